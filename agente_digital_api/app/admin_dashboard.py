@@ -6,6 +6,7 @@ Sistema de métricas y estadísticas en tiempo real para administradores
 
 from flask import Blueprint, jsonify, request
 from .database import get_db_connection
+from .modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from datetime import datetime, timedelta
 from functools import wraps
 import json
@@ -69,10 +70,11 @@ def obtener_metricas_generales():
         metricas['sesiones_activas'] = cursor.fetchone()[0]
         
         # Incidentes del mes
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT COUNT(*) FROM Incidentes 
             WHERE MONTH(FechaCreacion) = MONTH(GETDATE()) 
             AND YEAR(FechaCreacion) = YEAR(GETDATE())
+            AND {filtro_no_eliminados(cursor)}
         """)
         metricas['incidentes_mes'] = cursor.fetchone()[0]
         
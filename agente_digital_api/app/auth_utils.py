@@ -8,6 +8,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from agente_digital_api.config import Config
+from .revocacion_tokens import token_revocado
 
 def verificar_token(token):
     """Verifica y decodifica un token JWT"""
@@ -21,6 +22,8 @@ def verificar_token(token):
         
         config = Config()
         data = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
+        if token_revocado(data):
+            return None
         
         return {
             'id': data.get('sub'),
@@ -57,6 +60,8 @@ def token_required(f):
             # Decodificar token usando la clave JWT específica
             config = Config()
             data = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
+            if token_revocado(data):
+                return jsonify({'message': 'Token revocado'}), 401
             current_user_id = data['sub']
             current_user_rol = data['rol']
             current_user_email = data.get('email', '')
@@ -94,6 +99,8 @@ def verify_token_info(token):
     try:
         config = Config()
         data = jwt.decode(token, config.JWT_SECRET_KEY, algorithms=['HS256'])
+        if token_revocado(data):
+            return {'valid': False, 'error': 'Token revocado'}
         return {
             'valid': True,
             'user_id': data['sub'],
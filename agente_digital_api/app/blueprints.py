@@ -0,0 +1,104 @@
+# app/blueprints.py
+# Manifiesto declarativo de los módulos que registra create_app
+
+import importlib
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# modulo:      ruta relativa al paquete app
+# atributo:    Blueprint a registrar, o función registradora(app) si es_funcion
+# descripcion: nombre legible para logs y /api/info
+# respaldo:    entrada alternativa si el módulo principal no se puede importar
+# peso:        cuántos módulos aporta al contador modules_loaded
+ModuloApp = namedtuple('ModuloApp', 'modulo atributo descripcion respaldo es_funcion peso',
+                       defaults=(None, False, 1))
+
+
+MODULOS = (
+    ModuloApp('.modules.core.health', 'health_bp', 'salud'),
+    ModuloApp('.modules.admin.empresas', 'empresas_bp', 'empresas'),
+    ModuloApp('.modules.admin.incidentes', 'incidentes_bp', 'incidentes'),
+    ModuloApp('.views.incidente_views', 'incidente_bp', 'gestión de incidentes'),
+    ModuloApp('.views.incidente_views_simple', 'incidente_simple_bp', 'incidentes simple'),
+    ModuloApp('.views.incidente_test', 'incidente_test_bp', 'prueba de incidentes'),
+    ModuloApp('.views.incidente_cargar_completo', 'incidente_cargar_bp', 'carga completa de incidentes'),
+    ModuloApp('.views.incidente_clonar', 'incidente_clonar_bp', 'clonado perfecto'),
+    ModuloApp('.views.incidente_dinamico_views', 'incidente_dinamico_bp', 'sistema dinámico'),
+    ModuloApp('.views.incidentes_evidencias_views', 'incidentes_evidencias_bp', 'evidencias de incidentes'),
+    ModuloApp('.views.evidencias_eliminar', 'evidencias_eliminar_bp', 'eliminación de evidencias'),
+    ModuloApp('.modules.admin.cumplimiento', 'cumplimiento_bp', 'cumplimiento'),
+    ModuloApp('.modules.admin.cumplimiento_global', 'cumplimiento_global_bp', 'cumplimiento global'),
+    ModuloApp('.modules.admin.cumplimiento_evidencias', 'cumplimiento_evidencias_bp', 'evidencias de cumplimiento'),
+    ModuloApp('.modules.admin.inquilinos', 'inquilinos_bp', 'inquilinos',
+              respaldo=ModuloApp('.modules.admin.inquilinos_simple', 'inquilinos_simple_bp', 'inquilinos simple')),
+    ModuloApp('.modules.admin.resumen_inquilino', 'resumen_inquilino_bp', 'resumen de empresas por inquilino'),
+    ModuloApp('.planificador_tareas', 'tareas_bp', 'tareas de mantenimiento'),
+    ModuloApp('.views.escalabilidad_views', 'escalabilidad_bp', 'métricas de escalabilidad'),
+    ModuloApp('.modules.admin.taxonomias', 'taxonomias_bp', 'taxonomías'),
+    ModuloApp('.modules.admin.taxonomias_simple', 'taxonomias_simple_bp', 'taxonomías simple'),
+    ModuloApp('.modules.admin.acompanamiento', 'acompanamiento_bp', 'acompañamiento'),
+    ModuloApp('.modules.admin.incidentes_eliminar_completo', 'incidentes_eliminar_completo_bp',
+              'eliminación completa de incidentes',
+              respaldo=ModuloApp('.modules.admin.incidentes_redirect', 'incidentes_redirect_bp',
+                                 'redirección de incidentes')),
+    ModuloApp('.routes', 'auth_bp', 'autenticación'),
+    ModuloApp('.modules.admin', 'registrar_modulos_admin', 'incidentes (crear/editar)',
+              es_funcion=True, peso=2),
+    ModuloApp('.modules.admin.diagnostico_incidentes', 'diagnostico_bp', 'diagnóstico de incidentes'),
+    ModuloApp('.modules.incidentes', 'registrar_modulo_unificado', 'incidentes unificado v2', es_funcion=True),
+    ModuloApp('.modules.informes_anci_views', 'informes_anci_bp', 'informes ANCI'),
+    ModuloApp('.modules.admin.incidentes_admin_endpoints', 'incidentes_admin_bp',
+              'endpoints administrativos de incidentes'),
+    ModuloApp('.modules.admin.incidentes_actualizar', 'incidentes_actualizar_bp', 'actualización de incidentes'),
+    ModuloApp('.modules.admin.incidentes_delete_directo', 'incidentes_delete_bp',
+              'eliminación directa de incidentes'),
+    ModuloApp('.modules.admin.incidentes_estadisticas', 'estadisticas_bp', 'estadísticas de incidentes'),
+    ModuloApp('.modules.admin.paquete_evidencias', 'paquete_evidencias_bp', 'paquetes ZIP de evidencias'),
+    ModuloApp('.views.incidente_anci_actualizar', 'incidente_anci_actualizar_bp', 'actualización ANCI'),
+    ModuloApp('.views.incidente_taxonomias', 'incidente_taxonomias_bp', 'taxonomías de incidentes'),
+    ModuloApp('.views.incidente_taxonomias_simple', 'incidente_taxonomias_simple_bp', 'taxonomías simplificado'),
+    ModuloApp('.views.incidente_campos_anci', 'campos_anci_bp', 'campos ANCI'),
+    ModuloApp('.views.generar_documento_anci_simple', 'bp', 'generación de documentos ANCI'),
+)
+
+
+def _registrar_modulo(app, entrada):
+    """Importa y registra una entrada del manifiesto. Propaga ImportError."""
+    modulo = importlib.import_module(entrada.modulo, package=__package__)
+    objetivo = getattr(modulo, entrada.atributo)
+    if entrada.es_funcion:
+        objetivo(app)
+    else:
+        app.register_blueprint(objetivo)
+
+
+def registrar_modulos(app, modulos=MODULOS):
+    """Registra los módulos del manifiesto y retorna el total registrado.
+
+    Los módulos que no se pueden importar se omiten (probando su respaldo si
+    lo tienen) y quedan listados en ``app.extensions['agente_modulos']``.
+    """
+    registrados = 0
+    cargados = []
+    no_disponibles = {}
+
+    for entrada in modulos:
+        actual = entrada
+        while actual is not None:
+            try:
+                _registrar_modulo(app, actual)
+                registrados += actual.peso
+                cargados.append(actual.descripcion)
+                break
+            except ImportError as e:
+                no_disponibles[actual.descripcion] = str(e)
+                logger.warning("Módulo de %s no disponible: %s", actual.descripcion, e)
+                actual = actual.respaldo
+
+    app.extensions['agente_modulos'] = {
+        'registrados': cargados,
+        'no_disponibles': no_disponibles,
+    }
+    return registrados
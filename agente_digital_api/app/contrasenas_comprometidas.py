@@ -0,0 +1,270 @@
+# app/contrasenas_comprometidas.py
+# Verificación offline de contraseñas filtradas con un índice local de hashes
+"""
+Índice de contraseñas comprometidas en un archivo ordenado de prefijos SHA-1,
+consultado con mmap de solo lectura: todos los workers de gunicorn comparten
+las mismas páginas del cache del sistema operativo y no hay llamadas de red
+al validar una contraseña.
+
+Formato del archivo (little-endian):
+    cabecera   MAGIA (8 bytes), versión u16, ancho u16, total u64
+    fanout     65537 x u64: posición de la primera entrada cuyos dos primeros
+               bytes son >= i (la entrada 65536 es el total)
+    entradas   total x ``ancho`` bytes: los primeros ``ancho`` bytes del SHA-1,
+               ordenados y sin repetidos
+
+Una consulta lee dos valores del fanout y hace búsqueda binaria dentro del
+tramo (O(log n)). La tasa de falsos positivos es total / 256**ancho: el
+ancho se elige al construir según la tasa pedida (ver ancho_para_tasa).
+
+Construcción (desde una lista de contraseñas, una por línea, o un archivo
+de hashes SHA-1 de HaveIBeenPwned "HASH:conteo"):
+    python dev_tools/construir_indice_contrasenas.py lista.txt --fp 1e-6
+
+El índice no viene en el repositorio: se construye en cada despliegue. Mientras no
+exista, password_policy consulta la API k-anónima de HaveIBeenPwned; con
+PWNED_PASSWORDS_API=false la verificación queda apagada y se advierte en el
+log de arranque.
+
+Configuración (entorno):
+    INDICE_CONTRASENAS   ruta del índice (por defecto app/contrasenas_comprometidas.idx)
+    PWNED_PASSWORDS_API  'false' apaga la consulta en línea sin índice (por defecto 'true')
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIA = b'AGDPWIDX'
+VERSION = 1
+CABECERA = struct.Struct('<8sHHQ')
+FANOUT = struct.Struct('<QQ')
+ENTRADAS_FANOUT = 65537
+INICIO_ENTRADAS = CABECERA.size + ENTRADAS_FANOUT * 8
+
+ANCHO_MINIMO = 4
+ANCHO_MAXIMO = 20
+TASA_FP_DEFECTO = 1e-6
+
+RUTA_INDICE = os.environ.get(
+    'INDICE_CONTRASENAS', os.path.join(os.path.dirname(__file__), 'contrasenas_comprometidas.idx')
+)
+INTERVALO_REVISION = 60  # segundos entre revisiones de cambios del archivo
+
+
+class IndiceInvalido(ValueError):
+    """El archivo no es un índice de contraseñas válido"""
+
+
+def ancho_para_tasa(total: int, tasa_fp: float = TASA_FP_DEFECTO) -> int:
+    """Bytes de prefijo necesarios para que total / 256**ancho <= tasa_fp"""
+    ancho = ANCHO_MINIMO
+    while ancho < ANCHO_MAXIMO and max(total, 1) / 256 ** ancho > tasa_fp:
+        ancho += 1
+    return ancho
+
+
+def _es_hash_sha1(linea: bytes) -> bool:
+    """Línea con formato HaveIBeenPwned: 40 dígitos hex, opcionalmente ':conteo'"""
+    if len(linea) < 40 or (len(linea) > 40 and linea[40:41] != b':'):
+        return False
+    try:
+        bytes.fromhex(linea[:40].decode('ascii'))
+        return True
+    except (UnicodeDecodeError, ValueError):
+        return False
+
+
+def _digestos(rutas):
+    """SHA-1 de cada línea no vacía de los archivos (o el hash si ya viene en hex)"""
+    for ruta in rutas:
+        with open(ruta, 'rb') as archivo:
+            for linea in archivo:
+                linea = linea.rstrip(b'\r\n')
+                if not linea:
+                    continue
+                if _es_hash_sha1(linea):
+                    yield bytes.fromhex(linea[:40].decode('ascii'))
+                else:
+                    yield hashlib.sha1(linea).digest()
+
+
+def construir_indice(rutas, destino, tasa_fp=TASA_FP_DEFECTO, ancho=None, progreso=None):
+    """
+    Construye el índice desde uno o más archivos de contraseñas o hashes.
+
+    Reparte los prefijos en 256 archivos temporales según su primer byte y
+    ordena cada uno en memoria, así la memoria usada es ~1/256 del total y
+    sirve para listas de cientos de millones de entradas. El índice se
+    escribe en ``destino.tmp`` y se reemplaza de forma atómica: los workers
+    que tienen abierto el anterior lo siguen leyendo hasta recargar.
+
+    Returns:
+        dict con total, ancho, tasa_fp, bytes y segundos
+    """
+    inicio = time.time()
+    rutas = [rutas] if isinstance(rutas, (str, os.PathLike)) else list(rutas)
+
+    if ancho is None:
+        lineas = 0
+        for ruta in rutas:
+            with open(ruta, 'rb') as archivo:
+                lineas += sum(1 for _ in archivo)
+        ancho = ancho_para_tasa(lineas, tasa_fp)
+    if not ANCHO_MINIMO <= ancho <= ANCHO_MAXIMO:
+        raise ValueError(f"ancho debe estar entre {ANCHO_MINIMO} y {ANCHO_MAXIMO}")
+
+    with tempfile.TemporaryDirectory(prefix='indice_contrasenas_') as temporal:
+        cubetas = [open(os.path.join(temporal, f"{i:02x}"), 'wb', buffering=1 << 16) for i in range(256)]
+        try:
+            leidas = 0
+            for digesto in _digestos(rutas):
+                cubetas[digesto[0]].write(digesto[:ancho])
+                leidas += 1
+                if progreso and leidas % 1000000 == 0:
+                    progreso(f"{leidas} entradas leídas")
+        finally:
+            for cubeta in cubetas:
+                cubeta.close()
+
+        fanout = [0] * ENTRADAS_FANOUT
+        total = 0
+        temporal_destino = f"{destino}.tmp"
+        with open(temporal_destino, 'wb') as salida:
+            salida.seek(INICIO_ENTRADAS)
+            for primero in range(256):
+                ruta_cubeta = os.path.join(temporal, f"{primero:02x}")
+                with open(ruta_cubeta, 'rb') as cubeta:
+                    datos = cubeta.read()
+                os.remove(ruta_cubeta)
+                entradas = sorted({datos[i:i + ancho] for i in range(0, len(datos), ancho)})
+                for entrada in entradas:
+                    fanout[(entrada[0] << 8 | entrada[1]) + 1] += 1
+                salida.write(b''.join(entradas))
+                total += len(entradas)
+
+            # Conteos por prefijo de 2 bytes -> posiciones acumuladas
+            for i in range(1, ENTRADAS_FANOUT):
+                fanout[i] += fanout[i - 1]
+
+            salida.seek(0)
+            salida.write(CABECERA.pack(MAGIA, VERSION, ancho, total))
+            salida.write(struct.pack(f"<{ENTRADAS_FANOUT}Q", *fanout))
+        os.replace(temporal_destino, destino)
+
+    return {
+        'total': total,
+        'leidas': leidas,
+        'ancho': ancho,
+        'tasa_fp': total / 256 ** ancho,
+        'bytes': os.path.getsize(destino),
+        'segundos': round(time.time() - inicio, 2),
+    }
+
+
+class IndiceContrasenas:
+    """Consulta de solo lectura sobre un índice construido con construir_indice"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as archivo:
+            self.mtime = os.fstat(archivo.fileno()).st_mtime
+            self._mm = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < INICIO_ENTRADAS:
+            self._mm.close()
+            raise IndiceInvalido(f"{ruta}: archivo demasiado corto")
+        magia, version, self.ancho, self.total = CABECERA.unpack_from(self._mm, 0)
+        if magia != MAGIA or version != VERSION or len(self._mm) != INICIO_ENTRADAS + self.total * self.ancho:
+            self._mm.close()
+            raise IndiceInvalido(f"{ruta}: cabecera o tamaño inválidos")
+
+        self.stats = {'consultas': 0, 'coincidencias': 0}
+
+    @property
+    def tasa_falsos_positivos(self):
+        return self.total / 256 ** self.ancho
+
+    def contiene_hash(self, digesto: bytes) -> bool:
+        """True si los primeros ``ancho`` bytes del SHA-1 están en el índice"""
+        clave = digesto[:self.ancho]
+        bajo, alto = FANOUT.unpack_from(self._mm, CABECERA.size + (clave[0] << 8 | clave[1]) * 8)
+        mm, ancho = self._mm, self.ancho
+        while bajo < alto:
+            medio = (bajo + alto) >> 1
+            posicion = INICIO_ENTRADAS + medio * ancho
+            entrada = mm[posicion:posicion + ancho]
+            if entrada < clave:
+                bajo = medio + 1
+            elif entrada > clave:
+                alto = medio
+            else:
+                return True
+        return False
+
+    def contiene(self, password: str) -> bool:
+        """
+        True si la contraseña (o su versión en minúsculas, como la lista de
+        contraseñas comunes) está en el índice
+        """
+        self.stats['consultas'] += 1
+        encontrada = self.contiene_hash(hashlib.sha1(password.encode('utf-8')).digest())
+        if not encontrada and password.lower() != password:
+            encontrada = self.contiene_hash(hashlib.sha1(password.lower().encode('utf-8')).digest())
+        if encontrada:
+            self.stats['coincidencias'] += 1
+        return encontrada
+
+    def cerrar(self):
+        self._mm.close()
+
+
+# Instancia del proceso (se abre al primer uso, después del fork de gunicorn)
+_indice = None
+_revisado = 0.0
+_lock = threading.Lock()
+
+
+def obtener_indice(ruta=None):
+    """
+    Índice compartido del proceso, o None si el archivo no existe. Se reabre
+    si el archivo fue reemplazado (revisión cada INTERVALO_REVISION segundos).
+    """
+    global _indice, _revisado
+    ruta = ruta or RUTA_INDICE
+    ahora = time.time()
+    if _indice is not None and _indice.ruta == ruta and ahora - _revisado < INTERVALO_REVISION:
+        return _indice
+
+    with _lock:
+        _revisado = ahora
+        try:
+            mtime = os.stat(ruta).st_mtime
+        except OSError:
+            _indice = None
+            return None
+
+        if _indice is None or _indice.ruta != ruta or _indice.mtime != mtime:
+            try:
+                nuevo = IndiceContrasenas(ruta)
+            except (OSError, IndiceInvalido) as e:
+                logger.warning(f"No se pudo abrir el índice de contraseñas comprometidas: {e}")
+                return _indice
+            # El mmap anterior no se cierra: otro hilo puede estar consultándolo
+            _indice = nuevo
+            logger.info(f"Índice de contraseñas comprometidas: {nuevo.total} entradas, "
+                        f"tasa de falsos positivos {nuevo.tasa_falsos_positivos:.2e}")
+        return _indice
+
+
+def es_comprometida(password: str) -> bool:
+    """True si la contraseña está en el índice local (False si no hay índice)"""
+    indice = obtener_indice()
+    return indice is not None and indice.contiene(password)
@@ -0,0 +1,395 @@
+# app/db_request_scope.py
+# Conexión de base de datos por request y unidad de trabajo
+"""
+Dentro de un request, ``get_db_connection()`` entrega siempre la misma
+conexión (guardada en ``flask.g``) envuelta en ``ConexionRequest``:
+
+- ``close()`` no cierra; la conexión se libera en el teardown del request.
+- ``commit()``/``rollback()`` pasan directo a la conexión, salvo dentro de una
+  ``unidad_de_trabajo()``, donde el commit se difiere y se hace una sola vez
+  al cerrar la unidad (un rollback marca la unidad como fallida).
+- Se cuentan conexiones físicas, llamadas a get_db_connection y consultas;
+  en modo debug se exponen en headers ``X-DB-*``. Cada consulta se mide
+  además en app/query_monitor.py (huella, duración, filas, sitio de llamada).
+
+Fuera de un request (scripts, hilos de mantenimiento) get_db_connection
+sigue creando una conexión nueva por llamada.
+
+Sin conexión compartida, ``crear_conexion()`` envuelve cada conexión propia
+en ``ConexionMedida``: close() sí la cierra, pero sus cursores suman a los
+mismos contadores del request, así X-DB-* y /api/scalability tienen datos
+en el modo por defecto.
+
+El modo es opcional: los endpoints existentes hacen commit/rollback/close
+por su cuenta asumiendo conexión propia, y con una conexión compartida un
+rollback de un helper descarta lo pendiente de otro. Activarlo solo tras
+revisar los endpoints del despliegue (o usar unidades de trabajo).
+
+Configuración (app.config):
+    DB_CONEXION_POR_REQUEST           False por defecto (una conexión por llamada); True comparte la conexión
+    DB_UNIDAD_DE_TRABAJO_POR_REQUEST  abre una unidad de trabajo por request (commit si status < 500);
+                                      requiere DB_CONEXION_POR_REQUEST
+    DB_METRICAS_HEADERS               headers X-DB-*; None = solo en debug
+"""
+
+import logging
+import time
+from contextlib import ContextDecorator
+from flask import g, has_request_context, current_app
+
+from .query_monitor import monitor_consultas
+
+logger = logging.getLogger(__name__)
+
+_CLAVE_ESTADO = '_db_estado_request'
+
+
+class EstadoConexionRequest:
+    """Conexión compartida y contadores de un request"""
+
+    __slots__ = ('conexion', 'conexiones_abiertas', 'solicitudes', 'consultas',
+                 'unidades_activas', 'commit_pendiente', 'fallida', 'fallo_conexion')
+
+    def __init__(self):
+        self.conexion = None
+        self.conexiones_abiertas = 0
+        self.solicitudes = 0
+        self.consultas = 0
+        self.unidades_activas = 0
+        self.commit_pendiente = False
+        self.fallida = False
+        self.fallo_conexion = False
+
+
+class CursorRequest:
+    """Cursor que cuenta y mide las consultas ejecutadas en el request"""
+
+    __slots__ = ('_cursor', '_conexion', '_estado', '_registro')
+
+    def __init__(self, cursor, conexion, estado):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_conexion', conexion)
+        object.__setattr__(self, '_estado', estado)
+        object.__setattr__(self, '_registro', None)
+
+    def _ejecutar(self, metodo, sql, args, kwargs):
+        self._estado.consultas += 1
+        registro = monitor_consultas.iniciar(sql)
+        object.__setattr__(self, '_registro', registro)
+        if registro is None:
+            return metodo(sql, *args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, *args, **kwargs)
+        finally:
+            monitor_consultas.sumar(registro, time.perf_counter() - inicio)
+
+    def execute(self, sql, *args, **kwargs):
+        resultado = self._ejecutar(self._cursor.execute, sql, args, kwargs)
+        # pyodbc retorna el mismo cursor para encadenar .fetchone()
+        return self if resultado is self._cursor else resultado
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._ejecutar(self._cursor.executemany, sql, args, kwargs)
+
+    def _leer(self, metodo, *args):
+        registro = self._registro
+        if registro is None:
+            return metodo(*args)
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        if isinstance(resultado, list):
+            filas = len(resultado)
+        else:
+            filas = 0 if resultado is None else 1
+        monitor_consultas.sumar(registro, time.perf_counter() - inicio, filas)
+        return resultado
+
+    def fetchone(self):
+        return self._leer(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._leer(self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._leer(self._cursor.fetchmany, *args)
+
+    def fetchval(self):
+        return self._leer(self._cursor.fetchval)
+
+    def __iter__(self):
+        if self._registro is None:
+            return iter(self._cursor)
+        return self._iterar()
+
+    def _iterar(self):
+        while True:
+            fila = self.fetchone()
+            if fila is None:
+                return
+            yield fila
+
+    def commit(self):
+        # pyodbc: cursor.commit() confirma la conexión; pasa por la unidad de trabajo
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Igual que pyodbc: commit al salir sin error; el cursor no se cierra
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # p.ej. cursor.fast_executemany = True
+        setattr(self._cursor, nombre, valor)
+
+
+class ConexionRequest:
+    """Proxy de la conexión compartida del request"""
+
+    __slots__ = ('_conexion', '_estado')
+
+    def __init__(self, conexion, estado):
+        object.__setattr__(self, '_conexion', conexion)
+        object.__setattr__(self, '_estado', estado)
+
+    def cursor(self):
+        return CursorRequest(self._conexion.cursor(), self, self._estado)
+
+    def commit(self):
+        if self._estado.unidades_activas:
+            self._estado.commit_pendiente = True
+        else:
+            self._conexion.commit()
+
+    def rollback(self):
+        if self._estado.unidades_activas:
+            self._estado.fallida = True
+        self._conexion.rollback()
+
+    def close(self):
+        """La conexión del request se cierra en el teardown"""
+
+    def execute(self, *args, **kwargs):
+        # pyodbc: conn.execute() crea un cursor nuevo
+        return self.cursor().execute(*args, **kwargs)
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Igual que pyodbc: commit al salir sin error, rollback con error
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._conexion, nombre, valor)
+
+
+class ConexionMedida:
+    """Conexión propia (no compartida) cuyos cursores cuentan y miden las consultas"""
+
+    __slots__ = ('_conexion', '_estado')
+
+    def __init__(self, conexion, estado):
+        object.__setattr__(self, '_conexion', conexion)
+        object.__setattr__(self, '_estado', estado)
+
+    def cursor(self):
+        return CursorRequest(self._conexion.cursor(), self._conexion, self._estado)
+
+    def execute(self, *args, **kwargs):
+        return self.cursor().execute(*args, **kwargs)
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conexion.commit()
+        else:
+            self._conexion.rollback()
+        return False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._conexion, nombre, valor)
+
+
+def conexion_medida(conexion):
+    """Envuelve una conexión física nueva; dentro de un request suma a sus contadores"""
+    if has_request_context():
+        estado = _estado_actual(crear=True)
+        estado.conexiones_abiertas += 1
+        estado.solicitudes += 1
+    else:
+        estado = EstadoConexionRequest()
+    return ConexionMedida(conexion, estado)
+
+
+def _alcance_activo():
+    return has_request_context() and current_app.config.get('DB_CONEXION_POR_REQUEST', False)
+
+
+def _estado_actual(crear=False):
+    estado = g.get(_CLAVE_ESTADO)
+    if estado is None and crear:
+        estado = EstadoConexionRequest()
+        setattr(g, _CLAVE_ESTADO, estado)
+    return estado
+
+
+def obtener_conexion_request(crear_conexion):
+    """Retorna (True, conexión del request) o (False, None) si no hay alcance de request.
+
+    La conexión física se abre en la primera llamada del request. Si falla,
+    las llamadas siguientes del mismo request retornan None sin reintentar.
+    """
+    if not _alcance_activo():
+        return False, None
+
+    estado = _estado_actual(crear=True)
+    estado.solicitudes += 1
+    if estado.conexion is None and not estado.fallo_conexion:
+        conexion = crear_conexion()
+        if conexion is None:
+            estado.fallo_conexion = True
+        else:
+            estado.conexiones_abiertas += 1
+            estado.conexion = ConexionRequest(conexion, estado)
+    return True, estado.conexion
+
+
+def _finalizar_unidad(estado, confirmar):
+    conexion = estado.conexion
+    try:
+        if conexion is not None:
+            if confirmar and estado.commit_pendiente and not estado.fallida:
+                conexion._conexion.commit()
+            elif estado.commit_pendiente or estado.fallida:
+                conexion._conexion.rollback()
+    finally:
+        estado.commit_pendiente = False
+        estado.fallida = False
+
+
+class unidad_de_trabajo(ContextDecorator):
+    """Agrupa los commits del request en uno solo al cerrar la unidad.
+
+    Uso como context manager (``with unidad_de_trabajo(): ...``) o como
+    decorador de endpoint (``@unidad_de_trabajo()``). Las unidades anidadas
+    se suman a la externa. Fuera de un request no tiene efecto.
+    """
+
+    def __enter__(self):
+        self._estado = _estado_actual(crear=True) if _alcance_activo() else None
+        if self._estado is not None:
+            self._estado.unidades_activas += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        estado = self._estado
+        if estado is None:
+            return False
+        estado.unidades_activas -= 1
+        if estado.unidades_activas == 0:
+            _finalizar_unidad(estado, confirmar=exc_type is None)
+        return False
+
+
+def estadisticas_request():
+    """Contadores de BD del request actual (vacío fuera de un request)"""
+    if not has_request_context():
+        return {}
+    estado = _estado_actual()
+    if estado is None:
+        return {'conexiones': 0, 'solicitudes': 0, 'consultas': 0}
+    return {
+        'conexiones': estado.conexiones_abiertas,
+        'solicitudes': estado.solicitudes,
+        'consultas': estado.consultas,
+    }
+
+
+def liberar_conexion_request(error=None):
+    """Cierra la conexión del request. Idempotente; seguro de llamar en teardown."""
+    estado = g.pop(_CLAVE_ESTADO, None)
+    if estado is None or estado.conexion is None:
+        return
+
+    conexion = estado.conexion._conexion
+    try:
+        if estado.unidades_activas:
+            # Unidad abierta al terminar el request (p.ej. excepción no capturada)
+            estado.unidades_activas = 0
+            _finalizar_unidad(estado, confirmar=error is None)
+        # Lo no confirmado explícitamente se descarta, igual que al cerrar una conexión pyodbc
+        conexion.rollback()
+    except Exception as e:
+        logger.warning(f"Error finalizando transacción del request: {e}")
+    finally:
+        try:
+            conexion.close()
+        except Exception as e:
+            logger.warning(f"Error cerrando conexión del request: {e}")
+
+
+def init_request_db(app):
+    """Registra la liberación de la conexión y los headers de métricas"""
+    app.config.setdefault('DB_CONEXION_POR_REQUEST', False)
+    app.config.setdefault('DB_METRICAS_HEADERS', None)  # None: solo en debug
+
+    if app.config.get('DB_UNIDAD_DE_TRABAJO_POR_REQUEST'):
+        @app.before_request
+        def _abrir_unidad_request():
+            estado = _estado_actual(crear=True)
+            estado.unidades_activas += 1
+
+        @app.after_request
+        def _cerrar_unidad_request(response):
+            # Un 5xx devuelto por robust_endpoint no lleva excepción: se descarta igual
+            estado = _estado_actual()
+            if estado is not None and estado.unidades_activas:
+                estado.unidades_activas -= 1
+                if estado.unidades_activas == 0:
+                    _finalizar_unidad(estado, confirmar=response.status_code < 500)
+            return response
+
+    @app.after_request
+    def _headers_metricas_db(response):
+        mostrar = app.config['DB_METRICAS_HEADERS']
+        if mostrar is None:
+            mostrar = app.debug
+        if mostrar:
+            stats = estadisticas_request()
+            response.headers['X-DB-Connections'] = str(stats.get('conexiones', 0))
+            response.headers['X-DB-Connection-Requests'] = str(stats.get('solicitudes', 0))
+            response.headers['X-DB-Queries'] = str(stats.get('consultas', 0))
+        return response
+
+    @app.teardown_request
+    def _liberar_conexion(error=None):
+        liberar_conexion_request(error)
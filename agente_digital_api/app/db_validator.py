@@ -5,21 +5,71 @@ Valida existencia de tablas, columnas y construye consultas seguras.
 """
 
 import pyodbc
+import threading
+import time
 from functools import wraps
-from typing import List, Dict, Optional, Tuple, Any
+from types import MappingProxyType
+from typing import List, Dict, Optional, Tuple, Any, FrozenSet, Mapping, NamedTuple
 import logging
 
 # Configurar logging específico para validación
 logging.basicConfig(level=logging.INFO)
 validator_logger = logging.getLogger('db_validator')
 
+# Una sola consulta para todo el esquema: tablas y vistas con sus columnas en
+# orden. Si un nombre existe en varios esquemas se usa el de dbo.
+QUERY_SNAPSHOT_ESQUEMA = """
+    SELECT t.TABLE_SCHEMA, t.TABLE_NAME, c.COLUMN_NAME
+    FROM INFORMATION_SCHEMA.TABLES t
+    LEFT JOIN INFORMATION_SCHEMA.COLUMNS c
+        ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
+    ORDER BY t.TABLE_NAME,
+             CASE WHEN t.TABLE_SCHEMA = 'dbo' THEN 0 ELSE 1 END,
+             t.TABLE_SCHEMA,
+             c.ORDINAL_POSITION
+"""
+
+# Cambia al crear/eliminar tablas o vistas y al alterarlas (modify_date)
+QUERY_VERSION_ESQUEMA = """
+    SELECT COUNT(*), MAX(modify_date)
+    FROM sys.objects
+    WHERE type IN ('U', 'V')
+"""
+
+
+class TablaEsquema(NamedTuple):
+    """Metadatos inmutables de una tabla"""
+    nombre: str
+    columnas: Tuple[str, ...]        # En orden de ORDINAL_POSITION
+    conjunto: FrozenSet[str]         # Para pruebas de pertenencia O(1)
+
+
+class SnapshotEsquema(NamedTuple):
+    """Foto inmutable del esquema, indexada por nombre de tabla en minúsculas
+    (la collation de SQL Server no distingue mayúsculas en los nombres)"""
+    tablas: Mapping[str, TablaEsquema]
+    version: Tuple[Any, ...]
+    cargado_en: float
+
+    def tabla(self, nombre: str) -> Optional[TablaEsquema]:
+        return self.tablas.get(nombre.lower())
+
+
 class DatabaseValidator:
-    """Validador robusto de base de datos con cache de metadatos"""
+    """Validador robusto de base de datos con snapshot de metadatos.
+
+    El esquema completo se carga en una consulta y se comparte entre
+    requests. Cada ``intervalo_verificacion`` segundos se compara la versión
+    (cantidad de objetos y última modify_date) y se recarga solo si cambió;
+    entre verificaciones cada consulta es una búsqueda en un dict.
+    """
     
-    def __init__(self):
-        self._table_cache = {}
-        self._column_cache = {}
-        self._cache_initialized = False
+    def __init__(self, intervalo_verificacion: float = 60.0, espera_reintento: float = 5.0):
+        self.intervalo_verificacion = intervalo_verificacion
+        self.espera_reintento = espera_reintento
+        self._snapshot: Optional[SnapshotEsquema] = None
+        self._proxima_verificacion = 0.0
+        self._lock = threading.Lock()
     
     def validate_connection(self, cursor) -> bool:
         """Valida que la conexión a base de datos esté activa"""
@@ -31,70 +81,92 @@ class DatabaseValidator:
             validator_logger.error(f"❌ Conexión a BD inválida: {str(e)}")
             return False
     
-    def table_exists(self, cursor, table_name: str) -> bool:
-        """Verifica si una tabla existe en la base de datos"""
-        if not self.validate_connection(cursor):
-            return False
-            
-        # Usar cache si disponible
-        if table_name in self._table_cache:
-            return self._table_cache[table_name]
+    # ------------------------------------------------------------------
+    # Snapshot del esquema
+    # ------------------------------------------------------------------
+    
+    def _leer_version(self, cursor) -> Tuple[Any, ...]:
+        cursor.execute(QUERY_VERSION_ESQUEMA)
+        return tuple(cursor.fetchone())
+    
+    def _cargar_snapshot(self, cursor, version: Tuple[Any, ...]) -> SnapshotEsquema:
+        cursor.execute(QUERY_SNAPSHOT_ESQUEMA)
+        columnas_por_tabla: Dict[str, List[str]] = {}
+        origen: Dict[str, Tuple[str, str]] = {}
+        for esquema, nombre_tabla, columna in cursor.fetchall():
+            clave = nombre_tabla.lower()
+            if clave not in origen:
+                origen[clave] = (esquema, nombre_tabla)
+                columnas_por_tabla[clave] = []
+            # Solo el primer esquema (dbo si existe) aporta columnas
+            if columna is not None and origen[clave] == (esquema, nombre_tabla):
+                columnas_por_tabla[clave].append(columna)
         
+        tablas = {
+            clave: TablaEsquema(origen[clave][1], tuple(columnas), frozenset(columnas))
+            for clave, columnas in columnas_por_tabla.items()
+        }
+        validator_logger.info(f"🔍 Snapshot de esquema cargado: {len(tablas)} tablas")
+        return SnapshotEsquema(MappingProxyType(tablas), version, time.time())
+    
+    def snapshot(self, cursor) -> Optional[SnapshotEsquema]:
+        """Retorna el snapshot vigente, cargándolo o refrescándolo si corresponde."""
+        actual = self._snapshot
+        if actual is not None and time.monotonic() < self._proxima_verificacion:
+            return actual
+        
+        # Un solo hilo verifica; el resto sigue con el snapshot anterior
+        if not self._lock.acquire(blocking=actual is None):
+            return actual
         try:
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_NAME = ?
-            """, (table_name,))
-            exists = cursor.fetchone()[0] > 0
-            
-            # Guardar en cache
-            self._table_cache[table_name] = exists
-            validator_logger.info(f"🔍 Tabla '{table_name}': {'EXISTE' if exists else 'NO EXISTE'}")
-            return exists
-            
-        except Exception as e:
-            validator_logger.error(f"❌ Error verificando tabla '{table_name}': {str(e)}")
-            self._table_cache[table_name] = False
-            return False
+            actual = self._snapshot
+            if actual is not None and time.monotonic() < self._proxima_verificacion:
+                return actual
+            try:
+                version = self._leer_version(cursor)
+                if actual is None or actual.version != version:
+                    actual = self._snapshot = self._cargar_snapshot(cursor, version)
+                self._proxima_verificacion = time.monotonic() + self.intervalo_verificacion
+            except Exception as e:
+                validator_logger.error(f"❌ Error cargando esquema de BD: {str(e)}")
+                self._proxima_verificacion = time.monotonic() + self.espera_reintento
+            return actual
+        finally:
+            self._lock.release()
+    
+    def get_table(self, cursor, table_name: str) -> Optional[TablaEsquema]:
+        """Metadatos de una tabla, o None si no existe"""
+        snapshot = self.snapshot(cursor)
+        return snapshot.tabla(table_name) if snapshot is not None else None
+    
+    def table_exists(self, cursor, table_name: str) -> bool:
+        """Verifica si una tabla existe en la base de datos"""
+        return self.get_table(cursor, table_name) is not None
     
     def get_table_columns(self, cursor, table_name: str) -> List[str]:
         """Obtiene lista de columnas de una tabla"""
-        if not self.validate_connection(cursor):
-            return []
-            
-        # Usar cache si disponible
-        cache_key = table_name
-        if cache_key in self._column_cache:
-            return self._column_cache[cache_key]
-        
-        if not self.table_exists(cursor, table_name):
-            self._column_cache[cache_key] = []
-            return []
-        
-        try:
-            cursor.execute("""
-                SELECT COLUMN_NAME 
-                FROM INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_NAME = ?
-                ORDER BY ORDINAL_POSITION
-            """, (table_name,))
-            
-            columns = [row[0] for row in cursor.fetchall()]
-            
-            # Guardar en cache
-            self._column_cache[cache_key] = columns
-            validator_logger.info(f"🔍 Columnas de '{table_name}': {len(columns)} columnas encontradas")
-            return columns
-            
-        except Exception as e:
-            validator_logger.error(f"❌ Error obteniendo columnas de '{table_name}': {str(e)}")
-            self._column_cache[cache_key] = []
-            return []
+        tabla = self.get_table(cursor, table_name)
+        return list(tabla.columnas) if tabla is not None else []
+    
+    # Compatibilidad con los endpoints de salud que inspeccionan el cache
+    @property
+    def _table_cache(self) -> Dict[str, bool]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+        return {tabla.nombre: True for tabla in snapshot.tablas.values()}
+    
+    @property
+    def _column_cache(self) -> Dict[str, List[str]]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+        return {tabla.nombre: list(tabla.columnas) for tabla in snapshot.tablas.values()}
     
     def validate_columns_exist(self, cursor, table_name: str, required_columns: List[str]) -> Tuple[List[str], List[str]]:
         """Valida qué columnas existen y cuáles faltan"""
-        available_columns = self.get_table_columns(cursor, table_name)
+        tabla = self.get_table(cursor, table_name)
+        available_columns = tabla.conjunto if tabla is not None else frozenset()
         
         existing = [col for col in required_columns if col in available_columns]
         missing = [col for col in required_columns if col not in available_columns]
@@ -109,13 +181,12 @@ class DatabaseValidator:
                                order_by: str = "") -> Tuple[str, List[str]]:
         """Construye una consulta SELECT segura con columnas validadas"""
         
-        if not self.table_exists(cursor, table_name):
+        tabla = self.get_table(cursor, table_name)
+        if tabla is None:
             validator_logger.error(f"❌ Tabla '{table_name}' no existe")
             return "", []
         
-        available_columns = self.get_table_columns(cursor, table_name)
-        
-        if not available_columns:
+        if not tabla.columnas:
             validator_logger.error(f"❌ Tabla '{table_name}' no tiene columnas")
             return "", []
         
@@ -124,7 +195,7 @@ class DatabaseValidator:
         table_alias = table_name[0].lower()  # Usar primera letra como alias
         
         for col in desired_columns:
-            if col in available_columns:
+            if col in tabla.conjunto:
                 safe_columns.append(f"{table_alias}.{col}")
             else:
                 validator_logger.warning(f"⚠️ Columna '{col}' no existe en '{table_name}', omitiendo")
@@ -132,7 +203,7 @@ class DatabaseValidator:
         # Si no hay columnas válidas, usar todas las disponibles (máximo 10)
         if not safe_columns:
             validator_logger.warning(f"⚠️ Ninguna columna deseada existe, usando columnas disponibles")
-            safe_columns = [f"{table_alias}.{col}" for col in available_columns[:10]]
+            safe_columns = [f"{table_alias}.{col}" for col in tabla.columnas[:10]]
         
         # Construir consulta
         query_parts = [
@@ -153,13 +224,14 @@ class DatabaseValidator:
         final_query = " ".join(query_parts)
         actual_columns = [col.split('.')[-1] for col in safe_columns]  # Quitar alias de tabla
         
-        validator_logger.info(f"✅ Consulta segura construida para '{table_name}' con {len(actual_columns)} columnas")
+        validator_logger.debug(f"✅ Consulta segura construida para '{table_name}' con {len(actual_columns)} columnas")
         return final_query, actual_columns
     
     def clear_cache(self):
-        """Limpia el cache de metadatos"""
-        self._table_cache.clear()
-        self._column_cache.clear()
+        """Descarta el snapshot; la próxima consulta recarga el esquema"""
+        with self._lock:
+            self._snapshot = None
+            self._proxima_verificacion = 0.0
         validator_logger.info("🧹 Cache de validación limpiado")
 
 # Instancia global del validador
@@ -275,7 +347,8 @@ def get_standard_fields(table_name: str) -> Dict[str, str]:
 
 def validate_and_map_fields(cursor, table_name: str, desired_fields: Dict[str, str]) -> Dict[str, str]:
     """Valida y mapea campos deseados con campos reales de la tabla"""
-    available_columns = db_validator.get_table_columns(cursor, table_name)
+    tabla = db_validator.get_table(cursor, table_name)
+    available_columns = tabla.conjunto if tabla is not None else frozenset()
     validated_mapping = {}
     
     for standard_name, db_column in desired_fields.items():
@@ -5,6 +5,7 @@
 #-----------------------------------------------------------------------------------
 from flask import Blueprint, jsonify
 from app.database import get_db_connection
+from app.json_rapido import filas_a_dicts
 
 inquilinos_bp = Blueprint('inquilinos', __name__, url_prefix='/api/inquilinos')
 
@@ -19,9 +20,7 @@ def get_inquilinos():
     if conn:
         cursor = conn.cursor()
         cursor.execute("SELECT InquilinoID, NombreInquilino FROM Inquilinos WHERE Activo = 1 ORDER BY NombreInquilino")
-        rows = cursor.fetchall()
-        columns = [column[0] for column in cursor.description]
-        inquilinos = [dict(zip(columns, row)) for row in rows]
+        inquilinos = filas_a_dicts(cursor)
         conn.close()
     return jsonify(inquilinos)
 
@@ -36,8 +35,6 @@ def get_empresas_por_inquilino(inquilino_id):
     if conn:
         cursor = conn.cursor()
         cursor.execute("SELECT EmpresaID, NombreEmpresa FROM Empresas WHERE InquilinoID = ? ORDER BY NombreEmpresa", (inquilino_id,))
-        rows = cursor.fetchall()
-        columns = [column[0] for column in cursor.description]
-        empresas = [dict(zip(columns, row)) for row in rows]
+        empresas = filas_a_dicts(cursor)
         conn.close()
     return jsonify(empresas)
\ No newline at end of file
@@ -0,0 +1,172 @@
+# app/json_rapido.py
+# Serialización JSON rápida para las respuestas de la API
+"""
+Dos piezas para los endpoints que devuelven listas grandes:
+
+- ``ProveedorJSONRapido``: proveedor JSON de Flask sobre orjson (si está
+  instalado; si no, json de la stdlib en modo compacto). Respeta
+  JSON_SORT_KEYS y JSON_AS_ASCII de app.config, que Flask 2.3 ya no lee.
+  Por compatibilidad con el frontend las fechas siguen saliendo en formato
+  HTTP (RFC 822) como con jsonify; JSON_FECHAS_ISO=True usa ISO 8601, que
+  orjson serializa de forma nativa. Decimal sale como string, igual que antes.
+- ``filas_a_dicts``/``mapeador_filas``: reemplazo de
+  ``[dict(zip(columns, row)) for row in rows]`` con una función compilada
+  una vez por forma de consulta (nombres de columnas de cursor.description).
+"""
+
+import dataclasses
+import decimal
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.info("orjson no disponible, se usa json de la stdlib")
+
+
+# ----------------------------------------------------------------------
+# Filas de pyodbc a dicts
+# ----------------------------------------------------------------------
+
+@lru_cache(maxsize=512)
+def _compilar_mapeador(columnas):
+    """Compila ``lambda fila: {'Col0': fila[0], 'Col1': fila[1], ...}`` para estas columnas"""
+    cuerpo = ', '.join(f"{columna!r}: fila[{i}]" for i, columna in enumerate(columnas))
+    return eval(f"lambda fila: {{{cuerpo}}}", {})  # noqa: S307 - solo nombres de columna con repr()
+
+
+def mapeador_filas(cursor_o_descripcion):
+    """Función fila -> dict para la descripción del cursor (compilada una vez por forma)"""
+    descripcion = getattr(cursor_o_descripcion, 'description', cursor_o_descripcion)
+    return _compilar_mapeador(tuple(columna[0] for columna in descripcion))
+
+
+def filas_a_dicts(cursor, filas=None):
+    """Filas del último SELECT del cursor como lista de dicts (fetchall si no se entregan)"""
+    if filas is None:
+        filas = cursor.fetchall()
+    mapear = mapeador_filas(cursor)
+    return [mapear(fila) for fila in filas]
+
+
+def fila_a_dict(cursor, fila):
+    return mapeador_filas(cursor)(fila) if fila is not None else None
+
+
+# ----------------------------------------------------------------------
+# Proveedor JSON
+# ----------------------------------------------------------------------
+
+_DIAS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MESES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def fecha_http(valor):
+    """Igual que werkzeug.http.http_date (naive = UTC), sin pasar por email.utils"""
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc)
+        hora = f"{valor.hour:02d}:{valor.minute:02d}:{valor.second:02d}"
+    else:
+        hora = "00:00:00"
+    return (f"{_DIAS[valor.weekday()]}, {valor.day:02d} {_MESES[valor.month - 1]} "
+            f"{valor.year:04d} {hora} GMT")
+
+
+def _por_defecto_http(obj):
+    """Tipos que ni orjson ni json serializan solos, con el mismo formato que jsonify"""
+    if isinstance(obj, date):
+        return fecha_http(obj)
+    if isinstance(obj, time):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _por_defecto_iso(obj):
+    if isinstance(obj, (date, time)):
+        return obj.isoformat()
+    return _por_defecto_http(obj)
+
+
+class ProveedorJSONRapido(DefaultJSONProvider):
+    """DefaultJSONProvider con orjson en dumps/loads/response"""
+
+    sort_keys = False
+    ensure_ascii = False
+    fechas_iso = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.sort_keys = app.config.get('JSON_SORT_KEYS', self.sort_keys)
+        self.ensure_ascii = app.config.get('JSON_AS_ASCII', self.ensure_ascii)
+        self.fechas_iso = app.config.get(
+            'JSON_FECHAS_ISO', os.environ.get('JSON_FECHAS_ISO', 'false').lower() == 'true')
+        self.default = _por_defecto_iso if self.fechas_iso else _por_defecto_http
+
+        self._opciones_orjson = 0
+        if orjson is not None:
+            self._opciones_orjson = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                self._opciones_orjson |= orjson.OPT_SORT_KEYS
+            if not self.fechas_iso:
+                self._opciones_orjson |= orjson.OPT_PASSTHROUGH_DATETIME
+        self.stats = {'respuestas': 0, 'respaldo_stdlib': 0}
+
+    @property
+    def motor(self):
+        # orjson no escapa a ASCII; con JSON_AS_ASCII se usa la stdlib
+        return 'orjson' if orjson is not None and not self.ensure_ascii else 'json'
+
+    def _bytes(self, obj):
+        if self.motor == 'orjson':
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._opciones_orjson)
+            except TypeError:
+                # Enteros de más de 64 bits u otros casos que orjson no acepta
+                self.stats['respaldo_stdlib'] += 1
+        return json.dumps(obj, default=self.default, ensure_ascii=self.ensure_ascii,
+                          sort_keys=self.sort_keys, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', self.default)
+            return super().dumps(obj, **kwargs)
+        return self._bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # En debug (o compact=False) se mantiene la salida indentada de Flask
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        self.stats['respuestas'] += 1
+        return self._app.response_class(self._bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def init_json_rapido(app):
+    """Instala ProveedorJSONRapido como app.json"""
+    app.json_provider_class = ProveedorJSONRapido
+    app.json = ProveedorJSONRapido(app)
+    print(f"⚡ JSON de respuestas con {app.json.motor}"
+          + (" (fechas ISO 8601)" if app.json.fechas_iso else ""))
+    return app.json
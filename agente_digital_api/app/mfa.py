@@ -2,12 +2,15 @@
 # Sistema de Autenticación Multifactor (MFA) para Agente Digital
 
 import os
+import importlib.util
 try:
-    import qrcode
     import pyotp
+    # qrcode (y PIL) se importa solo al generar el código QR
+    if importlib.util.find_spec('qrcode') is None:
+        raise ImportError("qrcode no instalado")
     MFA_AVAILABLE = True
 except ImportError:
-    from .fallback_imports import qrcode, pyotp
+    from .fallback_imports import pyotp
     MFA_AVAILABLE = False
 import logging
 import smtplib
@@ -52,6 +55,10 @@ class MFAManager:
             )
             
             # Generar código QR
+            if MFA_AVAILABLE:
+                import qrcode
+            else:
+                from .fallback_imports import qrcode
             qr = qrcode.QRCode(
                 version=1,
                 error_correction=qrcode.constants.ERROR_CORRECT_L,
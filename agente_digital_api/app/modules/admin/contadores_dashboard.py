@@ -0,0 +1,247 @@
+# modules/admin/contadores_dashboard.py
+# Contadores mantenidos por empresa para el dashboard
+"""
+La tabla EmpresaContadoresDashboard (sql/contadores_dashboard_empresa.sql)
+guarda una fila por empresa con los totales del dashboard. Los triggers de
+Incidentes, CumplimientoEmpresa, EvidenciasCumplimiento y EvidenciasIncidentes
+aplican los deltas en la misma transacción que la escritura, así que el
+dashboard se resuelve con una lectura por clave primaria.
+
+``reconciliar_contadores`` recalcula desde las tablas base (cada tabla
+agregada por separado, sin multiplicar filas) y corrige los desvíos.
+Ejecutar periódicamente o tras cargas masivas:
+
+    python -m app.modules.admin.contadores_dashboard              # todas
+    python -m app.modules.admin.contadores_dashboard --empresa 3  # una
+"""
+
+import logging
+import time
+
+from .eliminacion_incidentes import filtro_no_eliminados
+
+logger = logging.getLogger(__name__)
+
+TABLA_CONTADORES = 'EmpresaContadoresDashboard'
+TRIGGERS_CONTADORES = (
+    'TR_Incidentes_ContadoresDashboard',
+    'TR_CumplimientoEmpresa_ContadoresDashboard',
+    'TR_EvidenciasCumplimiento_ContadoresDashboard',
+    'TR_EvidenciasIncidentes_ContadoresDashboard',
+)
+
+COLUMNAS_CONTADORES = (
+    'IncidentesTotal', 'IncidentesAbiertos', 'IncidentesCerrados', 'IncidentesPendientes',
+    'IncidentesCritAlta', 'IncidentesCritMedia', 'IncidentesCritBaja', 'IncidentesCriticosAbiertos',
+    'ObligacionesTotal', 'ObligacionesImplementadas', 'ObligacionesEnProceso',
+    'ObligacionesPendientes', 'ObligacionesVencidas', 'ObligacionesNoAplica',
+    'AvanceSuma', 'AvanceCantidad',
+    'EvidenciasCumplimiento', 'EvidenciasIncidentes',
+)
+
+QUERY_CONTADORES = f"""
+    SELECT {', '.join(COLUMNAS_CONTADORES)}, FechaActualizacion, FechaReconciliacion
+    FROM {TABLA_CONTADORES}
+    WHERE EmpresaID = ?
+"""
+
+QUERY_DISPONIBILIDAD = f"""
+    SELECT
+        CASE WHEN OBJECT_ID('{TABLA_CONTADORES}', 'U') IS NULL THEN 0 ELSE 1 END,
+        (SELECT COUNT(*) FROM sys.triggers WHERE name IN ({', '.join('?' for _ in TRIGGERS_CONTADORES)}))
+"""
+
+# Valores esperados por empresa calculados desde las tablas base. Cada
+# agregado se resuelve por separado y se une por EmpresaID. {vigentes}
+# excluye los incidentes eliminados pendientes de purga, como los triggers.
+QUERY_RECONCILIAR = f"""
+    SET NOCOUNT ON;
+    DECLARE @EmpresaID INT = ?;
+
+    WITH inc AS (
+        SELECT EmpresaID,
+            COUNT(*) AS Total,
+            SUM(CASE WHEN EstadoActual = 'Abierto' THEN 1 ELSE 0 END) AS Abiertos,
+            SUM(CASE WHEN EstadoActual = 'Cerrado' THEN 1 ELSE 0 END) AS Cerrados,
+            SUM(CASE WHEN EstadoActual = 'Pendiente' THEN 1 ELSE 0 END) AS Pendientes,
+            SUM(CASE WHEN Criticidad = 'Alta' THEN 1 ELSE 0 END) AS CritAlta,
+            SUM(CASE WHEN Criticidad = 'Media' THEN 1 ELSE 0 END) AS CritMedia,
+            SUM(CASE WHEN Criticidad = 'Baja' THEN 1 ELSE 0 END) AS CritBaja,
+            SUM(CASE WHEN Criticidad = 'Alta' AND EstadoActual = 'Abierto' THEN 1 ELSE 0 END) AS CriticosAbiertos
+        FROM Incidentes i
+        WHERE (@EmpresaID IS NULL OR EmpresaID = @EmpresaID) AND {{vigentes}}
+        GROUP BY EmpresaID
+    ), cum AS (
+        SELECT EmpresaID,
+            COUNT(*) AS Total,
+            SUM(CASE WHEN Estado = 'Implementado' THEN 1 ELSE 0 END) AS Implementadas,
+            SUM(CASE WHEN Estado = 'En Proceso' THEN 1 ELSE 0 END) AS EnProceso,
+            SUM(CASE WHEN Estado = 'Pendiente' THEN 1 ELSE 0 END) AS Pendientes,
+            SUM(CASE WHEN Estado = 'Vencido' THEN 1 ELSE 0 END) AS Vencidas,
+            SUM(CASE WHEN Estado = 'No Aplica' THEN 1 ELSE 0 END) AS NoAplica,
+            SUM(CAST(ISNULL(PorcentajeAvance, 0) AS BIGINT)) AS AvanceSuma,
+            COUNT(PorcentajeAvance) AS AvanceCantidad
+        FROM CumplimientoEmpresa
+        WHERE @EmpresaID IS NULL OR EmpresaID = @EmpresaID
+        GROUP BY EmpresaID
+    ), evc AS (
+        SELECT ce.EmpresaID, COUNT(*) AS Total
+        FROM EvidenciasCumplimiento ec
+        JOIN CumplimientoEmpresa ce ON ce.CumplimientoID = ec.CumplimientoID
+        WHERE @EmpresaID IS NULL OR ce.EmpresaID = @EmpresaID
+        GROUP BY ce.EmpresaID
+    ), evi AS (
+        SELECT i.EmpresaID, COUNT(*) AS Total
+        FROM EvidenciasIncidentes ei
+        JOIN Incidentes i ON i.IncidenteID = ei.IncidenteID
+        WHERE (@EmpresaID IS NULL OR i.EmpresaID = @EmpresaID) AND {{vigentes}}
+        GROUP BY i.EmpresaID
+    ), esperado AS (
+        SELECT e.EmpresaID,
+            ISNULL(inc.Total, 0) AS IncidentesTotal,
+            ISNULL(inc.Abiertos, 0) AS IncidentesAbiertos,
+            ISNULL(inc.Cerrados, 0) AS IncidentesCerrados,
+            ISNULL(inc.Pendientes, 0) AS IncidentesPendientes,
+            ISNULL(inc.CritAlta, 0) AS IncidentesCritAlta,
+            ISNULL(inc.CritMedia, 0) AS IncidentesCritMedia,
+            ISNULL(inc.CritBaja, 0) AS IncidentesCritBaja,
+            ISNULL(inc.CriticosAbiertos, 0) AS IncidentesCriticosAbiertos,
+            ISNULL(cum.Total, 0) AS ObligacionesTotal,
+            ISNULL(cum.Implementadas, 0) AS ObligacionesImplementadas,
+            ISNULL(cum.EnProceso, 0) AS ObligacionesEnProceso,
+            ISNULL(cum.Pendientes, 0) AS ObligacionesPendientes,
+            ISNULL(cum.Vencidas, 0) AS ObligacionesVencidas,
+            ISNULL(cum.NoAplica, 0) AS ObligacionesNoAplica,
+            ISNULL(cum.AvanceSuma, 0) AS AvanceSuma,
+            ISNULL(cum.AvanceCantidad, 0) AS AvanceCantidad,
+            ISNULL(evc.Total, 0) AS EvidenciasCumplimiento,
+            ISNULL(evi.Total, 0) AS EvidenciasIncidentes
+        FROM Empresas e
+        LEFT JOIN inc ON inc.EmpresaID = e.EmpresaID
+        LEFT JOIN cum ON cum.EmpresaID = e.EmpresaID
+        LEFT JOIN evc ON evc.EmpresaID = e.EmpresaID
+        LEFT JOIN evi ON evi.EmpresaID = e.EmpresaID
+        WHERE @EmpresaID IS NULL OR e.EmpresaID = @EmpresaID
+    )
+    MERGE {TABLA_CONTADORES} WITH (HOLDLOCK) AS c
+    USING esperado AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED AND (c.FechaReconciliacion IS NULL
+        OR {' OR '.join(f'c.{col} <> d.{col}' for col in COLUMNAS_CONTADORES)}) THEN UPDATE SET
+        {', '.join(f'{col} = d.{col}' for col in COLUMNAS_CONTADORES)},
+        FechaActualizacion = GETDATE(),
+        FechaReconciliacion = GETDATE()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (EmpresaID, {', '.join(COLUMNAS_CONTADORES)}, FechaReconciliacion)
+        VALUES (d.EmpresaID, {', '.join(f'd.{col}' for col in COLUMNAS_CONTADORES)}, GETDATE())
+    WHEN NOT MATCHED BY SOURCE AND @EmpresaID IS NULL THEN DELETE
+    OUTPUT $action, ISNULL(inserted.EmpresaID, deleted.EmpresaID),
+        CASE WHEN deleted.FechaReconciliacion IS NULL THEN 1 ELSE 0 END;
+"""
+
+# Se revisa si la tabla y los triggers existen, como máximo una vez cada TTL
+TTL_DISPONIBILIDAD = 300
+_disponibilidad = {'valor': None, 'expira': 0.0}
+
+
+def contadores_disponibles(cursor):
+    """True si la tabla y los cuatro triggers están instalados."""
+    ahora = time.monotonic()
+    if _disponibilidad['valor'] is not None and ahora < _disponibilidad['expira']:
+        return _disponibilidad['valor']
+    try:
+        cursor.execute(QUERY_DISPONIBILIDAD, TRIGGERS_CONTADORES)
+        tabla, triggers = cursor.fetchone()
+        disponible = bool(tabla) and triggers == len(TRIGGERS_CONTADORES)
+        if not disponible:
+            logger.info("Contadores de dashboard no instalados (tabla=%s, triggers=%s); "
+                        "se usan consultas agregadas", tabla, triggers)
+    except Exception as e:
+        logger.warning(f"No se pudo verificar la tabla de contadores: {e}")
+        disponible = False
+    _disponibilidad['valor'] = disponible
+    _disponibilidad['expira'] = ahora + TTL_DISPONIBILIDAD
+    return disponible
+
+
+def _fila_a_dict(cursor, fila):
+    return {col[0]: valor for col, valor in zip(cursor.description, fila)}
+
+
+def obtener_contadores(conn, empresa_id):
+    """Retorna los contadores de la empresa como dict, o None si no están disponibles.
+
+    Si la empresa aún no tiene fila inicializada, la reconcilia en el momento
+    (una sola vez) y confirma.
+    """
+    cursor = conn.cursor()
+    if not contadores_disponibles(cursor):
+        return None
+
+    cursor.execute(QUERY_CONTADORES, (empresa_id,))
+    fila = cursor.fetchone()
+    if fila is None or fila.FechaReconciliacion is None:
+        reconciliar_contadores(cursor, empresa_id)
+        conn.commit()
+        cursor.execute(QUERY_CONTADORES, (empresa_id,))
+        fila = cursor.fetchone()
+        if fila is None:
+            return None
+    return _fila_a_dict(cursor, fila)
+
+
+def reconciliar_contadores(cursor, empresa_id=None):
+    """Recalcula los contadores desde las tablas base y corrige desvíos.
+
+    No confirma la transacción. Retorna un resumen con las empresas
+    inicializadas, corregidas y eliminadas.
+    """
+    inicio = time.perf_counter()
+    vigentes = filtro_no_eliminados(cursor, 'i')
+    cursor.execute(QUERY_RECONCILIAR.format(vigentes=vigentes), (empresa_id,))
+    cambios = cursor.fetchall()
+
+    resumen = {'inicializadas': 0, 'corregidas': [], 'eliminadas': 0}
+    for accion, id_empresa, sin_inicializar in cambios:
+        if accion == 'INSERT' or (accion == 'UPDATE' and sin_inicializar):
+            resumen['inicializadas'] += 1
+        elif accion == 'UPDATE':
+            resumen['corregidas'].append(id_empresa)
+        elif accion == 'DELETE':
+            resumen['eliminadas'] += 1
+    resumen['duracion_s'] = round(time.perf_counter() - inicio, 3)
+
+    if resumen['corregidas']:
+        logger.warning("Contadores de dashboard con desvío corregidos para empresas: %s",
+                       resumen['corregidas'])
+    return resumen
+
+
+def main():
+    import argparse
+    from ...database import get_db_connection
+
+    parser = argparse.ArgumentParser(description='Reconciliar contadores del dashboard por empresa')
+    parser.add_argument('--empresa', type=int, default=None, help='EmpresaID (por defecto todas)')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ No se pudo conectar a la base de datos")
+        return 1
+    try:
+        resumen = reconciliar_contadores(conn.cursor(), args.empresa)
+        conn.commit()
+        print(f"✅ Reconciliación completada en {resumen['duracion_s']}s: "
+              f"{resumen['inicializadas']} inicializadas, {len(resumen['corregidas'])} corregidas, "
+              f"{resumen['eliminadas']} eliminadas")
+        return 0
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error reconciliando contadores: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,303 @@
+# modules/admin/contadores_incidente.py
+# Contadores mantenidos por incidente (estadísticas y completitud)
+"""
+La tabla IncidenteContadores (sql/contadores_incidente.sql) guarda una fila
+por incidente con sus evidencias, comentarios, taxonomías, secciones del
+formulario y campos principales completos. Los triggers de Incidentes,
+INCIDENTES_ARCHIVOS, INCIDENTES_COMENTARIOS, INCIDENTE_TAXONOMIA,
+EVIDENCIAS_TAXONOMIA, COMENTARIOS_TAXONOMIA e INCIDENTES_SECCIONES_DATOS
+aplican los deltas al guardar, así que las estadísticas de un incidente (o
+de todo un listado) se resuelven con una lectura por clave primaria.
+
+``reconciliar_contadores_incidente`` recalcula desde las tablas base,
+corrige y reporta los desvíos por columna. Ejecutar periódicamente (tarea
+'contadores_incidentes' del planificador) o tras cargas masivas:
+
+    python -m app.modules.admin.contadores_incidente                 # todos
+    python -m app.modules.admin.contadores_incidente --incidente 42  # uno
+"""
+
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+TABLA_CONTADORES = 'IncidenteContadores'
+TRIGGERS_CONTADORES = (
+    'TR_Incidentes_ContadoresIncidente',
+    'TR_IncidentesArchivos_ContadoresIncidente',
+    'TR_IncidentesComentarios_ContadoresIncidente',
+    'TR_IncidenteTaxonomia_ContadoresIncidente',
+    'TR_EvidenciasTaxonomia_ContadoresIncidente',
+    'TR_ComentariosTaxonomia_ContadoresIncidente',
+    'TR_IncidentesSeccionesDatos_ContadoresIncidente',
+)
+
+COLUMNAS_CONTADORES = (
+    'Evidencias', 'EvidenciasTaxonomia', 'Comentarios', 'ComentariosTaxonomia',
+    'Taxonomias', 'SeccionesConDatos', 'SeccionesCompletas', 'CamposCompletos',
+)
+
+# Campos principales que cuentan para la completitud (los mismos de
+# dbo.fn_CamposCompletosIncidente en el script SQL)
+CAMPOS_COMPLETITUD = (
+    'Titulo', 'TipoRegistro', 'FechaDeteccion', 'FechaOcurrencia',
+    'Criticidad', 'AlcanceGeografico', 'DescripcionInicial',
+    'AnciImpactoPreliminar', 'SistemasAfectados', 'ServiciosInterrumpidos',
+    'OrigenIncidente', 'AnciTipoAmenaza', 'ResponsableCliente',
+    'AccionesInmediatas', 'CausaRaiz', 'LeccionesAprendidas', 'PlanMejora',
+)
+# Taxonomías valen 2, evidencias y comentarios 1 cada uno
+PUNTOS_EXTRA = 4
+
+# Lecturas por lote: el límite de parámetros de SQL Server es 2100
+LOTE_LECTURA = 1000
+
+QUERY_CONTADORES = f"""
+    SELECT IncidenteID, {', '.join(COLUMNAS_CONTADORES)}, FechaActualizacion, FechaReconciliacion
+    FROM {TABLA_CONTADORES}
+    WHERE IncidenteID IN ({{marcadores}})
+"""
+
+QUERY_DISPONIBILIDAD = f"""
+    SELECT
+        CASE WHEN OBJECT_ID('{TABLA_CONTADORES}', 'U') IS NULL THEN 0 ELSE 1 END,
+        (SELECT COUNT(*) FROM sys.triggers WHERE name IN ({', '.join('?' for _ in TRIGGERS_CONTADORES)}))
+"""
+
+# Valores esperados por incidente desde las tablas base; cada tabla hija se
+# agrega por separado. @Ids: NULL (todos) o arreglo JSON de IncidenteID.
+QUERY_RECONCILIAR = f"""
+    SET NOCOUNT ON;
+    DECLARE @Ids NVARCHAR(MAX) = ?;
+
+    WITH objetivo AS (
+        SELECT i.*
+        FROM Incidentes i
+        WHERE @Ids IS NULL OR i.IncidenteID IN (SELECT CAST(value AS INT) FROM OPENJSON(@Ids))
+    ), arch AS (
+        SELECT IncidenteID, COUNT(*) AS Total FROM INCIDENTES_ARCHIVOS
+        WHERE Activo = 1 AND IncidenteID IN (SELECT IncidenteID FROM objetivo) GROUP BY IncidenteID
+    ), com AS (
+        SELECT IncidenteID, COUNT(*) AS Total FROM INCIDENTES_COMENTARIOS
+        WHERE Activo = 1 AND IncidenteID IN (SELECT IncidenteID FROM objetivo) GROUP BY IncidenteID
+    ), tax AS (
+        SELECT IncidenteID, COUNT(*) AS Total FROM INCIDENTE_TAXONOMIA
+        WHERE IncidenteID IN (SELECT IncidenteID FROM objetivo) GROUP BY IncidenteID
+    ), evt AS (
+        SELECT IncidenteID, COUNT(*) AS Total FROM EVIDENCIAS_TAXONOMIA
+        WHERE IncidenteID IN (SELECT IncidenteID FROM objetivo) GROUP BY IncidenteID
+    ), cmt AS (
+        SELECT IncidenteID, COUNT(*) AS Total FROM COMENTARIOS_TAXONOMIA
+        WHERE IncidenteID IN (SELECT IncidenteID FROM objetivo) GROUP BY IncidenteID
+    ), sec AS (
+        SELECT IncidenteID,
+            SUM(CASE WHEN EstadoSeccion <> 'VACIO' THEN 1 ELSE 0 END) AS ConDatos,
+            SUM(CASE WHEN EstadoSeccion = 'COMPLETO' THEN 1 ELSE 0 END) AS Completas
+        FROM INCIDENTES_SECCIONES_DATOS
+        WHERE IncidenteID IN (SELECT IncidenteID FROM objetivo) GROUP BY IncidenteID
+    ), esperado AS (
+        SELECT o.IncidenteID,
+            ISNULL(arch.Total, 0) AS Evidencias,
+            ISNULL(evt.Total, 0) AS EvidenciasTaxonomia,
+            ISNULL(com.Total, 0) AS Comentarios,
+            ISNULL(cmt.Total, 0) AS ComentariosTaxonomia,
+            ISNULL(tax.Total, 0) AS Taxonomias,
+            ISNULL(sec.ConDatos, 0) AS SeccionesConDatos,
+            ISNULL(sec.Completas, 0) AS SeccionesCompletas,
+            f.Total AS CamposCompletos
+        FROM objetivo o
+        CROSS APPLY dbo.fn_CamposCompletosIncidente(
+            o.Titulo, o.TipoRegistro, CONVERT(NVARCHAR(30), o.FechaDeteccion, 126),
+            CONVERT(NVARCHAR(30), o.FechaOcurrencia, 126), o.Criticidad, o.AlcanceGeografico,
+            o.DescripcionInicial, o.AnciImpactoPreliminar, o.SistemasAfectados, o.ServiciosInterrumpidos,
+            o.OrigenIncidente, o.AnciTipoAmenaza, o.ResponsableCliente, o.AccionesInmediatas,
+            o.CausaRaiz, o.LeccionesAprendidas, o.PlanMejora
+        ) f
+        LEFT JOIN arch ON arch.IncidenteID = o.IncidenteID
+        LEFT JOIN com ON com.IncidenteID = o.IncidenteID
+        LEFT JOIN tax ON tax.IncidenteID = o.IncidenteID
+        LEFT JOIN evt ON evt.IncidenteID = o.IncidenteID
+        LEFT JOIN cmt ON cmt.IncidenteID = o.IncidenteID
+        LEFT JOIN sec ON sec.IncidenteID = o.IncidenteID
+    )
+    MERGE {TABLA_CONTADORES} WITH (HOLDLOCK) AS c
+    USING esperado AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED AND (c.FechaReconciliacion IS NULL
+        OR {' OR '.join(f'c.{col} <> d.{col}' for col in COLUMNAS_CONTADORES)}) THEN UPDATE SET
+        {', '.join(f'{col} = d.{col}' for col in COLUMNAS_CONTADORES)},
+        FechaActualizacion = GETDATE(),
+        FechaReconciliacion = GETDATE()
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (IncidenteID, {', '.join(COLUMNAS_CONTADORES)}, FechaReconciliacion)
+        VALUES (d.IncidenteID, {', '.join(f'd.{col}' for col in COLUMNAS_CONTADORES)}, GETDATE())
+    WHEN NOT MATCHED BY SOURCE AND @Ids IS NULL THEN DELETE
+    OUTPUT $action, ISNULL(inserted.IncidenteID, deleted.IncidenteID),
+        CASE WHEN deleted.FechaReconciliacion IS NULL THEN 1 ELSE 0 END,
+        {', '.join(f'deleted.{col}' for col in COLUMNAS_CONTADORES)},
+        {', '.join(f'inserted.{col}' for col in COLUMNAS_CONTADORES)};
+"""
+
+# Se revisa si la tabla y los triggers existen, como máximo una vez cada TTL
+TTL_DISPONIBILIDAD = 300
+_disponibilidad = {'valor': None, 'expira': 0.0}
+
+
+def contadores_incidente_disponibles(cursor):
+    """True si la tabla y los siete triggers están instalados."""
+    ahora = time.monotonic()
+    if _disponibilidad['valor'] is not None and ahora < _disponibilidad['expira']:
+        return _disponibilidad['valor']
+    try:
+        cursor.execute(QUERY_DISPONIBILIDAD, TRIGGERS_CONTADORES)
+        tabla, triggers = cursor.fetchone()
+        disponible = bool(tabla) and triggers == len(TRIGGERS_CONTADORES)
+        if not disponible:
+            logger.info("Contadores por incidente no instalados (tabla=%s, triggers=%s); "
+                        "se usan consultas agregadas", tabla, triggers)
+    except Exception as e:
+        logger.warning(f"No se pudo verificar la tabla de contadores por incidente: {e}")
+        disponible = False
+    _disponibilidad['valor'] = disponible
+    _disponibilidad['expira'] = ahora + TTL_DISPONIBILIDAD
+    return disponible
+
+
+def calcular_completitud(campos_completos, taxonomias, evidencias, comentarios):
+    """Porcentaje de completitud (0-100) del incidente"""
+    puntos = campos_completos
+    if taxonomias > 0:
+        puntos += 2  # Las taxonomías valen más
+    if evidencias > 0:
+        puntos += 1
+    if comentarios > 0:
+        puntos += 1
+    return min(100, int(puntos / (len(CAMPOS_COMPLETITUD) + PUNTOS_EXTRA) * 100))
+
+
+def estadisticas_desde_contadores(contadores):
+    """Estadísticas del incidente (formato del endpoint) a partir de su fila de contadores"""
+    evidencias = contadores['Evidencias'] + contadores['EvidenciasTaxonomia']
+    comentarios = contadores['Comentarios'] + contadores['ComentariosTaxonomia']
+    return {
+        'TotalEvidencias': evidencias,
+        'TotalComentarios': comentarios,
+        'TaxonomiasSeleccionadas': contadores['Taxonomias'],
+        'SeccionesConDatos': contadores['SeccionesConDatos'],
+        'SeccionesCompletas': contadores['SeccionesCompletas'],
+        'Completitud': calcular_completitud(
+            contadores['CamposCompletos'], contadores['Taxonomias'], evidencias, comentarios
+        ),
+    }
+
+
+def _leer(cursor, ids):
+    filas = {}
+    for inicio in range(0, len(ids), LOTE_LECTURA):
+        lote = ids[inicio:inicio + LOTE_LECTURA]
+        cursor.execute(QUERY_CONTADORES.format(marcadores=', '.join('?' for _ in lote)), lote)
+        columnas = [c[0] for c in cursor.description]
+        for fila in cursor.fetchall():
+            registro = dict(zip(columnas, fila))
+            filas[registro['IncidenteID']] = registro
+    return filas
+
+
+def obtener_contadores_incidentes(conn, incidente_ids):
+    """Contadores de varios incidentes en una lectura: {IncidenteID: dict}.
+
+    Retorna None si los contadores no están instalados. Los incidentes sin
+    fila inicializada se reconcilian en el momento (una sola vez) y se
+    confirma; los que no existen no aparecen en el resultado.
+    """
+    cursor = conn.cursor()
+    if not contadores_incidente_disponibles(cursor):
+        return None
+
+    ids = list(dict.fromkeys(int(i) for i in incidente_ids))
+    if not ids:
+        return {}
+    filas = _leer(cursor, ids)
+    sin_inicializar = [i for i in ids if i not in filas or filas[i]['FechaReconciliacion'] is None]
+    if sin_inicializar:
+        reconciliar_contadores_incidente(cursor, sin_inicializar)
+        conn.commit()
+        filas.update(_leer(cursor, sin_inicializar))
+    return filas
+
+
+def obtener_estadisticas_incidentes(conn, incidente_ids):
+    """Estadísticas de varios incidentes: {IncidenteID: dict}, o None si no están instaladas"""
+    contadores = obtener_contadores_incidentes(conn, incidente_ids)
+    if contadores is None:
+        return None
+    return {incidente_id: estadisticas_desde_contadores(fila) for incidente_id, fila in contadores.items()}
+
+
+def reconciliar_contadores_incidente(cursor, incidente_ids=None):
+    """Recalcula los contadores desde las tablas base y corrige desvíos.
+
+    No confirma la transacción. Retorna un resumen con los incidentes
+    inicializados, corregidos (con el desvío por columna) y eliminados.
+    """
+    inicio = time.perf_counter()
+    ids = json.dumps([int(i) for i in incidente_ids]) if incidente_ids is not None else None
+    cursor.execute(QUERY_RECONCILIAR, (ids,))
+    cambios = cursor.fetchall()
+
+    n = len(COLUMNAS_CONTADORES)
+    resumen = {'inicializados': 0, 'corregidos': [], 'desvios': {}, 'eliminados': 0}
+    for fila in cambios:
+        accion, incidente_id, sin_inicializar = fila[0], fila[1], fila[2]
+        if accion == 'INSERT' or (accion == 'UPDATE' and sin_inicializar):
+            resumen['inicializados'] += 1
+        elif accion == 'UPDATE':
+            resumen['corregidos'].append(incidente_id)
+            antes, despues = fila[3:3 + n], fila[3 + n:3 + 2 * n]
+            for columna, valor_antes, valor_despues in zip(COLUMNAS_CONTADORES, antes, despues):
+                if valor_antes != valor_despues:
+                    desvio = resumen['desvios'].setdefault(columna, {'incidentes': 0, 'diferencia_total': 0})
+                    desvio['incidentes'] += 1
+                    desvio['diferencia_total'] += abs(valor_despues - valor_antes)
+        elif accion == 'DELETE':
+            resumen['eliminados'] += 1
+    resumen['duracion_s'] = round(time.perf_counter() - inicio, 3)
+
+    if resumen['corregidos']:
+        logger.warning("Contadores por incidente con desvío corregidos (%s incidentes, primeros %s): %s",
+                       len(resumen['corregidos']), resumen['corregidos'][:20], resumen['desvios'])
+    return resumen
+
+
+def main():
+    import argparse
+    from ...database import get_db_connection
+
+    parser = argparse.ArgumentParser(description='Reconciliar contadores por incidente')
+    parser.add_argument('--incidente', type=int, action='append', help='IncidenteID (repetible; por defecto todos)')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ No se pudo conectar a la base de datos")
+        return 1
+    try:
+        resumen = reconciliar_contadores_incidente(conn.cursor(), args.incidente)
+        conn.commit()
+        print(f"✅ Reconciliación completada en {resumen['duracion_s']}s: "
+              f"{resumen['inicializados']} inicializados, {len(resumen['corregidos'])} corregidos, "
+              f"{resumen['eliminados']} eliminados")
+        for columna, desvio in resumen['desvios'].items():
+            print(f"   {columna}: {desvio['incidentes']} incidentes, diferencia total {desvio['diferencia_total']}")
+        return 0
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error reconciliando contadores por incidente: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,6 +11,8 @@ from datetime import datetime
 from flask import Blueprint, jsonify, request
 from ...database import get_db_connection
 from ...auth_utils import verificar_token
+from ...verificador_archivos import verificador_archivos
+from .eliminacion_incidentes import filtro_no_eliminados
 from functools import wraps
 
 diagnostico_bp = Blueprint('diagnostico_incidentes', __name__, url_prefix='/api/admin/diagnostico')
@@ -111,14 +113,14 @@ class DiagnosticoIncidentes:
         """Verifica si el incidente existe en la BD principal"""
         try:
             # Buscar por IDVisible o por indice_unico
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT IncidenteID, IDVisible, Titulo, EstadoActual, 
                        EmpresaID, FechaCreacion, FechaModificacion,
                        FormatoSemillaJSON, IndiceTaxonomias
                 FROM Incidentes 
-                WHERE IDVisible = ? OR IncidenteID IN (
+                WHERE (IDVisible = ? OR IncidenteID IN (
                     SELECT id FROM Incidentes WHERE indice_unico = ?
-                )
+                )) AND {filtro_no_eliminados(cursor)}
             """, (indice_unico, indice_unico))
             
             resultado = cursor.fetchone()
@@ -254,6 +256,7 @@ class DiagnosticoIncidentes:
             
             evidencias = cursor.fetchall()
             resultado["total_evidencias"] = len(evidencias)
+            existentes = verificador_archivos.existen(ev[2] for ev in evidencias)
             
             for ev in evidencias:
                 seccion = ev[4] or "sin_seccion"
@@ -273,7 +276,7 @@ class DiagnosticoIncidentes:
                     "subido_por": ev[7],
                     "version": ev[8],
                     "tamano_kb": ev[9],
-                    "archivo_existe": os.path.exists(ev[2]) if ev[2] else False
+                    "archivo_existe": existentes.get(ev[2], False) if ev[2] else False
                 }
                 
                 resultado["evidencias"].append(evidencia_info)
@@ -317,16 +320,13 @@ class DiagnosticoIncidentes:
         carpeta_evidencias = os.path.join(self.ruta_uploads, "evidencias", indice_unico)
         
         if os.path.exists(carpeta_evidencias):
-            for root, dirs, files in os.walk(carpeta_evidencias):
-                for archivo in files:
-                    ruta_completa = os.path.join(root, archivo)
-                    archivos_disco.add(ruta_completa)
-            
+            archivos_disco.update(verificador_archivos.listar_carpeta(carpeta_evidencias))
             resultado["total_archivos_disco"] = len(archivos_disco)
         
-        # Comparar
+        # Comparar (stat en paralelo)
+        existentes = verificador_archivos.existen(archivos_bd)
         for archivo_bd in archivos_bd:
-            if os.path.exists(archivo_bd):
+            if existentes.get(archivo_bd, False):
                 resultado["archivos_correctos"] += 1
             else:
                 resultado["archivos_faltantes"].append(archivo_bd)
@@ -534,10 +534,10 @@ def diagnosticar_todos(usuario):
             return jsonify({"error": "Error de conexión a BD"}), 500
         
         cursor = conn.cursor()
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT IDVisible, Titulo, EstadoActual 
             FROM Incidentes 
-            WHERE IDVisible IS NOT NULL
+            WHERE IDVisible IS NOT NULL AND {filtro_no_eliminados(cursor)}
             ORDER BY IncidenteID DESC
         """)
         
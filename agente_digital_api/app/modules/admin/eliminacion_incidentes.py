@@ -0,0 +1,414 @@
+# modules/admin/eliminacion_incidentes.py
+# Eliminación diferida de incidentes con purga en segundo plano
+"""
+Eliminar un incidente borraba en el request, una a una, las filas de unas
+20 tablas (consultando antes INFORMATION_SCHEMA por cada una) y después
+los archivos físicos de a uno, listando además toda la carpeta de
+temporales.
+
+Con sql/eliminacion_incidentes.sql instalado:
+
+- ``marcar_eliminado``: un UPDATE de Incidentes.EliminadoEn con OUTPUT
+  hacia la cola IncidentesPurga; la respuesta es inmediata.
+- ``filtro_no_eliminados``: predicado ``EliminadoEn IS NULL`` que agregan
+  las consultas que listan o muestran incidentes (listados, detalle,
+  dashboards y reconciliación de contadores).
+- ``restaurar_incidente``: dentro de la ventana de restauración
+  (INCIDENTES_VENTANA_RESTAURACION_HORAS, por defecto 72) deshace la marca.
+  Restaurar y listar eliminados exige un rol de ROLES_ADMINISTRACION y se
+  limita al inquilino del usuario (``alcance_usuario``).
+- ``purgar_lote``: toma hasta PURGA_LOTE_INCIDENTES incidentes vencidos y
+  borra sus filas relacionadas con un DELETE por tabla para todo el lote
+  (CASCADA, en orden de dependencias), encolando antes sus archivos en
+  ArchivosPurga. Cada lote es una transacción: si el proceso muere a la
+  mitad, el lote se repite completo en la siguiente ejecución.
+- ``purgar_archivos``: vacía la cola de archivos por lotes, eliminándolos
+  en paralelo (verificador_archivos); los errores quedan con su intento
+  y se reintentan hasta MAX_INTENTOS_ARCHIVO.
+
+La tarea 'purga_incidentes' del planificador (app/tareas_mantenimiento.py)
+ejecuta ambos pasos con checkpoint. Sin el script instalado, la
+eliminación sigue siendo la síncrona de incidentes_eliminar_completo.py.
+"""
+
+import logging
+import os
+import time
+
+from ...verificador_archivos import verificador_archivos
+
+logger = logging.getLogger(__name__)
+
+TABLA_COLA = 'IncidentesPurga'
+TABLA_ARCHIVOS = 'ArchivosPurga'
+
+VENTANA_RESTAURACION_HORAS = int(os.environ.get('INCIDENTES_VENTANA_RESTAURACION_HORAS', 72))
+LOTE_INCIDENTES = int(os.environ.get('PURGA_LOTE_INCIDENTES', 100))
+LOTE_ARCHIVOS = int(os.environ.get('PURGA_LOTE_ARCHIVOS', 500))
+MAX_INTENTOS_ARCHIVO = 5
+
+# Roles que pueden restaurar y ver incidentes eliminados
+ROLES_ADMINISTRACION = frozenset(('admin', 'Administrador', 'Superusuario'))
+
+CARPETA_TEMPORALES = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'temp_incidentes'))
+
+# (tabla, DELETE para todo el lote en #IncidentesPurga), de lo más específico
+# a lo más general. Una tabla que no existe en la BD se omite.
+CASCADA = (
+    ('ComentariosIncidenteCategoria', """
+        DELETE x FROM ComentariosIncidenteCategoria x
+        JOIN IncidentesCategorias ic ON ic.IncidenteCategoriaID = x.IncidenteCategoriaID
+        JOIN #IncidentesPurga p ON p.IncidenteID = ic.IncidenteID
+    """),
+    ('EvidenciasIncidenteCategoria', """
+        DELETE x FROM EvidenciasIncidenteCategoria x
+        JOIN IncidentesCategorias ic ON ic.IncidenteCategoriaID = x.IncidenteCategoriaID
+        JOIN #IncidentesPurga p ON p.IncidenteID = ic.IncidenteID
+    """),
+    ('IncidentesCategorias', None),
+    ('EVIDENCIAS_TAXONOMIA', None),
+    ('COMENTARIOS_TAXONOMIA', None),
+    ('INCIDENTE_TAXONOMIA', None),
+    ('EvidenciasIncidentes', None),
+    ('ManifiestoArchivosIncidente', None),
+    ('HistorialIncidentes', None),
+    ('AnciNotificaciones', None),
+    ('AnciAutorizaciones', None),
+    ('AnciPlazos', None),
+    ('AnciEnvios', """
+        DELETE x FROM AnciEnvios x
+        JOIN ReportesANCI r ON r.ReporteAnciID = x.ReporteAnciID
+        JOIN #IncidentesPurga p ON p.IncidenteID = r.IncidenteID
+    """),
+    ('ReportesANCI', None),
+    # Un recorrido de la auditoría por lote, no por incidente
+    ('AuditoriaAccesos', """
+        DELETE x FROM AuditoriaAccesos x
+        JOIN #IncidentesPurga p
+          ON x.DatosAdicionales LIKE '%IncidenteID":"' + CAST(p.IncidenteID AS VARCHAR(12)) + '"%'
+          OR x.DatosAdicionales LIKE '%incidente_id":' + CAST(p.IncidenteID AS VARCHAR(12)) + '[^0-9]%'
+    """),
+    ('AuditoriaAdminPlataforma', """
+        DELETE x FROM AuditoriaAdminPlataforma x
+        JOIN #IncidentesPurga p ON p.IncidenteID = x.RecursoID
+        WHERE x.RecursoAfectado = 'Incidente'
+    """),
+    ('ArchivosTemporales', """
+        DELETE x FROM ArchivosTemporales x
+        JOIN #IncidentesPurga p ON p.IncidenteID = x.EntidadID
+        WHERE x.EntidadTipo = 'Incidente'
+    """),
+)
+
+# Tablas con archivos físicos: (tabla, SELECT IncidenteID, RutaArchivo del lote)
+FUENTES_ARCHIVOS = (
+    ('EvidenciasIncidentes', """
+        SELECT x.IncidenteID, x.RutaArchivo FROM EvidenciasIncidentes x
+        JOIN #IncidentesPurga p ON p.IncidenteID = x.IncidenteID
+    """),
+    ('EvidenciasIncidenteCategoria', """
+        SELECT ic.IncidenteID, x.RutaArchivo FROM EvidenciasIncidenteCategoria x
+        JOIN IncidentesCategorias ic ON ic.IncidenteCategoriaID = x.IncidenteCategoriaID
+        JOIN #IncidentesPurga p ON p.IncidenteID = ic.IncidenteID
+    """),
+    ('EVIDENCIAS_TAXONOMIA', """
+        SELECT x.IncidenteID, x.RutaArchivo FROM EVIDENCIAS_TAXONOMIA x
+        JOIN #IncidentesPurga p ON p.IncidenteID = x.IncidenteID
+    """),
+    ('ManifiestoArchivosIncidente', """
+        SELECT x.IncidenteID, x.RutaArchivo FROM ManifiestoArchivosIncidente x
+        JOIN #IncidentesPurga p ON p.IncidenteID = x.IncidenteID
+    """),
+)
+
+QUERY_DISPONIBILIDAD = f"""
+    SELECT
+        CASE WHEN OBJECT_ID('{TABLA_COLA}', 'U') IS NULL OR OBJECT_ID('{TABLA_ARCHIVOS}', 'U') IS NULL
+             THEN 0 ELSE 1 END,
+        CASE WHEN COL_LENGTH('Incidentes', 'EliminadoEn') IS NULL THEN 0 ELSE 1 END
+"""
+
+QUERY_MARCAR = f"""
+    UPDATE Incidentes
+    SET EliminadoEn = GETDATE(), EliminadoPor = ?
+    OUTPUT inserted.IncidenteID, inserted.EmpresaID, inserted.IDVisible, inserted.EliminadoEn,
+           inserted.EliminadoPor, DATEADD(HOUR, ?, inserted.EliminadoEn)
+    INTO {TABLA_COLA} (IncidenteID, EmpresaID, IDVisible, EliminadoEn, EliminadoPor, PurgarDesde)
+    WHERE IncidenteID = ? AND EliminadoEn IS NULL
+"""
+
+QUERY_RESTAURAR = f"""
+    UPDATE i SET EliminadoEn = NULL, EliminadoPor = NULL
+    FROM Incidentes i
+    JOIN {TABLA_COLA} q ON q.IncidenteID = i.IncidenteID AND q.Estado = 'pendiente'
+    WHERE i.IncidenteID = ? AND i.EliminadoEn IS NOT NULL AND {{filtro}}
+"""
+
+# Empresas del inquilino (EmpresaID con el alias que corresponda)
+FILTRO_INQUILINO = "{columna} IN (SELECT EmpresaID FROM Empresas WHERE InquilinoID = ?)"
+
+QUERY_LISTAR = f"""
+    SELECT IncidenteID, EmpresaID, IDVisible, EliminadoEn, EliminadoPor, PurgarDesde, Estado, FechaPurga
+    FROM {TABLA_COLA}
+    WHERE {{filtro}}
+    ORDER BY EliminadoEn DESC
+"""
+
+# El lote se reserva con UPDLOCK/READPAST: dos purgadores no toman el mismo
+# incidente. Los que ya no están marcados (restaurados a mano) salen de la cola.
+QUERY_TOMAR_LOTE = f"""
+    SET NOCOUNT ON;
+    INSERT INTO #IncidentesPurga (IncidenteID, IDVisible)
+    SELECT TOP (?) q.IncidenteID, q.IDVisible
+    FROM {TABLA_COLA} q WITH (UPDLOCK, READPAST)
+    WHERE q.Estado = 'pendiente' AND q.PurgarDesde <= GETDATE()
+    ORDER BY q.PurgarDesde, q.IncidenteID;
+
+    DELETE q FROM {TABLA_COLA} q
+    JOIN #IncidentesPurga p ON p.IncidenteID = q.IncidenteID
+    JOIN Incidentes i ON i.IncidenteID = p.IncidenteID
+    WHERE i.EliminadoEn IS NULL;
+
+    DELETE p FROM #IncidentesPurga p
+    WHERE NOT EXISTS (SELECT 1 FROM {TABLA_COLA} q WHERE q.IncidenteID = p.IncidenteID);
+
+    SELECT IncidenteID, IDVisible FROM #IncidentesPurga ORDER BY IncidenteID;
+"""
+
+
+QUERY_COLUMNA_ELIMINADO = """
+    SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_NAME = 'Incidentes' AND COLUMN_NAME = 'EliminadoEn'
+"""
+
+# La existencia de la columna se revisa como máximo una vez cada TTL
+TTL_DISPONIBILIDAD = 300
+_columna_eliminado = {'valor': None, 'expira': 0.0}
+
+
+def filtro_no_eliminados(cursor, alias=None):
+    """
+    Predicado que deja fuera los incidentes eliminados pendientes de purga,
+    para agregar a las consultas sobre Incidentes que lo necesitan:
+
+        f"WHERE i.EmpresaID = ? AND {filtro_no_eliminados(cursor, 'i')}"
+
+    Sin la columna Incidentes.EliminadoEn (script no instalado) retorna '1 = 1'.
+    """
+    def contar():
+        cursor.execute(QUERY_COLUMNA_ELIMINADO)
+        return cursor.fetchone()[0]
+
+    return filtro_no_eliminados_con(contar, alias)
+
+
+def filtro_no_eliminados_con(contar, alias=None):
+    """
+    Igual que ``filtro_no_eliminados`` para quien no trabaja con un cursor
+    pyodbc: ``contar()`` ejecuta QUERY_COLUMNA_ELIMINADO y retorna el conteo.
+    """
+    ahora = time.monotonic()
+    if _columna_eliminado['valor'] is None or ahora >= _columna_eliminado['expira']:
+        try:
+            _columna_eliminado['valor'] = contar() > 0
+        except Exception as e:
+            logger.warning(f"No se pudo verificar la columna EliminadoEn: {e}")
+            _columna_eliminado['valor'] = False
+        _columna_eliminado['expira'] = ahora + TTL_DISPONIBILIDAD
+    if not _columna_eliminado['valor']:
+        return '1 = 1'
+    return f"{alias}.EliminadoEn IS NULL" if alias else "EliminadoEn IS NULL"
+
+
+def eliminacion_diferida_disponible(cursor):
+    """True si sql/eliminacion_incidentes.sql está instalado"""
+    try:
+        cursor.execute(QUERY_DISPONIBILIDAD)
+        cola, columna = cursor.fetchone()
+        return bool(cola and columna)
+    except Exception as e:
+        logger.warning(f"No se pudo verificar la eliminación diferida: {e}")
+        return False
+
+
+def tablas_existentes(cursor, nombres):
+    """Subconjunto de ``nombres`` que existe en la BD (una sola consulta)"""
+    nombres = list(dict.fromkeys(nombres))
+    cursor.execute(
+        f"SELECT name FROM sys.tables WHERE name IN ({', '.join('?' for _ in nombres)})", nombres
+    )
+    return {fila[0] for fila in cursor.fetchall()}
+
+
+def _sentencia_cascada(tabla, sentencia):
+    return sentencia or f"""
+        DELETE x FROM {tabla} x
+        JOIN #IncidentesPurga p ON p.IncidenteID = x.IncidenteID
+    """
+
+
+def marcar_eliminado(cursor, incidente_id, usuario=None):
+    """
+    Marca el incidente como eliminado y lo encola para purga. No hace commit.
+
+    Returns:
+        dict con incidente_id, empresa_id y purgar_desde, o None si no
+        existe o ya estaba eliminado
+    """
+    cursor.execute(QUERY_MARCAR, (usuario, VENTANA_RESTAURACION_HORAS, incidente_id))
+    if cursor.rowcount == 0:
+        return None
+    cursor.execute(f"SELECT EmpresaID, PurgarDesde FROM {TABLA_COLA} WHERE IncidenteID = ?", (incidente_id,))
+    empresa_id, purgar_desde = cursor.fetchone()
+    return {'incidente_id': incidente_id, 'empresa_id': empresa_id, 'purgar_desde': purgar_desde}
+
+
+def alcance_usuario(cursor, usuario_id, rol):
+    """
+    (permitido, inquilino_id) para administrar incidentes eliminados.
+    inquilino_id None = todos: usuario de la plataforma (Usuarios.InquilinoID nulo).
+    """
+    if rol not in ROLES_ADMINISTRACION:
+        return False, None
+    cursor.execute("SELECT InquilinoID FROM Usuarios WHERE UsuarioID = ?", (usuario_id,))
+    fila = cursor.fetchone()
+    if not fila:
+        return False, None
+    return True, fila[0]
+
+
+def restaurar_incidente(cursor, incidente_id, inquilino_id=None):
+    """
+    Quita la marca de eliminado si aún no se purgó y, con ``inquilino_id``,
+    si el incidente es de una empresa de ese inquilino. No hace commit.
+    Retorna True si el incidente se restauró.
+    """
+    if inquilino_id is None:
+        cursor.execute(QUERY_RESTAURAR.format(filtro='1 = 1'), (incidente_id,))
+    else:
+        filtro = FILTRO_INQUILINO.format(columna='i.EmpresaID')
+        cursor.execute(QUERY_RESTAURAR.format(filtro=filtro), (incidente_id, inquilino_id))
+    if cursor.rowcount == 0:
+        return False
+    cursor.execute(f"DELETE FROM {TABLA_COLA} WHERE IncidenteID = ? AND Estado = 'pendiente'", (incidente_id,))
+    return True
+
+
+def listar_eliminados(cursor, empresa_id=None, incluir_purgados=False, inquilino_id=None):
+    condiciones, parametros = [], []
+    if empresa_id is not None:
+        condiciones.append("EmpresaID = ?")
+        parametros.append(empresa_id)
+    if inquilino_id is not None:
+        condiciones.append(FILTRO_INQUILINO.format(columna='EmpresaID'))
+        parametros.append(inquilino_id)
+    if not incluir_purgados:
+        condiciones.append("Estado = 'pendiente'")
+    cursor.execute(QUERY_LISTAR.format(filtro=' AND '.join(condiciones) or '1 = 1'), parametros)
+    columnas = [c[0] for c in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+def purgar_lote(cursor, limite=None, tablas=None):
+    """
+    Purga un lote de incidentes vencidos en la transacción del cursor (el
+    llamador hace commit). ``tablas``: resultado de tablas_existentes, para
+    no consultarlo en cada lote.
+
+    Returns:
+        dict con incidentes (IDs purgados), filas por tabla y archivos encolados
+    """
+    if tablas is None:
+        tablas = tablas_existentes(cursor, [t for t, _ in CASCADA] + [t for t, _ in FUENTES_ARCHIVOS])
+
+    # Sin parámetros: así la tabla temporal vive en la sesión y no solo en
+    # el sp_executesql de una sentencia parametrizada
+    cursor.execute("""
+        IF OBJECT_ID('tempdb..#IncidentesPurga') IS NOT NULL DROP TABLE #IncidentesPurga;
+        CREATE TABLE #IncidentesPurga (IncidenteID INT NOT NULL PRIMARY KEY, IDVisible NVARCHAR(200) NULL);
+    """)
+    try:
+        cursor.execute(QUERY_TOMAR_LOTE, (limite or LOTE_INCIDENTES,))
+        lote = cursor.fetchall()
+        if not lote:
+            return {'incidentes': [], 'filas': {}, 'archivos_encolados': 0}
+
+        # Archivos físicos: a la cola antes de perder las filas que los referencian
+        fuentes = [sentencia for tabla, sentencia in FUENTES_ARCHIVOS if tabla in tablas]
+        encolados = 0
+        if fuentes:
+            cursor.execute(f"""
+                INSERT INTO {TABLA_ARCHIVOS} (IncidenteID, RutaArchivo)
+                SELECT DISTINCT a.IncidenteID, a.RutaArchivo
+                FROM ({' UNION ALL '.join(fuentes)}) a
+                WHERE a.RutaArchivo IS NOT NULL AND a.RutaArchivo <> ''
+            """)
+            encolados = max(cursor.rowcount, 0)
+        temporales = [(incidente_id, os.path.join(CARPETA_TEMPORALES, f"{id_visible}.json"))
+                      for incidente_id, id_visible in lote if id_visible]
+        if temporales:
+            cursor.executemany(f"INSERT INTO {TABLA_ARCHIVOS} (IncidenteID, RutaArchivo) VALUES (?, ?)", temporales)
+            encolados += len(temporales)
+
+        filas = {}
+        for tabla, sentencia in CASCADA:
+            if tabla in tablas:
+                cursor.execute(_sentencia_cascada(tabla, sentencia))
+                if cursor.rowcount > 0:
+                    filas[tabla] = cursor.rowcount
+
+        cursor.execute("""
+            DELETE i FROM Incidentes i
+            JOIN #IncidentesPurga p ON p.IncidenteID = i.IncidenteID
+            WHERE i.EliminadoEn IS NOT NULL
+        """)
+        filas['Incidentes'] = cursor.rowcount
+        cursor.execute(f"""
+            UPDATE q SET Estado = 'purgado', FechaPurga = GETDATE()
+            FROM {TABLA_COLA} q
+            JOIN #IncidentesPurga p ON p.IncidenteID = q.IncidenteID
+        """)
+        return {'incidentes': [fila[0] for fila in lote], 'filas': filas, 'archivos_encolados': encolados}
+    finally:
+        cursor.execute("IF OBJECT_ID('tempdb..#IncidentesPurga') IS NOT NULL DROP TABLE #IncidentesPurga")
+
+
+def purgar_archivos(cursor, limite=None):
+    """
+    Elimina un lote de la cola de archivos (el llamador hace commit).
+    Luego intenta borrar, una vez cada una, las carpetas que quedaron vacías.
+
+    Returns:
+        dict con procesados, errores y carpetas eliminadas
+    """
+    cursor.execute(f"""
+        SELECT TOP (?) ArchivoPurgaID, RutaArchivo FROM {TABLA_ARCHIVOS}
+        WHERE Intentos < ?
+        ORDER BY ArchivoPurgaID
+    """, (limite or LOTE_ARCHIVOS, MAX_INTENTOS_ARCHIVO))
+    pendientes = cursor.fetchall()
+    if not pendientes:
+        return {'procesados': 0, 'errores': 0, 'carpetas': 0}
+
+    resultado = verificador_archivos.eliminar(ruta for _, ruta in pendientes)
+    listos = [(id_archivo,) for id_archivo, ruta in pendientes if resultado.get(ruta) is None]
+    fallidos = [(resultado[ruta][:500], id_archivo) for id_archivo, ruta in pendientes if resultado.get(ruta)]
+    if listos:
+        cursor.executemany(f"DELETE FROM {TABLA_ARCHIVOS} WHERE ArchivoPurgaID = ?", listos)
+    if fallidos:
+        cursor.executemany(
+            f"UPDATE {TABLA_ARCHIVOS} SET Intentos = Intentos + 1, UltimoError = ? WHERE ArchivoPurgaID = ?",
+            fallidos
+        )
+        for error, id_archivo in fallidos[:5]:
+            logger.warning(f"No se pudo eliminar el archivo {id_archivo} de la purga: {error}")
+
+    carpetas = 0
+    for carpeta in {os.path.dirname(ruta) for _, ruta in pendientes}:
+        if carpeta and os.path.normpath(carpeta) != CARPETA_TEMPORALES:
+            try:
+                os.rmdir(carpeta)
+                carpetas += 1
+            except OSError:
+                pass  # No está vacía o ya no existe
+    return {'procesados': len(listos), 'errores': len(fallidos), 'carpetas': carpetas}
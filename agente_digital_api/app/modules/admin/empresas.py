@@ -3,8 +3,11 @@
 
 from flask import Blueprint, jsonify, request
 from datetime import datetime
+from types import SimpleNamespace
 from ..core.database import get_db_connection, db_validator
 from ..core.errors import robust_endpoint, ErrorResponse
+from .contadores_dashboard import obtener_contadores
+from .eliminacion_incidentes import filtro_no_eliminados
 
 empresas_bp = Blueprint('admin_empresas', __name__, url_prefix='/api/admin/empresas')
 
@@ -92,6 +95,14 @@ def get_dashboard_stats(empresa_id):
             return jsonify(response), status
         tipo_empresa = empresa_info.TipoEmpresa if empresa_info and hasattr(empresa_info, 'TipoEmpresa') else 'PSE'
 
+        # Contadores mantenidos por triggers (lectura por clave primaria).
+        # None si no están instalados: se usan las consultas agregadas.
+        try:
+            contadores = obtener_contadores(conn, empresa_id)
+        except Exception as e:
+            print(f"Error leyendo contadores del dashboard: {e}")
+            contadores = None
+
         # 2. Estadísticas de Cumplimiento (Actual)
         try:
             # Contar obligaciones base según tipo de empresa
@@ -115,8 +126,17 @@ def get_dashboard_stats(empresa_id):
                 FROM CumplimientoEmpresa AS C
                 WHERE C.EmpresaID = ?
             """
-            cursor.execute(q_cumplimiento, (empresa_id,))
-            cumplimiento = cursor.fetchone()
+            if contadores is not None:
+                cumplimiento = SimpleNamespace(
+                    Implementadas=contadores['ObligacionesImplementadas'],
+                    EnProceso=contadores['ObligacionesEnProceso'],
+                    Pendientes=contadores['ObligacionesPendientes'],
+                    Vencidas=contadores['ObligacionesVencidas'],
+                    NoAplica=contadores['ObligacionesNoAplica']
+                )
+            else:
+                cursor.execute(q_cumplimiento, (empresa_id,))
+                cumplimiento = cursor.fetchone()
             print(f"DEBUG: Empresa ID: {empresa_id}, Cumplimiento: {cumplimiento}")
             
             # Verificar los valores individuales
@@ -126,33 +146,33 @@ def get_dashboard_stats(empresa_id):
             # Si no hay registros en CumplimientoEmpresa, todas las obligaciones están pendientes
             if not cumplimiento or (cumplimiento.Implementadas + cumplimiento.EnProceso + 
                                    cumplimiento.Pendientes + cumplimiento.Vencidas + cumplimiento.NoAplica) == 0:
-                cumplimiento = type('obj', (object,), {
-                    'Total': total_obligaciones_base,
-                    'Implementadas': 0,
-                    'EnProceso': 0,
-                    'Pendientes': total_obligaciones_base,
-                    'Vencidas': 0,
-                    'NoAplica': 0
-                })
+                cumplimiento = SimpleNamespace(
+                    Total=total_obligaciones_base,
+                    Implementadas=0,
+                    EnProceso=0,
+                    Pendientes=total_obligaciones_base,
+                    Vencidas=0,
+                    NoAplica=0
+                )
             else:
                 # No podemos modificar pyodbc.Row, crear un objeto nuevo con los valores
-                cumplimiento = type('obj', (object,), {
-                    'Total': total_obligaciones_base,
-                    'Implementadas': cumplimiento.Implementadas,
-                    'EnProceso': cumplimiento.EnProceso,
-                    'Pendientes': cumplimiento.Pendientes,
-                    'Vencidas': cumplimiento.Vencidas,
-                    'NoAplica': cumplimiento.NoAplica
-                })
+                cumplimiento = SimpleNamespace(
+                    Total=total_obligaciones_base,
+                    Implementadas=cumplimiento.Implementadas,
+                    EnProceso=cumplimiento.EnProceso,
+                    Pendientes=cumplimiento.Pendientes,
+                    Vencidas=cumplimiento.Vencidas,
+                    NoAplica=cumplimiento.NoAplica
+                )
         except Exception as e:
             print(f"Error ejecutando query de cumplimiento: {e}")
             import traceback
             traceback.print_exc()
             # Valores por defecto si falla la consulta
-            cumplimiento = type('obj', (object,), {
-                'Total': 0, 'Implementadas': 0, 'EnProceso': 0, 
-                'Pendientes': 0, 'Vencidas': 0, 'NoAplica': 0
-            })
+            cumplimiento = SimpleNamespace(
+                Total=0, Implementadas=0, EnProceso=0, 
+                Pendientes=0, Vencidas=0, NoAplica=0
+            )
 
         # Usar el total de obligaciones base calculado anteriormente
         total_obligaciones = total_obligaciones_base
@@ -179,7 +199,7 @@ def get_dashboard_stats(empresa_id):
 
         # 3. Estadísticas de Incidentes (TODAS las incidencias, no solo últimos 60 días)
         try:
-            q_incidentes = """
+            q_incidentes = f"""
                 SELECT 
                     ISNULL(COUNT(*), 0) as Total,
                     ISNULL(SUM(CASE WHEN EstadoActual = 'Abierto' THEN 1 ELSE 0 END), 0) as Activos,
@@ -189,17 +209,28 @@ def get_dashboard_stats(empresa_id):
                     ISNULL(SUM(CASE WHEN Criticidad = 'Media' THEN 1 ELSE 0 END), 0) as CritMedia,
                     ISNULL(SUM(CASE WHEN Criticidad = 'Baja' THEN 1 ELSE 0 END), 0) as CritBaja
                 FROM Incidentes
-                WHERE EmpresaID = ?
+                WHERE EmpresaID = ? AND {filtro_no_eliminados(cursor)}
             """
-            cursor.execute(q_incidentes, (empresa_id,))
-            incidentes = cursor.fetchone()
+            if contadores is not None:
+                incidentes = SimpleNamespace(
+                    Total=contadores['IncidentesTotal'],
+                    Activos=contadores['IncidentesAbiertos'],
+                    Cerrados=contadores['IncidentesCerrados'],
+                    Pendientes=contadores['IncidentesPendientes'],
+                    CritAlta=contadores['IncidentesCritAlta'],
+                    CritMedia=contadores['IncidentesCritMedia'],
+                    CritBaja=contadores['IncidentesCritBaja']
+                )
+            else:
+                cursor.execute(q_incidentes, (empresa_id,))
+                incidentes = cursor.fetchone()
         except Exception as e:
             print(f"Error ejecutando query de incidentes: {e}")
             # Valores por defecto si falla la consulta
-            incidentes = type('obj', (object,), {
-                'Total': 0, 'Activos': 0, 'Cerrados': 0, 
-                'Pendientes': 0, 'CritAlta': 0, 'CritMedia': 0, 'CritBaja': 0
-            })
+            incidentes = SimpleNamespace(
+                Total=0, Activos=0, Cerrados=0, 
+                Pendientes=0, CritAlta=0, CritMedia=0, CritBaja=0
+            )
         
         # 4. Lógica de Riesgo
         riesgo_nivel = 'bajo'
@@ -263,46 +294,33 @@ def get_dashboard_stats(empresa_id):
             print(f"Error ejecutando query de vencimientos: {e}")
             proximas_fechas = []
 
-        # 7. Total Evidencias - verificar si la tabla existe primero
+        # 7. Total Evidencias de cumplimiento (lo mismo que cuenta EvidenciasCumplimiento en los contadores)
         total_evidencias = 0
-        try:
-            # Verificar si existe la tabla Evidencias
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_NAME = 'Evidencias'
-            """)
-            if cursor.fetchone()[0] > 0:
-                cursor.execute("SELECT COUNT(*) FROM Evidencias WHERE EmpresaID = ?", (empresa_id,))
+        if contadores is not None:
+            total_evidencias = contadores['EvidenciasCumplimiento']
+        else:
+            try:
+                cursor.execute("""
+                    SELECT COUNT(*)
+                    FROM EvidenciasCumplimiento ec
+                    JOIN CumplimientoEmpresa ce ON ce.CumplimientoID = ec.CumplimientoID
+                    WHERE ce.EmpresaID = ?
+                """, (empresa_id,))
                 evidencias_result = cursor.fetchone()
                 total_evidencias = evidencias_result[0] if evidencias_result else 0
-            else:
-                # Si no existe la tabla, intentar contar archivos subidos desde otra tabla
-                try:
-                    # Intentar contar desde CumplimientoEmpresa donde haya evidencias
-                    cursor.execute("""
-                        SELECT COUNT(*) 
-                        FROM CumplimientoEmpresa 
-                        WHERE EmpresaID = ? 
-                        AND (ArchivoEvidencia IS NOT NULL OR RutaEvidencia IS NOT NULL)
-                    """, (empresa_id,))
-                    evidencias_result = cursor.fetchone()
-                    total_evidencias = evidencias_result[0] if evidencias_result else 0
-                except:
-                    total_evidencias = 0
-        except Exception as e:
-            print(f"Error ejecutando query de evidencias: {e}")
-            total_evidencias = 0
+            except Exception as e:
+                print(f"Error ejecutando query de evidencias: {e}")
+                total_evidencias = 0
 
         # 7.5 Obtener tipos frecuentes de incidentes
         def obtener_tipos_frecuentes(cursor, empresa_id):
             try:
-                q_tipos = """
+                q_tipos = f"""
                     SELECT TOP 3 
                         ISNULL(TipoFlujo, 'No especificado') as Tipo,
                         COUNT(*) as Cantidad
                     FROM Incidentes
-                    WHERE EmpresaID = ? 
+                    WHERE EmpresaID = ? AND {filtro_no_eliminados(cursor)}
                     GROUP BY TipoFlujo
                     ORDER BY COUNT(*) DESC
                 """
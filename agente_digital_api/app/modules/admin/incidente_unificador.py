@@ -11,6 +11,9 @@ import uuid
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from ...database import get_db_connection
+from .secuencia_incidentes import siguiente_correlativo
+from .eliminacion_incidentes import filtro_no_eliminados
+from ..incidentes.gestor_taxonomias import sincronizar_taxonomias
 
 class IncidenteUnificador:
     """
@@ -497,9 +500,7 @@ class IncidenteUnificador:
         try:
             conn = get_db_connection()
             if not conn:
-                # Fallback si no hay conexión
-                timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-                return f"1_{timestamp}_1_1_INCIDENTE_TEMPORAL"
+                raise RuntimeError("Sin conexión a la BD para generar el índice único")
             
             cursor = conn.cursor()
             
@@ -514,18 +515,16 @@ class IncidenteUnificador:
             else:
                 rut_sin_dv = "00000000"
             
-            # Obtener correlativo incremental
-            cursor.execute("SELECT ISNULL(MAX(id), 0) + 1 FROM Incidentes")
-            correlativo = cursor.fetchone()[0]
+            # Obtener correlativo incremental (secuencia por empresa)
+            correlativo = siguiente_correlativo(empresa_id)
             
             # Formato: CORRELATIVO_RUT_MODULO_SUBMODULO_DESCRIPCION
             return f"{correlativo}_{rut_sin_dv}_1_1_INCIDENTE_CIBERSEGURIDAD"
             
         except Exception as e:
+            # Igual que CreadorIncidentes: sin correlativo no se crea el incidente
             print(f"Error generando índice único: {str(e)}")
-            # Fallback
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            return f"1_{timestamp}_1_1_INCIDENTE_ERROR"
+            raise
         finally:
             if conn:
                 conn.close()
@@ -753,27 +752,22 @@ class IncidenteUnificador:
             cursor = conn.cursor()
             incidente_id = incidente["_metadatos"]["incidente_id"]
             
-            # Primero eliminar las taxonomías existentes (para simplificar)
-            cursor.execute("DELETE FROM INCIDENTE_TAXONOMIA WHERE IncidenteID = ?", (incidente_id,))
-            
-            # Insertar las taxonomías activas
-            for taxonomia in incidente["taxonomias"]["seleccionadas"]:
-                cursor.execute("""
-                    INSERT INTO INCIDENTE_TAXONOMIA (
-                        IncidenteID, Id_Taxonomia, Comentarios, 
-                        FechaAsignacion, CreadoPor
-                    ) VALUES (?, ?, ?, GETDATE(), ?)
-                """, (
-                    incidente_id,
-                    taxonomia["taxonomia_id"],
-                    json.dumps({
-                        "porque_seleccionada": taxonomia["porque_seleccionada"],
-                        "observaciones": taxonomia["observaciones_adicionales"],
-                        "numero_orden": taxonomia["numero_orden"],
-                        "id_unico": taxonomia["id_unico"]
-                    }),
-                    incidente["_metadatos"]["usuario_modificacion"]
-                ))
+            deseadas = {
+                taxonomia["taxonomia_id"]: json.dumps({
+                    "porque_seleccionada": taxonomia["porque_seleccionada"],
+                    "observaciones": taxonomia["observaciones_adicionales"],
+                    "numero_orden": taxonomia["numero_orden"],
+                    "id_unico": taxonomia["id_unico"]
+                })
+                for taxonomia in incidente["taxonomias"]["seleccionadas"]
+            }
+            
+            # Solo se tocan las filas que cambian; las demás conservan su fecha
+            sincronizar_taxonomias(
+                cursor, incidente_id, deseadas,
+                usuario=incidente["_metadatos"]["usuario_modificacion"],
+                columna_usuario="CreadoPor"
+            )
             
             conn.commit()
             
@@ -798,9 +792,9 @@ class IncidenteUnificador:
             cursor = conn.cursor()
             
             # Buscar por IDVisible o indice_unico
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT * FROM Incidentes 
-                WHERE IDVisible = ? OR indice_unico = ?
+                WHERE (IDVisible = ? OR indice_unico = ?) AND {filtro_no_eliminados(cursor)}
             """, (indice_unico, indice_unico))
             
             resultado = cursor.fetchone()
@@ -4,6 +4,9 @@
 from flask import Blueprint, jsonify, request
 from ..core.database import get_db_connection, db_validator
 from ..core.errors import robust_endpoint, ErrorResponse
+from ...json_rapido import filas_a_dicts
+from .contadores_incidente import obtener_estadisticas_incidentes
+from .eliminacion_incidentes import filtro_no_eliminados
 
 incidentes_bp = Blueprint('admin_incidentes', __name__, url_prefix='/api/admin/empresas')
 
@@ -37,12 +40,22 @@ def get_incidentes_empresa(empresa_id):
             query, columns = db_validator.build_safe_select_query(
                 cursor, 'Incidentes', 
                 desired_columns=['IncidenteID', 'Titulo', 'EstadoActual', 'Criticidad', 'FechaCreacion'],
-                where_clause=f"EmpresaID = {empresa_id}"
+                where_clause=f"EmpresaID = {empresa_id} AND {filtro_no_eliminados(cursor)}"
             )
             
             cursor.execute(query)
-            rows = cursor.fetchall()
-            incidentes = [dict(zip(columns, row)) for row in rows]
+            incidentes = filas_a_dicts(cursor)
+            
+            # Estadísticas de todo el listado en una lectura, si están instaladas
+            if incidentes and 'IncidenteID' in incidentes[0]:
+                try:
+                    estadisticas = obtener_estadisticas_incidentes(conn, [i['IncidenteID'] for i in incidentes])
+                except Exception as e:
+                    print(f"Error leyendo estadísticas de incidentes: {e}")
+                    estadisticas = None
+                if estadisticas is not None:
+                    for incidente in incidentes:
+                        incidente.update(estadisticas.get(incidente['IncidenteID'], {}))
             
             return jsonify(incidentes)
             
@@ -117,7 +130,10 @@ def get_incidente_detalle(incidente_id):
             response, status = ErrorResponse.not_found_error("Sistema de incidentes")
             return jsonify(response), status
         
-        cursor.execute("SELECT * FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT * FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         incidente_row = cursor.fetchone()
         
         if not incidente_row:
@@ -5,6 +5,8 @@ from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from app.database import get_db_connection
 from app.auth_utils import token_required
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
+from app.modules.admin import manifiesto_archivos
 import logging
 import os
 import json
@@ -35,7 +37,10 @@ def actualizar_incidente(current_user_id, current_user_rol, current_user_email,
         cursor = conn.cursor()
         
         # Verificar que el incidente existe
-        cursor.execute("SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         if not cursor.fetchone():
             return jsonify({"error": "Incidente no encontrado"}), 404
         
@@ -241,6 +246,10 @@ def actualizar_incidente(current_user_id, current_user_rol, current_user_email,
                                 file.content_type or 'application/octet-stream',
                                 current_user_id
                             ))
+                            manifiesto_archivos.registrar_si_disponible(
+                                cursor, incidente_id, ruta_archivo, taxonomia_id=str(tax_id),
+                                subido_por=current_user_id, nombre=file.filename
+                            )
                             
                             logger.info(f"Archivo de taxonomía guardado: {nombre_archivo} para taxonomía {tax_id}")
                 
@@ -284,6 +293,10 @@ def actualizar_incidente(current_user_id, current_user_rol, current_user_email,
                                 seccion_id,
                                 current_user_id
                             ))
+                            manifiesto_archivos.registrar_si_disponible(
+                                cursor, incidente_id, ruta_archivo, seccion=str(seccion_id),
+                                subido_por=current_user_id, nombre=file.filename
+                            )
                             
                             logger.info(f"Archivo guardado: {nombre_archivo} en sección {seccion_id}")
         
@@ -350,7 +363,10 @@ def subir_archivo_incidente(current_user_id, current_user_rol, current_user_emai
         cursor = conn.cursor()
         
         # Verificar que el incidente existe
-        cursor.execute("SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         if not cursor.fetchone():
             return jsonify({"error": "Incidente no encontrado"}), 404
         
@@ -386,6 +402,11 @@ def subir_archivo_incidente(current_user_id, current_user_rol, current_user_emai
         cursor.execute("SELECT SCOPE_IDENTITY()")
         archivo_id = cursor.fetchone()[0]
         
+        manifiesto_archivos.registrar_si_disponible(
+            cursor, incidente_id, ruta_archivo, seccion=str(seccion_id),
+            subido_por=current_user_id, nombre=file.filename
+        )
+        
         conn.commit()
         
         return jsonify({
@@ -6,6 +6,7 @@ from flask_cors import cross_origin
 from app.database import get_db_connection
 from app.auth_utils import token_required
 from app.utils.encoding_fixer import EncodingFixer
+from .eliminacion_incidentes import filtro_no_eliminados
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +25,7 @@ def obtener_incidente_admin(current_user_id, current_user_rol, current_user_emai
         cursor = conn.cursor()
         
         # Consulta completa del incidente con todos los campos necesarios
-        query = """
+        query = f"""
         SELECT 
             i.IncidenteID,
             i.EmpresaID,
@@ -83,7 +84,7 @@ def obtener_incidente_admin(current_user_id, current_user_rol, current_user_emai
         FROM Incidentes i
         LEFT JOIN Empresas e ON i.EmpresaID = e.EmpresaID
         LEFT JOIN Inquilinos inq ON i.InquilinoID = inq.InquilinoID
-        WHERE i.IncidenteID = ?
+        WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """
         
         cursor.execute(query, (incidente_id,))
@@ -283,7 +284,10 @@ def validar_incidente_para_anci(current_user_id, current_user_rol, current_user_
         cursor = conn.cursor()
         
         # Verificar que el incidente existe
-        cursor.execute("SELECT TieneReporteANCI FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT TieneReporteANCI FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         result = cursor.fetchone()
         
         if not result:
@@ -298,7 +302,7 @@ def validar_incidente_para_anci(current_user_id, current_user_rol, current_user_
             }), 200
         
         # Verificar campos requeridos para ANCI
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 Titulo,
                 FechaDeteccion,
@@ -309,7 +313,7 @@ def validar_incidente_para_anci(current_user_id, current_user_rol, current_user_
                 AnciImpactoPreliminar,
                 AccionesInmediatas
             FROM Incidentes
-            WHERE IncidenteID = ?
+            WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
         """, (incidente_id,))
         
         campos = cursor.fetchone()
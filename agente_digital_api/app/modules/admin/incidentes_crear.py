@@ -12,6 +12,9 @@ from functools import wraps
 from ...database import get_db_connection
 from ...auth_utils import verificar_token
 from ...utils.indice_taxonomias import IndiceUnico
+from .secuencia_incidentes import siguiente_correlativo
+from . import manifiesto_archivos
+from .eliminacion_incidentes import filtro_no_eliminados
 import uuid
 import tempfile
 import shutil
@@ -54,21 +57,17 @@ class CreadorIncidentes:
         os.makedirs(self.temp_folder, exist_ok=True)
         os.makedirs(self.upload_folder, exist_ok=True)
     
-    def generar_indice_unico(self, rut_empresa, modulo, submodulo, descripcion):
+    def generar_indice_unico(self, empresa_id, modulo, submodulo, descripcion):
         """
         Genera el índice único según la nomenclatura especificada:
         CORRELATIVO + RUT + MODULO + SUBMODULO + DESCRIPCION
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Obtener el siguiente correlativo
-            cursor.execute("SELECT ISNULL(MAX(IncidenteID), 0) + 1 FROM Incidentes")
-            correlativo = cursor.fetchone()[0]
+            # Obtener el siguiente correlativo (secuencia por empresa)
+            correlativo = siguiente_correlativo(empresa_id)
             
             # Formatear RUT sin dígito verificador
-            rut_sin_dv = str(rut_empresa).split('-')[0].replace('.', '')
+            rut_sin_dv = str(empresa_id).split('-')[0].replace('.', '')
             
             # Construir el índice único
             indice = f"{correlativo}_{rut_sin_dv}_{modulo}_{submodulo}_{descripcion}"
@@ -78,9 +77,6 @@ class CreadorIncidentes:
                 indice = indice[:50]
                 print(f"⚠️ Índice truncado a 50 caracteres: {indice}")
             
-            cursor.close()
-            conn.close()
-            
             return indice
             
         except Exception as e:
@@ -450,6 +446,7 @@ def cargar_evidencia_incidente(usuario):
         evidencias_procesadas = creador.procesar_evidencias(
             evidencias, indice_unico, seccion
         )
+        registrar_evidencias_manifiesto(indice_unico, seccion, evidencias_procesadas, usuario)
         
         return jsonify({
             "success": True,
@@ -464,6 +461,48 @@ def cargar_evidencia_incidente(usuario):
             "detalle": str(e)
         }), 500
 
+def registrar_evidencias_manifiesto(indice_unico, seccion, evidencias_procesadas, usuario):
+    """Registra en el manifiesto (si está instalado) las evidencias recién guardadas"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if not manifiesto_archivos.manifiesto_disponible(cursor):
+            return
+        incidente_id = manifiesto_archivos.incidente_por_id_visible(cursor, indice_unico)
+        if incidente_id is None:
+            return  # Se registrará al guardar el formulario o con la importación
+        for evidencia in evidencias_procesadas:
+            evidencia['manifiesto_id'] = manifiesto_archivos.registrar_archivo(
+                cursor, incidente_id, evidencia['ruta'], seccion=seccion,
+                descripcion=evidencia.get('descripcion', ''), subido_por=str(usuario.get('id') or '')
+            )
+        conn.commit()
+    except Exception as e:
+        print(f"⚠️ No se pudo registrar la evidencia en el manifiesto: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def registrar_archivos_formulario(incidente_id, archivos, taxonomias):
+    """Registra en el manifiesto (si está instalado) los archivos con que se creó el incidente"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if not manifiesto_archivos.manifiesto_disponible(cursor):
+            return
+        cambios = manifiesto_archivos.sincronizar_formulario(
+            cursor, incidente_id, manifiesto_archivos.archivos_del_formulario(archivos, taxonomias)
+        )
+        conn.commit()
+        print(f"📁 Manifiesto de archivos: {cambios['insertados']} registrados")
+    except Exception as e:
+        print(f"⚠️ No se pudieron registrar los archivos en el manifiesto: {e}")
+    finally:
+        if conn:
+            conn.close()
+
 # TEMPORAL: Versión sin autenticación para pruebas
 def crear_incidente_test():
     """Endpoint temporal sin autenticación para pruebas"""
@@ -541,12 +580,16 @@ def crear_incidente_test():
         # Guardar en base de datos
         incidente_id = creador.guardar_incidente_db(datos_guardar, indice_unico)
         print(f"✅ Incidente guardado con ID: {incidente_id}")
+        registrar_archivos_formulario(incidente_id, datos_guardar['archivos'], datos_guardar['taxonomias'])
         
         # Verificar que realmente se guardó
         try:
             conn_verify = get_db_connection()
             cursor_verify = conn_verify.cursor()
-            cursor_verify.execute("SELECT IncidenteID, Titulo FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+            cursor_verify.execute(
+                f"SELECT IncidenteID, Titulo FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor_verify)}",
+                (incidente_id,)
+            )
             verificacion = cursor_verify.fetchone()
             if verificacion:
                 print(f"✅ VERIFICACIÓN: Incidente {verificacion[0]} encontrado en BD: {verificacion[1][:50]}...")
@@ -596,7 +639,7 @@ def obtener_estructura_base_incidente(incidente_id):
         cursor = conn.cursor()
         
         # Obtener datos del incidente con todos los campos
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 i.*,
                 e.RazonSocial as NombreEmpresa,
@@ -604,7 +647,7 @@ def obtener_estructura_base_incidente(incidente_id):
                 e.RUT as RutEmpresa
             FROM Incidentes i
             LEFT JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (incidente_id,))
         
         row = cursor.fetchone()
@@ -663,6 +706,16 @@ def obtener_estructura_base_incidente(incidente_id):
         
         incidente['taxonomias'] = taxonomias
         
+        # Con el manifiesto instalado: una consulta por índice, sin carpeta ni JSON
+        if manifiesto_archivos.manifiesto_disponible(cursor):
+            archivos_por_seccion, archivos_por_taxonomia = manifiesto_archivos.listar_archivos(cursor, incidente_id)
+            for tax in incidente['taxonomias']:
+                tax['archivos'] = archivos_por_taxonomia.get(str(tax['id']), [])
+            incidente['archivos'] = archivos_por_seccion
+            cursor.close()
+            conn.close()
+            return incidente
+        
         # Obtener archivos asociados
         carpeta_evidencias = os.path.join(creador.upload_folder, 'evidencias', incidente.get('IDVisible', ''))
         archivos_por_seccion = {}
@@ -754,7 +807,10 @@ def actualizar_incidente_test(incidente_id):
         cursor = conn.cursor()
         
         # Verificar que el incidente existe
-        cursor.execute("SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         if not cursor.fetchone():
             return jsonify({"error": "Incidente no encontrado"}), 404
         
@@ -862,8 +918,18 @@ def actualizar_incidente_test(incidente_id):
                     'Sistema'
                 ))
         
+        # Con el manifiesto instalado: solo las filas que cambian, en la misma transacción
+        if 'archivos' in datos and manifiesto_archivos.manifiesto_disponible(cursor):
+            cambios = manifiesto_archivos.sincronizar_formulario(
+                cursor, incidente_id,
+                manifiesto_archivos.archivos_del_formulario(datos['archivos'], datos.get('taxonomias_seleccionadas')),
+                eliminados=datos.get('archivos_eliminados'),
+                sincronizar_taxonomias='taxonomias_seleccionadas' in datos
+            )
+            print(f"📁 Manifiesto de archivos: {cambios}")
+        
         # Guardar archivos en JSON temporal (simulación)
-        if 'archivos' in datos:
+        elif 'archivos' in datos:
             try:
                 archivo_temp = obtener_ruta_archivo_temporal(incidente_id, 'temp.json')
                 
@@ -1012,14 +1078,14 @@ def obtener_detalle_incidente_simple(incidente_id):
         cursor = conn.cursor()
         
         # Consulta básica del incidente
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 i.*,
                 e.RazonSocial as NombreEmpresa,
                 e.TipoEmpresa
             FROM Incidentes i
             LEFT JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (incidente_id,))
         
         row = cursor.fetchone()
@@ -1125,9 +1191,10 @@ def validar_para_anci(usuario, incidente_id):
     """Valida que un incidente tenga todos los campos requeridos para ser transformado en ANCI"""
     try:
         conn = get_db_connection()
+        cursor = conn.cursor()
         
         # Obtener datos del incidente
-        query = """
+        query = f"""
             SELECT 
                 i.IncidenteID,
                 i.Titulo,
@@ -1146,10 +1213,9 @@ def validar_para_anci(usuario, incidente_id):
                 i.TipoRegistro,
                 i.ReporteAnciID
             FROM Incidentes i
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """
         
-        cursor = conn.cursor()
         cursor.execute(query, (incidente_id,))
         incidente = cursor.fetchone()
         
@@ -1237,7 +1303,7 @@ def transformar_a_anci(usuario, incidente_id):
         cursor = conn.cursor()
         
         # Primero validar
-        query = """
+        query = f"""
             SELECT 
                 i.*,
                 e.RUT as RutEmpresa,
@@ -1245,7 +1311,7 @@ def transformar_a_anci(usuario, incidente_id):
                 e.TipoEmpresa
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """
         
         cursor.execute(query, (incidente_id,))
@@ -10,6 +10,8 @@ import traceback
 from functools import wraps
 from ...database import get_db_connection
 from ...auth_utils import verificar_token
+from .eliminacion_incidentes import filtro_no_eliminados
+from . import manifiesto_archivos
 import shutil
 
 # Decorador para autenticación
@@ -48,7 +50,7 @@ class EditorIncidentes:
             cursor = conn.cursor()
             
             # Cargar datos principales del incidente
-            query_incidente = """
+            query_incidente = f"""
             SELECT 
                 id, InquilinoID, EmpresaID, tipo_registro, titulo_incidente,
                 fecha_deteccion, fecha_ocurrencia, criticidad, alcance_geografico,
@@ -58,7 +60,7 @@ class EditorIncidentes:
                 lecciones_aprendidas, recomendaciones_mejora, estado,
                 fecha_creacion, usuario_creacion
             FROM Incidentes
-            WHERE indice_unico = ?
+            WHERE indice_unico = ? AND {filtro_no_eliminados(cursor)}
             """
             
             cursor.execute(query_incidente, (indice_unico,))
@@ -285,6 +287,10 @@ class EditorIncidentes:
                             evidencia['ruta'],
                             evidencia['fecha_carga']
                         ))
+                        manifiesto_archivos.registrar_si_disponible(
+                            cursor, incidente_id, evidencia['ruta'], seccion=seccion,
+                            descripcion=evidencia['descripcion'], nombre=evidencia['nombre_archivo']
+                        )
             
             # Confirmar transacción
             cursor.execute("COMMIT")
@@ -456,7 +462,10 @@ def obtener_resumen_evidencias(usuario):
         cursor = conn.cursor()
         
         # Obtener ID del incidente
-        cursor.execute("SELECT id FROM Incidentes WHERE indice_unico = ?", (indice_unico,))
+        cursor.execute(
+            f"SELECT id FROM Incidentes WHERE indice_unico = ? AND {filtro_no_eliminados(cursor)}",
+            (indice_unico,)
+        )
         result = cursor.fetchone()
         
         if not result:
@@ -1,8 +1,10 @@
 # incidentes_eliminar_completo.py
 # Módulo de eliminación completa de incidentes - No deja rastro
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from ...database import get_db_connection
+from ...auth_utils import verificar_token, token_required
+from . import eliminacion_incidentes
 import os
 import shutil
 
@@ -43,7 +45,12 @@ def obtener_archivos_incidente(cursor, incidente_id):
         cursor.execute("SELECT RutaArchivo FROM EVIDENCIAS_TAXONOMIA WHERE IncidenteID = ?", (incidente_id,))
         archivos.extend([row[0] for row in cursor.fetchall() if row[0]])
     
-    return archivos
+    # Archivos registrados en el manifiesto
+    if verificar_tabla_existe(cursor, 'ManifiestoArchivosIncidente'):
+        cursor.execute("SELECT RutaArchivo FROM ManifiestoArchivosIncidente WHERE IncidenteID = ?", (incidente_id,))
+        archivos.extend([row[0] for row in cursor.fetchall() if row[0]])
+    
+    return list(dict.fromkeys(archivos))
 
 def eliminar_archivos_fisicos(archivos):
     """Elimina archivos físicos del sistema de archivos"""
@@ -84,6 +91,10 @@ def eliminar_incidente_completo(incidente_id):
         cursor = conn.cursor()
         print(f"✅ Conexión a BD establecida correctamente")
         
+        # Con sql/eliminacion_incidentes.sql instalado: marcar y purgar en segundo plano
+        if eliminacion_incidentes.eliminacion_diferida_disponible(cursor):
+            return eliminar_incidente_diferido(conn, cursor, incidente_id)
+        
         # Verificar que el incidente existe
         print(f"🔍 Verificando que el incidente {incidente_id} existe...")
         cursor.execute("SELECT IncidenteID, EmpresaID FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
@@ -135,6 +146,7 @@ def eliminar_incidente_completo(incidente_id):
             
             # 5. Eliminar evidencias del incidente
             ("EvidenciasIncidentes", "DELETE FROM EvidenciasIncidentes WHERE IncidenteID = ?"),
+            ("ManifiestoArchivosIncidente", "DELETE FROM ManifiestoArchivosIncidente WHERE IncidenteID = ?"),
             
             # 6. Eliminar historial
             ("HistorialIncidentes", "DELETE FROM HistorialIncidentes WHERE IncidenteID = ?"),
@@ -290,6 +302,101 @@ def eliminar_incidente_completo(incidente_id):
             except:
                 pass
 
+def usuario_actual():
+    """Email (o ID) del usuario del token, si viene uno válido"""
+    usuario = verificar_token(request.headers.get('Authorization'))
+    if not usuario:
+        return None
+    return str(usuario['email'] or usuario['id'])
+
+def eliminar_incidente_diferido(conn, cursor, incidente_id):
+    """Marca el incidente como eliminado; la tarea 'purga_incidentes' borra sus datos"""
+    marcado = eliminacion_incidentes.marcar_eliminado(cursor, incidente_id, usuario_actual())
+    if not marcado:
+        print(f"❌ Incidente {incidente_id} no encontrado o ya eliminado")
+        return jsonify({"error": "Incidente no encontrado"}), 404
+    conn.commit()
+    print(f"🗑️ Incidente {incidente_id} marcado como eliminado, purga desde {marcado['purgar_desde']}")
+    return jsonify({
+        "success": True,
+        "message": "Incidente eliminado; sus datos se purgarán en segundo plano",
+        "incidente_id": incidente_id,
+        "empresa_id": marcado['empresa_id'],
+        "restaurable_hasta": marcado['purgar_desde'].isoformat() if marcado['purgar_desde'] else None
+    }), 202
+
+@incidentes_eliminar_completo_bp.route('/incidentes/<int:incidente_id>/restaurar', methods=['POST'])
+@token_required
+def restaurar_incidente(current_user_id, current_user_rol, current_user_email, current_user_nombre, incidente_id):
+    """Restaura un incidente eliminado que aún no se ha purgado (solo de su inquilino)"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Error de conexión a la base de datos"}), 500
+        cursor = conn.cursor()
+        permitido, inquilino_id = eliminacion_incidentes.alcance_usuario(cursor, current_user_id, current_user_rol)
+        if not permitido:
+            return jsonify({"error": "Permisos de administrador requeridos"}), 403
+        if not eliminacion_incidentes.eliminacion_diferida_disponible(cursor):
+            return jsonify({"error": "La eliminación diferida no está instalada"}), 404
+        # Un incidente de otro inquilino responde igual que uno inexistente
+        if not eliminacion_incidentes.restaurar_incidente(cursor, incidente_id, inquilino_id):
+            return jsonify({"error": "Incidente no eliminado o ya purgado"}), 404
+        conn.commit()
+        print(f"♻️ Incidente {incidente_id} restaurado por {current_user_email or current_user_id}")
+        return jsonify({"success": True, "incidente_id": incidente_id}), 200
+    except Exception as e:
+        if conn:
+            try:
+                conn.rollback()
+            except:
+                pass
+        print(f"❌ Error restaurando incidente {incidente_id}: {e}")
+        return jsonify({"error": "Error al restaurar incidente", "detalle": str(e)}), 500
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+
+@incidentes_eliminar_completo_bp.route('/incidentes/eliminados', methods=['GET'])
+@token_required
+def listar_incidentes_eliminados(current_user_id, current_user_rol, current_user_email, current_user_nombre):
+    """Incidentes eliminados del inquilino pendientes de purga (?empresa_id=, ?incluir_purgados=1)"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Error de conexión a la base de datos"}), 500
+        cursor = conn.cursor()
+        permitido, inquilino_id = eliminacion_incidentes.alcance_usuario(cursor, current_user_id, current_user_rol)
+        if not permitido:
+            return jsonify({"error": "Permisos de administrador requeridos"}), 403
+        if not eliminacion_incidentes.eliminacion_diferida_disponible(cursor):
+            return jsonify({"incidentes": [], "total": 0}), 200
+        incidentes = eliminacion_incidentes.listar_eliminados(
+            cursor,
+            empresa_id=request.args.get('empresa_id', type=int),
+            incluir_purgados=request.args.get('incluir_purgados') == '1',
+            inquilino_id=inquilino_id
+        )
+        for incidente in incidentes:
+            for campo in ('EliminadoEn', 'PurgarDesde', 'FechaPurga'):
+                if incidente[campo]:
+                    incidente[campo] = incidente[campo].isoformat()
+        return jsonify({"incidentes": incidentes, "total": len(incidentes)}), 200
+    except Exception as e:
+        print(f"❌ Error listando incidentes eliminados: {e}")
+        return jsonify({"error": "Error al listar incidentes eliminados", "detalle": str(e)}), 500
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except:
+                pass
+
 # Endpoint alternativo para compatibilidad
 @incidentes_eliminar_completo_bp.route('/incidentes/<int:incidente_id>', methods=['DELETE'])
 def eliminar_incidente_redirect(incidente_id):
@@ -0,0 +1,199 @@
+# modules/admin/informe_cumplimiento.py
+# Motor del informe de cumplimiento de obligaciones
+"""
+El catálogo OBLIGACIONES cambia rara vez y es igual para todas las empresas:
+se carga una vez (ordenado por ArticuloNorma, como lo mostraba el informe),
+se agrupa por AplicaPara y se mantiene en memoria CATALOGO_OBLIGACIONES_TTL
+segundos. Por empresa solo se leen sus filas de CumplimientoEmpresa y se
+combinan en Python con las obligaciones de su tipo (PSE/OIV + 'Ambos').
+
+``informes_empresas`` arma los informes de muchas empresas (exportación por
+inquilino o global) con una consulta de empresas y una de cumplimientos.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+TTL_CATALOGO = int(os.environ.get('CATALOGO_OBLIGACIONES_TTL', 600))
+TIPO_EMPRESA_DEFECTO = 'PSE'
+
+QUERY_CATALOGO = """
+    SELECT ObligacionID, ArticuloNorma, Descripcion, MedioDeVerificacionSugerido,
+           ContactoTecnicoComercial, AplicaPara
+    FROM OBLIGACIONES
+    ORDER BY ArticuloNorma
+"""
+
+COLUMNAS_CUMPLIMIENTO = """
+    EmpresaID, ObligacionID, Estado, PorcentajeAvance, Responsable, FechaTermino,
+    ObservacionesCiberseguridad, ObservacionesLegales, CumplimientoID
+"""
+
+
+def format_date_safe(fecha, formato='%Y-%m-%d %H:%M:%S'):
+    """Formatea fechas de forma segura"""
+    if not fecha:
+        return None
+    return fecha.strftime(formato) if hasattr(fecha, 'strftime') else str(fecha)
+
+
+class CatalogoObligaciones:
+    """Catálogo OBLIGACIONES en memoria, agrupado por AplicaPara"""
+
+    def __init__(self, ttl=TTL_CATALOGO):
+        self.ttl = ttl
+        self._obligaciones = ()
+        self._por_tipo = {}
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'cargas': 0, 'aciertos': 0}
+
+    def _cargar(self, cursor):
+        cursor.execute(QUERY_CATALOGO)
+        self._obligaciones = tuple(
+            {
+                'ObligacionID': row[0],
+                'ArticuloNorma': row[1],
+                'Descripcion': row[2],
+                'MedioDeVerificacionSugerido': row[3],
+                'ContactoTecnicoComercial': row[4],
+                'AplicaPara': row[5],
+            }
+            for row in cursor.fetchall()
+        )
+        self._por_tipo = {}
+        self._cargado_en = time.time()
+        self.stats['cargas'] += 1
+        logger.debug(f"Catálogo de obligaciones cargado: {len(self._obligaciones)} obligaciones")
+
+    def para_tipo(self, cursor, tipo_empresa):
+        """Obligaciones que aplican al tipo de empresa (incluye 'Ambos'), en orden de ArticuloNorma"""
+        with self._lock:
+            if not self._cargado_en or time.time() - self._cargado_en > self.ttl:
+                self._cargar(cursor)
+            else:
+                self.stats['aciertos'] += 1
+            if tipo_empresa not in self._por_tipo:
+                self._por_tipo[tipo_empresa] = tuple(
+                    o for o in self._obligaciones if o['AplicaPara'] in (tipo_empresa, 'Ambos')
+                )
+            return self._por_tipo[tipo_empresa]
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = 0.0
+
+
+# Instancia global
+catalogo_obligaciones = CatalogoObligaciones()
+
+
+def _estadisticas(cumplimientos):
+    total = len(cumplimientos)
+    implementadas = sum(1 for c in cumplimientos if c[2] == 'Implementado')
+    return {
+        'total_obligaciones': total,
+        'implementadas': implementadas,
+        'en_proceso': sum(1 for c in cumplimientos if c[2] == 'En Proceso'),
+        'pendientes': sum(1 for c in cumplimientos if c[2] == 'Pendiente'),
+        'porcentaje_cumplimiento': round(implementadas / total * 100, 2) if total > 0 else 0
+    }
+
+
+def _detalle(obligaciones, cumplimientos):
+    """Obligaciones del tipo combinadas con las filas de cumplimiento (como un LEFT JOIN)"""
+    por_obligacion = defaultdict(list)
+    for c in cumplimientos:
+        por_obligacion[c[1]].append(c)
+
+    detalle = []
+    for o in obligaciones:
+        for c in por_obligacion.get(o['ObligacionID']) or (None,):
+            detalle.append({
+                'ObligacionID': o['ObligacionID'],
+                'ArticuloNorma': o['ArticuloNorma'],
+                'Descripcion': o['Descripcion'],
+                'MedioDeVerificacionSugerido': o['MedioDeVerificacionSugerido'],
+                'Estado': (c[2] if c else None) or 'Pendiente',
+                'PorcentajeAvance': (c[3] if c else None) or 0,
+                'Responsable': c[4] if c else None,
+                'FechaTermino': format_date_safe(c[5], '%Y-%m-%d') if c and c[5] else None,
+                'ObservacionesCiberseguridad': c[6] if c else None,
+                'ObservacionesLegales': c[7] if c else None,
+                'CumplimientoID': c[8] if c else None,
+                'ContactoTecnicoComercial': o['ContactoTecnicoComercial']
+            })
+    return detalle
+
+
+def armar_informe(cursor, empresa, cumplimientos, incluir_detalle=True):
+    """
+    Informe de una empresa a partir de su fila (EmpresaID, RazonSocial,
+    TipoEmpresa) y sus filas de CumplimientoEmpresa (COLUMNAS_CUMPLIMIENTO).
+    """
+    tipo_empresa = empresa[2] or TIPO_EMPRESA_DEFECTO
+    informe = {
+        'empresa': {
+            'EmpresaID': empresa[0],
+            'RazonSocial': empresa[1],
+            'TipoEmpresa': tipo_empresa
+        },
+        'estadisticas_generales': _estadisticas(cumplimientos),
+        'fecha_generacion': format_date_safe(datetime.now())
+    }
+    if incluir_detalle:
+        try:
+            obligaciones = catalogo_obligaciones.para_tipo(cursor, tipo_empresa)
+        except Exception as e:
+            print(f"Error obteniendo catálogo de obligaciones: {e}")
+            obligaciones = ()
+        informe['obligaciones_detalle'] = _detalle(obligaciones, cumplimientos)
+    return informe
+
+
+def informe_empresa(cursor, empresa_id, incluir_detalle=True):
+    """Informe de cumplimiento de una empresa, o None si no existe"""
+    cursor.execute("SELECT EmpresaID, RazonSocial, TipoEmpresa FROM Empresas WHERE EmpresaID = ?", (empresa_id,))
+    empresa = cursor.fetchone()
+    if not empresa:
+        return None
+
+    try:
+        cursor.execute(f"SELECT {COLUMNAS_CUMPLIMIENTO} FROM CumplimientoEmpresa WHERE EmpresaID = ?",
+                       (empresa_id,))
+        cumplimientos = cursor.fetchall()
+    except Exception as e:
+        print(f"Error obteniendo cumplimientos: {e}")
+        cumplimientos = []
+
+    return armar_informe(cursor, empresa, cumplimientos, incluir_detalle)
+
+
+def informes_empresas(cursor, inquilino_id=None, incluir_detalle=True):
+    """
+    Informes de todas las empresas (o las de un inquilino) en una pasada:
+    una consulta de empresas y una de cumplimientos, agrupados en memoria.
+    Retorna un generador de informes en orden de RazonSocial.
+    """
+    filtro = "WHERE InquilinoID = ?" if inquilino_id is not None else ""
+    parametros = (inquilino_id,) if inquilino_id is not None else ()
+
+    cursor.execute(f"SELECT EmpresaID, RazonSocial, TipoEmpresa FROM Empresas {filtro} ORDER BY RazonSocial",
+                   parametros)
+    empresas = cursor.fetchall()
+
+    filtro_ce = ("WHERE EmpresaID IN (SELECT EmpresaID FROM Empresas WHERE InquilinoID = ?)"
+                 if inquilino_id is not None else "")
+    cursor.execute(f"SELECT {COLUMNAS_CUMPLIMIENTO} FROM CumplimientoEmpresa {filtro_ce}", parametros)
+    por_empresa = defaultdict(list)
+    for row in cursor.fetchall():
+        por_empresa[row[0]].append(row)
+
+    for empresa in empresas:
+        yield armar_informe(cursor, empresa, por_empresa.get(empresa[0], []), incluir_detalle)
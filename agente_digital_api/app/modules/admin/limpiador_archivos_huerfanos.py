@@ -5,12 +5,15 @@ Asegura que no queden archivos sin referencia en el sistema
 """
 
 import os
+import re
 import logging
 from datetime import datetime
 from ...database import get_db_connection
 
 logger = logging.getLogger(__name__)
 
+PATRON_ARCHIVO_INCIDENTE = re.compile(r'incidente_(\d+)_')
+
 class LimpiadorArchivosHuerfanos:
     """
     Gestiona la eliminación de archivos físicos cuando se eliminan evidencias
@@ -163,10 +166,37 @@ class LimpiadorArchivosHuerfanos:
         return resultado
     
     @staticmethod
-    def limpiar_archivos_huerfanos_masivo(incidente_id: int) -> dict:
+    def directorio_uploads() -> str:
+        return os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 
+            'uploads'
+        )
+    
+    @staticmethod
+    def archivos_por_incidente(upload_dir: str = None) -> dict:
+        """
+        Recorre uploads una vez y agrupa los archivos por incidente
+        (nombre con 'incidente_<id>_'). Retorna {incidente_id: [rutas]}
+        """
+        upload_dir = upload_dir or LimpiadorArchivosHuerfanos.directorio_uploads()
+        por_incidente = {}
+        for root, dirs, files in os.walk(upload_dir):
+            for archivo in files:
+                coincidencia = PATRON_ARCHIVO_INCIDENTE.search(archivo)
+                if coincidencia:
+                    por_incidente.setdefault(int(coincidencia.group(1)), []).append(os.path.join(root, archivo))
+        return por_incidente
+    
+    @staticmethod
+    def limpiar_archivos_huerfanos_masivo(incidente_id: int, archivos: list = None, eliminar: bool = True) -> dict:
         """
         Busca y elimina todos los archivos huérfanos de un incidente
         (archivos en disco sin registro en BD)
+        
+        Args:
+            archivos: rutas del incidente ya listadas (ver archivos_por_incidente);
+                      si no se entregan se recorre uploads
+            eliminar: False solo cuenta los huérfanos sin borrarlos
         """
         resultado = {
             'archivos_verificados': 0,
@@ -176,12 +206,9 @@ class LimpiadorArchivosHuerfanos:
         }
         
         # Directorio de uploads
-        upload_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 
-            'uploads'
-        )
+        upload_dir = LimpiadorArchivosHuerfanos.directorio_uploads()
         
-        if not os.path.exists(upload_dir):
+        if archivos is None and not os.path.exists(upload_dir):
             return resultado
         
         conn = None
@@ -207,23 +234,30 @@ class LimpiadorArchivosHuerfanos:
                     rutas_registradas.add(row[0])
             
             # Buscar archivos en disco relacionados con el incidente
-            patron_incidente = f"incidente_{incidente_id}_"
+            if archivos is None:
+                patron_incidente = f"incidente_{incidente_id}_"
+                archivos = [
+                    os.path.join(root, archivo)
+                    for root, dirs, files in os.walk(upload_dir)
+                    for archivo in files
+                    if patron_incidente in archivo
+                ]
             
-            for root, dirs, files in os.walk(upload_dir):
-                for archivo in files:
-                    if patron_incidente in archivo:
-                        ruta_completa = os.path.join(root, archivo)
-                        resultado['archivos_verificados'] += 1
-                        
-                        # Si no está registrado, es huérfano
-                        if ruta_completa not in rutas_registradas:
-                            resultado['archivos_huerfanos'] += 1
-                            try:
-                                os.remove(ruta_completa)
-                                resultado['archivos_eliminados'] += 1
-                                print(f"🗑️ Archivo huérfano eliminado: {archivo}")
-                            except Exception as e:
-                                resultado['errores'].append(f"Error eliminando {archivo}: {str(e)}")
+            for ruta_completa in archivos:
+                archivo = os.path.basename(ruta_completa)
+                resultado['archivos_verificados'] += 1
+                
+                # Si no está registrado, es huérfano
+                if ruta_completa not in rutas_registradas:
+                    resultado['archivos_huerfanos'] += 1
+                    if not eliminar:
+                        continue
+                    try:
+                        os.remove(ruta_completa)
+                        resultado['archivos_eliminados'] += 1
+                        print(f"🗑️ Archivo huérfano eliminado: {archivo}")
+                    except Exception as e:
+                        resultado['errores'].append(f"Error eliminando {archivo}: {str(e)}")
             
         except Exception as e:
             resultado['errores'].append(f"Error general: {str(e)}")
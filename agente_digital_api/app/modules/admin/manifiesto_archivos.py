@@ -0,0 +1,436 @@
+# modules/admin/manifiesto_archivos.py
+# Manifiesto de archivos por incidente en la base de datos
+"""
+La tabla ManifiestoArchivosIncidente (sql/manifiesto_archivos_incidente.sql)
+registra cada archivo de un incidente con su sección o taxonomía, tamaño,
+hash SHA-256 y estado:
+
+- ``registrar_archivo``: al subir una evidencia (tamaño y hash del archivo
+  recién escrito, vía verificador_archivos). Cada punto que escribe un
+  archivo de incidente (incidentes_crear, GestorEvidencias y la copia de
+  evidencias, incidente_views, incidentes_editar, incidentes_actualizar,
+  gestor_taxonomias y sistema_dinamico) lo registra con
+  ``registrar_si_disponible`` en su misma transacción.
+- ``sincronizar_formulario``: al guardar el formulario aplica solo las
+  diferencias (altas, cambios de descripción/comentario, bajas) en vez de
+  reescribir el JSON temporal completo.
+- ``listar_archivos``: los archivos de un incidente, agrupados por sección
+  y por taxonomía, con una consulta por índice.
+- ``importar``: carga única de lo existente en uploads/evidencias/<IDVisible>
+  y en los JSON temporales (temp_incidentes/<IDVisible>.json y
+  incidente_<id>_temp.json); se puede repetir, no duplica.
+
+    python -m app.modules.admin.manifiesto_archivos --importar [--simular]
+
+Sin el script instalado, incidentes_crear.py sigue listando la carpeta y
+leyendo el JSON temporal.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+from ...verificador_archivos import verificador_archivos
+
+logger = logging.getLogger(__name__)
+
+TABLA_MANIFIESTO = 'ManifiestoArchivosIncidente'
+ALGORITMO_HASH = 'sha256'
+
+RAIZ_APP = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CARPETA_EVIDENCIAS = os.path.join(RAIZ_APP, 'uploads', 'evidencias')
+CARPETA_TEMPORALES = os.path.join(RAIZ_APP, 'temp_incidentes')
+CARPETA_DATOS_TEMPORALES = os.path.join(tempfile.gettempdir(), 'agente_digital', 'datos_temporales')
+PATRON_DATOS_TEMPORALES = re.compile(r'^incidente_(\d+)_temp\.json$')
+
+# Orígenes cuyas filas refleja el formulario: si un guardado ya no las trae,
+# se dan de baja. Los archivos subidos solo salen con 'archivos_eliminados'.
+ORIGENES_FORMULARIO = ('formulario', 'importado_json')
+
+COLUMNAS = (
+    'ArchivoManifiestoID', 'IncidenteID', 'Seccion', 'TaxonomiaID', 'ClaveCliente', 'NombreArchivo',
+    'RutaArchivo', 'TamanoBytes', 'TipoArchivo', 'HashSHA256', 'Descripcion', 'Comentario',
+    'Origen', 'FechaCarga',
+)
+
+QUERY_LISTAR = f"""
+    SELECT {', '.join(COLUMNAS)}
+    FROM {TABLA_MANIFIESTO}
+    WHERE IncidenteID = ? AND Estado = 'activo'
+    ORDER BY Seccion, TaxonomiaID, FechaCarga, ArchivoManifiestoID
+"""
+
+QUERY_INSERTAR = f"""
+    INSERT INTO {TABLA_MANIFIESTO} (
+        IncidenteID, Seccion, TaxonomiaID, ClaveCliente, NombreArchivo, RutaArchivo,
+        TamanoBytes, TipoArchivo, HashSHA256, Descripcion, Comentario, Origen, FechaCarga, SubidoPor
+    ) {{salida}}
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ISNULL(?, GETDATE()), ?)
+"""
+QUERY_INSERTAR_UNO = QUERY_INSERTAR.format(salida='OUTPUT inserted.ArchivoManifiestoID')
+QUERY_INSERTAR_LOTE = QUERY_INSERTAR.format(salida='')
+
+# Se revisa si la tabla existe, como máximo una vez cada TTL
+TTL_DISPONIBILIDAD = 300
+_disponibilidad = {'valor': None, 'expira': 0.0}
+
+
+def manifiesto_disponible(cursor):
+    """True si sql/manifiesto_archivos_incidente.sql está instalado."""
+    ahora = time.monotonic()
+    if _disponibilidad['valor'] is not None and ahora < _disponibilidad['expira']:
+        return _disponibilidad['valor']
+    try:
+        cursor.execute(f"SELECT CASE WHEN OBJECT_ID('{TABLA_MANIFIESTO}', 'U') IS NULL THEN 0 ELSE 1 END")
+        disponible = bool(cursor.fetchone()[0])
+    except Exception as e:
+        logger.warning(f"No se pudo verificar el manifiesto de archivos: {e}")
+        disponible = False
+    _disponibilidad['valor'] = disponible
+    _disponibilidad['expira'] = ahora + TTL_DISPONIBILIDAD
+    return disponible
+
+
+def incidente_por_id_visible(cursor, id_visible):
+    cursor.execute("SELECT IncidenteID FROM Incidentes WHERE IDVisible = ?", (id_visible,))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+
+def _texto(valor, maximo=None):
+    if valor is None:
+        return None
+    valor = str(valor)
+    return valor[:maximo] if maximo else valor
+
+
+def _fecha(valor):
+    """Fecha ISO del formulario como texto aceptado por SQL Server, o None"""
+    if not valor:
+        return None
+    return str(valor).replace('T', ' ')[:23] if re.match(r'^\d{4}-\d{2}-\d{2}', str(valor)) else None
+
+
+def _tamano(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fila_insertar(incidente_id, archivo, origen, subido_por=None):
+    return (
+        incidente_id, _texto(archivo.get('seccion'), 20), _texto(archivo.get('taxonomia_id'), 50),
+        _texto(archivo.get('clave'), 100) or None, _texto(archivo.get('nombre') or '', 255),
+        _texto(archivo.get('ruta'), 1000) or None, _tamano(archivo.get('tamano')),
+        _texto(archivo.get('tipo'), 100) or None, archivo.get('hash'),
+        _texto(archivo.get('descripcion'), 1000), archivo.get('comentario'),
+        origen, _fecha(archivo.get('fecha')), subido_por,
+    )
+
+
+def registrar_archivo(cursor, incidente_id, ruta, seccion=None, taxonomia_id=None, descripcion='',
+                      comentario='', tipo=None, subido_por=None, origen='carga', nombre=None):
+    """Registra un archivo ya escrito en disco. No hace commit. Retorna su ID."""
+    estado = verificador_archivos.estado(ruta)
+    archivo = {
+        'seccion': seccion, 'taxonomia_id': taxonomia_id, 'nombre': nombre or os.path.basename(ruta),
+        'ruta': ruta, 'tamano': estado.tamano if estado.existe else None,
+        'tipo': tipo or os.path.splitext(ruta)[1].lstrip('.').lower() or None,
+        'hash': verificador_archivos.hash_archivo(ruta, ALGORITMO_HASH, estado),
+        'descripcion': descripcion, 'comentario': comentario,
+    }
+    cursor.execute(QUERY_INSERTAR_UNO, _fila_insertar(incidente_id, archivo, origen, subido_por))
+    return cursor.fetchone()[0]
+
+
+def registrar_si_disponible(cursor, incidente_id, ruta, **datos):
+    """registrar_archivo si el manifiesto está instalado; None si no o si falla.
+
+    No hace commit: la fila entra en la transacción del que escribió el archivo.
+    Un error al registrar no debe cortar la carga; la importación lo recupera.
+    """
+    if not incidente_id or not ruta or not manifiesto_disponible(cursor):
+        return None
+    try:
+        return registrar_archivo(cursor, incidente_id, ruta, **datos)
+    except Exception as e:
+        logger.warning(f"No se pudo registrar {ruta} en el manifiesto: {e}")
+        return None
+
+
+def _leer_activos(cursor, incidente_id):
+    cursor.execute(QUERY_LISTAR, (incidente_id,))
+    return [dict(zip(COLUMNAS, fila)) for fila in cursor.fetchall()]
+
+
+def _a_formato_formulario(incidente_id, fila):
+    ambito = fila['Seccion'] or f"tax_{fila['TaxonomiaID']}"
+    return {
+        'id': fila['ClaveCliente'] or f"{incidente_id}_{ambito}_m{fila['ArchivoManifiestoID']}",
+        'manifiesto_id': fila['ArchivoManifiestoID'],
+        'nombre': fila['NombreArchivo'],
+        'tamaño': fila['TamanoBytes'] or 0,
+        'tipo': fila['TipoArchivo'] or '',
+        'descripcion': fila['Descripcion'] or '',
+        'comentario': fila['Comentario'] or '',
+        'fechaCarga': fila['FechaCarga'].isoformat() if fila['FechaCarga'] else '',
+        'hash': fila['HashSHA256'],
+        'origen': 'guardado',
+        'existente': True,
+        'ruta': fila['RutaArchivo'] or '',
+    }
+
+
+def listar_archivos(cursor, incidente_id):
+    """
+    Archivos activos del incidente en el formato del formulario:
+    ({seccion: [archivo]}, {taxonomia_id: [archivo]})
+    """
+    por_seccion, por_taxonomia = {}, {}
+    for fila in _leer_activos(cursor, incidente_id):
+        archivo = _a_formato_formulario(incidente_id, fila)
+        if fila['TaxonomiaID']:
+            por_taxonomia.setdefault(fila['TaxonomiaID'], []).append(archivo)
+        else:
+            por_seccion.setdefault(fila['Seccion'] or '', []).append(archivo)
+    return por_seccion, por_taxonomia
+
+
+def _desde_formulario(archivo, seccion=None, taxonomia_id=None):
+    """Normaliza un archivo tal como lo envía (o lo guardaba) el formulario"""
+    return {
+        'seccion': seccion, 'taxonomia_id': taxonomia_id, 'clave': archivo.get('id') or None,
+        'nombre': archivo.get('nombre', ''), 'ruta': archivo.get('ruta') or None,
+        'tamano': archivo.get('tamaño', archivo.get('tamano')), 'tipo': archivo.get('tipo'),
+        'descripcion': archivo.get('descripcion', ''), 'comentario': archivo.get('comentario', ''),
+        'fecha': archivo.get('fechaCarga'),
+    }
+
+
+def archivos_del_formulario(archivos_secciones=None, taxonomias=None):
+    """Lista plana de archivos desde datos['archivos'] y las taxonomías seleccionadas"""
+    resultado = []
+    for seccion_key, archivos in (archivos_secciones or {}).items():
+        if seccion_key == 'taxonomias' and isinstance(archivos, dict):
+            for tax_id, archivos_tax in archivos.items():
+                resultado.extend(_desde_formulario(a, taxonomia_id=str(tax_id)) for a in archivos_tax or [])
+        else:
+            seccion = str(seccion_key).split('_')[-1]
+            resultado.extend(_desde_formulario(a, seccion=seccion) for a in archivos or [])
+    for tax in taxonomias or []:
+        resultado.extend(_desde_formulario(a, taxonomia_id=str(tax['id'])) for a in tax.get('archivos') or [])
+    return resultado
+
+
+def _indices(filas):
+    por_clave, por_ruta, por_nombre = {}, {}, {}
+    for fila in filas:
+        if fila['ClaveCliente']:
+            por_clave.setdefault(fila['ClaveCliente'], fila)
+        if fila['RutaArchivo']:
+            por_ruta.setdefault(fila['RutaArchivo'], fila)
+        por_nombre.setdefault((fila['Seccion'], fila['TaxonomiaID'], fila['NombreArchivo']), fila)
+    return por_clave, por_ruta, por_nombre
+
+
+def _buscar(indices, archivo):
+    por_clave, por_ruta, por_nombre = indices
+    return (por_clave.get(archivo.get('clave')) or por_ruta.get(archivo.get('ruta'))
+            or por_nombre.get((archivo.get('seccion'), archivo.get('taxonomia_id'), archivo.get('nombre'))))
+
+
+def sincronizar_formulario(cursor, incidente_id, archivos, eliminados=(), sincronizar_secciones=True,
+                           sincronizar_taxonomias=True, usuario=None):
+    """
+    Aplica al manifiesto los archivos que envía un guardado del formulario
+    (ver archivos_del_formulario): solo inserta, actualiza o da de baja las
+    filas que cambian. No hace commit.
+
+    ``eliminados``: datos['archivos_eliminados'] ({'id', 'seccion', ...}).
+    Retorna {'insertados', 'actualizados', 'eliminados'}.
+    """
+    filas = _leer_activos(cursor, incidente_id)
+    indices = _indices(filas)
+    claves_eliminadas = {str(e.get('id')) for e in eliminados or () if e.get('id')}
+
+    insertar, actualizar, vistos = [], [], set()
+    for archivo in archivos:
+        if archivo.get('clave') in claves_eliminadas:
+            continue
+        fila = _buscar(indices, archivo)
+        if fila is None:
+            insertar.append(_fila_insertar(incidente_id, archivo, 'formulario', usuario))
+            continue
+        vistos.add(fila['ArchivoManifiestoID'])
+        nuevo = (archivo.get('clave') or fila['ClaveCliente'], _texto(archivo.get('descripcion') or '', 1000),
+                 archivo.get('comentario') or '')
+        if nuevo != (fila['ClaveCliente'], fila['Descripcion'] or '', fila['Comentario'] or ''):
+            actualizar.append((*nuevo, fila['ArchivoManifiestoID']))
+
+    bajas = []
+    for fila in filas:
+        if fila['ArchivoManifiestoID'] in vistos:
+            continue
+        explicita = fila['ClaveCliente'] in claves_eliminadas
+        ambito = (sincronizar_taxonomias if fila['TaxonomiaID'] else sincronizar_secciones)
+        if explicita or (ambito and fila['Origen'] in ORIGENES_FORMULARIO):
+            bajas.append((fila['ArchivoManifiestoID'],))
+
+    if insertar:
+        cursor.executemany(QUERY_INSERTAR_LOTE, insertar)
+    if actualizar:
+        cursor.executemany(f"""
+            UPDATE {TABLA_MANIFIESTO}
+            SET ClaveCliente = ?, Descripcion = ?, Comentario = ?, FechaActualizacion = GETDATE()
+            WHERE ArchivoManifiestoID = ?
+        """, actualizar)
+    if bajas:
+        cursor.executemany(f"""
+            UPDATE {TABLA_MANIFIESTO} SET Estado = 'eliminado', FechaActualizacion = GETDATE()
+            WHERE ArchivoManifiestoID = ?
+        """, bajas)
+    return {'insertados': len(insertar), 'actualizados': len(actualizar), 'eliminados': len(bajas)}
+
+
+# ----------------------------------------------------------------------
+# Importación única desde carpetas y JSON temporales
+# ----------------------------------------------------------------------
+
+def _seccion_desde_nombre(nombre, id_visible):
+    """Sección desde '<IDVisible>_<seccion>_<n>_<timestamp>.<ext>' (procesar_evidencias)"""
+    resto = nombre[len(id_visible) + 1:] if nombre.startswith(f"{id_visible}_") else None
+    if resto:
+        return resto.split('_')[0]
+    partes = nombre.split('_')
+    return partes[1] if len(partes) >= 3 else None
+
+
+def _archivos_json(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"JSON temporal ilegible {ruta}: {e}")
+        return []
+    archivos = datos.get('archivos') if isinstance(datos, dict) else None
+    return archivos_del_formulario(archivos) if isinstance(archivos, dict) else []
+
+
+def importar(cursor, commit=None, simular=False):
+    """
+    Importa al manifiesto los archivos de las carpetas de evidencias y de los
+    JSON temporales. Omite los que ya están (por ruta, o por sección/taxonomía
+    y nombre). ``commit``: función llamada tras cada incidente.
+    """
+    inicio = time.perf_counter()
+    cursor.execute("SELECT IncidenteID, IDVisible FROM Incidentes WHERE IDVisible IS NOT NULL AND IDVisible <> ''")
+    por_visible = {id_visible: incidente_id for incidente_id, id_visible in cursor.fetchall()}
+    existentes = set(por_visible.values())
+
+    candidatos = {}  # {IncidenteID: [(archivo, origen)]}
+    carpetas = os.listdir(CARPETA_EVIDENCIAS) if os.path.isdir(CARPETA_EVIDENCIAS) else []
+    for id_visible in carpetas:
+        incidente_id = por_visible.get(id_visible)
+        if incidente_id is None:
+            continue
+        for ruta in verificador_archivos.listar_carpeta(os.path.join(CARPETA_EVIDENCIAS, id_visible)):
+            nombre = os.path.basename(ruta)
+            candidatos.setdefault(incidente_id, []).append(({
+                'seccion': _seccion_desde_nombre(nombre, id_visible), 'nombre': nombre, 'ruta': ruta,
+                'tipo': os.path.splitext(nombre)[1].lstrip('.').lower() or None,
+            }, 'importado_carpeta'))
+
+    jsons = []
+    if os.path.isdir(CARPETA_TEMPORALES):
+        jsons.extend((por_visible.get(nombre[:-5]), os.path.join(CARPETA_TEMPORALES, nombre))
+                     for nombre in os.listdir(CARPETA_TEMPORALES) if nombre.endswith('.json'))
+    if os.path.isdir(CARPETA_DATOS_TEMPORALES):
+        for nombre in os.listdir(CARPETA_DATOS_TEMPORALES):
+            coincidencia = PATRON_DATOS_TEMPORALES.match(nombre)
+            if coincidencia and int(coincidencia.group(1)) in existentes:
+                jsons.append((int(coincidencia.group(1)), os.path.join(CARPETA_DATOS_TEMPORALES, nombre)))
+    for incidente_id, ruta in jsons:
+        if incidente_id is not None:
+            candidatos.setdefault(incidente_id, []).extend(
+                (archivo, 'importado_json') for archivo in _archivos_json(ruta))
+
+    # Tamaño y hash de los archivos en disco, en paralelo
+    rutas = [a['ruta'] for lista in candidatos.values() for a, _ in lista if a.get('ruta')]
+    estados = verificador_archivos.estados(rutas)
+    hashes = verificador_archivos.hashes([r for r, e in estados.items() if e.existe], ALGORITMO_HASH)
+
+    resumen = {'incidentes': 0, 'insertados': 0, 'omitidos': 0, 'sin_archivo_en_disco': 0,
+               'carpetas': len(carpetas), 'json': len(jsons)}
+    for incidente_id in sorted(candidatos):
+        indices = _indices(_leer_activos(cursor, incidente_id))
+        filas = []
+        for archivo, origen in candidatos[incidente_id]:
+            if _buscar(indices, archivo) is not None:
+                resumen['omitidos'] += 1
+                continue
+            estado = estados.get(archivo.get('ruta'))
+            if estado is not None and estado.existe:
+                archivo['tamano'] = estado.tamano
+                archivo['hash'] = hashes.get(archivo['ruta'])
+            elif archivo.get('ruta'):
+                resumen['sin_archivo_en_disco'] += 1
+            filas.append(_fila_insertar(incidente_id, archivo, origen, 'importacion'))
+            # Un mismo archivo en la carpeta y en el JSON se importa una vez
+            nueva = {'ArchivoManifiestoID': None, 'ClaveCliente': archivo.get('clave'),
+                     'RutaArchivo': archivo.get('ruta'), 'Seccion': archivo.get('seccion'),
+                     'TaxonomiaID': archivo.get('taxonomia_id'), 'NombreArchivo': archivo.get('nombre')}
+            for indice, clave in zip(indices, (nueva['ClaveCliente'], nueva['RutaArchivo'],
+                                               (nueva['Seccion'], nueva['TaxonomiaID'], nueva['NombreArchivo']))):
+                if clave:
+                    indice.setdefault(clave, nueva)
+        if filas and not simular:
+            cursor.executemany(QUERY_INSERTAR_LOTE, filas)
+            if commit:
+                commit()
+        resumen['incidentes'] += 1 if filas else 0
+        resumen['insertados'] += len(filas)
+    resumen['duracion_s'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+
+def main():
+    import argparse
+    from ...database import get_db_connection
+
+    parser = argparse.ArgumentParser(description='Manifiesto de archivos de incidentes')
+    parser.add_argument('--importar', action='store_true', help='Importar carpetas de evidencias y JSON temporales')
+    parser.add_argument('--simular', action='store_true', help='Solo contar, sin insertar')
+    args = parser.parse_args()
+    if not args.importar:
+        parser.print_help()
+        return 0
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ No se pudo conectar a la base de datos")
+        return 1
+    try:
+        cursor = conn.cursor()
+        if not manifiesto_disponible(cursor):
+            print("❌ Falta ejecutar sql/manifiesto_archivos_incidente.sql")
+            return 1
+        resumen = importar(cursor, commit=conn.commit, simular=args.simular)
+        print(f"✅ Importación {'simulada ' if args.simular else ''}en {resumen['duracion_s']}s: "
+              f"{resumen['insertados']} archivos de {resumen['incidentes']} incidentes, "
+              f"{resumen['omitidos']} ya registrados, {resumen['sin_archivo_en_disco']} sin archivo en disco "
+              f"({resumen['carpetas']} carpetas, {resumen['json']} JSON)")
+        return 0
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error importando el manifiesto: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,490 @@
+# modules/admin/paquete_evidencias.py
+# Exportación de evidencias en un ZIP generado al vuelo
+"""
+Descarga en un solo ZIP de todas las evidencias de un incidente o de una
+empresa (evidencias de sus incidentes y de cumplimiento), leídas de
+EvidenciasIncidentes, EVIDENCIAS_TAXONOMIA y EvidenciasCumplimiento.
+
+- El ZIP se escribe por bloques sobre un destino sin seek: zipfile usa
+  descriptores de datos y pasa a ZIP64 cuando un archivo o el paquete lo
+  necesitan, y la memoria usada no depende del tamaño del paquete.
+- Los formatos ya comprimidos (imágenes, PDF, Office, zip...) van sin
+  comprimir (ZIP_STORED); el resto con deflate.
+- Al final va manifest.csv con la ruta en el ZIP, el origen, el tamaño y
+  el SHA-256 de cada archivo, calculado mientras se envía.
+- La huella del paquete (SHA-256 de las filas y del stat de cada archivo)
+  es el ETag. La salida es determinista para una misma huella, así que la
+  descarga se guarda en PAQUETES_EVIDENCIAS_DIR/<huella>.zip mientras se
+  envía; un Range (reanudación) se atiende desde ese archivo y, si la
+  descarga anterior quedó a medias, se completa el parcial regenerando
+  solo lo que falta escribir.
+
+La tarea 'paquetes_evidencias' del planificador borra los paquetes con más
+de PAQUETES_EVIDENCIAS_CACHE_HORAS horas (0 desactiva la caché).
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from typing import NamedTuple, Optional
+
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+
+from ...auth_utils import token_required
+from ...database import get_db_connection
+from ...planificador_tareas import DIRECTORIO_TAREAS, BloqueoArchivo
+from ...verificador_archivos import EstadoArchivo, verificador_archivos
+from .eliminacion_incidentes import filtro_no_eliminados, tablas_existentes
+
+logger = logging.getLogger(__name__)
+
+paquete_evidencias_bp = Blueprint('paquete_evidencias', __name__, url_prefix='/api/admin')
+
+RAIZ_PROYECTO = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+CARPETA_UPLOADS = os.path.join(RAIZ_PROYECTO, 'uploads')
+
+DIRECTORIO_PAQUETES = os.environ.get(
+    'PAQUETES_EVIDENCIAS_DIR', os.path.join(tempfile.gettempdir(), 'agente_digital', 'paquetes_evidencias')
+)
+CACHE_HORAS = float(os.environ.get('PAQUETES_EVIDENCIAS_CACHE_HORAS', 24))
+
+TAMANO_BLOQUE = 256 * 1024
+NOMBRE_MANIFIESTO = 'manifest.csv'
+# Cambia la huella de todos los paquetes si cambia el formato de salida
+VERSION_FORMATO = 1
+
+# Extensiones que ya vienen comprimidas: deflate no las achica y cuesta CPU
+EXTENSIONES_COMPRIMIDAS = frozenset((
+    'zip', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar',
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'heic',
+    'mp3', 'mp4', 'm4a', 'mov', 'avi', 'mkv',
+    'pdf', 'docx', 'xlsx', 'pptx', 'odt', 'ods', 'odp',
+))
+
+# (tabla, carpeta base de las rutas relativas, SELECT con {filtro}) de las
+# evidencias de incidentes. Columnas: IncidenteID, IDVisible, Nombre, RutaArchivo, Subcarpeta.
+FUENTES_INCIDENTE = (
+    ('EvidenciasIncidentes', RAIZ_PROYECTO, """
+        SELECT x.IncidenteID, i.IDVisible, x.NombreArchivo, x.RutaArchivo, NULL
+        FROM EvidenciasIncidentes x
+        JOIN Incidentes i ON i.IncidenteID = x.IncidenteID
+        WHERE {filtro} AND x.RutaArchivo IS NOT NULL AND x.RutaArchivo <> ''
+        ORDER BY x.IncidenteID, x.FechaSubida, x.RutaArchivo
+    """),
+    ('EVIDENCIAS_TAXONOMIA', RAIZ_PROYECTO, """
+        SELECT x.IncidenteID, i.IDVisible, ISNULL(x.NombreArchivoOriginal, x.NombreArchivo),
+               x.RutaArchivo, x.TaxonomiaID
+        FROM EVIDENCIAS_TAXONOMIA x
+        JOIN Incidentes i ON i.IncidenteID = x.IncidenteID
+        WHERE {filtro} AND ISNULL(x.Activo, 1) = 1
+          AND x.RutaArchivo IS NOT NULL AND x.RutaArchivo <> ''
+        ORDER BY x.IncidenteID, x.TaxonomiaID, x.FechaSubida, x.RutaArchivo
+    """),
+)
+
+QUERY_CUMPLIMIENTO = """
+    SELECT c.CumplimientoID, e.NombreArchivoOriginal, e.RutaArchivo
+    FROM EvidenciasCumplimiento e
+    JOIN CumplimientoEmpresa c ON c.CumplimientoID = e.CumplimientoID
+    WHERE c.EmpresaID = ? AND e.RutaArchivo IS NOT NULL AND e.RutaArchivo <> ''
+    ORDER BY c.CumplimientoID, e.FechaSubida, e.EvidenciaID
+"""
+
+stats = {
+    'paquetes_generados': 0,
+    'paquetes_desde_cache': 0,
+    'paquetes_completados': 0,
+    'bytes_generados': 0,
+}
+
+
+class Entrada(NamedTuple):
+    """Un archivo del paquete"""
+    nombre_zip: str
+    ruta: str
+    origen: str
+    referencia: str
+    nombre_original: str
+    estado: EstadoArchivo
+
+
+class Paquete(NamedTuple):
+    """Entradas en orden de salida, nombre de descarga y huella (ETag)"""
+    nombre_descarga: str
+    entradas: list
+    huella: str
+
+
+# ----------------------------------------------------------------------
+# Armado del paquete
+# ----------------------------------------------------------------------
+
+def _componente(texto, respaldo='archivo'):
+    """Segmento de ruta seguro dentro del ZIP"""
+    texto = str(texto or '').replace('\\', '/').rsplit('/', 1)[-1].strip().lstrip('.')
+    return texto or respaldo
+
+
+def _ruta_absoluta(ruta, base):
+    return os.path.normpath(ruta if os.path.isabs(ruta) else os.path.join(base, ruta))
+
+
+def _nombre_unico(nombre, usados):
+    """'a/b.pdf' -> 'a/b (2).pdf' si ya está en el paquete"""
+    if nombre not in usados:
+        usados.add(nombre)
+        return nombre
+    raiz, extension = os.path.splitext(nombre)
+    n = 2
+    while f"{raiz} ({n}){extension}" in usados:
+        n += 1
+    nombre = f"{raiz} ({n}){extension}"
+    usados.add(nombre)
+    return nombre
+
+
+def _filas_incidentes(cursor, filtro, parametros, prefijo):
+    """(carpeta en el ZIP, ruta, origen, referencia, nombre) de las evidencias de incidentes"""
+    existentes = tablas_existentes(cursor, [tabla for tabla, _, _ in FUENTES_INCIDENTE])
+    filtro = f"{filtro} AND {filtro_no_eliminados(cursor, 'i')}"
+    for tabla, base, query in FUENTES_INCIDENTE:
+        if tabla not in existentes:
+            continue
+        cursor.execute(query.format(filtro=filtro), parametros)
+        for incidente_id, id_visible, nombre, ruta, subcarpeta in cursor.fetchall():
+            carpeta = prefijo(incidente_id, id_visible)
+            if tabla == 'EVIDENCIAS_TAXONOMIA':
+                carpeta += f"taxonomias/{_componente(subcarpeta, 'sin_taxonomia')}/"
+            else:
+                carpeta += 'evidencias/'
+            yield carpeta, _ruta_absoluta(ruta, base), tabla, str(incidente_id), nombre or ruta
+
+
+def _filas_cumplimiento(cursor, empresa_id):
+    if 'EvidenciasCumplimiento' not in tablas_existentes(cursor, ['EvidenciasCumplimiento']):
+        return
+    cursor.execute(QUERY_CUMPLIMIENTO, (empresa_id,))
+    for cumplimiento_id, nombre, ruta in cursor.fetchall():
+        yield (f"cumplimiento/{cumplimiento_id}/", _ruta_absoluta(ruta, CARPETA_UPLOADS),
+               'EvidenciasCumplimiento', str(cumplimiento_id), nombre or ruta)
+
+
+def _armar(nombre_descarga, filas):
+    """Entradas sin rutas repetidas, con el stat en paralelo, y la huella del paquete"""
+    filas = list(filas)
+    estados = verificador_archivos.estados(ruta for _, ruta, _, _, _ in filas)
+    usados, vistas, entradas = {NOMBRE_MANIFIESTO}, set(), []
+    huella = hashlib.sha256(f"paquete_evidencias:{VERSION_FORMATO}".encode())
+    for carpeta, ruta, origen, referencia, nombre in filas:
+        if ruta in vistas:
+            continue
+        vistas.add(ruta)
+        estado = estados[ruta]
+        entrada = Entrada(_nombre_unico(carpeta + _componente(nombre), usados), ruta, origen,
+                          referencia, str(nombre), estado)
+        entradas.append(entrada)
+        huella.update(json.dumps([entrada.nombre_zip, ruta, origen, referencia, entrada.nombre_original,
+                                  estado.existe, estado.tamano, estado.mtime_ns]).encode())
+    return Paquete(nombre_descarga, entradas, huella.hexdigest())
+
+
+def paquete_incidente(cursor, incidente_id):
+    """Paquete de un incidente, o None si no existe (o está eliminado)"""
+    cursor.execute(
+        f"SELECT IDVisible FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+        (incidente_id,)
+    )
+    fila = cursor.fetchone()
+    if not fila:
+        return None
+    nombre = _componente(fila[0], str(incidente_id))
+    return _armar(f"evidencias_{nombre}.zip",
+                  _filas_incidentes(cursor, 'x.IncidenteID = ?', (incidente_id,), lambda *_: ''))
+
+
+def paquete_empresa(cursor, empresa_id):
+    """Paquete de una empresa: sus incidentes y su cumplimiento, o None si no existe"""
+    cursor.execute("SELECT EmpresaID FROM Empresas WHERE EmpresaID = ?", (empresa_id,))
+    if not cursor.fetchone():
+        return None
+
+    def prefijo(incidente_id, id_visible):
+        return f"incidentes/{_componente(id_visible, str(incidente_id))}/"
+
+    filas = list(_filas_incidentes(cursor, 'i.EmpresaID = ?', (empresa_id,), prefijo))
+    filas.extend(_filas_cumplimiento(cursor, empresa_id))
+    return _armar(f"evidencias_empresa_{empresa_id}.zip", filas)
+
+
+# ----------------------------------------------------------------------
+# Generación del ZIP
+# ----------------------------------------------------------------------
+
+class _DestinoSinSeek:
+    """Destino de zipfile sin tell/seek; lo escrito se retira por bloques"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, datos):
+        self.buffer += datos
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = bytes(self.buffer)
+        self.buffer.clear()
+        stats['bytes_generados'] += len(datos)
+        return datos
+
+
+def _fecha_zip(mtime_ns):
+    fecha = time.localtime(mtime_ns / 1e9 if mtime_ns else 0)[:6]
+    return max(fecha, (1980, 1, 1, 0, 0, 0))
+
+
+def _info_zip(entrada):
+    info = zipfile.ZipInfo(entrada.nombre_zip, date_time=_fecha_zip(entrada.estado.mtime_ns))
+    extension = os.path.splitext(entrada.ruta)[1].lstrip('.').lower()
+    info.compress_type = zipfile.ZIP_STORED if extension in EXTENSIONES_COMPRIMIDAS else zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    # Con el tamaño declarado zipfile elige ZIP64 para el archivo cuando hace falta
+    info.file_size = entrada.estado.tamano
+    return info
+
+
+def generar_zip(paquete):
+    """Bytes del ZIP en bloques de ~TAMANO_BLOQUE; determinista para una misma huella"""
+    destino = _DestinoSinSeek()
+    filas_manifiesto = []
+    with zipfile.ZipFile(destino, 'w', allowZip64=True) as zf:
+        for entrada in paquete.entradas:
+            if not entrada.estado.existe:
+                filas_manifiesto.append((entrada, None, None, 'no_encontrado'))
+                continue
+            try:
+                origen = open(entrada.ruta, 'rb')
+            except OSError as e:
+                logger.warning(f"No se pudo abrir {entrada.ruta}: {e}")
+                filas_manifiesto.append((entrada, None, None, 'ilegible'))
+                continue
+            sha256, tamano = hashlib.sha256(), 0
+            with origen, zf.open(_info_zip(entrada), 'w') as archivo_zip:
+                for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+                    archivo_zip.write(bloque)
+                    sha256.update(bloque)
+                    tamano += len(bloque)
+                    if len(destino.buffer) >= TAMANO_BLOQUE:
+                        yield destino.retirar()
+            filas_manifiesto.append((entrada, tamano, sha256.hexdigest(), 'incluido'))
+            if len(destino.buffer) >= TAMANO_BLOQUE:
+                yield destino.retirar()
+
+        texto = io.StringIO()
+        escritor = csv.writer(texto, lineterminator='\n')
+        escritor.writerow(['archivo', 'origen', 'referencia', 'nombre_original', 'tamano_bytes', 'sha256', 'estado'])
+        for entrada, tamano, sha256, estado in filas_manifiesto:
+            escritor.writerow([entrada.nombre_zip, entrada.origen, entrada.referencia, entrada.nombre_original,
+                               '' if tamano is None else tamano, sha256 or '', estado])
+        info = zipfile.ZipInfo(NOMBRE_MANIFIESTO, date_time=(1980, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        zf.writestr(info, texto.getvalue().encode('utf-8'))
+    yield destino.retirar()
+
+
+# ----------------------------------------------------------------------
+# Caché en disco por huella
+# ----------------------------------------------------------------------
+
+def cache_activa():
+    return CACHE_HORAS > 0
+
+
+def ruta_paquete(huella, parcial=False):
+    return os.path.join(DIRECTORIO_PAQUETES, f"{huella}.zip" + ('.parcial' if parcial else ''))
+
+
+def _bloqueo(huella):
+    os.makedirs(DIRECTORIO_TAREAS, exist_ok=True)
+    return BloqueoArchivo(f"paquete_evidencias_{huella}")
+
+
+def _con_copia(paquete):
+    """
+    Envía el ZIP y lo va escribiendo en <huella>.zip.parcial; al terminar lo
+    renombra a <huella>.zip. Si el cliente corta, el parcial queda para
+    completarlo en la reanudación.
+    """
+    os.makedirs(DIRECTORIO_PAQUETES, exist_ok=True)
+    with open(ruta_paquete(paquete.huella, parcial=True), 'wb') as copia:
+        for bloque in generar_zip(paquete):
+            copia.write(bloque)
+            yield bloque
+    os.replace(ruta_paquete(paquete.huella, parcial=True), ruta_paquete(paquete.huella))
+
+
+def completar_paquete(paquete):
+    """
+    Deja <huella>.zip completo en disco, continuando el parcial si lo hay:
+    se regenera el ZIP y solo se escribe desde el primer byte que falte o
+    difiera del parcial. Devuelve la ruta, o None si otro proceso lo está
+    generando.
+    """
+    final = ruta_paquete(paquete.huella)
+    bloqueo = _bloqueo(paquete.huella)
+    if not bloqueo.adquirir():
+        return None
+    try:
+        if os.path.exists(final):
+            return final
+        os.makedirs(DIRECTORIO_PAQUETES, exist_ok=True)
+        parcial = ruta_paquete(paquete.huella, parcial=True)
+        with open(parcial, 'ab+') as copia:
+            copia.seek(0)
+            posicion, coincide = 0, True
+            for bloque in generar_zip(paquete):
+                if coincide:
+                    existente = copia.read(len(bloque))
+                    if existente == bloque:
+                        posicion += len(bloque)
+                        continue
+                    comunes = next((i for i, (a, b) in enumerate(zip(existente, bloque)) if a != b),
+                                   len(existente))
+                    copia.truncate(posicion + comunes)
+                    bloque = bloque[comunes:]
+                    coincide = False
+                copia.write(bloque)
+            if coincide:
+                copia.truncate(posicion)
+        os.replace(parcial, final)
+        stats['paquetes_completados'] += 1
+        return final
+    finally:
+        bloqueo.liberar()
+
+
+def limpiar_paquetes(horas: Optional[float] = None):
+    """Borra los paquetes (completos y parciales) más antiguos que ``horas``"""
+    horas = CACHE_HORAS if horas is None else horas
+    limite = time.time() - horas * 3600
+    resumen = {'eliminados': 0, 'bytes_liberados': 0, 'en_uso': 0}
+    if not os.path.isdir(DIRECTORIO_PAQUETES):
+        return resumen
+    for nombre in os.listdir(DIRECTORIO_PAQUETES):
+        ruta = os.path.join(DIRECTORIO_PAQUETES, nombre)
+        estado = verificador_archivos.estado(ruta)
+        if not estado.existe or estado.mtime_ns / 1e9 >= limite:
+            continue
+        bloqueo = _bloqueo(nombre.split('.', 1)[0])
+        if not bloqueo.adquirir():
+            resumen['en_uso'] += 1
+            continue
+        try:
+            if verificador_archivos.eliminar_archivo(ruta) is None:
+                resumen['eliminados'] += 1
+                resumen['bytes_liberados'] += estado.tamano
+                verificador_archivos.eliminar_archivo(bloqueo.ruta)
+        finally:
+            bloqueo.liberar()
+    return resumen
+
+
+# ----------------------------------------------------------------------
+# Respuesta HTTP
+# ----------------------------------------------------------------------
+
+def respuesta_paquete(paquete):
+    """
+    200 con el ZIP en streaming, 304 si el cliente ya lo tiene, o el archivo
+    de la caché (Range/If-Range los resuelve send_file) para reanudar.
+    """
+    if paquete.huella in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{paquete.huella}"'})
+
+    final = ruta_paquete(paquete.huella)
+    if cache_activa():
+        reanudacion = request.range is not None and (
+            request.if_range.etag is None or request.if_range.etag == paquete.huella)
+        if not os.path.exists(final) and reanudacion:
+            final = completar_paquete(paquete) or final
+        if os.path.exists(final):
+            stats['paquetes_desde_cache'] += 1
+            return send_file(final, mimetype='application/zip', as_attachment=True,
+                             download_name=paquete.nombre_descarga, etag=paquete.huella,
+                             conditional=True, max_age=0)
+
+    stats['paquetes_generados'] += 1
+    bloqueo = _bloqueo(paquete.huella) if cache_activa() else None
+    if bloqueo is not None and bloqueo.adquirir():
+        cuerpo = _con_copia(paquete)
+    else:
+        # Sin caché, o con otro proceso escribiendo la copia de esta huella
+        bloqueo, cuerpo = None, generar_zip(paquete)
+
+    respuesta = Response(stream_with_context(cuerpo), mimetype='application/zip')
+    if bloqueo is not None:
+        # Al cerrar la respuesta, aunque el cuerpo no se haya recorrido (HEAD, corte)
+        respuesta.call_on_close(bloqueo.liberar)
+    respuesta.headers['Content-Disposition'] = f'attachment; filename="{paquete.nombre_descarga}"'
+    respuesta.headers['ETag'] = f'"{paquete.huella}"'
+    respuesta.headers['Accept-Ranges'] = 'bytes' if cache_activa() else 'none'
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+
+def _paquete_desde_bd(armar, identificador):
+    """Arma el paquete y cierra la conexión antes de empezar a enviar"""
+    conn = get_db_connection()
+    if not conn:
+        return None, (jsonify({"error": "Error de conexión a base de datos"}), 500)
+    try:
+        return armar(conn.cursor(), identificador), None
+    finally:
+        conn.close()
+
+
+@paquete_evidencias_bp.route('/incidentes/<int:incidente_id>/evidencias.zip', methods=['GET'])
+@token_required
+def descargar_evidencias_incidente(current_user_id, current_user_rol, current_user_email,
+                                   current_user_nombre, incidente_id):
+    """ZIP con las evidencias del incidente y manifest.csv"""
+    try:
+        paquete, error = _paquete_desde_bd(paquete_incidente, incidente_id)
+        if error:
+            return error
+        if paquete is None:
+            return jsonify({"error": "Incidente no encontrado"}), 404
+        logger.info(f"📦 Paquete de evidencias del incidente {incidente_id}: "
+                    f"{len(paquete.entradas)} archivos, huella {paquete.huella[:12]}")
+        return respuesta_paquete(paquete)
+    except Exception as e:
+        logger.error(f"Error generando paquete de evidencias del incidente {incidente_id}: {e}")
+        return jsonify({"error": f"Error al generar el paquete: {str(e)}"}), 500
+
+
+@paquete_evidencias_bp.route('/empresas/<int:empresa_id>/evidencias.zip', methods=['GET'])
+@token_required
+def descargar_evidencias_empresa(current_user_id, current_user_rol, current_user_email,
+                                 current_user_nombre, empresa_id):
+    """ZIP con las evidencias de los incidentes y del cumplimiento de la empresa"""
+    try:
+        paquete, error = _paquete_desde_bd(paquete_empresa, empresa_id)
+        if error:
+            return error
+        if paquete is None:
+            return jsonify({"error": "Empresa no encontrada"}), 404
+        logger.info(f"📦 Paquete de evidencias de la empresa {empresa_id}: "
+                    f"{len(paquete.entradas)} archivos, huella {paquete.huella[:12]}")
+        return respuesta_paquete(paquete)
+    except Exception as e:
+        logger.error(f"Error generando paquete de evidencias de la empresa {empresa_id}: {e}")
+        return jsonify({"error": f"Error al generar el paquete: {str(e)}"}), 500
@@ -0,0 +1,335 @@
+# modules/admin/resumen_inquilino.py
+# Resumen de dashboard de todas las empresas de un inquilino
+"""
+La pantalla de inquilino listaba las empresas y luego pedía, por cada una,
+/dashboard-stats, /informe-cumplimiento e /incidentes: 3×N requests (y
+conexiones) para un inquilino con N empresas.
+
+``resumen_empresas`` resuelve lo mismo para todas las empresas del inquilino
+con un puñado de consultas agrupadas por EmpresaID (cumplimiento, incidentes,
+evidencias, tipos frecuentes, próximos vencimientos e incidentes recientes),
+sin importar cuántas empresas tenga. El endpoint emite el JSON empresa por
+empresa, así un inquilino grande no arma la respuesta completa en memoria.
+
+Las métricas por empresa siguen las reglas de get_dashboard_stats
+(app/modules/admin/empresas.py): obligaciones base por tipo, ajuste
+proporcional, nivel de riesgo y tendencia a 30 días.
+"""
+
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from ..core.database import get_db_connection, db_validator
+from ..core.errors import robust_endpoint, ErrorResponse
+from .informe_cumplimiento import format_date_safe
+from .eliminacion_incidentes import filtro_no_eliminados
+
+logger = logging.getLogger(__name__)
+
+resumen_inquilino_bp = Blueprint('admin_resumen_inquilino', __name__, url_prefix='/api/admin/inquilinos')
+
+OBLIGACIONES_BASE = {'PSE': 14, 'OIV': 21}
+INCIDENTES_RECIENTES_DEFECTO = 10
+INCIDENTES_RECIENTES_MAX = 100
+
+EMPRESAS_INQUILINO = "SELECT EmpresaID FROM Empresas WHERE InquilinoID = ?"
+
+QUERY_EMPRESAS = """
+    SELECT EmpresaID, RazonSocial, TipoEmpresa
+    FROM Empresas
+    WHERE InquilinoID = ?
+    ORDER BY RazonSocial
+"""
+
+# {implementadas_pasado}: conteo a 30 días si existe FechaModificacion
+QUERY_CUMPLIMIENTO = f"""
+    SELECT EmpresaID,
+        SUM(CASE WHEN Estado = 'Implementado' THEN 1 ELSE 0 END) AS Implementadas,
+        SUM(CASE WHEN Estado = 'En Proceso' THEN 1 ELSE 0 END) AS EnProceso,
+        SUM(CASE WHEN Estado = 'Pendiente' THEN 1 ELSE 0 END) AS Pendientes,
+        SUM(CASE WHEN Estado = 'Vencido' THEN 1 ELSE 0 END) AS Vencidas,
+        SUM(CASE WHEN Estado = 'No Aplica' THEN 1 ELSE 0 END) AS NoAplica,
+        {{implementadas_pasado}} AS ImplementadasPasado
+    FROM CumplimientoEmpresa
+    WHERE EmpresaID IN ({EMPRESAS_INQUILINO})
+    GROUP BY EmpresaID
+"""
+
+# {vigentes}: excluye los incidentes eliminados pendientes de purga
+QUERY_INCIDENTES = f"""
+    SELECT EmpresaID,
+        COUNT(*) AS Total,
+        SUM(CASE WHEN EstadoActual = 'Abierto' THEN 1 ELSE 0 END) AS Activos,
+        SUM(CASE WHEN EstadoActual = 'Cerrado' THEN 1 ELSE 0 END) AS Cerrados,
+        SUM(CASE WHEN EstadoActual = 'Pendiente' THEN 1 ELSE 0 END) AS Pendientes,
+        SUM(CASE WHEN Criticidad = 'Alta' THEN 1 ELSE 0 END) AS CritAlta,
+        SUM(CASE WHEN Criticidad = 'Media' THEN 1 ELSE 0 END) AS CritMedia,
+        SUM(CASE WHEN Criticidad = 'Baja' THEN 1 ELSE 0 END) AS CritBaja
+    FROM Incidentes
+    WHERE EmpresaID IN ({EMPRESAS_INQUILINO}) AND {{vigentes}}
+    GROUP BY EmpresaID
+"""
+
+QUERY_EVIDENCIAS = f"""
+    SELECT ce.EmpresaID, COUNT(*)
+    FROM EvidenciasCumplimiento ec
+    JOIN CumplimientoEmpresa ce ON ce.CumplimientoID = ec.CumplimientoID
+    WHERE ce.EmpresaID IN ({EMPRESAS_INQUILINO})
+    GROUP BY ce.EmpresaID
+"""
+
+QUERY_TIPOS_FRECUENTES = f"""
+    SELECT EmpresaID, Tipo, Cantidad
+    FROM (
+        SELECT EmpresaID, ISNULL(TipoFlujo, 'No especificado') AS Tipo, COUNT(*) AS Cantidad,
+               ROW_NUMBER() OVER (PARTITION BY EmpresaID ORDER BY COUNT(*) DESC) AS Orden
+        FROM Incidentes
+        WHERE EmpresaID IN ({EMPRESAS_INQUILINO}) AND {{vigentes}}
+        GROUP BY EmpresaID, TipoFlujo
+    ) t
+    WHERE Orden <= 3
+    ORDER BY EmpresaID, Orden
+"""
+
+QUERY_VENCIMIENTOS = f"""
+    SELECT EmpresaID, DescripcionRecomendacion, FechaTermino, DiasRestantes
+    FROM (
+        SELECT C.EmpresaID, R.DescripcionRecomendacion, C.FechaTermino,
+               DATEDIFF(day, GETDATE(), C.FechaTermino) AS DiasRestantes,
+               ROW_NUMBER() OVER (PARTITION BY C.EmpresaID ORDER BY C.FechaTermino ASC) AS Orden
+        FROM CumplimientoEmpresa C
+        JOIN Recomendaciones R ON C.RecomendacionID = R.RecomendacionID
+        WHERE C.EmpresaID IN ({EMPRESAS_INQUILINO})
+          AND C.Estado IN ('Pendiente', 'En Proceso') AND C.FechaTermino IS NOT NULL
+    ) v
+    WHERE Orden <= 3
+    ORDER BY EmpresaID, Orden
+"""
+
+QUERY_INCIDENTES_RECIENTES = f"""
+    SELECT EmpresaID, IncidenteID, Titulo, EstadoActual, Criticidad, FechaCreacion
+    FROM (
+        SELECT EmpresaID, IncidenteID, Titulo, EstadoActual, Criticidad, FechaCreacion,
+               ROW_NUMBER() OVER (PARTITION BY EmpresaID ORDER BY FechaCreacion DESC, IncidenteID DESC) AS Orden
+        FROM Incidentes
+        WHERE EmpresaID IN ({EMPRESAS_INQUILINO}) AND {{vigentes}}
+    ) r
+    WHERE Orden <= ?
+    ORDER BY EmpresaID, Orden
+"""
+
+
+def _agrupado(cursor, descripcion, query, parametros, convertir):
+    """Ejecuta una consulta agrupada y retorna {EmpresaID: convertir(row)}.
+    Si la consulta falla (tabla opcional inexistente) retorna {} como el
+    dashboard por empresa, que usa valores por defecto."""
+    try:
+        cursor.execute(query, parametros)
+        return {row[0]: convertir(row) for row in cursor.fetchall()}
+    except Exception as e:
+        print(f"Error obteniendo {descripcion} del inquilino: {e}")
+        return {}
+
+
+def _listas(cursor, descripcion, query, parametros, convertir):
+    """Como _agrupado, pero varias filas por empresa: {EmpresaID: [convertir(row), ...]}"""
+    por_empresa = defaultdict(list)
+    try:
+        cursor.execute(query, parametros)
+        for row in cursor.fetchall():
+            por_empresa[row[0]].append(convertir(row))
+    except Exception as e:
+        print(f"Error obteniendo {descripcion} del inquilino: {e}")
+    return por_empresa
+
+
+def calcular_dashboard(empresa_id, tipo_empresa, cumplimiento, incidentes, implementadas_pasado=None,
+                       total_evidencias=0, tipos_frecuentes=(), proximas_fechas=()):
+    """
+    Estadísticas de dashboard de una empresa a partir de sus conteos, con las
+    reglas de get_dashboard_stats. ``cumplimiento`` e ``incidentes`` son dicts
+    de conteos (vacíos si la empresa no tiene filas).
+    """
+    total_obligaciones = OBLIGACIONES_BASE.get(tipo_empresa, OBLIGACIONES_BASE['PSE'])
+
+    implementadas = cumplimiento.get('implementadas', 0)
+    en_proceso = cumplimiento.get('en_proceso', 0)
+    pendientes = cumplimiento.get('pendientes', 0)
+    vencidas = cumplimiento.get('vencidas', 0)
+    no_aplica = cumplimiento.get('no_aplica', 0)
+
+    # Sin registros de cumplimiento todas las obligaciones están pendientes
+    if implementadas + en_proceso + pendientes + vencidas + no_aplica == 0:
+        pendientes = total_obligaciones
+
+    # Más registros que obligaciones base: ajustar proporcionalmente
+    total_registros = implementadas + en_proceso + pendientes + vencidas
+    if total_registros > total_obligaciones:
+        factor = total_obligaciones / total_registros
+        implementadas = int(implementadas * factor)
+        en_proceso = int(en_proceso * factor)
+        pendientes = int(pendientes * factor)
+        vencidas = int(vencidas * factor)
+        diferencia = total_obligaciones - (implementadas + en_proceso + pendientes + vencidas)
+        if diferencia > 0:
+            pendientes += diferencia
+
+    porcentaje_cumplimiento = round((implementadas / total_obligaciones) * 100) if total_obligaciones > 0 else 0
+
+    crit_alta = incidentes.get('criticidad_alta', 0)
+    crit_media = incidentes.get('criticidad_media', 0)
+    riesgo_nivel = 'bajo'
+    if porcentaje_cumplimiento < 50 or crit_alta > 0:
+        riesgo_nivel = 'alto'
+    elif porcentaje_cumplimiento < 80 or crit_media > 0:
+        riesgo_nivel = 'medio'
+
+    # Sin FechaModificacion el dashboard compara contra el valor actual
+    if implementadas_pasado is None:
+        implementadas_pasado = cumplimiento.get('implementadas', 0)
+    porcentaje_pasado = round((implementadas_pasado / total_obligaciones) * 100) if total_obligaciones > 0 else 0
+    tendencia = 'estable'
+    if porcentaje_cumplimiento > porcentaje_pasado:
+        tendencia = 'mejora'
+    elif porcentaje_cumplimiento < porcentaje_pasado:
+        tendencia = 'deterioro'
+
+    return {
+        'empresa_id': empresa_id,
+        'tipo_empresa': tipo_empresa,
+        'porcentaje_cumplimiento': porcentaje_cumplimiento,
+        'total_obligaciones': total_obligaciones,
+        'implementadas': implementadas,
+        'en_proceso': en_proceso,
+        'pendientes': pendientes,
+        'vencidas': vencidas,
+        'no_aplica': no_aplica,
+        'total_evidencias': total_evidencias,
+        'riesgo_nivel': riesgo_nivel,
+        'tendencia_cumplimiento': tendencia,
+        'incidentes': {
+            'total': incidentes.get('total', 0),
+            'activos': incidentes.get('activos', 0),
+            'cerrados': incidentes.get('cerrados', 0),
+            'pendientes': incidentes.get('pendientes', 0),
+            'criticidad_alta': crit_alta,
+            'criticidad_media': crit_media,
+            'criticidad_baja': incidentes.get('criticidad_baja', 0),
+            'tipos_frecuentes': list(tipos_frecuentes)
+        },
+        'proximas_fechas': list(proximas_fechas)
+    }
+
+
+def resumen_empresas(cursor, inquilino_id, incidentes_recientes=INCIDENTES_RECIENTES_DEFECTO):
+    """
+    Resumen de dashboard de cada empresa del inquilino, con consultas
+    agrupadas por EmpresaID (su número no depende de cuántas empresas haya).
+    Retorna un generador de dicts en orden de RazonSocial.
+    """
+    inicio = time.perf_counter()
+    parametros = (inquilino_id,)
+
+    cursor.execute(QUERY_EMPRESAS, parametros)
+    empresas = cursor.fetchall()
+    if not empresas:
+        return
+
+    tabla_cumplimiento = db_validator.get_table(cursor, 'CumplimientoEmpresa')
+    implementadas_pasado = (
+        "SUM(CASE WHEN Estado = 'Implementado' AND FechaModificacion < DATEADD(day, -30, GETDATE()) "
+        "THEN 1 ELSE 0 END)"
+        if tabla_cumplimiento is not None and 'FechaModificacion' in tabla_cumplimiento.conjunto
+        else "NULL"
+    )
+    vigentes = filtro_no_eliminados(cursor)
+
+    cumplimiento = _agrupado(
+        cursor, 'cumplimiento', QUERY_CUMPLIMIENTO.format(implementadas_pasado=implementadas_pasado), parametros,
+        lambda r: {'implementadas': r[1] or 0, 'en_proceso': r[2] or 0, 'pendientes': r[3] or 0,
+                   'vencidas': r[4] or 0, 'no_aplica': r[5] or 0, 'implementadas_pasado': r[6]}
+    )
+    incidentes = _agrupado(
+        cursor, 'incidentes', QUERY_INCIDENTES.format(vigentes=vigentes), parametros,
+        lambda r: {'total': r[1] or 0, 'activos': r[2] or 0, 'cerrados': r[3] or 0, 'pendientes': r[4] or 0,
+                   'criticidad_alta': r[5] or 0, 'criticidad_media': r[6] or 0, 'criticidad_baja': r[7] or 0}
+    )
+    evidencias = _agrupado(cursor, 'evidencias', QUERY_EVIDENCIAS, parametros, lambda r: r[1] or 0)
+    tipos = _listas(
+        cursor, 'tipos frecuentes', QUERY_TIPOS_FRECUENTES.format(vigentes=vigentes), parametros,
+        lambda r: {'tipo': r[1], 'cantidad': r[2]}
+    )
+    vencimientos = _listas(
+        cursor, 'vencimientos', QUERY_VENCIMIENTOS, parametros,
+        lambda r: {'ArticuloNorma': r[1], 'FechaTermino': format_date_safe(r[2], '%Y-%m-%d'), 'DiasRestantes': r[3]}
+    )
+    recientes = {}
+    if incidentes_recientes > 0:
+        recientes = _listas(
+            cursor, 'incidentes recientes', QUERY_INCIDENTES_RECIENTES.format(vigentes=vigentes),
+            (inquilino_id, incidentes_recientes),
+            lambda r: {'IncidenteID': r[1], 'Titulo': r[2], 'EstadoActual': r[3], 'Criticidad': r[4],
+                       'FechaCreacion': format_date_safe(r[5])}
+        )
+
+    logger.debug(f"Resumen inquilino {inquilino_id}: {len(empresas)} empresas en "
+                 f"{(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    for empresa_id, razon_social, tipo_empresa in empresas:
+        tipo_empresa = tipo_empresa or 'PSE'
+        conteos = cumplimiento.get(empresa_id, {})
+        resumen = calcular_dashboard(
+            empresa_id, tipo_empresa, conteos, incidentes.get(empresa_id, {}),
+            implementadas_pasado=conteos.get('implementadas_pasado'),
+            total_evidencias=evidencias.get(empresa_id, 0),
+            tipos_frecuentes=tipos.get(empresa_id, ()),
+            proximas_fechas=vencimientos.get(empresa_id, ())
+        )
+        resumen['razon_social'] = razon_social
+        if incidentes_recientes > 0:
+            resumen['incidentes_recientes'] = recientes.get(empresa_id, [])
+        yield resumen
+
+
+def _json_en_partes(inquilino_id, resumenes):
+    """Emite {"inquilino_id", "empresas": [...], "total_empresas", "timestamp"} empresa por empresa"""
+    yield f'{{"inquilino_id": {json.dumps(inquilino_id)}, "empresas": ['
+    total = 0
+    for resumen in resumenes:
+        yield (', ' if total else '') + json.dumps(resumen, ensure_ascii=False, default=str)
+        total += 1
+    yield f'], "total_empresas": {total}, "timestamp": {json.dumps(format_date_safe(datetime.now()))}}}'
+
+
+@resumen_inquilino_bp.route('/<int:inquilino_id>/resumen-empresas', methods=['GET'])
+@robust_endpoint(require_authentication=True, log_perf=True)
+def get_resumen_empresas(inquilino_id):
+    """Dashboard, cumplimiento e incidentes recientes de todas las empresas del inquilino"""
+    incidentes_recientes = request.args.get('incidentes', INCIDENTES_RECIENTES_DEFECTO, type=int)
+    incidentes_recientes = max(0, min(incidentes_recientes, INCIDENTES_RECIENTES_MAX))
+
+    conn = get_db_connection()
+    if not conn:
+        response, status = ErrorResponse.database_error()
+        return jsonify(response), status
+
+    cursor = conn.cursor()
+    if not db_validator.table_exists(cursor, 'Empresas'):
+        conn.close()
+        return jsonify({"error": "Sistema no disponible"}), 503
+
+    def generar():
+        # La conexión sigue abierta mientras se emite la respuesta
+        try:
+            yield from _json_en_partes(
+                inquilino_id, resumen_empresas(cursor, inquilino_id, incidentes_recientes)
+            )
+        finally:
+            conn.close()
+
+    return Response(stream_with_context(generar()), mimetype='application/json')
@@ -0,0 +1,180 @@
+# modules/admin/secuencia_incidentes.py
+# Correlativos de IDVisible por empresa
+"""
+El correlativo de IDVisible (CORRELATIVO_RUT_MODULO_SUBMODULO_DESCRIPCION)
+se calculaba con MAX sobre los incidentes en cada creación: un scan no
+sargable, y dos creaciones simultáneas podían leer el mismo MAX.
+
+La tabla EmpresaSecuenciaIncidentes (sql/secuencia_incidentes.sql) guarda el
+último correlativo por empresa y se incrementa con un UPDATE ... OUTPUT:
+una búsqueda por clave primaria, atómica, sin duplicados.
+
+La reserva usa su propia conexión y hace commit de inmediato, así el lock
+de la fila dura lo que el UPDATE y no lo que la transacción del incidente.
+Con INCIDENTES_BLOQUE_CORRELATIVOS > 1 cada proceso reserva un bloque y lo
+reparte en memoria (menos viajes a la BD), a cambio de huecos si el proceso
+termina sin agotarlo y de correlativos no ordenados entre workers.
+
+Sin el script aplicado se usa el cálculo anterior, MAX + 1 sobre los
+incidentes de la empresa, en la misma transacción que habría hecho la
+reserva (``correlativo_por_maximo``). La existencia de la tabla se
+verifica cada TTL_DISPONIBILIDAD segundos, así instalarla no requiere
+reiniciar. Los errores que no sean la tabla faltante (sin conexión, BD
+caída) se propagan: quien crea el incidente no inventa un correlativo.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from ...database import crear_conexion
+
+logger = logging.getLogger(__name__)
+
+TABLA_SECUENCIA = 'EmpresaSecuenciaIncidentes'
+TTL_DISPONIBILIDAD = 300
+
+QUERY_DISPONIBLE = f"SELECT CASE WHEN OBJECT_ID('{TABLA_SECUENCIA}', 'U') IS NULL THEN 0 ELSE 1 END"
+
+QUERY_RESERVAR = f"""
+    UPDATE {TABLA_SECUENCIA}
+    SET UltimoCorrelativo = UltimoCorrelativo + ?, FechaActualizacion = GETDATE()
+    OUTPUT inserted.UltimoCorrelativo
+    WHERE EmpresaID = ?
+"""
+
+# Primera reserva de una empresa sin fila: parte del mayor correlativo ya
+# usado. El UPDLOCK/HOLDLOCK serializa dos inicializaciones simultáneas.
+QUERY_INICIALIZAR = f"""
+    INSERT INTO {TABLA_SECUENCIA} (EmpresaID, UltimoCorrelativo)
+    SELECT ?, x.Maximo
+    FROM (
+        SELECT ISNULL(MAX(TRY_CAST(LEFT(IDVisible, CHARINDEX('_', IDVisible + '_') - 1) AS INT)), 0) AS Maximo
+        FROM Incidentes
+        WHERE EmpresaID = ?
+    ) x
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {TABLA_SECUENCIA} WITH (UPDLOCK, HOLDLOCK) WHERE EmpresaID = ?
+    )
+"""
+
+# Respaldo sin tabla de secuencia: el mismo mayor correlativo usado, más uno
+QUERY_MAX_CORRELATIVO = """
+    SELECT ISNULL(MAX(TRY_CAST(LEFT(IDVisible, CHARINDEX('_', IDVisible + '_') - 1) AS INT)), 0) + 1
+    FROM Incidentes
+    WHERE EmpresaID = ?
+"""
+
+
+def reservar_correlativos(cursor, empresa_id, cantidad=1):
+    """
+    Reserva ``cantidad`` correlativos consecutivos de la empresa.
+    Retorna (primero, ultimo). No hace commit.
+    """
+    cursor.execute(QUERY_RESERVAR, (cantidad, empresa_id))
+    fila = cursor.fetchone()
+    if fila is None:
+        cursor.execute(QUERY_INICIALIZAR, (empresa_id, empresa_id, empresa_id))
+        cursor.execute(QUERY_RESERVAR, (cantidad, empresa_id))
+        fila = cursor.fetchone()
+    ultimo = int(fila[0])
+    return ultimo - cantidad + 1, ultimo
+
+
+def correlativo_por_maximo(cursor, empresa_id):
+    """
+    Siguiente correlativo con MAX + 1 (sin sql/secuencia_incidentes.sql).
+    No reserva: dos creaciones simultáneas pueden obtener el mismo.
+    """
+    cursor.execute(QUERY_MAX_CORRELATIVO, (empresa_id,))
+    return int(cursor.fetchone()[0])
+
+
+class AsignadorCorrelativos:
+    """Reparte correlativos por empresa, reservándolos en bloques"""
+
+    def __init__(self, bloque=None, conectar=None):
+        if bloque is None:
+            bloque = os.environ.get('INCIDENTES_BLOQUE_CORRELATIVOS', 1)
+        self.bloque = max(1, int(bloque))
+        self._conectar = conectar or crear_conexion
+        self._bloques = {}   # {empresa_id: [siguiente, ultimo]}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._tabla = {'disponible': None, 'expira': 0.0}
+        self.stats = {'asignados': 0, 'reservas_bd': 0, 'respaldo_max': 0, 'errores': 0}
+
+    def _lock_empresa(self, empresa_id):
+        with self._locks_guard:
+            return self._locks.setdefault(empresa_id, threading.Lock())
+
+    def _tabla_disponible(self, cursor):
+        ahora = time.monotonic()
+        if self._tabla['disponible'] is None or ahora >= self._tabla['expira']:
+            cursor.execute(QUERY_DISPONIBLE)
+            disponible = bool(cursor.fetchone()[0])
+            if not disponible and self._tabla['disponible'] is not False:
+                logger.warning(f"Tabla {TABLA_SECUENCIA} no instalada (sql/secuencia_incidentes.sql); "
+                               f"correlativos con MAX + 1")
+            self._tabla.update(disponible=disponible, expira=ahora + TTL_DISPONIBILIDAD)
+        return self._tabla['disponible']
+
+    def _reservar_bloque(self, empresa_id):
+        conn = self._conectar()
+        if conn is None:
+            raise RuntimeError("Sin conexión a la BD para reservar correlativos")
+        try:
+            cursor = conn.cursor()
+            if self._tabla_disponible(cursor):
+                rango = reservar_correlativos(cursor, empresa_id, self.bloque)
+            else:
+                # Bloque de uno: la siguiente llamada vuelve a leer el MAX
+                correlativo = correlativo_por_maximo(cursor, empresa_id)
+                self.stats['respaldo_max'] += 1
+                rango = (correlativo, correlativo)
+            conn.commit()
+            return rango
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def siguiente(self, empresa_id):
+        """Siguiente correlativo de la empresa (único entre procesos)"""
+        if empresa_id is None:
+            raise ValueError("empresa_id es requerido para asignar un correlativo")
+        empresa_id = int(empresa_id)
+
+        # Lock por empresa: una reserva lenta no bloquea a las demás empresas
+        with self._lock_empresa(empresa_id):
+            rango = self._bloques.get(empresa_id)
+            if rango is None or rango[0] > rango[1]:
+                try:
+                    primero, ultimo = self._reservar_bloque(empresa_id)
+                except Exception as e:
+                    self.stats['errores'] += 1
+                    logger.error(f"Error reservando correlativos de la empresa {empresa_id}: {e}")
+                    raise
+                self.stats['reservas_bd'] += 1
+                rango = self._bloques[empresa_id] = [primero, ultimo]
+
+            correlativo = rango[0]
+            rango[0] += 1
+            self.stats['asignados'] += 1
+            return correlativo
+
+    def get_stats(self):
+        with self._locks_guard:
+            pendientes = sum(max(0, r[1] - r[0] + 1) for r in list(self._bloques.values()))
+        return {**self.stats, 'bloque': self.bloque, 'reservados_sin_usar': pendientes}
+
+
+# Instancia global
+asignador_correlativos = AsignadorCorrelativos()
+
+
+def siguiente_correlativo(empresa_id):
+    """Siguiente correlativo de IDVisible para la empresa"""
+    return asignador_correlativos.siguiente(empresa_id)
@@ -0,0 +1,209 @@
+# modules/estado_documental.py
+# Estado documental ANCI por empresa
+"""
+Motor de estado de DOCUMENTOS_ANCI para las vistas de gestión documental
+(app/views/gestion_documental_views.py).
+
+Una sola consulta agrupada por empresa entrega, por carpeta, los archivos,
+vencidos y por vencer; el documento más reciente de cada tipo (checklist) y
+el detalle de los vencidos y por vencer (alertas). Métricas, alertas,
+carpetas y checklist se derivan de ese resultado.
+
+El resultado se guarda por empresa junto a una huella de sus documentos
+activos (COUNT + CHECKSUM_AGG): mientras la huella no cambie y no pase
+ESTADO_DOCUMENTAL_TTL (los vencimientos dependen de la fecha actual), las
+vistas de la misma página no vuelven a recorrer DOCUMENTOS_ANCI.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+DIAS_POR_VENCER = 30
+TTL_ESTADO = int(os.environ.get('ESTADO_DOCUMENTAL_TTL', 300))
+
+# Cambia al subir, eliminar (Activo = 0) o editar un documento de la empresa
+QUERY_HUELLA_DOCUMENTOS = """
+    SELECT COUNT(*),
+           CHECKSUM_AGG(CHECKSUM(DocumentoID, CarpetaID, TipoDocumento,
+                                 NombreArchivo, FechaSubida, FechaVencimiento))
+    FROM DOCUMENTOS_ANCI
+    WHERE EmpresaID = ? AND Activo = 1
+"""
+
+# Totales por carpeta con funciones de ventana; solo vuelven las filas que
+# se usan: el más reciente de cada tipo y los vencidos o por vencer
+QUERY_ESTADO_DOCUMENTOS = f"""
+    WITH docs AS (
+        SELECT
+            DocumentoID, CarpetaID, TipoDocumento, NombreArchivo,
+            FechaSubida, FechaVencimiento,
+            CASE WHEN FechaVencimiento < GETDATE() THEN 1 ELSE 0 END AS Vencido,
+            CASE WHEN FechaVencimiento BETWEEN GETDATE() AND DATEADD(day, {DIAS_POR_VENCER}, GETDATE())
+                 THEN 1 ELSE 0 END AS PorVencer,
+            CASE WHEN FechaVencimiento IS NULL OR FechaVencimiento > DATEADD(day, {DIAS_POR_VENCER}, GETDATE())
+                 THEN 1 ELSE 0 END AS Vigente
+        FROM DOCUMENTOS_ANCI
+        WHERE EmpresaID = ? AND Activo = 1
+    ), agrupados AS (
+        SELECT
+            docs.*,
+            DATEDIFF(day, GETDATE(), FechaVencimiento) AS DiasRestantes,
+            ROW_NUMBER() OVER (PARTITION BY CarpetaID, TipoDocumento ORDER BY FechaSubida DESC) AS OrdenTipo,
+            ROW_NUMBER() OVER (PARTITION BY CarpetaID ORDER BY FechaSubida DESC) AS OrdenCarpeta,
+            COUNT(*) OVER (PARTITION BY CarpetaID) AS ArchivosCarpeta,
+            SUM(Vencido) OVER (PARTITION BY CarpetaID) AS VencidosCarpeta,
+            SUM(PorVencer) OVER (PARTITION BY CarpetaID) AS PorVencerCarpeta,
+            SUM(Vigente) OVER (PARTITION BY CarpetaID) AS VigentesCarpeta
+        FROM docs
+    )
+    SELECT
+        CarpetaID, TipoDocumento, DocumentoID, NombreArchivo, FechaSubida,
+        FechaVencimiento, Vencido, PorVencer, DiasRestantes, OrdenTipo, OrdenCarpeta,
+        ArchivosCarpeta, VencidosCarpeta, PorVencerCarpeta, VigentesCarpeta
+    FROM agrupados
+    WHERE OrdenTipo = 1 OR OrdenCarpeta = 1 OR Vencido = 1 OR PorVencer = 1
+"""
+
+_cache = {}   # {empresa_id: (huella, calculado_en, estado)}
+_cache_lock = threading.Lock()
+
+
+def _calcular_estado(cursor, empresa_id):
+    cursor.execute(QUERY_ESTADO_DOCUMENTOS, empresa_id)
+
+    carpetas = {}
+    ultimos_por_tipo = {}
+    vencidos = []
+    por_vencer = []
+
+    for row in cursor.fetchall():
+        if row.OrdenCarpeta == 1:
+            carpetas[row.CarpetaID] = {
+                'archivos': row.ArchivosCarpeta,
+                'vencidos': row.VencidosCarpeta or 0,
+                'por_vencer': row.PorVencerCarpeta or 0,
+                'vigentes': row.VigentesCarpeta or 0,
+            }
+        if row.OrdenTipo == 1 and row.TipoDocumento is not None:
+            ultimos_por_tipo[(row.CarpetaID, row.TipoDocumento)] = {
+                'id': row.DocumentoID,
+                'nombre': row.NombreArchivo,
+                'fecha': row.FechaSubida,
+            }
+        documento = {
+            'id': row.DocumentoID,
+            'nombre': row.NombreArchivo,
+            'carpeta_id': row.CarpetaID,
+            'fecha_vencimiento': row.FechaVencimiento,
+            'dias_restantes': row.DiasRestantes,
+        }
+        if row.Vencido:
+            vencidos.append(documento)
+        elif row.PorVencer:
+            por_vencer.append(documento)
+
+    return {
+        'empresa_id': empresa_id,
+        'carpetas': carpetas,
+        'ultimos_por_tipo': ultimos_por_tipo,
+        'vencidos': vencidos,
+        'por_vencer': por_vencer,
+        'total_documentos': sum(c['archivos'] for c in carpetas.values()),
+        'calculado': datetime.now().isoformat(),
+    }
+
+
+def obtener_estado_documental(cursor, empresa_id):
+    """
+    Estado documental de la empresa (no modificar: se comparte desde el cache).
+
+    Claves: carpetas {carpeta_id: archivos/vencidos/por_vencer/vigentes},
+    ultimos_por_tipo {(carpeta_id, tipo): documento}, vencidos, por_vencer,
+    total_documentos.
+    """
+    cursor.execute(QUERY_HUELLA_DOCUMENTOS, empresa_id)
+    huella = tuple(cursor.fetchone())
+
+    with _cache_lock:
+        guardado = _cache.get(empresa_id)
+    if guardado and guardado[0] == huella and time.time() - guardado[1] < TTL_ESTADO:
+        return guardado[2]
+
+    estado = _calcular_estado(cursor, empresa_id)
+    with _cache_lock:
+        _cache[empresa_id] = (huella, time.time(), estado)
+    return estado
+
+
+def invalidar_estado_documental(empresa_id=None):
+    """Descarta el estado guardado de una empresa (o de todas)"""
+    with _cache_lock:
+        if empresa_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(empresa_id, None)
+
+
+def calcular_metricas(estado, estructura_carpetas):
+    """Métricas de cumplimiento documental a partir del estado"""
+    carpetas = estado['carpetas']
+    requeridas = [c['id'] for c in estructura_carpetas if c['requerido']]
+    requeridas_con_docs = sum(1 for carpeta_id in requeridas if carpetas.get(carpeta_id, {}).get('archivos'))
+
+    return {
+        'cumplimientoGlobal': int(requeridas_con_docs / len(requeridas) * 100) if requeridas else 0,
+        'alertasCriticas': len(estado['vencidos']),
+        'proximosVencimientos': len(estado['por_vencer']),
+        'documentosActualizados': sum(c['vigentes'] for c in carpetas.values()),
+        'totalDocumentos': estado['total_documentos'],
+        'carpetasConDocumentos': len(carpetas),
+        'carpetasRequeridas': len(requeridas)
+    }
+
+
+def construir_alertas(estado, estructura_carpetas, limite=20):
+    """Alertas de vencidos, por vencer y carpetas requeridas vacías, por severidad"""
+    ahora = datetime.now().isoformat()
+    nombres = {c['id']: c['nombre'] for c in estructura_carpetas}
+    alertas = []
+
+    for doc in estado['vencidos']:
+        if doc['carpeta_id'] not in nombres:
+            continue
+        alertas.append({
+            'id': f"vencido_{doc['id']}",
+            'tipo': 'critica',
+            'titulo': 'Documento Vencido',
+            'mensaje': f"El documento '{doc['nombre']}' en {nombres[doc['carpeta_id']]} "
+                       f"venció el {doc['fecha_vencimiento'].strftime('%d/%m/%Y')}",
+            'fecha': doc['fecha_vencimiento'].isoformat(),
+            'carpeta_id': doc['carpeta_id']
+        })
+
+    for doc in estado['por_vencer']:
+        alertas.append({
+            'id': f"por_vencer_{doc['id']}",
+            'tipo': 'alta' if doc['dias_restantes'] <= 7 else 'media',
+            'titulo': 'Documento Por Vencer',
+            'mensaje': f"El documento '{doc['nombre']}' vence en {doc['dias_restantes']} días",
+            'fecha': ahora,
+            'carpeta_id': doc['carpeta_id']
+        })
+
+    for carpeta in estructura_carpetas:
+        if carpeta['requerido'] and not estado['carpetas'].get(carpeta['id']):
+            alertas.append({
+                'id': f"carpeta_vacia_{carpeta['id']}",
+                'tipo': 'media',
+                'titulo': 'Carpeta Requerida Vacía',
+                'mensaje': f"La carpeta '{carpeta['nombre']}' es obligatoria y no contiene documentos",
+                'fecha': ahora,
+                'carpeta_id': carpeta['id']
+            })
+
+    # Ordenar alertas por tipo (crítica > alta > media)
+    orden_tipo = {'critica': 0, 'alta': 1, 'media': 2, 'baja': 3}
+    alertas.sort(key=lambda x: orden_tipo.get(x['tipo'], 99))
+    return alertas[:limite]
@@ -20,7 +20,9 @@ from .gestor_evidencias import GestorEvidencias
 
 # Importar utilidades del sistema
 from ...database import get_db_connection
+from ..admin.eliminacion_incidentes import filtro_no_eliminados
 from ...auth_utils import verificar_token
+from ..admin.secuencia_incidentes import siguiente_correlativo
 
 # Crear Blueprint principal
 incidentes_unificado_bp = Blueprint('incidentes_unificado', __name__, 
@@ -404,6 +406,8 @@ class IncidentesManager:
         conn = None
         try:
             conn = get_db_connection()
+            if not conn:
+                raise RuntimeError("Sin conexión a la BD para generar el índice único")
             cursor = conn.cursor()
             
             # Obtener RUT de empresa
@@ -414,14 +418,8 @@ class IncidentesManager:
             rut_result = cursor.fetchone()
             rut = rut_result[0].replace('-', '').replace('.', '') if rut_result else "00000000"
             
-            # Obtener correlativo
-            cursor.execute("""
-                SELECT ISNULL(MAX(CAST(LEFT(IDVisible, CHARINDEX('_', IDVisible) - 1) AS INT)), 0) + 1
-                FROM Incidentes
-                WHERE EmpresaID = ?
-            """, (empresa_id,))
-            
-            correlativo = cursor.fetchone()[0]
+            # Obtener correlativo (secuencia por empresa, sin MAX sobre Incidentes)
+            correlativo = siguiente_correlativo(empresa_id)
             
             # Generar descripción desde título
             descripcion = titulo[:30].upper().replace(' ', '_')
@@ -433,9 +431,9 @@ class IncidentesManager:
             return indice
             
         except Exception as e:
-            # Fallback con timestamp
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            return f"1_{timestamp}_1_1_INCIDENTE"
+            # Igual que CreadorIncidentes: sin correlativo no se crea el incidente
+            print(f"Error generando índice único: {str(e)}")
+            raise
         finally:
             if conn:
                 conn.close()
@@ -498,11 +496,11 @@ class IncidentesManager:
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT IncidenteID, IDVisible, Titulo, Descripcion,
                        EmpresaID, FormatoSemillaJSON, EstadoActual
                 FROM Incidentes
-                WHERE IDVisible = ?
+                WHERE IDVisible = ? AND {filtro_no_eliminados(cursor)}
             """, (indice_unico,))
             
             row = cursor.fetchone()
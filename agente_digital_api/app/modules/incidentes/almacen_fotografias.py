@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Almacén versionado de fotografías de incidentes
+
+Por incidente y tipo ("actual", "editando", "manual") se guarda:
+
+    fotografias_incidentes/<incidente_id>/<tipo>/
+        indice.json          versiones (hash, fecha, tamaño, base) y puntero a la última
+        base_000001.json.gz  fotografía completa comprimida (base de una cadena)
+        deltas.jsonl         un JSON-patch compacto por versión, solo se agrega al final
+        ultima.json.gz       última versión materializada (lectura O(1))
+
+- El contenido se guarda sin ``metadata.fecha_fotografia`` (va en el índice),
+  así esa fecha no genera deltas ni impide la deduplicación.
+- Una fotografía idéntica (mismo hash de contenido) a la última no crea
+  versión; idéntica a una anterior se guarda como referencia a esa versión.
+- Cada MAX_DELTAS versiones, después de una referencia, o cuando los patches
+  acumulados pesan más que la base, se escribe una base nueva; así
+  reconstruir cualquier versión aplica a lo más MAX_DELTAS patches.
+- Los patches usan las operaciones add/remove/replace de RFC 6902.
+- El índice es el punto de confirmación. Guarda el tamaño confirmado de
+  deltas.jsonl (``tamano_deltas``); lo escrito después de ese tamaño es de
+  una caída entre el append y el índice. Se ignora al leer y se trunca en el
+  próximo append, porque ese número de versión se reutiliza. ultima.json.gz
+  solo se usa si su hash coincide con la última versión del índice.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo bloqueo dentro del proceso
+    fcntl = None
+
+MAX_DELTAS = 25
+NIVEL_COMPRESION = 6
+GZIP_WBITS = 31  # zlib con cabecera gzip: los .gz se pueden abrir con zcat
+MAX_CACHE_ULTIMAS = 64
+
+ARCHIVO_INDICE = 'indice.json'
+ARCHIVO_DELTAS = 'deltas.jsonl'
+ARCHIVO_ULTIMA = 'ultima.json.gz'
+ARCHIVO_BLOQUEO = '.lock'
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+# Última versión decodificada por carpeta: {carpeta: (version, contenido)}.
+# Evita descomprimir y parsear la última al calcular el siguiente delta.
+_cache_ultimas = OrderedDict()
+_cache_guard = threading.Lock()
+
+
+# ============================================================================
+# JSON-PATCH (RFC 6902: add / remove / replace)
+# ============================================================================
+
+def _escapar(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _desescapar(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def generar_patch(origen, destino, ruta=''):
+    """Lista de operaciones que transforman ``origen`` en ``destino``."""
+    if origen == destino:
+        return []
+
+    if isinstance(origen, dict) and isinstance(destino, dict):
+        ops = []
+        for clave in origen:
+            if clave not in destino:
+                ops.append({'op': 'remove', 'path': f"{ruta}/{_escapar(clave)}"})
+        for clave, valor in destino.items():
+            sub = f"{ruta}/{_escapar(clave)}"
+            if clave not in origen:
+                ops.append({'op': 'add', 'path': sub, 'value': valor})
+            elif origen[clave] != valor:
+                ops.extend(generar_patch(origen[clave], valor, sub))
+        return ops
+
+    if isinstance(origen, list) and isinstance(destino, list):
+        # Recortar prefijo y sufijo comunes: una fila agregada o eliminada en
+        # medio de la lista es una sola operación
+        inicio = 0
+        limite = min(len(origen), len(destino))
+        while inicio < limite and origen[inicio] == destino[inicio]:
+            inicio += 1
+        fin_o, fin_d = len(origen), len(destino)
+        while fin_o > inicio and fin_d > inicio and origen[fin_o - 1] == destino[fin_d - 1]:
+            fin_o -= 1
+            fin_d -= 1
+
+        ops = []
+        comunes = min(fin_o, fin_d) - inicio
+        for i in range(inicio, inicio + comunes):
+            ops.extend(generar_patch(origen[i], destino[i], f"{ruta}/{i}"))
+        for i in range(inicio + comunes, fin_d):
+            ops.append({'op': 'add', 'path': f"{ruta}/{i}", 'value': destino[i]})
+        for _ in range(inicio + comunes, fin_o):
+            ops.append({'op': 'remove', 'path': f"{ruta}/{inicio + comunes}"})
+        return ops
+
+    return [{'op': 'replace', 'path': ruta, 'value': destino}]
+
+
+def aplicar_patch(documento, ops):
+    """Aplica las operaciones sobre ``documento`` (lo modifica) y lo retorna."""
+    for op in ops:
+        ruta = op['path']
+        if ruta == '':
+            documento = op.get('value')
+            continue
+        tokens = [_desescapar(t) for t in ruta.split('/')[1:]]
+        padre = documento
+        for token in tokens[:-1]:
+            padre = padre[int(token)] if isinstance(padre, list) else padre[token]
+        ultimo = tokens[-1]
+
+        if isinstance(padre, list):
+            indice = len(padre) if ultimo == '-' else int(ultimo)
+            if op['op'] == 'add':
+                padre.insert(indice, op['value'])
+            elif op['op'] == 'remove':
+                del padre[indice]
+            else:
+                padre[indice] = op['value']
+        else:
+            if op['op'] == 'remove':
+                del padre[ultimo]
+            else:
+                padre[ultimo] = op['value']
+    return documento
+
+
+# ============================================================================
+# ALMACÉN
+# ============================================================================
+
+def separar_fecha(fotografia):
+    """Retorna (fotografía sin metadata.fecha_fotografia, fecha o None)."""
+    metadata = fotografia.get('metadata')
+    if not isinstance(metadata, dict) or 'fecha_fotografia' not in metadata:
+        return fotografia, None
+    sin_fecha = dict(fotografia)
+    sin_fecha['metadata'] = {k: v for k, v in metadata.items() if k != 'fecha_fotografia'}
+    return sin_fecha, metadata['fecha_fotografia']
+
+
+def _restaurar_fecha(contenido, fecha):
+    if fecha is not None and isinstance(contenido.get('metadata'), dict):
+        contenido['metadata']['fecha_fotografia'] = fecha
+    return contenido
+
+
+def _compacto(valor):
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _comprimir(datos, nivel=NIVEL_COMPRESION):
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, GZIP_WBITS)
+    return compresor.compress(datos) + compresor.flush()
+
+
+def _leer_comprimido(ruta):
+    with open(ruta, 'rb') as f:
+        return json.loads(zlib.decompress(f.read(), GZIP_WBITS))
+
+
+def _escribir_atomico(ruta, datos):
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def _cache_obtener(carpeta, version):
+    with _cache_guard:
+        valor = _cache_ultimas.get(carpeta)
+        if valor is not None and valor[0] == version:
+            _cache_ultimas.move_to_end(carpeta)
+            return valor[1]
+    return None
+
+
+def _cache_guardar(carpeta, version, contenido):
+    with _cache_guard:
+        _cache_ultimas[carpeta] = (version, contenido)
+        _cache_ultimas.move_to_end(carpeta)
+        while len(_cache_ultimas) > MAX_CACHE_ULTIMAS:
+            _cache_ultimas.popitem(last=False)
+
+
+class AlmacenFotografias:
+    """Fotografías versionadas con base comprimida + deltas JSON-patch"""
+
+    def __init__(self, ruta_base, max_deltas=MAX_DELTAS):
+        self.ruta_base = ruta_base
+        self.max_deltas = max_deltas
+
+    def carpeta(self, incidente_id, tipo):
+        return os.path.join(self.ruta_base, str(incidente_id), tipo)
+
+    # ------------------------------------------------------------------
+    # Bloqueo e índice
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _bloqueo(self, carpeta):
+        with _locks_guard:
+            lock = _locks.setdefault(carpeta, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(carpeta, ARCHIVO_BLOQUEO), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _leer_indice(self, carpeta):
+        ruta = os.path.join(carpeta, ARCHIVO_INDICE)
+        if not os.path.exists(ruta):
+            return {'versiones': [], 'ultima': None, 'ultima_activa': False,
+                    'deltas_desde_base': 0, 'bytes_desde_base': 0, 'tamano_deltas': 0}
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _guardar_indice(self, carpeta, indice):
+        _escribir_atomico(os.path.join(carpeta, ARCHIVO_INDICE), _compacto(indice))
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def guardar(self, incidente_id, tipo, fotografia):
+        """Guarda una versión. Retorna dict con version, hash, nueva y bytes escritos."""
+        carpeta = self.carpeta(incidente_id, tipo)
+        os.makedirs(carpeta, exist_ok=True)
+
+        # Una sola serialización: sirve para el hash, la base y la última
+        sin_fecha, fecha_fotografia = separar_fecha(fotografia)
+        datos = _compacto(sin_fecha)
+        huella = hashlib.sha256(datos).hexdigest()
+
+        with self._bloqueo(carpeta):
+            indice = self._leer_indice(carpeta)
+            versiones = indice['versiones']
+            ultima = versiones[-1] if versiones else None
+
+            # Sin cambios respecto de la última: no se crea versión
+            if ultima is not None and ultima['hash'] == huella:
+                indice['ultima_activa'] = True
+                self._guardar_indice(carpeta, indice)
+                return {'version': ultima['version'], 'hash': huella, 'nueva': False, 'bytes': 0,
+                        'ruta': self.ruta_version(incidente_id, tipo, ultima['version'])}
+
+            numero = ultima['version'] + 1 if ultima else 1
+            entrada = {'version': numero, 'hash': huella, 'fecha': datetime.now().isoformat(),
+                       'fecha_fotografia': fecha_fotografia}
+            anterior = next((v for v in versiones if v['hash'] == huella), None)
+            contenido = json.loads(datos)
+
+            if anterior is not None:
+                # Mismo contenido que una versión anterior: referencia. La
+                # cadena de deltas se corta, la próxima versión nueva es base
+                entrada.update(tipo='ref', ref=anterior['version'], bytes=0)
+                indice['deltas_desde_base'] = self.max_deltas
+            else:
+                patch = None
+                if ultima is not None and indice['deltas_desde_base'] < self.max_deltas:
+                    previo = self._contenido_ultima(carpeta, indice)
+                    patch = _compacto({'v': numero, 'ops': generar_patch(previo, contenido)}) + b'\n'
+                    if indice['bytes_desde_base'] + len(patch) > indice.get('bytes_base', 0):
+                        patch = None  # Cadena más pesada que una base nueva
+
+                if patch is None:
+                    comprimido = _comprimir(datos)
+                    _escribir_atomico(os.path.join(carpeta, f"base_{numero:06d}.json.gz"), comprimido)
+                    entrada.update(tipo='base', bytes=len(comprimido))
+                    indice['deltas_desde_base'] = 0
+                    indice['bytes_desde_base'] = 0
+                    indice['bytes_base'] = len(comprimido)
+                else:
+                    indice['tamano_deltas'] = self._agregar_delta(carpeta, indice, patch)
+                    entrada.update(tipo='delta', bytes=len(patch))
+                    indice['deltas_desde_base'] += 1
+                    indice['bytes_desde_base'] += len(patch)
+
+            entrada['base'] = (numero if entrada['tipo'] == 'base'
+                               else versiones[-1]['base'] if versiones else numero)
+            versiones.append(entrada)
+
+            _escribir_atomico(os.path.join(carpeta, ARCHIVO_ULTIMA), _comprimir(datos, 1))
+            indice['ultima'] = numero
+            indice['ultima_activa'] = True
+            self._guardar_indice(carpeta, indice)
+            _cache_guardar(carpeta, numero, contenido)
+
+        return {'version': numero, 'hash': huella, 'nueva': True, 'bytes': entrada['bytes'],
+                'ruta': self.ruta_version(incidente_id, tipo, numero)}
+
+    def _agregar_delta(self, carpeta, indice, patch):
+        """Agrega el patch tras el tamaño confirmado en el índice. Retorna el nuevo tamaño."""
+        ruta = os.path.join(carpeta, ARCHIVO_DELTAS)
+        confirmado = indice.get('tamano_deltas')  # None: índice anterior a este campo
+        with open(ruta, 'ab') as f:
+            if confirmado is not None and os.path.getsize(ruta) > confirmado:
+                f.truncate(confirmado)  # Delta huérfano de una caída antes del índice
+            f.write(patch)
+        return os.path.getsize(ruta)
+
+    def descartar_ultima(self, incidente_id, tipo):
+        """Marca que no hay versión vigente (se conserva el historial)."""
+        carpeta = self.carpeta(incidente_id, tipo)
+        if not os.path.exists(os.path.join(carpeta, ARCHIVO_INDICE)):
+            return
+        with self._bloqueo(carpeta):
+            indice = self._leer_indice(carpeta)
+            indice['ultima_activa'] = False
+            self._guardar_indice(carpeta, indice)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def ruta_version(self, incidente_id, tipo, version):
+        return os.path.join(self.carpeta(incidente_id, tipo), f"v{version}")
+
+    def _leer_ultima(self, carpeta, indice):
+        """ultima.json.gz si es la última versión del índice; si no, se reconstruye."""
+        ruta = os.path.join(carpeta, ARCHIVO_ULTIMA)
+        if os.path.exists(ruta):
+            with open(ruta, 'rb') as f:
+                datos = zlib.decompress(f.read(), GZIP_WBITS)
+            # Otro hash: se escribió antes de una caída que no alcanzó a guardar el índice
+            if hashlib.sha256(datos).hexdigest() == indice['versiones'][-1]['hash']:
+                return json.loads(datos)
+        return self._reconstruir(carpeta, indice, indice['ultima'])
+
+    def _contenido_ultima(self, carpeta, indice):
+        """Contenido (sin fecha) de la última versión. No modificar: puede venir del cache."""
+        contenido = _cache_obtener(carpeta, indice['ultima'])
+        if contenido is not None:
+            return contenido
+        contenido = self._leer_ultima(carpeta, indice)
+        _cache_guardar(carpeta, indice['ultima'], contenido)
+        return contenido
+
+    def cargar_ultima(self, incidente_id, tipo):
+        """Última versión vigente, o None."""
+        carpeta = self.carpeta(incidente_id, tipo)
+        if not os.path.exists(os.path.join(carpeta, ARCHIVO_INDICE)):
+            return None
+        indice = self._leer_indice(carpeta)
+        if not indice['versiones'] or not indice.get('ultima_activa'):
+            return None
+        # Copia fresca desde disco: quien la recibe puede modificarla
+        contenido = self._leer_ultima(carpeta, indice)
+        return _restaurar_fecha(contenido, indice['versiones'][-1].get('fecha_fotografia'))
+
+    def cargar_version(self, incidente_id, tipo, version):
+        """Reconstruye una versión cualquiera: base más cercana + sus patches."""
+        carpeta = self.carpeta(incidente_id, tipo)
+        indice = self._leer_indice(carpeta)
+        contenido = self._reconstruir(carpeta, indice, version)
+        if contenido is None:
+            return None
+        entrada = next(v for v in indice['versiones'] if v['version'] == version)
+        return _restaurar_fecha(contenido, entrada.get('fecha_fotografia'))
+
+    def _reconstruir(self, carpeta, indice, version):
+        por_numero = {v['version']: v for v in indice['versiones']}
+        entrada = por_numero.get(version)
+        if entrada is None:
+            return None
+        while entrada['tipo'] == 'ref':
+            entrada = por_numero[entrada['ref']]
+        version = entrada['version']
+
+        base = entrada['base']
+        documento = _leer_comprimido(os.path.join(carpeta, f"base_{base:06d}.json.gz"))
+        if version == base:
+            return documento
+
+        # Solo se decodifican las líneas de la cadena pedida, hasta el tamaño
+        # confirmado. Sin ese tamaño (índices anteriores) un número repetido
+        # por una caída se resuelve con la última línea, la que entró al índice
+        limite = indice.get('tamano_deltas')
+        lineas = {}
+        leidos = 0
+        with open(os.path.join(carpeta, ARCHIVO_DELTAS), 'rb') as f:
+            for linea in f:
+                leidos += len(linea)
+                if limite is not None and leidos > limite:
+                    break
+                prefijo = linea[:24]
+                numero = int(prefijo[prefijo.index(b':') + 1:prefijo.index(b',')])
+                if numero <= base:
+                    continue
+                if numero > version:
+                    break
+                lineas[numero] = linea
+        for numero in sorted(lineas):
+            documento = aplicar_patch(documento, json.loads(lineas[numero])['ops'])
+        return documento
+
+    def historial(self, incidente_id, tipo):
+        """Versiones guardadas de un tipo, de la más reciente a la más antigua."""
+        carpeta = self.carpeta(incidente_id, tipo)
+        if not os.path.exists(os.path.join(carpeta, ARCHIVO_INDICE)):
+            return []
+        indice = self._leer_indice(carpeta)
+        return list(reversed(indice['versiones']))
+
+    def tipos(self, incidente_id):
+        carpeta = os.path.join(self.ruta_base, str(incidente_id))
+        if not os.path.isdir(carpeta):
+            return []
+        return [nombre for nombre in os.listdir(carpeta)
+                if os.path.exists(os.path.join(carpeta, nombre, ARCHIVO_INDICE))]
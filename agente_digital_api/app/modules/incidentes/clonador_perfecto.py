@@ -7,11 +7,12 @@ Con corrección automática de encoding UTF-8
 
 import os
 import json
-import shutil
 from datetime import datetime
 from pathlib import Path
 from ...database import get_db_connection
+from ..admin.eliminacion_incidentes import filtro_no_eliminados
 from ...utils.encoding_fixer import EncodingFixer
+from .almacen_fotografias import AlmacenFotografias
 
 class IncidenteClonadorPerfecto:
     """
@@ -25,6 +26,8 @@ class IncidenteClonadorPerfecto:
             'fotografias_incidentes'
         )
         os.makedirs(self.ruta_fotografias, exist_ok=True)
+        # Versiones: base comprimida + deltas JSON-patch (ver almacen_fotografias.py)
+        self.almacen = AlmacenFotografias(self.ruta_fotografias)
     
     def crear_fotografia_completa(self, incidente_id):
         """
@@ -41,7 +44,10 @@ class IncidenteClonadorPerfecto:
             cursor = conn.cursor()
             
             # 1. Datos principales del incidente
-            cursor.execute("SELECT * FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+            cursor.execute(
+                f"SELECT * FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+                (incidente_id,)
+            )
             columnas = [desc[0] for desc in cursor.description]
             fila = cursor.fetchone()
             
@@ -147,32 +153,31 @@ class IncidenteClonadorPerfecto:
     
     def guardar_fotografia(self, incidente_id, indice_unico, fotografia, tipo="actual"):
         """
-        Guarda la fotografía en archivo JSON
+        Guarda la fotografía como nueva versión en el almacén.
+        Si el contenido no cambió respecto de la última, no crea versión.
         """
-        # Crear carpeta para el incidente
-        carpeta_incidente = os.path.join(self.ruta_fotografias, str(incidente_id))
-        os.makedirs(carpeta_incidente, exist_ok=True)
-        
-        # Nombre del archivo con timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        nombre_archivo = f"fotografia_{tipo}_{timestamp}.json"
-        ruta_completa = os.path.join(carpeta_incidente, nombre_archivo)
+        resultado = self.almacen.guardar(incidente_id, tipo, fotografia)
         
-        # Guardar JSON con formato legible
-        with open(ruta_completa, 'w', encoding='utf-8') as f:
-            json.dump(fotografia, f, ensure_ascii=False, indent=2, default=str)
-        
-        # También guardar como "ultima" para acceso rápido
-        ruta_ultima = os.path.join(carpeta_incidente, f"fotografia_{tipo}_ultima.json")
-        shutil.copy2(ruta_completa, ruta_ultima)
-        
-        print(f"💾 Fotografía guardada en: {ruta_completa}")
-        return ruta_completa
+        if resultado['nueva']:
+            print(f"💾 Fotografía {tipo} v{resultado['version']} guardada ({resultado['bytes']} bytes)")
+        else:
+            print(f"💾 Fotografía {tipo} sin cambios, se mantiene v{resultado['version']}")
+        return resultado['ruta']
     
     def cargar_fotografia_ultima(self, incidente_id, tipo="actual"):
         """
         Carga la última fotografía guardada
         """
+        try:
+            fotografia = self.almacen.cargar_ultima(incidente_id, tipo)
+            if fotografia is not None:
+                print(f"📂 Fotografía {tipo} cargada desde el almacén")
+                return fotografia
+        except Exception as e:
+            print(f"❌ Error cargando fotografía: {e}")
+            return None
+        
+        # Fotografías guardadas con el formato anterior (un JSON completo por versión)
         carpeta_incidente = os.path.join(self.ruta_fotografias, str(incidente_id))
         ruta_ultima = os.path.join(carpeta_incidente, f"fotografia_{tipo}_ultima.json")
         
@@ -191,6 +196,12 @@ class IncidenteClonadorPerfecto:
             print(f"❌ Error cargando fotografía: {e}")
             return None
     
+    def cargar_fotografia_version(self, incidente_id, version, tipo="actual"):
+        """
+        Reconstruye una versión específica de la fotografía
+        """
+        return self.almacen.cargar_version(incidente_id, tipo, version)
+    
     def clonar_para_editar(self, incidente_id):
         """
         Crea un clon perfecto para edición
@@ -217,7 +228,8 @@ class IncidenteClonadorPerfecto:
         # 3. Guardar como nueva versión "actual"
         self.guardar_fotografia(incidente_id, None, nueva_fotografia, "actual")
         
-        # 4. Limpiar archivo de edición
+        # 4. Limpiar archivo de edición (el historial se conserva)
+        self.almacen.descartar_ultima(incidente_id, "editando")
         carpeta_incidente = os.path.join(self.ruta_fotografias, str(incidente_id))
         archivo_editando = os.path.join(carpeta_incidente, "fotografia_editando_ultima.json")
         if os.path.exists(archivo_editando):
@@ -235,6 +247,21 @@ class IncidenteClonadorPerfecto:
             return []
         
         archivos = []
+        # Versiones del almacén (leídas del índice, sin abrir las fotografías)
+        for tipo in self.almacen.tipos(incidente_id):
+            for entrada in self.almacen.historial(incidente_id, tipo):
+                archivos.append({
+                    'archivo': f"fotografia_{tipo}_v{entrada['version']}",
+                    'fecha': datetime.fromisoformat(entrada['fecha']),
+                    'tamaño': entrada['bytes'],
+                    'ruta': self.almacen.ruta_version(incidente_id, tipo, entrada['version']),
+                    'tipo': tipo,
+                    'version': entrada['version'],
+                    'almacenamiento': entrada['tipo'],
+                    'hash': entrada['hash']
+                })
+        
+        # Fotografías en el formato anterior
         for archivo in os.listdir(carpeta_incidente):
             if archivo.endswith('.json') and not archivo.endswith('_ultima.json'):
                 ruta_completa = os.path.join(carpeta_incidente, archivo)
@@ -15,6 +15,7 @@ from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
 from ..core.database import get_db_connection
+from ..admin.eliminacion_incidentes import filtro_no_eliminados
 
 class GeneradorInformesANCIv2:
     """
@@ -103,7 +104,7 @@ class GeneradorInformesANCIv2:
     def _cargar_datos_completos(self, incidente_id: int) -> Dict:
         """Carga todos los datos necesarios del incidente"""
         # Datos del incidente
-        query_incidente = """
+        query_incidente = f"""
             SELECT 
                 i.*,
                 e.RazonSocial, e.RUT, e.TipoEmpresa, e.SectorEsencial,
@@ -112,7 +113,7 @@ class GeneradorInformesANCIv2:
             FROM Incidentes i
             INNER JOIN Empresa e ON i.EmpresaID = e.EmpresaID
             LEFT JOIN Usuario u ON u.UsuarioID = 1
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(self.cursor, 'i')}
         """
         self.cursor.execute(query_incidente, incidente_id)
         incidente = self._dict_from_row(self.cursor.fetchone())
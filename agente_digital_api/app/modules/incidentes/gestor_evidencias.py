@@ -7,12 +7,13 @@ Integrado con el sistema de diagnóstico para verificación de integridad
 
 import os
 import shutil
-import hashlib
 import mimetypes
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from werkzeug.utils import secure_filename
 from ...database import get_db_connection
+from ...verificador_archivos import verificador_archivos
+from ..admin import manifiesto_archivos
 
 class GestorEvidencias:
     """
@@ -160,6 +161,18 @@ class GestorEvidencias:
             cursor.execute("SELECT SCOPE_IDENTITY()")
             evidencia_id = cursor.fetchone()[0]
             
+            # Registrar en el manifiesto con la sección del formulario ("2.5" -> "2")
+            seccion_formulario = next(
+                (seccion for seccion, carpeta in self.SECCION_CARPETA.items()
+                 if carpeta == archivo_info["seccion"]),
+                archivo_info["seccion"]
+            )
+            manifiesto_archivos.registrar_si_disponible(
+                cursor, incidente_id, archivo_info["ruta"], seccion=seccion_formulario,
+                descripcion=descripcion, tipo=archivo_info.get("extension", "").lstrip(".") or None,
+                subido_por=archivo_info.get("subido_por"), nombre=archivo_info.get("nombre_original")
+            )
+            
             conn.commit()
             
             return {
@@ -215,9 +228,13 @@ class GestorEvidencias:
             query += " ORDER BY Seccion, FechaSubida"
             
             cursor.execute(query, params)
+            filas = cursor.fetchall()
             evidencias = []
             
-            for row in cursor.fetchall():
+            # Existencia de todos los archivos en un lote
+            existentes = verificador_archivos.existen(row[2] for row in filas)
+            
+            for row in filas:
                 evidencia = {
                     "id": row[0],
                     "nombre": row[1],
@@ -231,7 +248,7 @@ class GestorEvidencias:
                     "tamano_kb": row[9],
                     "tipo_mime": row[10],
                     "estado": row[11],
-                    "existe_archivo": os.path.exists(row[2]) if row[2] else False
+                    "existe_archivo": existentes.get(row[2], False) if row[2] else False
                 }
                 evidencias.append(evidencia)
             
@@ -403,19 +420,13 @@ class GestorEvidencias:
             
             # Escanear archivos en disco
             carpeta_incidente = os.path.join(self.RUTA_EVIDENCIAS, indice_unico)
-            archivos_disco = []
-            
-            if os.path.exists(carpeta_incidente):
-                for root, dirs, files in os.walk(carpeta_incidente):
-                    for archivo in files:
-                        ruta_completa = os.path.join(root, archivo)
-                        archivos_disco.append(ruta_completa)
+            archivos_disco = verificador_archivos.listar_carpeta(carpeta_incidente)
             
             reporte["archivos_disco"] = len(archivos_disco)
             
-            # Verificar archivos faltantes en disco
+            # Verificar archivos faltantes en disco (existencia ya verificada en lote)
             for ruta, evidencia in rutas_bd.items():
-                if not os.path.exists(ruta):
+                if not evidencia["existe_archivo"]:
                     reporte["faltantes_disco"].append({
                         "id": evidencia["id"],
                         "nombre": evidencia["nombre"],
@@ -446,15 +457,25 @@ class GestorEvidencias:
             True si el hash coincide
         """
         try:
-            if not os.path.exists(ruta_archivo):
-                return False
-            
-            hash_actual = self._calcular_hash_archivo(ruta_archivo)
-            return hash_actual == hash_esperado
+            # El hash se recalcula solo si el archivo cambió desde la última vez
+            hash_actual = verificador_archivos.hash_archivo(ruta_archivo, 'md5')
+            return hash_actual is not None and hash_actual == hash_esperado
             
         except Exception:
             return False
     
+    def verificar_integridad_archivos(self, esperados: Dict[str, str]) -> Dict[str, bool]:
+        """
+        Verifica en lote la integridad de varios archivos
+        
+        Args:
+            esperados: {ruta: hash MD5 esperado}
+            
+        Returns:
+            {ruta: True si el hash coincide}
+        """
+        return verificador_archivos.verificar_integridad(esperados, 'md5')
+    
     def limpiar_archivos_temporales(self, dias_antiguedad: int = 7) -> Dict:
         """
         Limpia archivos temporales antiguos
@@ -522,12 +543,8 @@ class GestorEvidencias:
         return {"valido": True}
     
     def _calcular_hash_archivo(self, ruta_archivo: str) -> str:
-        """Calcula el hash MD5 de un archivo"""
-        hash_md5 = hashlib.md5()
-        with open(ruta_archivo, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        """Calcula el hash MD5 de un archivo (queda memorizado para verificaciones)"""
+        return verificador_archivos.hash_archivo(ruta_archivo, 'md5')
     
     def exportar_lista_evidencias(self, incidente_id: int) -> Dict:
         """
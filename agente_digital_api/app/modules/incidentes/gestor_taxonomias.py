@@ -11,6 +11,91 @@ import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from ...database import get_db_connection
+from ..admin import manifiesto_archivos
+
+# Columnas admitidas para el usuario que asigna (los módulos usan una u otra)
+COLUMNAS_USUARIO_TAXONOMIA = ("AsignadoPor", "CreadoPor")
+
+# SQL Server admite 2100 parámetros por sentencia y 1000 filas por VALUES
+FILAS_POR_INSERT = 400
+IDS_POR_DELETE = 1000
+
+
+def sincronizar_taxonomias(cursor, incidente_id: int, deseadas: Dict,
+                           usuario=None, columna_usuario: str = "AsignadoPor") -> Dict:
+    """
+    Deja INCIDENTE_TAXONOMIA del incidente igual a ``deseadas``
+    
+    Calcula en memoria qué agregar, eliminar y actualizar a partir de una sola
+    lectura, y aplica cada conjunto con sentencias por lote sobre el cursor
+    recibido. No hace commit: el llamador controla la transacción.
+    
+    Args:
+        cursor: Cursor de la conexión donde se aplican los cambios
+        incidente_id: ID del incidente
+        deseadas: {taxonomia_id: comentarios} que deben quedar asignadas
+        usuario: Valor para la columna de usuario en las filas nuevas
+        columna_usuario: "AsignadoPor" o "CreadoPor"
+        
+    Returns:
+        Contadores agregadas, eliminadas, actualizadas y sin_cambios
+    """
+    if columna_usuario not in COLUMNAS_USUARIO_TAXONOMIA:
+        raise ValueError(f"Columna de usuario no válida: {columna_usuario}")
+    
+    cursor.execute("""
+        SELECT Id_Taxonomia, Comentarios FROM INCIDENTE_TAXONOMIA
+        WHERE IncidenteID = ?
+    """, (incidente_id,))
+    actuales = {}
+    for row in cursor.fetchall():
+        actuales.setdefault(row[0], row[1])
+    
+    # Los IDs pueden venir como texto desde el JSON: comparar normalizados
+    actuales_por_clave = {str(k): k for k in actuales}
+    deseadas_por_clave = {str(k): (k, v) for k, v in deseadas.items()}
+    
+    a_agregar = [deseadas_por_clave[c] for c in deseadas_por_clave if c not in actuales_por_clave]
+    a_eliminar = [actuales_por_clave[c] for c in actuales_por_clave if c not in deseadas_por_clave]
+    a_actualizar = [
+        (deseadas_por_clave[c][1], incidente_id, actuales_por_clave[c])
+        for c in deseadas_por_clave
+        if c in actuales_por_clave
+        and (deseadas_por_clave[c][1] or "") != (actuales[actuales_por_clave[c]] or "")
+    ]
+    
+    for inicio in range(0, len(a_eliminar), IDS_POR_DELETE):
+        lote = a_eliminar[inicio:inicio + IDS_POR_DELETE]
+        cursor.execute(f"""
+            DELETE FROM INCIDENTE_TAXONOMIA
+            WHERE IncidenteID = ? AND Id_Taxonomia IN ({", ".join("?" * len(lote))})
+        """, (incidente_id, *lote))
+    
+    for inicio in range(0, len(a_agregar), FILAS_POR_INSERT):
+        lote = a_agregar[inicio:inicio + FILAS_POR_INSERT]
+        parametros = []
+        for taxonomia_id, comentarios in lote:
+            parametros.extend((incidente_id, taxonomia_id, comentarios, usuario))
+        cursor.execute(f"""
+            INSERT INTO INCIDENTE_TAXONOMIA (
+                IncidenteID, Id_Taxonomia, Comentarios,
+                FechaAsignacion, {columna_usuario}
+            ) VALUES {", ".join(["(?, ?, ?, GETDATE(), ?)"] * len(lote))}
+        """, parametros)
+    
+    if a_actualizar:
+        cursor.executemany("""
+            UPDATE INCIDENTE_TAXONOMIA SET Comentarios = ?
+            WHERE IncidenteID = ? AND Id_Taxonomia = ?
+        """, a_actualizar)
+    
+    return {
+        "agregadas": len(a_agregar),
+        "eliminadas": len(a_eliminar),
+        "actualizadas": len(a_actualizar),
+        "sin_cambios": len(deseadas_por_clave) - len(a_agregar) - len(a_actualizar)
+    }
+
 
 class GestorTaxonomias:
     """
@@ -182,6 +267,12 @@ class GestorTaxonomias:
                     cursor.execute("SELECT SCOPE_IDENTITY()")
                     evidencia_id = cursor.fetchone()[0]
                     
+                    manifiesto_archivos.registrar_si_disponible(
+                        cursor, incidente_id, archivo.get("ruta"), taxonomia_id=taxonomia_uuid,
+                        descripcion=archivo.get("descripcion", ""), subido_por=archivo.get("subido_por"),
+                        nombre=archivo.get("nombre")
+                    )
+                    
                     resultados["procesados"].append({
                         "evidencia_id": evidencia_id,
                         "archivo": archivo["nombre"],
@@ -301,65 +392,37 @@ class GestorTaxonomias:
             "sincronizadas": 0,
             "agregadas": 0,
             "eliminadas": 0,
+            "actualizadas": 0,
             "errores": []
         }
         
+        # Taxonomías activas del JSON: {taxonomia_id: comentarios}
+        taxonomias_json = estructura_json.get("4", {}).get("taxonomias", {}).get("seleccionadas", [])
+        deseadas = {
+            t["taxonomia_id"]: t.get("datos", {}).get("comentarios", "")
+            for t in taxonomias_json if t.get("estado") == "activo"
+        }
+        
+        # Diferencias calculadas en memoria y aplicadas en una transacción
+        conn = None
         try:
-            # Obtener taxonomías de BD
-            taxonomias_bd = self.obtener_taxonomias_incidente(incidente_id)
-            taxonomias_bd_ids = {t["taxonomia_id"] for t in taxonomias_bd}
-            
-            # Obtener taxonomías de JSON
-            taxonomias_json = estructura_json.get("4", {}).get("taxonomias", {}).get("seleccionadas", [])
-            taxonomias_json_activas = [
-                t for t in taxonomias_json if t.get("estado") == "activo"
-            ]
-            taxonomias_json_ids = {t["taxonomia_id"] for t in taxonomias_json_activas}
-            
-            # Identificar diferencias
-            a_agregar = taxonomias_json_ids - taxonomias_bd_ids
-            a_eliminar = taxonomias_bd_ids - taxonomias_json_ids
-            
-            # Agregar nuevas
-            for tax_json in taxonomias_json_activas:
-                if tax_json["taxonomia_id"] in a_agregar:
-                    res = self.asignar_taxonomia_incidente(
-                        incidente_id,
-                        tax_json["taxonomia_id"],
-                        tax_json.get("datos", {}).get("comentarios", "")
-                    )
-                    if res["exito"]:
-                        resultado["agregadas"] += 1
-                    else:
-                        resultado["errores"].append(res["mensaje"])
-            
-            # Eliminar obsoletas
-            conn = None
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                
-                for tax_id in a_eliminar:
-                    cursor.execute("""
-                        DELETE FROM INCIDENTE_TAXONOMIA 
-                        WHERE IncidenteID = ? AND Id_Taxonomia = ?
-                    """, (incidente_id, tax_id))
-                    resultado["eliminadas"] += 1
-                
-                conn.commit()
-                
-            except Exception as e:
-                if conn:
-                    conn.rollback()
-                resultado["errores"].append(f"Error eliminando: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cambios = sincronizar_taxonomias(cursor, incidente_id, deseadas)
+            conn.commit()
             
-            resultado["sincronizadas"] = len(taxonomias_json_ids & taxonomias_bd_ids)
+            resultado["agregadas"] = cambios["agregadas"]
+            resultado["eliminadas"] = cambios["eliminadas"]
+            resultado["actualizadas"] = cambios["actualizadas"]
+            resultado["sincronizadas"] = len(deseadas) - cambios["agregadas"]
             
         except Exception as e:
-            resultado["errores"].append(f"Error general: {str(e)}")
+            if conn:
+                conn.rollback()
+            resultado["errores"].append(f"Error sincronizando taxonomías: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
         
         return resultado
     
@@ -12,6 +12,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from ..core.database import get_db_connection
+from ..admin.eliminacion_incidentes import filtro_no_eliminados
+from ..admin import manifiesto_archivos
 
 @dataclass
 class SeccionConfig:
@@ -311,10 +313,13 @@ class SistemaDinamicoIncidentes:
                 raise ValueError(f"El archivo excede el límite de {max_size}MB")
             
             # Obtener empresa ID para la ruta
-            cursor.execute("""
-                SELECT EmpresaID, IDVisible FROM Incidentes WHERE IncidenteID = ?
+            cursor.execute(f"""
+                SELECT EmpresaID, IDVisible FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
             """, (incidente_id,))
-            empresa_id, id_visible = cursor.fetchone()
+            fila = cursor.fetchone()
+            if not fila:
+                raise ValueError("Incidente no encontrado")
+            empresa_id, id_visible = fila
             
             # Crear estructura de carpetas
             ruta_empresa = os.path.join(self.base_path, f"empresa_{empresa_id}")
@@ -360,6 +365,11 @@ class SistemaDinamicoIncidentes:
                 archivo_info.get('descripcion', ''),
                 usuario
             ))
+            manifiesto_archivos.registrar_si_disponible(
+                cursor, incidente_id, ruta_completa, seccion=str(seccion_id),
+                descripcion=archivo_info.get('descripcion', ''), subido_por=usuario,
+                nombre=archivo_info['nombre_original']
+            )
             
             # Auditoría
             self._registrar_auditoria(cursor, incidente_id, seccion_id, 'SUBIR_ARCHIVO', {
@@ -398,11 +408,11 @@ class SistemaDinamicoIncidentes:
             cursor = conn.cursor()
             
             # Datos básicos del incidente
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT i.*, e.Tipo_Empresa 
                 FROM Incidentes i
                 INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-                WHERE i.IncidenteID = ?
+                WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
             """, (incidente_id,))
             
             incidente = cursor.fetchone()
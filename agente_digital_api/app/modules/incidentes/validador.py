@@ -11,6 +11,8 @@ from typing import Dict, List, Tuple, Optional
 import os
 import sys
 
+from ...verificador_archivos import verificador_archivos
+
 # Agregar ruta para importar módulo de diagnóstico
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -443,9 +445,10 @@ class ValidadorIncidentes:
                                 "ruta": evidencia["archivo"]
                             })
         
-        # Verificar existencia
+        # Verificar existencia (stat en paralelo)
+        existentes = verificador_archivos.existen(a["ruta"] for a in archivos_verificar)
         for archivo in archivos_verificar:
-            if not os.path.exists(archivo["ruta"]):
+            if not existentes.get(archivo["ruta"], False):
                 errores.append(
                     f"Archivo no encontrado: {archivo['numero']} - {archivo['ruta']}"
                 )
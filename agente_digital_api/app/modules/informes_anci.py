@@ -11,6 +11,7 @@ from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from app.database import get_db_connection
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from config import Config
 UPLOAD_FOLDER = Config.UPLOAD_FOLDER
 
@@ -135,7 +136,7 @@ class InformesANCI:
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            query = """
+            query = f"""
             SELECT 
                 i.IncidenteID,
                 i.IDVisible,
@@ -157,7 +158,7 @@ class InformesANCI:
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.ID
             INNER JOIN Inquilinos inq ON e.InquilinoID = inq.ID
-            WHERE i.IncidenteID = ? AND i.Activo = 1
+            WHERE i.IncidenteID = ? AND i.Activo = 1 AND {filtro_no_eliminados(cursor, 'i')}
             """
             
             cursor.execute(query, (incidente_id,))
@@ -13,6 +13,7 @@ from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 from ..database import get_db_connection
+from .admin.eliminacion_incidentes import filtro_no_eliminados
 import os
 import traceback
 
@@ -91,7 +92,7 @@ class GeneradorInformeANCICompleto:
     
     def _obtener_datos_completos(self, reporte_id):
         """Obtiene todos los datos del reporte ANCI incluyendo campos faltantes"""
-        query = """
+        query = f"""
         SELECT 
             r.*,
             i.IncidenteID,
@@ -115,7 +116,7 @@ class GeneradorInformeANCICompleto:
         FROM ReportesANCI r
         LEFT JOIN Incidentes i ON r.IncidenteID = i.IncidenteID
         LEFT JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-        WHERE r.ReporteAnciID = ?
+        WHERE r.ReporteAnciID = ? AND {filtro_no_eliminados(self.cursor, 'i')}
         """
         
         self.cursor.execute(query, (reporte_id,))
@@ -6,9 +6,9 @@ Endpoints para generación de informes ANCI completos
 
 from flask import Blueprint, jsonify, send_file, request
 from flask_cors import cross_origin
-from .informes_anci_completo import generar_informe_anci_completo
 from ..database import get_db_connection
 from ..auth_utils import token_required
+from .admin.eliminacion_incidentes import filtro_no_eliminados
 import os
 import traceback
 
@@ -27,7 +27,7 @@ def exportar_informe_completo(current_user_id, current_user_rol, current_user_em
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 r.ReporteAnciID,
                 r.IncidenteID,
@@ -37,7 +37,7 @@ def exportar_informe_completo(current_user_id, current_user_rol, current_user_em
             FROM ReportesANCI r
             INNER JOIN Incidentes i ON r.IncidenteID = i.IncidenteID
             INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE r.ReporteAnciID = ?
+            WHERE r.ReporteAnciID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (reporte_id,))
         
         reporte = cursor.fetchone()
@@ -45,7 +45,8 @@ def exportar_informe_completo(current_user_id, current_user_rol, current_user_em
         if not reporte:
             return jsonify({"error": "Reporte ANCI no encontrado"}), 404
         
-        # Generar el informe
+        # Generar el informe (python-docx se importa solo al generar)
+        from .informes_anci_completo import generar_informe_anci_completo
         filepath = generar_informe_anci_completo(reporte_id)
         
         if not os.path.exists(filepath):
@@ -129,7 +130,8 @@ def generar_desde_incidente(current_user_id, current_user_rol, current_user_emai
         
         conn.close()
         
-        # Generar el informe
+        # Generar el informe (python-docx se importa solo al generar)
+        from .informes_anci_completo import generar_informe_anci_completo
         filepath = generar_informe_anci_completo(reporte_id)
         
         if not os.path.exists(filepath):
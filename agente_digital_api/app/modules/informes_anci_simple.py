@@ -8,6 +8,7 @@ import json
 import logging
 from datetime import datetime
 from app.database import get_db_connection
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from config import Config
 import textwrap
 
@@ -86,7 +87,7 @@ class InformesANCI:
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            query = """
+            query = f"""
             SELECT 
                 i.IncidenteID,
                 i.IDVisible,
@@ -108,7 +109,7 @@ class InformesANCI:
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
             INNER JOIN Inquilinos inq ON e.InquilinoID = inq.InquilinoID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
             """
             
             cursor.execute(query, (incidente_id,))
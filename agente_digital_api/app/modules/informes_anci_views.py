@@ -10,6 +10,8 @@ from flask import Blueprint, jsonify, request, send_file, make_response
 from flask_cors import cross_origin
 import logging
 from app.database import get_db_connection
+from app.json_rapido import mapeador_filas
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from config import Config
 UPLOAD_FOLDER = Config.UPLOAD_FOLDER
 from app.modules.informes_anci_simple import InformesANCI
@@ -61,11 +63,11 @@ def obtener_historial_informes(incidente_id):
         """
         
         cursor.execute(query, (incidente_id,))
-        columns = [column[0] for column in cursor.description]
+        mapear = mapeador_filas(cursor)
         informes = []
         
         for row in cursor.fetchall():
-            informe = dict(zip(columns, row))
+            informe = mapear(row)
             
             # Convertir fechas
             if informe['FechaGeneracion']:
@@ -160,7 +162,7 @@ def descargar_informe_anci(informe_id):
         cursor = conn.cursor()
         
         # Obtener información del informe
-        query = """
+        query = f"""
         SELECT 
             ia.RutaArchivo,
             ia.TipoInforme,
@@ -168,7 +170,7 @@ def descargar_informe_anci(informe_id):
             ia.FechaGeneracion
         FROM INFORMES_ANCI ia
         INNER JOIN Incidentes i ON ia.IncidenteID = i.IncidenteID
-        WHERE ia.InformeID = ? AND ia.Activo = 1
+        WHERE ia.InformeID = ? AND ia.Activo = 1 AND {filtro_no_eliminados(cursor, 'i')}
         """
         
         cursor.execute(query, (informe_id,))
@@ -236,7 +238,7 @@ def obtener_cuenta_regresiva():
         # Query para obtener incidentes
         if tabla_existe:
             # Query completa con verificación de informes existentes
-            query = """
+            query = f"""
             SELECT 
                 i.IncidenteID,
                 i.IDVisible,
@@ -261,11 +263,11 @@ def obtener_cuenta_regresiva():
                  AND Activo = 1) as TieneFinal
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.ID
-            WHERE i.Activo = 1
+            WHERE i.Activo = 1 AND {filtro_no_eliminados(cursor, 'i')}
             """
         else:
             # Query simplificada sin verificación de informes
-            query = """
+            query = f"""
             SELECT 
                 i.IncidenteID,
                 i.IDVisible,
@@ -278,7 +280,7 @@ def obtener_cuenta_regresiva():
                 0 as TieneFinal
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.ID
-            WHERE i.Activo = 1
+            WHERE i.Activo = 1 AND {filtro_no_eliminados(cursor, 'i')}
             """
         
         params = []
@@ -291,13 +293,13 @@ def obtener_cuenta_regresiva():
         query += " ORDER BY i.FechaDeteccion DESC"
         
         cursor.execute(query, params)
-        columns = [column[0] for column in cursor.description]
+        mapear = mapeador_filas(cursor)
         incidentes = []
         
         ahora = datetime.now()
         
         for row in cursor.fetchall():
-            incidente = dict(zip(columns, row))
+            incidente = mapear(row)
             
             # Convertir fecha
             fecha_deteccion = incidente['FechaDeteccion']
@@ -6,6 +6,7 @@ Sistema completo para gestión, validación y políticas de contraseñas
 
 from flask import Blueprint, jsonify, request
 from .database import get_db_connection
+from .contrasenas_comprometidas import es_comprometida
 from werkzeug.security import generate_password_hash, check_password_hash
 import secrets
 import hashlib
@@ -589,15 +590,15 @@ def verificar_expiracion():
 
 def es_contraseña_comprometida(password):
     """
-    Verificar si una contraseña está en listas de contraseñas comprometidas
-    (Para implementación futura con APIs como HaveIBeenPwned)
+    Verificar si una contraseña está en listas de contraseñas comprometidas:
+    las más comunes y el índice local de contraseñas filtradas
+    (app/contrasenas_comprometidas.py)
     """
-    # TODO: Implementar verificación contra bases de datos de contraseñas comprometidas
     common_passwords = [
         "123456", "password", "123456789", "12345678", "12345",
         "1234567", "1234567890", "qwerty", "abc123", "111111"
     ]
-    return password.lower() in common_passwords
+    return password.lower() in common_passwords or es_comprometida(password)
 
 def generar_consejo_seguridad():
     """Genera un consejo aleatorio de seguridad de contraseñas"""
@@ -7,11 +7,17 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
-import requests
+from functools import lru_cache
 import os
 
+from .contrasenas_comprometidas import obtener_indice
+
 logger = logging.getLogger(__name__)
 
+# Consulta k-anónima a HaveIBeenPwned cuando no hay índice local (solo viajan
+# 5 caracteres del SHA-1). PWNED_PASSWORDS_API=false la apaga en entornos sin salida.
+PWNED_API_HABILITADA = os.environ.get('PWNED_PASSWORDS_API', 'true').lower() == 'true'
+
 @dataclass
 class PasswordPolicy:
     """Configuración de política de contraseñas"""
@@ -31,6 +37,40 @@ class PasswordPolicy:
     account_lockout_attempts: int = 5
     account_lockout_duration: int = 30  # minutos
 
+@lru_cache(maxsize=1)
+def _cargar_contrasenas_comunes() -> frozenset:
+    """Cargar lista de contraseñas comunes (una vez por proceso)"""
+    common_passwords = {
+        # Top contraseñas más comunes
+        "123456", "password", "123456789", "12345678", "12345",
+        "1234567", "1234567890", "qwerty", "abc123", "million2",
+        "000000", "1234", "iloveyou", "aaron431", "password1",
+        "qqww1122", "123", "omgpop", "123321", "654321",
+        "qwertyuiop", "qwer1234", "123abc", "a123456", "1q2w3e4r",
+        "admin", "administrator", "root", "user", "guest",
+        "demo", "test", "123qwe", "1qaz2wsx", "welcome",
+        "monkey", "dragon", "letmein", "baseball", "trustno1",
+        "hello", "freedom", "whatever", "qazwsx", "ninja",
+        # Contraseñas en español
+        "contraseña", "clave123", "acceso", "seguridad", "admin123",
+        "usuario", "sistema", "empresa", "chile123", "santiago",
+        "password123", "clave", "pass123", "administrador"
+    }
+
+    # Intentar cargar archivo de contraseñas comunes si existe
+    common_passwords_file = os.path.join(os.path.dirname(__file__), 'common_passwords.txt')
+    if os.path.exists(common_passwords_file):
+        try:
+            with open(common_passwords_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    password = line.strip().lower()
+                    if password:
+                        common_passwords.add(password)
+        except Exception as e:
+            logger.warning(f"Could not load common passwords file: {e}")
+
+    return frozenset(common_passwords)
+
 class PasswordValidator:
     """Validador de contraseñas con políticas de seguridad"""
     
@@ -39,38 +79,9 @@ class PasswordValidator:
         self.common_passwords = self._load_common_passwords()
         self.special_chars = "!@#$%^&*(),.?\":{}|<>[]\\/-_=+"
     
-    def _load_common_passwords(self) -> set:
-        """Cargar lista de contraseñas comunes"""
-        common_passwords = {
-            # Top contraseñas más comunes
-            "123456", "password", "123456789", "12345678", "12345",
-            "1234567", "1234567890", "qwerty", "abc123", "million2",
-            "000000", "1234", "iloveyou", "aaron431", "password1",
-            "qqww1122", "123", "omgpop", "123321", "654321",
-            "qwertyuiop", "qwer1234", "123abc", "a123456", "1q2w3e4r",
-            "admin", "administrator", "root", "user", "guest",
-            "demo", "test", "123qwe", "1qaz2wsx", "welcome",
-            "monkey", "dragon", "letmein", "baseball", "trustno1",
-            "hello", "freedom", "whatever", "qazwsx", "ninja",
-            # Contraseñas en español
-            "contraseña", "clave123", "acceso", "seguridad", "admin123",
-            "usuario", "sistema", "empresa", "chile123", "santiago",
-            "password123", "clave", "pass123", "administrador"
-        }
-        
-        # Intentar cargar archivo de contraseñas comunes si existe
-        common_passwords_file = os.path.join(os.path.dirname(__file__), 'common_passwords.txt')
-        if os.path.exists(common_passwords_file):
-            try:
-                with open(common_passwords_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        password = line.strip().lower()
-                        if password:
-                            common_passwords.add(password)
-            except Exception as e:
-                logger.warning(f"Could not load common passwords file: {e}")
-        
-        return common_passwords
+    def _load_common_passwords(self) -> frozenset:
+        """Lista de contraseñas comunes (compartida por todas las instancias)"""
+        return _cargar_contrasenas_comunes()
     
     def validate_password(self, 
                          password: str, 
@@ -204,14 +215,29 @@ class PasswordValidator:
         return False
     
     def _is_pwned_password(self, password: str) -> bool:
-        """Verificar contra API de HaveIBeenPwned (opcional)"""
+        """
+        Verificar contra el índice local de contraseñas filtradas
+        (app/contrasenas_comprometidas.py). Sin índice consulta la API
+        k-anónima de HaveIBeenPwned, salvo con PWNED_PASSWORDS_API=false.
+        """
+        indice = obtener_indice()
+        if indice is not None:
+            if indice.contiene(password):
+                logger.warning("Password found in local breach index")
+                return True
+            return False
+        
+        if not PWNED_API_HABILITADA:
+            return False
+        
         try:
             # Calcular hash SHA-1 de la contraseña
             sha1_hash = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
             prefix = sha1_hash[:5]
             suffix = sha1_hash[5:]
             
-            # Consultar API de HaveIBeenPwned
+            # Consultar API de HaveIBeenPwned (requests solo se importa si se usa)
+            import requests
             url = f"https://api.pwnedpasswords.com/range/{prefix}"
             response = requests.get(url, timeout=3)
             
@@ -371,6 +397,19 @@ class AccountLockoutManager:
 _password_manager = None
 _lockout_manager = None
 
+def _avisar_verificacion_filtradas():
+    """Deja en el log de arranque cómo se verifican las contraseñas filtradas"""
+    if obtener_indice() is not None:
+        return
+    if PWNED_API_HABILITADA:
+        logger.info("Sin índice local de contraseñas comprometidas: se usa la API k-anónima de HaveIBeenPwned")
+    else:
+        logger.warning(
+            "Verificación de contraseñas filtradas DESACTIVADA: no hay índice local y "
+            "PWNED_PASSWORDS_API=false. Construir el índice con "
+            "'python dev_tools/construir_indice_contrasenas.py <lista>' (ver app/contrasenas_comprometidas.py)"
+        )
+
 def init_password_system(policy: PasswordPolicy = None):
     """Inicializar sistema de contraseñas"""
     global _password_manager, _lockout_manager
@@ -378,6 +417,7 @@ def init_password_system(policy: PasswordPolicy = None):
     try:
         _password_manager = PasswordManager(policy)
         _lockout_manager = AccountLockoutManager(policy)
+        _avisar_verificacion_filtradas()
         logger.info("Password system initialized successfully")
         return True
     except Exception as e:
@@ -16,9 +16,12 @@ import logging
 # Importaciones opcionales para evitar errores si no están instaladas
 try:
     import pyotp
-    import qrcode
     from io import BytesIO
     import base64
+    import importlib.util
+    # qrcode (y PIL) se importa solo al generar el código QR
+    if importlib.util.find_spec('qrcode') is None:
+        raise ImportError("qrcode no instalado")
     MFA_AVAILABLE = True
 except ImportError:
     MFA_AVAILABLE = False
@@ -244,6 +247,7 @@ class SecurityManager:
             issuer_name=SECURITY_CONFIG['mfa']['issuer_name']
         )
         
+        import qrcode
         qr = qrcode.QRCode(version=1, box_size=10, border=5)
         qr.add_data(totp_uri)
         qr.make(fit=True)
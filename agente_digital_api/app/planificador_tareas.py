@@ -0,0 +1,548 @@
+# app/planificador_tareas.py
+# Planificador de tareas de mantenimiento en segundo plano
+"""
+Ejecutor único para las tareas de mantenimiento (limpieza de temporales,
+huérfanos, sesiones MFA, logs de auditoría, reconciliaciones), que antes se
+disparaban dentro de requests o con hilos sueltos por worker.
+
+- Programación estilo cron (minuto hora día-mes mes día-semana) con ``*``,
+  ``*/n``, rangos ``a-b`` y listas ``a,b``.
+- Elección de líder por tarea: ``bloqueo='archivo'`` toma un flock no
+  bloqueante (un solo worker por nodo), ``bloqueo='bd'`` un sp_getapplock de
+  sesión (un solo proceso en todo el cluster) y ``bloqueo=None`` corre en cada
+  proceso (estado en memoria del worker, como las sesiones MFA).
+- Ejecución por lotes con checkpoint: la tarea recibe un ``ContextoTarea``,
+  guarda su avance con ``guardar_checkpoint`` y consulta ``debe_detenerse``
+  (presupuesto ``max_segundos``). Si se detiene antes de terminar queda
+  'parcial' y se reanuda desde el checkpoint en el siguiente minuto.
+- Estado, progreso y métricas se guardan en un JSON por tarea en TAREAS_DIR,
+  así cualquier worker del nodo responde /api/admin/tareas con el avance del
+  que la está ejecutando.
+
+Configuración (entorno):
+    TAREAS_MANTENIMIENTO   'false' desactiva el hilo planificador (por defecto activo)
+    TAREAS_DIR             directorio de estado y locks (por defecto <tmp>/agente_tareas)
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import traceback
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify, request
+
+from .auth_utils import admin_required
+from .modules.core.errors import robust_endpoint
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo bloqueo dentro del proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_TAREAS = os.environ.get('TAREAS_DIR', os.path.join(tempfile.gettempdir(), 'agente_tareas'))
+INTERVALO_PROGRESO = 1.0  # segundos mínimos entre escrituras de progreso
+
+
+# ----------------------------------------------------------------------
+# Expresiones cron
+# ----------------------------------------------------------------------
+
+class ExpresionCron:
+    """Expresión cron de 5 campos (día de semana 0-6, 0 = domingo; 7 también es domingo)"""
+
+    CAMPOS = (('minuto', 0, 59), ('hora', 0, 23), ('dia', 1, 31), ('mes', 1, 12), ('dia_semana', 0, 7))
+
+    def __init__(self, expresion):
+        partes = expresion.split()
+        if len(partes) != 5:
+            raise ValueError(f"Expresión cron inválida (se esperan 5 campos): '{expresion}'")
+        self.expresion = expresion
+        valores = [self._parsear(parte, minimo, maximo) for parte, (_, minimo, maximo) in zip(partes, self.CAMPOS)]
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = valores
+        self.dias_semana = frozenset(d % 7 for d in dias_semana)
+        # Como cron: si día del mes y de la semana están restringidos, basta con uno
+        self._dia_libre = partes[2] == '*'
+        self._semana_libre = partes[4] == '*'
+
+    @staticmethod
+    def _parsear(parte, minimo, maximo):
+        valores = set()
+        for item in parte.split(','):
+            rango, _, paso = item.partition('/')
+            paso = int(paso) if paso else 1
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = (int(x) for x in rango.split('-', 1))
+            else:
+                inicio = int(rango)
+                fin = maximo if paso > 1 else inicio
+            if inicio < minimo or fin > maximo or inicio > fin or paso < 1:
+                raise ValueError(f"Campo cron fuera de rango: '{item}' ({minimo}-{maximo})")
+            valores.update(range(inicio, fin + 1, paso))
+        return frozenset(valores)
+
+    def _dia_coincide(self, momento):
+        en_mes = momento.day in self.dias
+        en_semana = (momento.isoweekday() % 7) in self.dias_semana
+        if self._dia_libre and self._semana_libre:
+            return True
+        if self._dia_libre:
+            return en_semana
+        if self._semana_libre:
+            return en_mes
+        return en_mes or en_semana
+
+    def coincide(self, momento):
+        return (momento.minute in self.minutos and momento.hour in self.horas
+                and momento.month in self.meses and self._dia_coincide(momento))
+
+    def siguiente(self, desde):
+        """Primer minuto estrictamente posterior a ``desde`` que coincide (None si no hay en 5 años)"""
+        momento = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=366 * 5)
+        while momento < limite:
+            if momento.month not in self.meses:
+                ultimo = monthrange(momento.year, momento.month)[1]
+                momento = momento.replace(day=ultimo, hour=0, minute=0) + timedelta(days=1)
+            elif not self._dia_coincide(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            elif momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+        return None
+
+
+# ----------------------------------------------------------------------
+# Elección de líder
+# ----------------------------------------------------------------------
+
+class BloqueoArchivo:
+    """flock no bloqueante: un solo proceso del nodo ejecuta la tarea"""
+
+    _locales = {}
+    _locales_guard = threading.Lock()
+
+    def __init__(self, nombre):
+        self.ruta = os.path.join(DIRECTORIO_TAREAS, f"{nombre}.lock")
+        with self._locales_guard:
+            self._local = self._locales.setdefault(self.ruta, threading.Lock())
+        self._archivo = None
+
+    def adquirir(self):
+        if not self._local.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+        try:
+            self._archivo = open(self.ruta, 'a')
+            fcntl.flock(self._archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+            self._local.release()
+            return False
+
+    def liberar(self):
+        if self._archivo:
+            try:
+                fcntl.flock(self._archivo, fcntl.LOCK_UN)
+            finally:
+                self._archivo.close()
+                self._archivo = None
+        self._local.release()
+
+
+class BloqueoBD:
+    """sp_getapplock de sesión en una conexión propia: un solo proceso del cluster"""
+
+    def __init__(self, nombre):
+        self.recurso = f"agente_tareas:{nombre}"
+        self._local = threading.Lock()
+        self._conn = None
+
+    def adquirir(self):
+        from .database import crear_conexion
+        if not self._local.acquire(blocking=False):
+            return False
+        try:
+            self._conn = crear_conexion()
+            cursor = self._conn.cursor()
+            cursor.execute("""
+                SET NOCOUNT ON;
+                DECLARE @r INT;
+                EXEC @r = sp_getapplock @Resource = ?, @LockMode = 'Exclusive',
+                                        @LockOwner = 'Session', @LockTimeout = 0;
+                SELECT @r;
+            """, (self.recurso,))
+            if cursor.fetchone()[0] >= 0:
+                return True
+        except Exception as e:
+            logger.warning(f"No se pudo tomar el lock de BD {self.recurso}: {e}")
+        self._cerrar()
+        self._local.release()
+        return False
+
+    def liberar(self):
+        try:
+            self._conn.cursor().execute(
+                "EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", (self.recurso,))
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el lock de BD {self.recurso}: {e}")
+        finally:
+            self._cerrar()
+            self._local.release()
+
+    def _cerrar(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+class BloqueoProceso:
+    """Sin elección de líder: la tarea corre en cada proceso (un hilo a la vez)"""
+
+    def __init__(self, nombre):
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        return self._lock.acquire(blocking=False)
+
+    def liberar(self):
+        self._lock.release()
+
+
+TIPOS_BLOQUEO = {'archivo': BloqueoArchivo, 'bd': BloqueoBD, None: BloqueoProceso}
+
+
+# ----------------------------------------------------------------------
+# Estado persistido por tarea
+# ----------------------------------------------------------------------
+
+def _ruta_estado(nombre, por_proceso=False):
+    sufijo = f".{os.getpid()}" if por_proceso else ""
+    return os.path.join(DIRECTORIO_TAREAS, f"{nombre}{sufijo}.json")
+
+
+def _leer_estado(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_estado(ruta, estado):
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, default=str)
+    os.replace(temporal, ruta)
+
+
+class ContextoTarea:
+    """Lo que recibe la función de una tarea: checkpoint, progreso y presupuesto de tiempo"""
+
+    def __init__(self, tarea, estado, ruta_estado, detener):
+        self.tarea = tarea
+        self.checkpoint = dict(estado.get('checkpoint') or {})
+        self._estado = estado
+        self._ruta_estado = ruta_estado
+        self._detener = detener
+        self._limite = time.monotonic() + tarea.max_segundos if tarea.max_segundos else None
+        self._ultima_escritura = 0.0
+        self.detenida = False
+
+    def guardar_checkpoint(self, checkpoint):
+        """Persiste el avance: si el proceso muere, la próxima ejecución parte desde aquí"""
+        self.checkpoint = dict(checkpoint)
+        self._estado['checkpoint'] = self.checkpoint
+        self._persistir(forzar=True)
+
+    def progreso(self, hechos, total=None, mensaje=None):
+        self._estado['progreso'] = {
+            'hechos': hechos,
+            'total': total,
+            'porcentaje': round(hechos / total * 100, 1) if total else None,
+            'mensaje': mensaje
+        }
+        self._persistir()
+
+    def debe_detenerse(self):
+        """True si se agotó max_segundos o el planificador se está deteniendo"""
+        if self._detener.is_set() or (self._limite is not None and time.monotonic() > self._limite):
+            self.detenida = True
+        return self.detenida
+
+    def _persistir(self, forzar=False):
+        ahora = time.monotonic()
+        if forzar or ahora - self._ultima_escritura >= INTERVALO_PROGRESO:
+            self._ultima_escritura = ahora
+            try:
+                _escribir_estado(self._ruta_estado, self._estado)
+            except OSError as e:
+                logger.warning(f"No se pudo guardar el estado de la tarea {self.tarea.nombre}: {e}")
+
+
+class Tarea:
+    """Definición de una tarea registrada"""
+
+    def __init__(self, nombre, funcion, cron, descripcion='', bloqueo='archivo', max_segundos=300):
+        if bloqueo not in TIPOS_BLOQUEO:
+            raise ValueError(f"Tipo de bloqueo desconocido: {bloqueo}")
+        self.nombre = nombre
+        self.funcion = funcion
+        self.cron = ExpresionCron(cron)
+        self.descripcion = descripcion
+        self.bloqueo = bloqueo
+        self.max_segundos = max_segundos
+        self._bloqueo = TIPOS_BLOQUEO[bloqueo](nombre)
+
+    @property
+    def por_proceso(self):
+        return self.bloqueo is None
+
+    @property
+    def ruta_estado(self):
+        return _ruta_estado(self.nombre, self.por_proceso)
+
+
+# ----------------------------------------------------------------------
+# Planificador
+# ----------------------------------------------------------------------
+
+class PlanificadorTareas:
+    """Registra tareas y las ejecuta según su cron en un hilo de fondo"""
+
+    def __init__(self):
+        self.tareas = {}
+        self._hilo = None
+        self._detener = threading.Event()
+        self._slots = {}  # {nombre: último minuto programado procesado en este proceso}
+        self.stats = {'ticks': 0, 'ejecuciones': 0, 'completadas': 0, 'parciales': 0,
+                      'errores': 0, 'omitidas_bloqueo': 0}
+
+    def registrar(self, nombre, funcion, cron, descripcion='', bloqueo='archivo', max_segundos=300):
+        """Registra una tarea. ``funcion(ctx)`` retorna un dict con su resultado."""
+        tarea = Tarea(nombre, funcion, cron, descripcion, bloqueo, max_segundos)
+        self.tareas[nombre] = tarea
+        return tarea
+
+    # -- Ejecución ------------------------------------------------------
+
+    def ejecutar(self, nombre, slot=None):
+        """
+        Ejecuta una tarea ahora si este proceso gana el bloqueo. ``slot`` es el
+        minuto programado: si otro proceso del nodo ya lo procesó, se omite.
+        Retorna el estado de la tarea.
+        """
+        tarea = self.tareas[nombre]
+        if not tarea._bloqueo.adquirir():
+            self.stats['omitidas_bloqueo'] += 1
+            return {'nombre': nombre, 'estado': 'omitida', 'motivo': 'en ejecución en otro proceso'}
+
+        try:
+            ruta = tarea.ruta_estado
+            estado = _leer_estado(ruta)
+            slot_iso = slot.isoformat() if slot else None
+            if slot_iso and estado.get('ultimo_slot') == slot_iso and estado.get('estado') != 'parcial':
+                return {'nombre': nombre, 'estado': 'omitida', 'motivo': 'slot ya procesado'}
+            return self._correr(tarea, estado, ruta, slot_iso)
+        finally:
+            tarea._bloqueo.liberar()
+
+    def _correr(self, tarea, estado, ruta, slot_iso):
+        estado.update({
+            'nombre': tarea.nombre,
+            'estado': 'ejecutando',
+            'pid': os.getpid(),
+            'inicio': datetime.now().isoformat(),
+            'progreso': None,
+        })
+        if slot_iso:
+            estado['ultimo_slot'] = slot_iso
+        ctx = ContextoTarea(tarea, estado, ruta, self._detener)
+        ctx._persistir(forzar=True)
+
+        self.stats['ejecuciones'] += 1
+        inicio = time.perf_counter()
+        try:
+            resultado = tarea.funcion(ctx)
+            if ctx.detenida:
+                estado['estado'] = 'parcial'
+                self.stats['parciales'] += 1
+            else:
+                estado['estado'] = 'completada'
+                estado['checkpoint'] = {}
+                estado['ultima_completada'] = datetime.now().isoformat()
+                self.stats['completadas'] += 1
+            estado['resultado'] = resultado
+            estado['error'] = None
+        except Exception as e:
+            self.stats['errores'] += 1
+            estado['estado'] = 'error'
+            estado['error'] = str(e)
+            estado['errores'] = estado.get('errores', 0) + 1
+            logger.error(f"Error en la tarea {tarea.nombre}: {e}\n{traceback.format_exc()}")
+
+        duracion = round(time.perf_counter() - inicio, 3)
+        estado['fin'] = datetime.now().isoformat()
+        estado['duracion_s'] = duracion
+        estado['ejecuciones'] = estado.get('ejecuciones', 0) + 1
+        estado['duracion_total_s'] = round(estado.get('duracion_total_s', 0) + duracion, 3)
+        ctx._persistir(forzar=True)
+        print(f"🧹 Tarea {tarea.nombre}: {estado['estado']} en {duracion}s")
+        return estado
+
+    def ejecutar_en_segundo_plano(self, nombre):
+        hilo = threading.Thread(target=self.ejecutar, args=(nombre,), daemon=True,
+                                name=f"tarea_{nombre}")
+        hilo.start()
+        return hilo
+
+    # -- Bucle ----------------------------------------------------------
+
+    def _tick(self, ahora):
+        self.stats['ticks'] += 1
+        for nombre, tarea in list(self.tareas.items()):
+            if self._detener.is_set():
+                return
+            if tarea.cron.coincide(ahora) and self._slots.get(nombre) != ahora:
+                self._slots[nombre] = ahora
+                self.ejecutar(nombre, slot=ahora)
+            elif _leer_estado(tarea.ruta_estado).get('estado') == 'parcial':
+                # Reanudar desde el checkpoint sin esperar al próximo slot
+                self.ejecutar(nombre)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            ahora = datetime.now().replace(second=0, microsecond=0)
+            try:
+                self._tick(ahora)
+            except Exception as e:
+                logger.error(f"Error en el planificador de tareas: {e}")
+            # Dormir hasta el próximo minuto
+            siguiente = ahora + timedelta(minutes=1)
+            self._detener.wait(max(1.0, (siguiente - datetime.now()).total_seconds()))
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        os.makedirs(DIRECTORIO_TAREAS, exist_ok=True)
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True, name='planificador_tareas')
+        self._hilo.start()
+        print(f"⏱️ Planificador de tareas iniciado ({len(self.tareas)} tareas)")
+
+    def detener(self, timeout=5.0):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+
+    # -- Consulta -------------------------------------------------------
+
+    def estado_tarea(self, nombre):
+        tarea = self.tareas[nombre]
+        estado = _leer_estado(tarea.ruta_estado)
+        proxima = tarea.cron.siguiente(datetime.now())
+        return {
+            'nombre': nombre,
+            'descripcion': tarea.descripcion,
+            'cron': tarea.cron.expresion,
+            'bloqueo': tarea.bloqueo or 'proceso',
+            'max_segundos': tarea.max_segundos,
+            'proxima_ejecucion': proxima.isoformat() if proxima else None,
+            'estado': estado.get('estado', 'sin ejecutar'),
+            'progreso': estado.get('progreso'),
+            'checkpoint': estado.get('checkpoint') or None,
+            'inicio': estado.get('inicio'),
+            'fin': estado.get('fin'),
+            'duracion_s': estado.get('duracion_s'),
+            'ultima_completada': estado.get('ultima_completada'),
+            'ejecuciones': estado.get('ejecuciones', 0),
+            'errores': estado.get('errores', 0),
+            'error': estado.get('error'),
+            'resultado': estado.get('resultado'),
+            'pid': estado.get('pid'),
+        }
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'activo': bool(self._hilo and self._hilo.is_alive()),
+            'pid': os.getpid(),
+            'tareas': len(self.tareas),
+        }
+
+
+# Instancia global
+planificador_tareas = PlanificadorTareas()
+
+
+def init_planificador(app):
+    """Registra las tareas de mantenimiento e inicia el planificador"""
+    from .tareas_mantenimiento import registrar_tareas_mantenimiento
+    registrar_tareas_mantenimiento(planificador_tareas)
+    app.extensions['planificador_tareas'] = planificador_tareas
+
+    if os.environ.get('TAREAS_MANTENIMIENTO', 'true').lower() == 'false' or app.testing:
+        print("⏸️ Planificador de tareas desactivado")
+        return planificador_tareas
+    planificador_tareas.iniciar()
+    return planificador_tareas
+
+
+# ----------------------------------------------------------------------
+# Endpoints de progreso
+# ----------------------------------------------------------------------
+
+tareas_bp = Blueprint('admin_tareas', __name__, url_prefix='/api/admin/tareas')
+
+
+@tareas_bp.route('', methods=['GET'])
+@robust_endpoint(require_authentication=False, log_perf=True)
+@admin_required
+def listar_tareas(current_user_id, current_user_rol, current_user_email, current_user_nombre):
+    """Estado, progreso y métricas de las tareas de mantenimiento"""
+    return jsonify({
+        'planificador': planificador_tareas.get_stats(),
+        'tareas': [planificador_tareas.estado_tarea(nombre) for nombre in planificador_tareas.tareas]
+    })
+
+
+@tareas_bp.route('/<nombre>', methods=['GET'])
+@robust_endpoint(require_authentication=False, log_perf=True)
+@admin_required
+def obtener_tarea(current_user_id, current_user_rol, current_user_email, current_user_nombre, nombre):
+    if nombre not in planificador_tareas.tareas:
+        return jsonify({'error': f"Tarea '{nombre}' no registrada"}), 404
+    return jsonify(planificador_tareas.estado_tarea(nombre))
+
+
+@tareas_bp.route('/<nombre>/ejecutar', methods=['POST'])
+@robust_endpoint(require_authentication=False, log_perf=True)
+@admin_required
+def ejecutar_tarea(current_user_id, current_user_rol, current_user_email, current_user_nombre, nombre):
+    """Lanza la tarea ahora en segundo plano (respeta el bloqueo de líder)"""
+    if nombre not in planificador_tareas.tareas:
+        return jsonify({'error': f"Tarea '{nombre}' no registrada"}), 404
+    print(f"▶️ Tarea '{nombre}' lanzada por {current_user_email or current_user_id}")
+    planificador_tareas.ejecutar_en_segundo_plano(nombre)
+    return jsonify({
+        'mensaje': f"Tarea '{nombre}' lanzada",
+        'estado_url': request.path.rsplit('/', 1)[0]
+    }), 202
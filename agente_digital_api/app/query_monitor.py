@@ -0,0 +1,258 @@
+# app/query_monitor.py
+# Instrumentación de SQL por request y detección de N+1
+"""
+Cada consulta ejecutada durante un request, sobre la conexión compartida o
+una propia (ver app/db_request_scope.py), se registra por *huella*: el texto SQL con
+literales reemplazados por ``?`` y espacios normalizados. Por huella se
+acumula cantidad, duración (execute + fetch), filas leídas y sitio de llamada.
+
+Al terminar el request los datos se consolidan en estadísticas globales del
+proceso. Una huella que se repite ``SQL_UMBRAL_N1`` veces o más en un mismo
+request se marca como candidata a N+1.
+
+Consulta de resultados: ``monitor_consultas.top(...)``, ``get_slow_queries()``
+de query_optimizer y ``/api/scalability`` (app/views/escalabilidad_views.py).
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import zlib
+from functools import lru_cache
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+_CLAVE_REQUEST = '_sql_monitor_request'
+
+UMBRAL_LENTA_SEGUNDOS = 1.0
+UMBRAL_N1 = 5
+MAX_HUELLAS = 500
+
+# Archivos de infraestructura que no cuentan como sitio de llamada
+_DIR_APP = os.path.dirname(os.path.abspath(__file__))
+_ARCHIVOS_INTERNOS = {
+    os.path.normcase(os.path.join(_DIR_APP, nombre))
+    for nombre in ('query_monitor.py', 'db_request_scope.py', 'database.py')
+}
+_RAIZ_PROYECTO = os.path.dirname(_DIR_APP)
+
+_RE_COMENTARIOS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_RE_CADENAS = re.compile(r"N?'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r'(?<![\w@#])-?\d+(?:\.\d+)?\b')
+_RE_LISTAS_IN = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_RE_ESPACIOS = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def huella_sql(sql):
+    """Retorna (id, texto normalizado) de una consulta."""
+    texto = _RE_COMENTARIOS.sub(' ', sql)
+    texto = _RE_CADENAS.sub('?', texto)
+    texto = _RE_NUMEROS.sub('?', texto)
+    texto = _RE_LISTAS_IN.sub('(?+)', texto)
+    texto = _RE_ESPACIOS.sub(' ', texto).strip()
+    return format(zlib.crc32(texto.encode('utf-8')), '08x'), texto
+
+
+@lru_cache(maxsize=4096)
+def _describir_sitio(archivo, linea, funcion):
+    return f"{os.path.relpath(archivo, _RAIZ_PROYECTO)}:{linea} ({funcion})"
+
+
+def _sitio_llamada():
+    """Primer frame fuera de la capa de base de datos."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        archivo = os.path.normcase(frame.f_code.co_filename)
+        if archivo not in _ARCHIVOS_INTERNOS:
+            return _describir_sitio(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return 'desconocido'
+
+
+class RegistroHuella:
+    """Acumulado de una huella dentro de un request"""
+
+    __slots__ = ('texto', 'ejecuciones', 'tiempo', 'max_tiempo', 'filas', 'sitio')
+
+    def __init__(self, texto, sitio):
+        self.texto = texto
+        self.ejecuciones = 0
+        self.tiempo = 0.0
+        self.max_tiempo = 0.0
+        self.filas = 0
+        self.sitio = sitio
+
+
+class MonitorConsultas:
+    """Estadísticas globales de SQL por huella"""
+
+    def __init__(self):
+        self.habilitado = True
+        self.umbral_lenta = UMBRAL_LENTA_SEGUNDOS
+        self.umbral_n1 = UMBRAL_N1
+        self.max_huellas = MAX_HUELLAS
+        self.stats = {}
+        self.requests_monitoreados = 0
+        self.requests_con_n1 = 0
+        self.huellas_descartadas = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Registro durante el request
+    # ------------------------------------------------------------------
+
+    def iniciar(self, sql):
+        """Registra el inicio de una consulta; retorna el registro del request o None."""
+        if not self.habilitado or not has_request_context() or not isinstance(sql, str):
+            return None
+        registros = g.get(_CLAVE_REQUEST)
+        if registros is None:
+            registros = {}
+            setattr(g, _CLAVE_REQUEST, registros)
+        id_huella, texto = huella_sql(sql)
+        registro = registros.get(id_huella)
+        if registro is None:
+            registro = registros[id_huella] = RegistroHuella(texto, _sitio_llamada())
+        registro.ejecuciones += 1
+        return registro
+
+    @staticmethod
+    def sumar(registro, duracion, filas=0):
+        """Suma tiempo (execute o fetch) y filas leídas a un registro."""
+        registro.tiempo += duracion
+        if duracion > registro.max_tiempo:
+            registro.max_tiempo = duracion
+        registro.filas += filas
+
+    # ------------------------------------------------------------------
+    # Consolidación al final del request
+    # ------------------------------------------------------------------
+
+    def finalizar_request(self, ruta=None):
+        """Consolida los registros del request en las estadísticas globales."""
+        registros = g.pop(_CLAVE_REQUEST, None) if has_request_context() else None
+        if not registros:
+            return []
+
+        candidatos_n1 = []
+        with self._lock:
+            self.requests_monitoreados += 1
+            for id_huella, registro in registros.items():
+                stats = self.stats.get(id_huella)
+                if stats is None:
+                    if len(self.stats) >= self.max_huellas:
+                        self.huellas_descartadas += 1
+                        continue
+                    stats = self.stats[id_huella] = {
+                        'sql': registro.texto,
+                        'total_executions': 0,
+                        'total_time': 0.0,
+                        'avg_time': 0.0,
+                        'max_time': 0.0,
+                        'slow_queries': 0,
+                        'rows': 0,
+                        'requests': 0,
+                        'n_plus_1': 0,
+                        'call_sites': {},
+                    }
+                stats['total_executions'] += registro.ejecuciones
+                stats['total_time'] += registro.tiempo
+                stats['avg_time'] = stats['total_time'] / stats['total_executions']
+                stats['max_time'] = max(stats['max_time'], registro.max_tiempo)
+                stats['rows'] += registro.filas
+                stats['requests'] += 1
+                if registro.max_tiempo > self.umbral_lenta:
+                    stats['slow_queries'] += 1
+                sitios = stats['call_sites']
+                if registro.sitio in sitios or len(sitios) < 10:
+                    sitios[registro.sitio] = sitios.get(registro.sitio, 0) + registro.ejecuciones
+                if registro.ejecuciones >= self.umbral_n1:
+                    stats['n_plus_1'] += 1
+                    candidatos_n1.append((id_huella, registro))
+            if candidatos_n1:
+                self.requests_con_n1 += 1
+
+        for id_huella, registro in candidatos_n1:
+            logger.warning("Posible N+1 en %s: %sx [%s] desde %s - %s",
+                           ruta or '?', registro.ejecuciones, id_huella,
+                           registro.sitio, registro.texto[:200])
+        return candidatos_n1
+
+    def resumen_request(self):
+        """(consultas, tiempo total, candidatos N+1) del request actual."""
+        registros = g.get(_CLAVE_REQUEST) if has_request_context() else None
+        if not registros:
+            return 0, 0.0, 0
+        consultas = sum(r.ejecuciones for r in registros.values())
+        tiempo = sum(r.tiempo for r in registros.values())
+        n1 = sum(1 for r in registros.values() if r.ejecuciones >= self.umbral_n1)
+        return consultas, tiempo, n1
+
+    # ------------------------------------------------------------------
+    # Consulta de estadísticas
+    # ------------------------------------------------------------------
+
+    def top(self, n=10, orden='total_time'):
+        """Las ``n`` huellas con mayor valor de ``orden`` (total_time, avg_time,
+        max_time, total_executions, n_plus_1)."""
+        with self._lock:
+            copia = [dict(stats, fingerprint=id_huella, call_sites=dict(stats['call_sites']))
+                     for id_huella, stats in self.stats.items()]
+        return sorted(copia, key=lambda s: s[orden], reverse=True)[:n]
+
+    def get_stats(self, n=10):
+        return {
+            'enabled': self.habilitado,
+            'fingerprints': len(self.stats),
+            'fingerprints_dropped': self.huellas_descartadas,
+            'requests_monitored': self.requests_monitoreados,
+            'requests_with_n_plus_1': self.requests_con_n1,
+            'slow_threshold': self.umbral_lenta,
+            'n_plus_1_threshold': self.umbral_n1,
+            'top_slow': self.top(n, 'total_time'),
+            'top_frequent': self.top(n, 'total_executions'),
+            'top_n_plus_1': [s for s in self.top(n, 'n_plus_1') if s['n_plus_1']],
+        }
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.requests_monitoreados = 0
+            self.requests_con_n1 = 0
+            self.huellas_descartadas = 0
+
+
+# Instancia global
+monitor_consultas = MonitorConsultas()
+
+
+def init_query_monitor(app):
+    """Configura el monitor y registra la consolidación al final de cada request"""
+    from flask import request
+
+    monitor_consultas.habilitado = app.config.get('SQL_MONITOR', True)
+    monitor_consultas.umbral_lenta = app.config.get('SQL_UMBRAL_LENTA', UMBRAL_LENTA_SEGUNDOS)
+    monitor_consultas.umbral_n1 = app.config.get('SQL_UMBRAL_N1', UMBRAL_N1)
+    app.config.setdefault('DB_METRICAS_HEADERS', None)
+
+    @app.after_request
+    def _headers_monitor_sql(response):
+        mostrar = app.config['DB_METRICAS_HEADERS']
+        if mostrar is None:
+            mostrar = app.debug
+        if mostrar:
+            _, tiempo, n1 = monitor_consultas.resumen_request()
+            response.headers['X-DB-Query-Time'] = f"{tiempo:.3f}s"
+            response.headers['X-DB-N-Plus-1'] = str(n1)
+        return response
+
+    @app.teardown_request
+    def _consolidar_sql(error=None):
+        monitor_consultas.finalizar_request(request.endpoint or request.path)
+
+    return monitor_consultas
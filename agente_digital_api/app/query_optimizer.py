@@ -10,6 +10,8 @@ from sqlalchemy import text
 
 from .cache_manager import cache_manager, cached
 from .database_pool import db_manager
+from .query_monitor import monitor_consultas
+from .modules.admin.eliminacion_incidentes import QUERY_COLUMNA_ELIMINADO, filtro_no_eliminados_con
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +70,12 @@ def monitor_query(query_name: str):
 # Instancia global
 query_optimizer = QueryOptimizer()
 
+def _no_eliminados(alias: Optional[str] = None) -> str:
+    """Condición que excluye los incidentes eliminados (soft-delete)"""
+    return filtro_no_eliminados_con(
+        lambda: db_manager.execute_query(QUERY_COLUMNA_ELIMINADO, fetch_one=True)[0], alias
+    )
+
 # ============================================================================
 # QUERIES OPTIMIZADAS PARA INQUILINOS
 # ============================================================================
@@ -120,7 +128,7 @@ def get_inquilinos_optimized(filtros: Optional[Dict] = None) -> List[Dict]:
 def get_inquilino_detail_optimized(inquilino_id: int) -> Optional[Dict]:
     """Obtener detalles de un inquilino específico"""
     
-    query = """
+    query = f"""
     SELECT 
         i.InquilinoID,
         i.RazonSocial,
@@ -140,7 +148,7 @@ def get_inquilino_detail_optimized(inquilino_id: int) -> Optional[Dict]:
     FROM Inquilinos i
     LEFT JOIN Empresas e ON i.InquilinoID = e.InquilinoID
     LEFT JOIN Usuarios u ON i.InquilinoID = u.InquilinoID
-    LEFT JOIN Incidentes inc ON e.EmpresaID = inc.EmpresaID
+    LEFT JOIN Incidentes inc ON e.EmpresaID = inc.EmpresaID AND {_no_eliminados('inc')}
     WHERE i.InquilinoID = :inquilino_id
     GROUP BY i.InquilinoID, i.RazonSocial, i.RUT, i.Email, i.Telefono, 
              i.Direccion, i.Ciudad, i.Region, i.CodigoPostal, i.Activo, 
@@ -158,7 +166,7 @@ def get_inquilino_detail_optimized(inquilino_id: int) -> Optional[Dict]:
 def get_empresas_by_inquilino_optimized(inquilino_id: int) -> List[Dict]:
     """Obtener empresas de un inquilino con estadísticas"""
     
-    query = """
+    query = f"""
     SELECT 
         e.EmpresaID,
         e.InquilinoID,
@@ -177,7 +185,7 @@ def get_empresas_by_inquilino_optimized(inquilino_id: int) -> List[Dict]:
         COUNT(DISTINCT ce.ObligacionID) as TotalObligaciones
     FROM Empresas e
     LEFT JOIN Usuarios u ON e.EmpresaID = u.EmpresaID
-    LEFT JOIN Incidentes inc ON e.EmpresaID = inc.EmpresaID
+    LEFT JOIN Incidentes inc ON e.EmpresaID = inc.EmpresaID AND {_no_eliminados('inc')}
     LEFT JOIN CumplimientoEmpresa ce ON e.EmpresaID = ce.EmpresaID
     WHERE e.InquilinoID = :inquilino_id AND e.Activo = 1
     GROUP BY e.EmpresaID, e.InquilinoID, e.RazonSocial, e.NombreComercial, 
@@ -192,29 +200,58 @@ def get_empresas_by_inquilino_optimized(inquilino_id: int) -> List[Dict]:
 def get_empresa_dashboard_optimized(empresa_id: int) -> Dict:
     """Obtener datos del dashboard de empresa optimizado"""
     
-    # Query principal para estadísticas
+    # Estadísticas desde los contadores mantenidos por triggers
+    # (sql/contadores_dashboard_empresa.sql): lectura por clave primaria
     stats_query = """
     SELECT 
         e.EmpresaID,
         e.RazonSocial,
         e.TipoEmpresa,
-        COUNT(DISTINCT u.UsuarioID) as TotalUsuarios,
-        COUNT(DISTINCT inc.IncidenteID) as TotalIncidentes,
-        COUNT(DISTINCT CASE WHEN inc.EstadoActual = 'Abierto' THEN inc.IncidenteID END) as IncidentesAbiertos,
-        COUNT(DISTINCT CASE WHEN inc.EstadoActual = 'Cerrado' THEN inc.IncidenteID END) as IncidentesCerrados,
-        COUNT(DISTINCT CASE WHEN inc.Criticidad = 'Alta' AND inc.EstadoActual = 'Abierto' THEN inc.IncidenteID END) as IncidentesCriticos,
-        COUNT(DISTINCT ce.ObligacionID) as TotalObligaciones,
-        AVG(CASE WHEN ce.PorcentajeAvance IS NOT NULL THEN ce.PorcentajeAvance END) as PromedioAvance
+        (SELECT COUNT(*) FROM Usuarios u WHERE u.EmpresaID = e.EmpresaID) as TotalUsuarios,
+        c.IncidentesTotal as TotalIncidentes,
+        c.IncidentesAbiertos,
+        c.IncidentesCerrados,
+        c.IncidentesCriticosAbiertos as IncidentesCriticos,
+        c.ObligacionesTotal as TotalObligaciones,
+        CAST(c.AvanceSuma AS FLOAT) / NULLIF(c.AvanceCantidad, 0) as PromedioAvance,
+        c.FechaReconciliacion
     FROM Empresas e
-    LEFT JOIN Usuarios u ON e.EmpresaID = u.EmpresaID
-    LEFT JOIN Incidentes inc ON e.EmpresaID = inc.EmpresaID
-    LEFT JOIN CumplimientoEmpresa ce ON e.EmpresaID = ce.EmpresaID
+    LEFT JOIN EmpresaContadoresDashboard c ON c.EmpresaID = e.EmpresaID
+    WHERE e.EmpresaID = :empresa_id
+    """
+    
+    # Respaldo si la tabla de contadores no existe o la empresa no está inicializada.
+    # Cada tabla se agrega por separado para no multiplicar filas en los JOIN.
+    vigentes = _no_eliminados()
+    stats_query_agregada = f"""
+    SELECT 
+        e.EmpresaID,
+        e.RazonSocial,
+        e.TipoEmpresa,
+        (SELECT COUNT(*) FROM Usuarios u WHERE u.EmpresaID = e.EmpresaID) as TotalUsuarios,
+        ISNULL(inc.Total, 0) as TotalIncidentes,
+        ISNULL(inc.Abiertos, 0) as IncidentesAbiertos,
+        ISNULL(inc.Cerrados, 0) as IncidentesCerrados,
+        ISNULL(inc.Criticos, 0) as IncidentesCriticos,
+        ISNULL(ce.Total, 0) as TotalObligaciones,
+        ce.PromedioAvance
+    FROM Empresas e
+    OUTER APPLY (
+        SELECT COUNT(*) as Total,
+            SUM(CASE WHEN EstadoActual = 'Abierto' THEN 1 ELSE 0 END) as Abiertos,
+            SUM(CASE WHEN EstadoActual = 'Cerrado' THEN 1 ELSE 0 END) as Cerrados,
+            SUM(CASE WHEN Criticidad = 'Alta' AND EstadoActual = 'Abierto' THEN 1 ELSE 0 END) as Criticos
+        FROM Incidentes WHERE EmpresaID = e.EmpresaID AND {vigentes}
+    ) inc
+    OUTER APPLY (
+        SELECT COUNT(DISTINCT ObligacionID) as Total, AVG(PorcentajeAvance) as PromedioAvance
+        FROM CumplimientoEmpresa WHERE EmpresaID = e.EmpresaID
+    ) ce
     WHERE e.EmpresaID = :empresa_id
-    GROUP BY e.EmpresaID, e.RazonSocial, e.TipoEmpresa
     """
     
     # Query para incidentes recientes
-    recent_incidents_query = """
+    recent_incidents_query = f"""
     SELECT TOP 5
         inc.IncidenteID,
         inc.Titulo,
@@ -222,16 +259,27 @@ def get_empresa_dashboard_optimized(empresa_id: int) -> Dict:
         inc.Criticidad,
         inc.FechaCreacion
     FROM Incidentes inc
-    WHERE inc.EmpresaID = :empresa_id
+    WHERE inc.EmpresaID = :empresa_id AND {vigentes}
     ORDER BY inc.FechaCreacion DESC
     """
     
     # Ejecutar queries
-    stats = db_manager.execute_query(stats_query, {'empresa_id': empresa_id}, fetch_one=True)
+    try:
+        stats = db_manager.execute_query(stats_query, {'empresa_id': empresa_id}, fetch_one=True)
+        if stats is not None and stats.FechaReconciliacion is None:
+            stats = None
+    except Exception as e:
+        logger.debug(f"Contadores de dashboard no disponibles: {e}")
+        stats = None
+    if stats is None:
+        stats = db_manager.execute_query(stats_query_agregada, {'empresa_id': empresa_id}, fetch_one=True)
     recent_incidents = db_manager.execute_query(recent_incidents_query, {'empresa_id': empresa_id}, fetch_all=True)
     
+    stats = dict(stats) if stats else {}
+    stats.pop('FechaReconciliacion', None)
+    
     return {
-        'stats': dict(stats) if stats else {},
+        'stats': stats,
         'recent_incidents': [dict(row) for row in recent_incidents]
     }
 
@@ -267,7 +315,7 @@ def get_incidentes_by_empresa_optimized(empresa_id: int, filtros: Optional[Dict]
     LEFT JOIN EvidenciasIncidentes ei ON inc.IncidenteID = ei.IncidenteID
     """
     
-    where_conditions = ["inc.EmpresaID = :empresa_id"]
+    where_conditions = ["inc.EmpresaID = :empresa_id", _no_eliminados('inc')]
     params = {'empresa_id': empresa_id}
     
     if filtros:
@@ -407,8 +455,12 @@ def get_query_stats() -> Dict[str, Any]:
     """Obtener estadísticas de performance de queries"""
     return query_optimizer.query_stats.copy()
 
-def get_slow_queries(threshold: float = None) -> Dict[str, Any]:
-    """Obtener queries lentas"""
+def get_slow_queries(threshold: float = None, top: int = 20) -> Dict[str, Any]:
+    """Obtener queries lentas.
+
+    Incluye las funciones con @monitor_query y las huellas SQL medidas por
+    app/query_monitor.py (claves ``sql:<huella>``, las ``top`` de mayor tiempo total).
+    """
     threshold = threshold or query_optimizer.slow_query_threshold
     slow_queries = {}
     
@@ -416,6 +468,10 @@ def get_slow_queries(threshold: float = None) -> Dict[str, Any]:
         if stats['avg_time'] > threshold or stats['slow_queries'] > 0:
             slow_queries[query_name] = stats
     
+    for stats in monitor_consultas.top(top, 'total_time'):
+        if stats['avg_time'] > threshold or stats['slow_queries'] > 0:
+            slow_queries[f"sql:{stats['fingerprint']}"] = stats
+    
     return slow_queries
 
 # ============================================================================
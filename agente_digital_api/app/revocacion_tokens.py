@@ -0,0 +1,414 @@
+# app/revocacion_tokens.py
+# Revocación de tokens JWT compartida entre workers, con expiración
+"""
+Lista de tokens JWT revocados (por ``jti``) compartida por todos los workers
+de gunicorn y por los reinicios de ``max_requests``:
+
+- un almacén con TTL = expiración del token: SQLite (un solo nodo, archivo
+  compartido en modo WAL) o Redis si REDIS_URL está configurado y responde
+- en cada worker, un filtro de Bloom con todos los jti revocados vigentes:
+  la consulta de un token no revocado (el caso normal) se responde en O(1)
+  sin tocar el almacén; solo un positivo del filtro se confirma en el almacén
+
+El filtro se actualiza de forma incremental con las revocaciones nuevas del
+almacén (SQLite: filas con seq mayor al cursor, Redis: stream de
+revocaciones) y se reconstruye periódicamente para descartar las expiradas.
+
+Uso:
+    from .revocacion_tokens import revocacion_tokens
+
+    revocacion_tokens.revocar(payload['jti'], payload['exp'])   # logout
+    if revocacion_tokens.esta_revocado(payload.get('jti')): ...  # cada request
+
+Configuración (entorno):
+    REVOCACION_BACKEND          auto | sqlite | redis (por defecto auto)
+    REVOCACION_DB               archivo SQLite (por defecto app/revocaciones_tokens.sqlite3)
+    REVOCACION_SINCRONIZACION   segundos entre sincronizaciones del filtro
+                                (por defecto 0.25 con SQLite, 1 con Redis); un
+                                logout se aplica de inmediato en su worker y en
+                                los demás tras a lo más este intervalo
+    REVOCACION_RECONSTRUCCION   segundos entre reconstrucciones completas (3600)
+    REVOCACION_CAPACIDAD        revocaciones vigentes previstas (100000)
+    REVOCACION_TASA_FP          falsos positivos del filtro (0.001)
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RUTA_DB = os.environ.get(
+    'REVOCACION_DB', os.path.join(os.path.dirname(__file__), 'revocaciones_tokens.sqlite3')
+)
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom con doble hashing (Kirsch-Mitzenmacher) sobre hash() de
+    Python, que se calcula una vez por string y queda en caché. hash() varía
+    entre procesos (PYTHONHASHSEED), así que el filtro no se comparte ni se
+    serializa: cada worker lo construye desde el almacén.
+    Sin falsos negativos: si ``clave not in filtro``, la clave nunca se agregó.
+    """
+
+    __slots__ = ('bits', 'm', 'k', 'capacidad', 'elementos', '_mascara')
+
+    def __init__(self, capacidad: int, tasa_fp: float = 0.001):
+        capacidad = max(int(capacidad), 1)
+        optimo = max(64, math.ceil(-capacidad * math.log(tasa_fp) / math.log(2) ** 2))
+        self.k = max(1, round(optimo / capacidad * math.log(2)))
+        # Potencia de 2: la posición sale con una máscara en lugar de un módulo
+        self.m = 1 << (optimo - 1).bit_length()
+        self._mascara = self.m - 1
+        self.bits = bytearray(self.m // 8)
+        self.capacidad = capacidad
+        self.elementos = 0
+
+    def agregar(self, clave: str):
+        bits, mascara = self.bits, self._mascara
+        h = hash(clave)
+        salto = (h >> 32 | h << 32) | 1  # segundo hash: rotación del primero, impar
+        for _ in range(self.k):
+            posicion = h & mascara
+            bits[posicion >> 3] |= 1 << (posicion & 7)
+            h += salto
+        self.elementos += 1
+
+    def __contains__(self, clave: str) -> bool:
+        # Un ausente suele descartarse en la primera o segunda posición
+        bits, mascara = self.bits, self._mascara
+        h = hash(clave)
+        salto = (h >> 32 | h << 32) | 1
+        for _ in range(self.k):
+            posicion = h & mascara
+            if not bits[posicion >> 3] >> (posicion & 7) & 1:
+                return False
+            h += salto
+        return True
+
+    @property
+    def tasa_estimada(self) -> float:
+        """Tasa de falsos positivos con los elementos actuales"""
+        return (1 - math.exp(-self.k * self.elementos / self.m)) ** self.k
+
+
+class AlmacenRevocacion:
+    """
+    Interfaz de los almacenes de revocación. ``expira`` es un timestamp Unix
+    (el claim ``exp`` del token); pasada esa fecha la entrada deja de contar.
+    """
+
+    nombre = 'base'
+    intervalo_sincronizacion = 1.0
+
+    def revocar(self, jti: str, expira: float):
+        raise NotImplementedError
+
+    def esta_revocado(self, jti: str) -> bool:
+        """Consulta exacta (sin falsos positivos)"""
+        raise NotImplementedError
+
+    def cambios_desde(self, cursor) -> Tuple[List[str], object, bool]:
+        """
+        Revocaciones nuevas desde ``cursor`` (None = todas las vigentes).
+
+        Returns:
+            (jtis, nuevo_cursor, completo): ``completo`` indica que ``jtis``
+            es el conjunto completo de revocaciones vigentes y el filtro debe
+            reconstruirse con él
+        """
+        raise NotImplementedError
+
+    def purgar_expirados(self) -> int:
+        return 0
+
+
+class AlmacenRevocacionSQLite(AlmacenRevocacion):
+    """
+    Archivo SQLite compartido por los workers del nodo (modo WAL: las
+    lecturas no bloquean a la escritura de un logout). ``seq`` es
+    AUTOINCREMENT, así que crece en orden de commit y sirve de cursor.
+    """
+
+    nombre = 'sqlite'
+    intervalo_sincronizacion = 0.25
+
+    def __init__(self, ruta: str = None):
+        self.ruta = ruta or RUTA_DB
+        self._local = threading.local()
+        conexion = self._conexion()
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS tokens_revocados ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " jti TEXT NOT NULL UNIQUE,"
+            " expira REAL NOT NULL)"
+        )
+        conexion.execute("CREATE INDEX IF NOT EXISTS ix_tokens_revocados_expira ON tokens_revocados (expira)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Una conexión por hilo y por proceso (las conexiones no sobreviven al fork)"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None or self._local.pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return conexion
+
+    def revocar(self, jti: str, expira: float):
+        self._conexion().execute(
+            "INSERT INTO tokens_revocados (jti, expira) VALUES (?, ?) "
+            "ON CONFLICT (jti) DO UPDATE SET expira = MAX(expira, excluded.expira)",
+            (jti, float(expira))
+        )
+
+    def esta_revocado(self, jti: str) -> bool:
+        fila = self._conexion().execute(
+            "SELECT 1 FROM tokens_revocados WHERE jti = ? AND expira > ?", (jti, time.time())
+        ).fetchone()
+        return fila is not None
+
+    def cambios_desde(self, cursor):
+        conexion = self._conexion()
+        if cursor is None:
+            # Cursor antes del recorrido: lo revocado entremedio se relee después
+            ultimo = conexion.execute("SELECT COALESCE(MAX(seq), 0) FROM tokens_revocados").fetchone()[0]
+            filas = conexion.execute(
+                "SELECT jti FROM tokens_revocados WHERE expira > ?", (time.time(),)
+            ).fetchall()
+            return [jti for jti, in filas], ultimo, True
+
+        filas = conexion.execute(
+            "SELECT seq, jti FROM tokens_revocados WHERE seq > ? ORDER BY seq", (cursor,)
+        ).fetchall()
+        return [jti for _, jti in filas], (filas[-1][0] if filas else cursor), False
+
+    def purgar_expirados(self) -> int:
+        return self._conexion().execute(
+            "DELETE FROM tokens_revocados WHERE expira <= ?", (time.time(),)
+        ).rowcount
+
+
+class AlmacenRevocacionRedis(AlmacenRevocacion):
+    """
+    Una clave por jti con TTL hasta la expiración del token, más un stream
+    con las revocaciones en orden (acotado a MAX_LOG entradas) para la
+    sincronización incremental de los filtros.
+    """
+
+    nombre = 'redis'
+    intervalo_sincronizacion = 1.0
+    MAX_LOG = 100000
+
+    def __init__(self, cliente, prefijo: str = 'agentedigital:revocacion:'):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self.clave_log = f"{prefijo}log"
+
+    def revocar(self, jti: str, expira: float):
+        ttl = max(1, math.ceil(expira - time.time()))
+        pipe = self.cliente.pipeline(transaction=True)
+        pipe.set(f"{self.prefijo}jti:{jti}", 1, ex=ttl)
+        pipe.xadd(self.clave_log, {'jti': jti}, maxlen=self.MAX_LOG, approximate=True)
+        pipe.execute()
+
+    def esta_revocado(self, jti: str) -> bool:
+        return bool(self.cliente.exists(f"{self.prefijo}jti:{jti}"))
+
+    @staticmethod
+    def _id(valor) -> Tuple[int, int]:
+        valor = valor.decode() if isinstance(valor, bytes) else valor
+        milisegundos, _, secuencia = valor.partition('-')
+        return int(milisegundos), int(secuencia or 0)
+
+    def cambios_desde(self, cursor):
+        if cursor is not None:
+            primero = self.cliente.xrange(self.clave_log, '-', '+', count=1)
+            # Si el stream se recortó más allá del cursor se perdieron entradas
+            if not primero or self._id(primero[0][0]) <= self._id(cursor):
+                entradas = self.cliente.xread({self.clave_log: cursor}, count=self.MAX_LOG) or []
+                entradas = entradas[0][1] if entradas else []
+                jtis = [self._texto(campos.get(b'jti', campos.get('jti'))) for _, campos in entradas]
+                return jtis, (self._texto(entradas[-1][0]) if entradas else cursor), False
+
+        # Cursor tomado antes del recorrido: lo revocado durante el SCAN se relee
+        ultimo = self.cliente.xrevrange(self.clave_log, '+', '-', count=1)
+        cursor = self._texto(ultimo[0][0]) if ultimo else '0-0'
+        inicio = len(f"{self.prefijo}jti:")
+        jtis = [self._texto(clave)[inicio:]
+                for clave in self.cliente.scan_iter(match=f"{self.prefijo}jti:*", count=1000)]
+        return jtis, cursor, True
+
+    @staticmethod
+    def _texto(valor) -> str:
+        return valor.decode() if isinstance(valor, bytes) else valor
+
+
+def crear_almacen() -> AlmacenRevocacion:
+    """Almacén según REVOCACION_BACKEND (auto: Redis si REDIS_URL responde, si no SQLite)"""
+    backend = os.environ.get('REVOCACION_BACKEND', 'auto').lower()
+    redis_url = os.environ.get('REDIS_URL')
+
+    if backend in ('auto', 'redis') and REDIS_AVAILABLE and (redis_url or backend == 'redis'):
+        try:
+            cliente = redis.from_url(redis_url or 'redis://localhost:6379/0', socket_timeout=2)
+            cliente.ping()
+            return AlmacenRevocacionRedis(cliente)
+        except Exception as e:
+            logger.warning(f"Redis no disponible para revocación de tokens, se usa SQLite: {e}")
+    elif backend == 'redis':
+        logger.warning("REVOCACION_BACKEND=redis pero el paquete redis no está instalado, se usa SQLite")
+
+    return AlmacenRevocacionSQLite()
+
+
+class RevocacionTokens:
+    """
+    Revocación de tokens del proceso: almacén compartido + filtro de Bloom
+    local. El almacén se abre al primer uso (después del fork de gunicorn).
+    """
+
+    def __init__(self, almacen: Optional[AlmacenRevocacion] = None):
+        self._almacen = almacen
+        self.config = {
+            'SINCRONIZACION': os.environ.get('REVOCACION_SINCRONIZACION'),
+            'RECONSTRUCCION': float(os.environ.get('REVOCACION_RECONSTRUCCION', 3600)),
+            'CAPACIDAD': int(os.environ.get('REVOCACION_CAPACIDAD', 100000)),
+            'TASA_FP': float(os.environ.get('REVOCACION_TASA_FP', 0.001)),
+        }
+        self._intervalo = None
+        self._filtro = None
+        self._cursor = None
+        self._sincronizado = 0.0
+        self._reconstruido = 0.0
+        self._lock = threading.Lock()
+        self._lock_almacen = threading.Lock()
+        self.stats = {
+            'consultas': 0,
+            'descartes_filtro': 0,
+            'confirmados': 0,
+            'falsos_positivos': 0,
+            'revocaciones': 0,
+            'sincronizaciones': 0,
+            'reconstrucciones': 0,
+            'errores': 0,
+        }
+
+    @property
+    def almacen(self) -> AlmacenRevocacion:
+        if self._almacen is None:
+            with self._lock_almacen:
+                if self._almacen is None:
+                    self._almacen = crear_almacen()
+                    logger.info(f"Revocación de tokens con almacén {self._almacen.nombre}")
+        return self._almacen
+
+    def _sincronizar(self, forzar_reconstruccion: bool = False):
+        """Trae las revocaciones nuevas al filtro; reconstruye si toca"""
+        ahora = time.time()
+        if not self._lock.acquire(blocking=self._filtro is None):
+            return  # otro hilo está sincronizando: se usa el filtro actual
+        try:
+            if self._intervalo is None:
+                configurado = self.config['SINCRONIZACION']
+                self._intervalo = (float(configurado) if configurado is not None
+                                   else self.almacen.intervalo_sincronizacion)
+            filtro = self._filtro
+            reconstruir = (forzar_reconstruccion or filtro is None
+                           or ahora - self._reconstruido >= self.config['RECONSTRUCCION']
+                           or filtro.elementos > filtro.capacidad)
+            if reconstruir:
+                self.almacen.purgar_expirados()
+            jtis, cursor, completo = self.almacen.cambios_desde(None if reconstruir else self._cursor)
+
+            if completo:
+                nuevo = FiltroBloom(max(self.config['CAPACIDAD'], 2 * len(jtis)), self.config['TASA_FP'])
+                for jti in jtis:
+                    nuevo.agregar(jti)
+                self._filtro = nuevo
+                self._reconstruido = ahora
+                self.stats['reconstrucciones'] += 1
+            else:
+                for jti in jtis:
+                    filtro.agregar(jti)
+            self._cursor = cursor
+            self._sincronizado = ahora
+            self.stats['sincronizaciones'] += 1
+        except Exception as e:
+            # Se conserva el filtro anterior; se reintenta en la próxima consulta
+            self.stats['errores'] += 1
+            logger.error(f"Error sincronizando revocaciones de tokens: {e}")
+            if self._filtro is None:
+                self._filtro = FiltroBloom(self.config['CAPACIDAD'], self.config['TASA_FP'])
+                self._intervalo = self._intervalo or AlmacenRevocacion.intervalo_sincronizacion
+        finally:
+            self._lock.release()
+
+    def esta_revocado(self, jti: Optional[str]) -> bool:
+        """True si el token con este jti fue revocado y aún no expira"""
+        if not jti:
+            return False
+        filtro = self._filtro
+        if filtro is None or time.time() - self._sincronizado >= self._intervalo:
+            self._sincronizar()
+            filtro = self._filtro
+
+        self.stats['consultas'] += 1
+        if jti not in filtro:
+            self.stats['descartes_filtro'] += 1
+            return False
+
+        try:
+            revocado = self.almacen.esta_revocado(jti)
+        except Exception as e:
+            # Ante la duda, un positivo del filtro se trata como revocado
+            self.stats['errores'] += 1
+            logger.error(f"Error consultando revocación de token: {e}")
+            return True
+        self.stats['confirmados' if revocado else 'falsos_positivos'] += 1
+        return revocado
+
+    def revocar(self, jti: Optional[str], expira: Optional[float]) -> bool:
+        """
+        Revoca el token hasta su expiración (claim ``exp``). Retorna False si
+        no tiene jti o ya expiró (no hace falta guardarlo).
+        """
+        if not jti or not expira or float(expira) <= time.time():
+            return False
+        self.almacen.revocar(jti, float(expira))
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.agregar(jti)
+        self.stats['revocaciones'] += 1
+        return True
+
+    def get_stats(self):
+        filtro = self._filtro
+        return {
+            **self.stats,
+            'almacen': self._almacen.nombre if self._almacen else None,
+            'filtro_elementos': filtro.elementos if filtro else 0,
+            'filtro_bytes': len(filtro.bits) if filtro else 0,
+            'filtro_tasa_fp': filtro.tasa_estimada if filtro else 0.0,
+        }
+
+
+# Instancia global
+revocacion_tokens = RevocacionTokens()
+
+
+def token_revocado(payload: dict) -> bool:
+    """True si el payload decodificado corresponde a un token revocado"""
+    return revocacion_tokens.esta_revocado(payload.get('jti'))
@@ -12,6 +12,7 @@ auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import Config
+from .revocacion_tokens import revocacion_tokens, token_revocado
 
 # Usar la configuración centralizada
 config = Config()
@@ -46,7 +47,8 @@ def login():
             'nombre': 'Usuario Administrador',
             'rol': 'Administrador',  # Por defecto para pruebas
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24),
-            'iat': datetime.datetime.utcnow()
+            'iat': datetime.datetime.utcnow(),
+            'jti': os.urandom(16).hex()  # Permite revocar el token en el logout
         }
         
         token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
@@ -74,6 +76,8 @@ def verify_token():
     try:
         token = auth_header.split(' ')[1]  # Bearer TOKEN
         payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        if token_revocado(payload):
+            return jsonify({"valid": False, "error": "Token revoked"}), 401
         return jsonify({
             "valid": True,
             "username": payload.get('username'),
@@ -88,5 +92,12 @@ def verify_token():
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
-    """Endpoint de logout (principalmente para el cliente)"""
+    """Endpoint de logout: revoca el token en todos los workers hasta su expiración"""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        try:
+            payload = jwt.decode(auth_header[7:], SECRET_KEY, algorithms=['HS256'])
+            revocacion_tokens.revocar(payload.get('jti'), payload.get('exp'))
+        except jwt.InvalidTokenError:
+            pass  # Token expirado o inválido: no hay nada que revocar
     return jsonify({"message": "Logout exitoso"}), 200
\ No newline at end of file
@@ -107,8 +107,9 @@ class ScalabilityManager:
         @app.teardown_appcontext
         def teardown_db(error):
             """Limpiar recursos después del request"""
-            # El connection pooling maneja automáticamente las conexiones
-            pass
+            # Libera la conexión compartida del request (idempotente si ya se liberó)
+            from .db_request_scope import liberar_conexion_request
+            liberar_conexion_request(error)
     
     def _register_monitoring_endpoints(self, app: Flask):
         """Registrar endpoints de monitoreo y métricas"""
@@ -163,6 +164,13 @@ class ScalabilityManager:
                 except Exception as e:
                     metrics['query_optimizer'] = {'error': str(e)}
                 
+                # Huellas SQL por request: lentas, frecuentes y candidatas N+1
+                try:
+                    from .query_monitor import monitor_consultas
+                    metrics['sql'] = monitor_consultas.get_stats(int(request.args.get('top', 10)))
+                except Exception as e:
+                    metrics['sql'] = {'error': str(e)}
+                
                 return jsonify(metrics)
                 
             except Exception as e:
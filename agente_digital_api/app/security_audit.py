@@ -496,6 +496,33 @@ def get_audit_manager() -> AuditManager:
         init_audit_system()
     return _audit_manager
 
+def limpiar_logs_antiguos(dias_retencion: int = None) -> Dict[str, Any]:
+    """Elimina los respaldos rotados del log de auditoría (security_audit.log.N) más antiguos que la retención"""
+    dias_retencion = dias_retencion or int(os.environ.get('AUDIT_LOG_RETENCION_DIAS', 90))
+    log_file = os.environ.get('AUDIT_LOG_FILE', '/home/agentedigital/logs/security_audit.log')
+    log_dir, base = os.path.split(log_file)
+    limite = time.time() - dias_retencion * 24 * 60 * 60
+    resultado = {'archivos_eliminados': 0, 'bytes_liberados': 0, 'errores': []}
+    
+    if not os.path.isdir(log_dir):
+        return resultado
+    
+    for nombre in os.listdir(log_dir):
+        # El log activo no se toca; solo sus respaldos rotados
+        if not nombre.startswith(base + '.'):
+            continue
+        ruta = os.path.join(log_dir, nombre)
+        try:
+            stat = os.stat(ruta)
+            if stat.st_mtime < limite:
+                os.remove(ruta)
+                resultado['archivos_eliminados'] += 1
+                resultado['bytes_liberados'] += stat.st_size
+        except OSError as e:
+            resultado['errores'].append(f"{nombre}: {e}")
+    
+    return resultado
+
 def cleanup_audit_system():
     """Limpiar sistema de auditoría al cerrar aplicación"""
     if _audit_manager:
@@ -0,0 +1,226 @@
+# app/tareas_mantenimiento.py
+# Tareas de mantenimiento registradas en el planificador
+"""
+Cada tarea envuelve una rutina de limpieza existente y la registra en
+app/planificador_tareas.py con su programación y su tipo de bloqueo:
+
+- 'archivo': archivos locales del nodo (un worker por nodo)
+- 'bd':      cambios en la base de datos (un proceso en todo el cluster)
+- None:      estado en memoria de cada worker (sesiones MFA)
+
+Las programaciones se pueden sobreescribir con TAREA_<NOMBRE>_CRON, por
+ejemplo TAREA_ARCHIVOS_HUERFANOS_CRON="0 2 * * 0".
+"""
+
+import os
+
+# nombre: (cron por defecto, bloqueo, max_segundos, descripción)
+PROGRAMACION = {
+    'evidencias_temporales': ('15 3 * * *', 'archivo', 300,
+                              'Temporales de evidencias de incidentes (GestorEvidencias)'),
+    'archivos_temporales': ('*/30 * * * *', 'archivo', 120,
+                            'Temporales del gestor de archivos (FileManager)'),
+    'taxonomias_huerfanas': ('30 3 * * *', 'bd', 300,
+                             'Taxonomías de incidentes sin incidente asociado'),
+    'archivos_huerfanos': ('0 4 * * *', 'archivo', 600,
+                           'Archivos de incidentes en disco sin registro en BD, por lotes'),
+    'sesiones_mfa': ('*/5 * * * *', None, 60,
+                     'Sesiones MFA expiradas en memoria del worker'),
+    'logs_auditoria': ('0 5 * * *', 'archivo', 120,
+                       'Respaldos rotados del log de auditoría fuera de retención'),
+    'contadores_dashboard': ('0 2 * * *', 'bd', 900,
+                             'Reconciliación de contadores del dashboard por empresa'),
+    'purga_incidentes': ('*/5 * * * *', 'bd', 240,
+                         'Purga por lotes de incidentes eliminados y sus archivos'),
+    'contadores_incidentes': ('15 2 * * *', 'bd', 900,
+                              'Reconciliación de estadísticas por incidente, con reporte de desvíos'),
+    'paquetes_evidencias': ('45 * * * *', 'archivo', 120,
+                            'Paquetes ZIP de evidencias guardados para reanudar descargas'),
+}
+
+LOTE_INCIDENTES_HUERFANOS = 50
+
+
+def tarea_evidencias_temporales(ctx):
+    from .modules.incidentes.gestor_evidencias import GestorEvidencias
+    dias = int(os.environ.get('EVIDENCIAS_TEMPORALES_DIAS', 7))
+    return GestorEvidencias().limpiar_archivos_temporales(dias)
+
+
+def tarea_archivos_temporales(ctx):
+    from .file_manager import get_file_manager
+    gestor = get_file_manager()
+    if gestor is None:
+        return {'omitida': 'FileManager no inicializado'}
+    gestor.cleanup_temp_files()
+    return {'ok': True}
+
+
+def tarea_taxonomias_huerfanas(ctx):
+    from .modules.incidentes.gestor_taxonomias import GestorTaxonomias
+    return GestorTaxonomias().limpiar_taxonomias_huerfanas()
+
+
+def tarea_archivos_huerfanos(ctx):
+    """
+    Recorre uploads una sola vez, agrupa por incidente y verifica los
+    incidentes en orden de ID desde el checkpoint. Por defecto solo cuenta
+    los huérfanos; LIMPIEZA_HUERFANOS_ELIMINAR=true los elimina.
+    """
+    from .modules.admin.limpiador_archivos_huerfanos import LimpiadorArchivosHuerfanos
+
+    eliminar = os.environ.get('LIMPIEZA_HUERFANOS_ELIMINAR', 'false').lower() == 'true'
+    por_incidente = LimpiadorArchivosHuerfanos.archivos_por_incidente()
+    desde = ctx.checkpoint.get('ultimo_incidente', 0)
+    pendientes = sorted(i for i in por_incidente if i > desde)
+
+    acumulado = ctx.checkpoint.get('acumulado') or {
+        'incidentes': 0, 'archivos_verificados': 0, 'archivos_huerfanos': 0, 'archivos_eliminados': 0, 'errores': 0
+    }
+    for posicion, incidente_id in enumerate(pendientes, 1):
+        r = LimpiadorArchivosHuerfanos.limpiar_archivos_huerfanos_masivo(
+            incidente_id, archivos=por_incidente[incidente_id], eliminar=eliminar
+        )
+        acumulado['incidentes'] += 1
+        for clave in ('archivos_verificados', 'archivos_huerfanos', 'archivos_eliminados'):
+            acumulado[clave] += r[clave]
+        acumulado['errores'] += len(r['errores'])
+
+        if posicion % LOTE_INCIDENTES_HUERFANOS == 0 or posicion == len(pendientes):
+            ctx.guardar_checkpoint({'ultimo_incidente': incidente_id, 'acumulado': acumulado})
+            ctx.progreso(posicion, len(pendientes), f"incidente {incidente_id}")
+            if ctx.debe_detenerse():
+                break
+
+    return {**acumulado, 'eliminar': eliminar}
+
+
+def tarea_sesiones_mfa(ctx):
+    from . import mfa
+    if mfa._mfa_system is None:
+        return {'omitida': 'MFA no inicializado en este worker'}
+    sesiones = mfa._mfa_system.session_manager.sessions
+    antes = len(sesiones)
+    mfa._mfa_system.session_manager.cleanup_expired_sessions()
+    return {'sesiones_eliminadas': antes - len(sesiones)}
+
+
+def tarea_logs_auditoria(ctx):
+    from .security_audit import limpiar_logs_antiguos
+    return limpiar_logs_antiguos()
+
+
+def tarea_contadores_dashboard(ctx):
+    from .database import crear_conexion
+    from .modules.admin.contadores_dashboard import contadores_disponibles, reconciliar_contadores
+
+    conn = crear_conexion()
+    try:
+        cursor = conn.cursor()
+        if not contadores_disponibles(cursor):
+            return {'omitida': 'contadores de dashboard no instalados'}
+        resumen = reconciliar_contadores(cursor)
+        conn.commit()
+        return resumen
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def tarea_contadores_incidentes(ctx):
+    from .database import crear_conexion
+    from .modules.admin.contadores_incidente import (
+        contadores_incidente_disponibles, reconciliar_contadores_incidente
+    )
+
+    conn = crear_conexion()
+    try:
+        cursor = conn.cursor()
+        if not contadores_incidente_disponibles(cursor):
+            return {'omitida': 'contadores por incidente no instalados'}
+        resumen = reconciliar_contadores_incidente(cursor)
+        conn.commit()
+        resumen['corregidos'] = len(resumen['corregidos'])
+        return resumen
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def tarea_paquetes_evidencias(ctx):
+    from .modules.admin.paquete_evidencias import limpiar_paquetes
+    return limpiar_paquetes()
+
+
+def tarea_purga_incidentes(ctx):
+    """
+    Purga lotes de incidentes vencidos (una transacción por lote) hasta
+    vaciar la cola o agotar el tiempo, y después la cola de archivos.
+    """
+    from .database import crear_conexion
+    from .modules.admin import eliminacion_incidentes as eliminacion
+
+    conn = crear_conexion()
+    try:
+        cursor = conn.cursor()
+        if not eliminacion.eliminacion_diferida_disponible(cursor):
+            return {'omitida': 'eliminación diferida de incidentes no instalada'}
+        tablas = eliminacion.tablas_existentes(
+            cursor, [t for t, _ in eliminacion.CASCADA] + [t for t, _ in eliminacion.FUENTES_ARCHIVOS]
+        )
+        acumulado = ctx.checkpoint.get('acumulado') or {
+            'incidentes': 0, 'filas': 0, 'archivos_encolados': 0, 'archivos_eliminados': 0, 'errores_archivos': 0
+        }
+
+        while not ctx.debe_detenerse():
+            lote = eliminacion.purgar_lote(cursor, tablas=tablas)
+            conn.commit()
+            if not lote['incidentes']:
+                break
+            acumulado['incidentes'] += len(lote['incidentes'])
+            acumulado['filas'] += sum(lote['filas'].values())
+            acumulado['archivos_encolados'] += lote['archivos_encolados']
+            ctx.guardar_checkpoint({'ultimo_incidente': lote['incidentes'][-1], 'acumulado': acumulado})
+            ctx.progreso(acumulado['incidentes'], None, f"lote hasta incidente {lote['incidentes'][-1]}")
+
+        while not ctx.debe_detenerse():
+            archivos = eliminacion.purgar_archivos(cursor)
+            conn.commit()
+            acumulado['archivos_eliminados'] += archivos['procesados']
+            acumulado['errores_archivos'] += archivos['errores']
+            if archivos['procesados'] + archivos['errores'] < eliminacion.LOTE_ARCHIVOS:
+                break
+
+        return acumulado
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+TAREAS = {
+    'evidencias_temporales': tarea_evidencias_temporales,
+    'archivos_temporales': tarea_archivos_temporales,
+    'taxonomias_huerfanas': tarea_taxonomias_huerfanas,
+    'archivos_huerfanos': tarea_archivos_huerfanos,
+    'sesiones_mfa': tarea_sesiones_mfa,
+    'logs_auditoria': tarea_logs_auditoria,
+    'contadores_dashboard': tarea_contadores_dashboard,
+    'purga_incidentes': tarea_purga_incidentes,
+    'contadores_incidentes': tarea_contadores_incidentes,
+    'paquetes_evidencias': tarea_paquetes_evidencias,
+}
+
+
+def registrar_tareas_mantenimiento(planificador):
+    """Registra las tareas de mantenimiento en el planificador"""
+    for nombre, funcion in TAREAS.items():
+        cron, bloqueo, max_segundos, descripcion = PROGRAMACION[nombre]
+        cron = os.environ.get(f"TAREA_{nombre.upper()}_CRON", cron)
+        planificador.registrar(nombre, funcion, cron, descripcion, bloqueo, max_segundos)
+    return planificador
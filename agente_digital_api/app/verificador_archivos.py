@@ -0,0 +1,172 @@
+# app/verificador_archivos.py
+# Verificación de archivos físicos en lote
+"""
+Servicio compartido para verificar archivos de evidencia referenciados en
+la BD o en el JSON de los incidentes.
+
+- ``estados``/``existen`` hacen un os.stat por ruta en un pool de hilos: en
+  el almacenamiento de uploads montado por red cada stat es un viaje de ida
+  y vuelta, y en paralelo el lote cuesta lo que el más lento.
+- ``hash_archivo``/``hashes`` memorizan el hash por (ruta, mtime, tamaño):
+  solo se vuelve a leer el archivo si cambió.
+- ``eliminar`` borra un lote de archivos en el mismo pool (purga de
+  incidentes eliminados).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE_HASH = 1024 * 1024
+
+
+class EstadoArchivo(NamedTuple):
+    """Resultado del stat de una ruta"""
+    ruta: str
+    existe: bool
+    tamano: int = 0
+    mtime_ns: int = 0
+    error: Optional[str] = None
+
+
+class VerificadorArchivos:
+    """Stat en paralelo y hashes memorizados por (ruta, mtime, tamaño)"""
+
+    def __init__(self, max_hilos: int = None, max_hashes: int = 20000):
+        self.max_hilos = max_hilos or int(os.environ.get('VERIFICADOR_ARCHIVOS_HILOS', 16))
+        self.max_hashes = max_hashes
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._hashes = OrderedDict()   # {(ruta, algoritmo): (mtime_ns, tamano, hash)}
+        self._hashes_lock = threading.Lock()
+        self.stats = {'stats': 0, 'lotes': 0, 'hashes_calculados': 0, 'hashes_cache': 0}
+
+    def _ejecutor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_hilos,
+                                                    thread_name_prefix='verificador_archivos')
+        return self._pool
+
+    def _en_paralelo(self, funcion, rutas: List[str]) -> List:
+        # Un solo archivo no justifica pasar por el pool
+        if len(rutas) <= 1:
+            return [funcion(ruta) for ruta in rutas]
+        self.stats['lotes'] += 1
+        return list(self._ejecutor().map(funcion, rutas))
+
+    @staticmethod
+    def _unicas(rutas: Iterable[str]) -> List[str]:
+        return list(dict.fromkeys(ruta for ruta in rutas if ruta))
+
+    # ------------------------------------------------------------------
+    # Existencia, tamaño y fecha de modificación
+    # ------------------------------------------------------------------
+
+    def estado(self, ruta: str) -> EstadoArchivo:
+        self.stats['stats'] += 1
+        try:
+            st = os.stat(ruta)
+        except FileNotFoundError:
+            return EstadoArchivo(ruta, False)
+        except OSError as e:
+            return EstadoArchivo(ruta, False, error=str(e))
+        return EstadoArchivo(ruta, True, st.st_size, st.st_mtime_ns)
+
+    def estados(self, rutas: Iterable[str]) -> Dict[str, EstadoArchivo]:
+        """Estado de cada ruta (sin repetir las duplicadas ni las vacías)"""
+        unicas = self._unicas(rutas)
+        return dict(zip(unicas, self._en_paralelo(self.estado, unicas)))
+
+    def existen(self, rutas: Iterable[str]) -> Dict[str, bool]:
+        return {ruta: estado.existe for ruta, estado in self.estados(rutas).items()}
+
+    def eliminar_archivo(self, ruta: str) -> Optional[str]:
+        """Elimina el archivo; None si se eliminó o ya no existía, si no el error"""
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            return str(e)
+        return None
+
+    def eliminar(self, rutas: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Elimina un lote de archivos en paralelo: {ruta: None | error}"""
+        unicas = self._unicas(rutas)
+        return dict(zip(unicas, self._en_paralelo(self.eliminar_archivo, unicas)))
+
+    def listar_carpeta(self, carpeta: str) -> List[str]:
+        """Rutas completas de los archivos bajo ``carpeta`` (vacío si no existe)"""
+        archivos = []
+        for raiz, _, nombres in os.walk(carpeta):
+            archivos.extend(os.path.join(raiz, nombre) for nombre in nombres)
+        return archivos
+
+    # ------------------------------------------------------------------
+    # Hashes
+    # ------------------------------------------------------------------
+
+    def hash_archivo(self, ruta: str, algoritmo: str = 'md5',
+                     estado: EstadoArchivo = None) -> Optional[str]:
+        """Hash del archivo, o None si no existe. Se recalcula solo si cambió."""
+        estado = estado or self.estado(ruta)
+        if not estado.existe:
+            return None
+
+        clave = (ruta, algoritmo)
+        with self._hashes_lock:
+            memorizado = self._hashes.get(clave)
+            if memorizado and memorizado[0] == estado.mtime_ns and memorizado[1] == estado.tamano:
+                self._hashes.move_to_end(clave)
+                self.stats['hashes_cache'] += 1
+                return memorizado[2]
+
+        h = hashlib.new(algoritmo)
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(TAMANO_BLOQUE_HASH), b''):
+                h.update(bloque)
+        digest = h.hexdigest()
+        self.stats['hashes_calculados'] += 1
+
+        with self._hashes_lock:
+            self._hashes[clave] = (estado.mtime_ns, estado.tamano, digest)
+            self._hashes.move_to_end(clave)
+            while len(self._hashes) > self.max_hashes:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def hashes(self, rutas: Iterable[str], algoritmo: str = 'md5') -> Dict[str, Optional[str]]:
+        def calcular(ruta):
+            try:
+                return self.hash_archivo(ruta, algoritmo)
+            except OSError as e:
+                logger.warning(f"No se pudo calcular el hash de {ruta}: {e}")
+                return None
+
+        unicas = self._unicas(rutas)
+        return dict(zip(unicas, self._en_paralelo(calcular, unicas)))
+
+    def verificar_integridad(self, esperados: Dict[str, str], algoritmo: str = 'md5') -> Dict[str, bool]:
+        """{ruta: hash_esperado} -> {ruta: coincide}. Un archivo inexistente no coincide."""
+        actuales = self.hashes(esperados.keys(), algoritmo)
+        return {
+            ruta: bool(esperado) and actuales.get(ruta) == esperado.lower()
+            for ruta, esperado in esperados.items()
+        }
+
+    def get_stats(self) -> Dict:
+        with self._hashes_lock:
+            memorizados = len(self._hashes)
+        return {**self.stats, 'hashes_memorizados': memorizados, 'max_hilos': self.max_hilos}
+
+
+# Instancia global
+verificador_archivos = VerificadorArchivos()
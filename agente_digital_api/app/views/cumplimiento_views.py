@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify, request
 from ..db_validator import db_validator
 from ..error_handlers import robust_endpoint, ErrorResponse
 from ..database import get_db_connection
+from ..json_rapido import filas_a_dicts
 from datetime import datetime
 
 cumplimiento_bp = Blueprint('cumplimiento_api', __name__, url_prefix='/api/admin/empresas')
@@ -133,9 +134,7 @@ def get_cumplimientos_empresa(empresa_id):
                 ORDER BY ObligacionID
             """, (empresa_id,))
             
-            rows = cursor.fetchall()
-            columns = [column[0] for column in cursor.description]
-            cumplimientos = [dict(zip(columns, row)) for row in rows]
+            cumplimientos = filas_a_dicts(cursor)
             
             return jsonify(cumplimientos)
             
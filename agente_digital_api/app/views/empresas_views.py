@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify, request
 from ..db_validator import db_validator
 from ..error_handlers import robust_endpoint, ErrorResponse
 from ..database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from datetime import datetime
 
 empresas_bp = Blueprint('empresas_api', __name__, url_prefix='/api/admin/empresas')
@@ -98,10 +99,14 @@ def get_dashboard_stats(empresa_id):
         # Solo obtener datos si las tablas existen
         if db_validator.table_exists(cursor, 'Incidentes'):
             try:
-                cursor.execute("SELECT COUNT(*) FROM Incidentes WHERE EmpresaID = ?", (empresa_id,))
+                vigentes = filtro_no_eliminados(cursor)
+                cursor.execute(f"SELECT COUNT(*) FROM Incidentes WHERE EmpresaID = ? AND {vigentes}", (empresa_id,))
                 stats['total_incidentes'] = cursor.fetchone()[0]
                 
-                cursor.execute("SELECT COUNT(*) FROM Incidentes WHERE EmpresaID = ? AND EstadoActual = 'Abierto'", (empresa_id,))
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM Incidentes WHERE EmpresaID = ? AND EstadoActual = 'Abierto' AND {vigentes}",
+                    (empresa_id,)
+                )
                 stats['incidentes_abiertos'] = cursor.fetchone()[0]
             except:
                 pass  # Mantener valores por defecto
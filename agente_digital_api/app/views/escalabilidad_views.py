@@ -0,0 +1,39 @@
+# views/escalabilidad_views.py
+# Métricas de consultas SQL por huella (app/query_monitor.py) para administradores
+
+import time
+
+from flask import Blueprint, current_app, jsonify, request
+
+from ..auth_utils import admin_required
+from ..query_monitor import monitor_consultas
+
+escalabilidad_bp = Blueprint('escalabilidad', __name__, url_prefix='/api/scalability')
+
+MAX_TOP = 100
+
+
+def _consultas_lentas(top):
+    """get_slow_queries de query_optimizer; sin SQLAlchemy, solo las huellas del monitor"""
+    try:
+        from ..query_optimizer import get_slow_queries
+    except ImportError:
+        return {
+            f"sql:{stats['fingerprint']}": stats
+            for stats in monitor_consultas.top(top, 'total_time')
+            if stats['avg_time'] > monitor_consultas.umbral_lenta or stats['slow_queries'] > 0
+        }
+    return get_slow_queries(top=top)
+
+
+@escalabilidad_bp.route('', methods=['GET'])
+@admin_required
+def metricas_escalabilidad(current_user_id, current_user_rol, current_user_email, current_user_nombre):
+    """Consultas más lentas, más frecuentes y candidatas a N+1 (?top=N, máximo 100)"""
+    top = max(1, min(request.args.get('top', 10, type=int), MAX_TOP))
+    return jsonify({
+        'timestamp': time.time(),
+        'conexion_por_request': current_app.config.get('DB_CONEXION_POR_REQUEST', False),
+        'consultas': monitor_consultas.get_stats(top),
+        'consultas_lentas': _consultas_lentas(top),
+    })
@@ -8,6 +8,7 @@ automáticamente a cambios en taxonomías y configuración ANCI.
 
 from flask import Blueprint, request, jsonify
 from app.database import get_db_connection
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from app.utils.auth import login_required
 from app.utils.error_handlers import robust_endpoint
 import json
@@ -387,11 +388,11 @@ def cargar_formulario_dinamico(empresa_id, incidente_id):
         cursor = conn.cursor()
         
         # Obtener datos del incidente
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT i.*, e.TipoEmpresa
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ? AND i.EmpresaID = ?
+            WHERE i.IncidenteID = ? AND i.EmpresaID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (incidente_id, empresa_id))
         
         incidente = cursor.fetchone()
@@ -6,6 +6,10 @@ from werkzeug.utils import secure_filename
 import json
 import io
 from ..modules.core.database import get_db_connection
+from ..modules.estado_documental import (
+    obtener_estado_documental, invalidar_estado_documental,
+    calcular_metricas, construir_alertas
+)
 
 gestion_documental_bp = Blueprint('gestion_documental', __name__, url_prefix='/api/gestion-documental')
 
@@ -204,23 +208,16 @@ def obtener_carpetas(empresa_id):
         rut_empresa = result.RUT
         base_path = os.path.join(UPLOAD_FOLDER, f"CLIENTE_{rut_empresa}")
         
+        # Conteos de todas las carpetas desde el estado documental (una consulta)
+        estado = obtener_estado_documental(cursor, empresa_id)
         carpetas_con_stats = []
         
         for carpeta in ESTRUCTURA_CARPETAS:
-            # Contar documentos por carpeta
-            query = """
-                SELECT COUNT(*) as archivos, 
-                       SUM(CASE WHEN FechaVencimiento < GETDATE() THEN 1 ELSE 0 END) as vencidos,
-                       SUM(CASE WHEN FechaVencimiento BETWEEN GETDATE() AND DATEADD(day, 30, GETDATE()) THEN 1 ELSE 0 END) as por_vencer
-                FROM DOCUMENTOS_ANCI
-                WHERE EmpresaID = ? AND CarpetaID = ?
-            """
-            cursor.execute(query, empresa_id, carpeta['id'])
-            stats = cursor.fetchone()
+            stats = estado['carpetas'].get(carpeta['id'])
             
             carpeta_info = carpeta.copy()
-            carpeta_info['archivos'] = stats.archivos if stats else 0
-            carpeta_info['alertas'] = (stats.vencidos + stats.por_vencer) if stats else 0
+            carpeta_info['archivos'] = stats['archivos'] if stats else 0
+            carpeta_info['alertas'] = (stats['vencidos'] + stats['por_vencer']) if stats else 0
             
             carpetas_con_stats.append(carpeta_info)
         
@@ -355,6 +352,7 @@ def subir_documento(empresa_id):
             ) VALUES (SCOPE_IDENTITY(), 'CREAR', ?, GETDATE(), ?)
         """, ('Sistema', f'Documento subido: {filename}'))
         conn.commit()
+        invalidar_estado_documental(empresa_id)
         
         conn.close()
         
@@ -499,49 +497,9 @@ def obtener_metricas(empresa_id):
     try:
         cursor = conn.cursor()
         
-        # Métricas generales
-        query = """
-            SELECT 
-                COUNT(DISTINCT CarpetaID) as carpetas_con_docs,
-                COUNT(*) as total_documentos,
-                SUM(CASE WHEN FechaVencimiento < GETDATE() THEN 1 ELSE 0 END) as documentos_vencidos,
-                SUM(CASE WHEN FechaVencimiento BETWEEN GETDATE() AND DATEADD(day, 30, GETDATE()) THEN 1 ELSE 0 END) as proximos_vencer,
-                SUM(CASE WHEN FechaVencimiento IS NULL OR FechaVencimiento > DATEADD(day, 30, GETDATE()) THEN 1 ELSE 0 END) as documentos_vigentes
-            FROM DOCUMENTOS_ANCI
-            WHERE EmpresaID = ? AND Activo = 1
-        """
-        cursor.execute(query, empresa_id)
-        result = cursor.fetchone()
-        
-        if result:
-            carpetas_con_docs = result.carpetas_con_docs or 0
-            total_documentos = result.total_documentos or 0
-            documentos_vencidos = result.documentos_vencidos or 0
-            proximos_vencer = result.proximos_vencer or 0
-            documentos_vigentes = result.documentos_vigentes or 0
-        else:
-            carpetas_con_docs = 0
-            total_documentos = 0
-            documentos_vencidos = 0
-            proximos_vencer = 0
-            documentos_vigentes = 0
-        
-        # Calcular cumplimiento global
-        carpetas_requeridas = len([c for c in ESTRUCTURA_CARPETAS if c['requerido']])
-        cumplimiento_global = int((carpetas_con_docs / carpetas_requeridas * 100)) if carpetas_requeridas > 0 else 0
-        
-        # Contar alertas críticas
-        alertas_criticas = documentos_vencidos
-        
-        metricas = {
-            'cumplimientoGlobal': cumplimiento_global,
-            'alertasCriticas': alertas_criticas,
-            'proximosVencimientos': proximos_vencer,
-            'documentosActualizados': documentos_vigentes,
-            'totalDocumentos': total_documentos,
-            'carpetasConDocumentos': carpetas_con_docs,
-            'carpetasRequeridas': carpetas_requeridas
-        }
+        # Métricas generales desde el estado documental
+        estado = obtener_estado_documental(cursor, empresa_id)
+        metricas = calcular_metricas(estado, ESTRUCTURA_CARPETAS)
         
         conn.close()
         return jsonify(metricas), 200
@@ -559,80 +517,13 @@ def obtener_alertas(empresa_id):
     
     try:
         cursor = conn.cursor()
-        alertas = []
-        
-        # Alertas de documentos vencidos
-        query_vencidos = """
-            SELECT 
-                d.DocumentoID, d.NombreArchivo, d.FechaVencimiento, d.CarpetaID,
-                c.nombre as CarpetaNombre
-            FROM DOCUMENTOS_ANCI d
-            JOIN (VALUES %s) c(id, codigo, nombre) ON d.CarpetaID = c.id
-            WHERE d.EmpresaID = ? AND d.Activo = 1 
-            AND d.FechaVencimiento < GETDATE()
-        """ % ','.join([f"({c['id']}, '{c['codigo']}', '{c['nombre']}')" for c in ESTRUCTURA_CARPETAS])
-        
-        cursor.execute(query_vencidos, empresa_id)
         
-        for row in cursor.fetchall():
-            alertas.append({
-                'id': f"vencido_{row.DocumentoID}",
-                'tipo': 'critica',
-                'titulo': 'Documento Vencido',
-                'mensaje': f"El documento '{row.NombreArchivo}' en {row.CarpetaNombre} venció el {row.FechaVencimiento.strftime('%d/%m/%Y')}",
-                'fecha': row.FechaVencimiento.isoformat(),
-                'carpeta_id': row.CarpetaID
-            })
-        
-        # Alertas de documentos por vencer
-        query_por_vencer = """
-            SELECT 
-                d.DocumentoID, d.NombreArchivo, d.FechaVencimiento, d.CarpetaID,
-                DATEDIFF(day, GETDATE(), d.FechaVencimiento) as dias_restantes
-            FROM DOCUMENTOS_ANCI d
-            WHERE d.EmpresaID = ? AND d.Activo = 1 
-            AND d.FechaVencimiento BETWEEN GETDATE() AND DATEADD(day, 30, GETDATE())
-        """
-        
-        cursor.execute(query_por_vencer, empresa_id)
-        
-        for row in cursor.fetchall():
-            tipo_alerta = 'alta' if row.dias_restantes <= 7 else 'media'
-            alertas.append({
-                'id': f"por_vencer_{row.DocumentoID}",
-                'tipo': tipo_alerta,
-                'titulo': 'Documento Por Vencer',
-                'mensaje': f"El documento '{row.NombreArchivo}' vence en {row.dias_restantes} días",
-                'fecha': datetime.now().isoformat(),
-                'carpeta_id': row.CarpetaID
-            })
-        
-        # Alertas de carpetas sin documentos requeridos
-        query_carpetas_vacias = """
-            SELECT COUNT(*) FROM DOCUMENTOS_ANCI 
-            WHERE EmpresaID = ? AND CarpetaID = ? AND Activo = 1
-        """
-        
-        for carpeta in ESTRUCTURA_CARPETAS:
-            if carpeta['requerido']:
-                cursor.execute(query_carpetas_vacias, empresa_id, carpeta['id'])
-                count = cursor.fetchone()[0]
-                if count == 0:
-                    alertas.append({
-                        'id': f"carpeta_vacia_{carpeta['id']}",
-                        'tipo': 'media',
-                        'titulo': 'Carpeta Requerida Vacía',
-                        'mensaje': f"La carpeta '{carpeta['nombre']}' es obligatoria y no contiene documentos",
-                        'fecha': datetime.now().isoformat(),
-                        'carpeta_id': carpeta['id']
-                    })
-        
-        # Ordenar alertas por tipo (crítica > alta > media)
-        orden_tipo = {'critica': 0, 'alta': 1, 'media': 2, 'baja': 3}
-        alertas.sort(key=lambda x: orden_tipo.get(x['tipo'], 99))
+        # Vencidos, por vencer y carpetas requeridas vacías desde el estado documental
+        estado = obtener_estado_documental(cursor, empresa_id)
+        alertas = construir_alertas(estado, ESTRUCTURA_CARPETAS)
         
         conn.close()
-        return jsonify(alertas[:20]), 200  # Limitar a 20 alertas más importantes
+        return jsonify(alertas), 200  # Limitado a las 20 alertas más importantes
         
     except Exception as e:
         print(f"Error obteniendo alertas: {e}")
@@ -717,6 +608,9 @@ def obtener_checklist(empresa_id, carpeta_id):
         # Obtener checklist para la carpeta
         items_checklist = checklists.get(carpeta_id, [])
         
+        # Documento más reciente de cada tipo desde el estado documental
+        ultimos_por_tipo = obtener_estado_documental(cursor, empresa_id)['ultimos_por_tipo']
+        
         # Verificar qué documentos ya están subidos
         for item in items_checklist:
             # Si es solo para OIV y la empresa no es OIV, marcar como no requerido
@@ -725,22 +619,14 @@ def obtener_checklist(empresa_id, carpeta_id):
                 item['completado'] = True
                 item['documento'] = None
             else:
-                query = """
-                    SELECT TOP 1 DocumentoID, NombreArchivo, FechaSubida
-                    FROM DOCUMENTOS_ANCI
-                    WHERE EmpresaID = ? AND CarpetaID = ? 
-                    AND TipoDocumento = ? AND Activo = 1
-                    ORDER BY FechaSubida DESC
-                """
-                cursor.execute(query, empresa_id, carpeta_id, item['tipo_documento'])
-                doc = cursor.fetchone()
+                doc = ultimos_por_tipo.get((carpeta_id, item['tipo_documento']))
                 
                 if doc:
                     item['completado'] = True
                     item['documento'] = {
-                        'id': doc.DocumentoID,
-                        'nombre': doc.NombreArchivo,
-                        'fecha': doc.FechaSubida.isoformat(),
+                        'id': doc['id'],
+                        'nombre': doc['nombre'],
+                        'fecha': doc['fecha'].isoformat(),
                         'tipo': item['tipo_documento']
                     }
                 else:
@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify
 from ..db_validator import db_validator
 from ..error_handlers import robust_endpoint, safe_endpoint, ErrorResponse, DatabaseHealthChecker
 from ..database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from datetime import datetime
 
 health_bp = Blueprint('health_api', __name__, url_prefix='/api/admin')
@@ -75,10 +76,10 @@ def health_check_detailed():
         incident_stats = []
         if db_validator.table_exists(cursor, 'Empresas') and db_validator.table_exists(cursor, 'Incidentes'):
             try:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT e.RazonSocial, COUNT(i.IncidenteID) as TotalIncidentes
                     FROM Empresas e
-                    LEFT JOIN Incidentes i ON e.EmpresaID = i.EmpresaID
+                    LEFT JOIN Incidentes i ON e.EmpresaID = i.EmpresaID AND {filtro_no_eliminados(cursor, 'i')}
                     GROUP BY e.EmpresaID, e.RazonSocial
                     ORDER BY TotalIncidentes DESC
                 """)
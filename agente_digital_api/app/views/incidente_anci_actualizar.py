@@ -7,6 +7,7 @@ Integra con el UnificadorIncidentes para mantener consistencia
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from ..database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from ..modules.incidentes.unificador import UnificadorIncidentes
 import json
 from datetime import datetime
@@ -34,7 +35,7 @@ def actualizar_incidente_anci(incidente_id):
         cursor = conn.cursor()
         
         # 1. Verificar que el incidente existe y obtener datos actuales
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 i.IncidenteID, i.DatosIncidente, i.EmpresaID, i.ReporteAnciID,
                 e.RazonSocial, e.RUT, e.TipoEmpresa, 
@@ -58,7 +59,7 @@ def actualizar_incidente_anci(incidente_id):
                 i.InformeFinalEnviado, i.FechaInformeFinal
             FROM Incidentes i
             LEFT JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (incidente_id,))
         
         incidente_row = cursor.fetchone()
@@ -405,14 +406,14 @@ def cargar_incidente_anci(incidente_id):
         cursor = conn.cursor()
         
         # Obtener datos del incidente
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 i.IncidenteID, i.DatosIncidente, i.ReporteAnciID,
                 i.FechaDeclaracionANCI, i.EstadoActual, i.Titulo,
                 e.TipoEmpresa, e.RazonSocial
             FROM Incidentes i
             LEFT JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (incidente_id,))
         
         row = cursor.fetchone()
@@ -434,8 +435,8 @@ def cargar_incidente_anci(incidente_id):
         # Si no hay JSON válido, crear estructura base y migrar campos
         if not datos_json:
             # Obtener todos los campos de la BD para migración
-            cursor.execute("""
-                SELECT * FROM Incidentes WHERE IncidenteID = ?
+            cursor.execute(f"""
+                SELECT * FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
             """, (incidente_id,))
             
             incidente_completo = cursor.fetchone()
@@ -6,6 +6,7 @@ Endpoint para actualizar campos ANCI faltantes en incidentes existentes
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from ..database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from datetime import datetime
 
 campos_anci_bp = Blueprint('campos_anci', __name__, url_prefix='/api/incidente')
@@ -36,7 +37,10 @@ def actualizar_campos_anci(incidente_id):
         cursor = conn.cursor()
         
         # Verificar que el incidente existe
-        cursor.execute("SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         if not cursor.fetchone():
             return jsonify({'error': 'Incidente no encontrado'}), 404
         
@@ -79,10 +83,10 @@ def actualizar_campos_anci(incidente_id):
             conn.commit()
             
             # Obtener los datos actualizados
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT EstadoActual, ReporteAnciID, FechaDeclaracionANCI
                 FROM Incidentes 
-                WHERE IncidenteID = ?
+                WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
             """, (incidente_id,))
             
             row = cursor.fetchone()
@@ -128,7 +132,7 @@ def validar_campos_anci(incidente_id):
         cursor = conn.cursor()
         
         # Obtener todos los campos relevantes
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
                 i.Titulo, i.FechaDeteccion, i.FechaOcurrencia, i.Criticidad,
                 i.EstadoActual, i.EmpresaID, i.OrigenIncidente, i.SistemasAfectados,
@@ -139,7 +143,7 @@ def validar_campos_anci(incidente_id):
                 e.Tipo_Empresa
             FROM Incidentes i
             INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """, (incidente_id,))
         
         row = cursor.fetchone()
@@ -5,6 +5,7 @@ Endpoint mejorado para cargar incidentes con TODAS las evidencias y taxonomías
 
 from flask import Blueprint, jsonify
 from ..modules.core.database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from ..utils.encoding_fixer import EncodingFixer
 import json
 
@@ -27,7 +28,7 @@ def cargar_incidente_completo(incidente_id):
         
         # 1. CARGAR DATOS BÁSICOS DEL INCIDENTE
         print(f"📋 1. Cargando datos básicos del incidente...")
-        query_incidente = """
+        query_incidente = f"""
             SELECT 
                 IncidenteID, Titulo, DescripcionInicial, Criticidad, EstadoActual, 
                 FechaCreacion, FechaActualizacion, EmpresaID, CreadoPor, 
@@ -37,7 +38,7 @@ def cargar_incidente_completo(incidente_id):
                 AlcanceGeografico, ServiciosInterrumpidos, AnciImpactoPreliminar, 
                 AnciTipoAmenaza, CausaRaiz, LeccionesAprendidas, PlanMejora
             FROM Incidentes
-            WHERE IncidenteID = ?
+            WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
         """
         cursor.execute(query_incidente, incidente_id)
         incidente = cursor.fetchone()
@@ -4,7 +4,9 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from app.database import get_db_connection
+from app.json_rapido import mapeador_filas
 from app.auth_utils import token_required
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,7 +30,10 @@ def obtener_taxonomias_incidente(incidente_id):
         cursor = conn.cursor()
         
         # Verificar que el incidente existe
-        cursor.execute("SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT IncidenteID FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         if not cursor.fetchone():
             return jsonify({"error": "Incidente no encontrado"}), 404
         
@@ -49,10 +54,10 @@ def obtener_taxonomias_incidente(incidente_id):
         """, (incidente_id,))
         
         taxonomias = []
-        columns = [column[0] for column in cursor.description]
+        mapear = mapeador_filas(cursor)
         
         for row in cursor.fetchall():
-            tax = dict(zip(columns, row))
+            tax = mapear(row)
             
             # Parsear justificación y descripción del problema
             if tax.get('Comentarios'):
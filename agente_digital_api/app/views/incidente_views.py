@@ -6,6 +6,8 @@ from werkzeug.utils import secure_filename
 import json
 import io
 from ..modules.core.database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
+from ..modules.admin import manifiesto_archivos
 
 incidente_bp = Blueprint('incidente_completo', __name__, url_prefix='/api/incidente')
 
@@ -114,6 +116,10 @@ def create_incidente():
                     subido_por = data.get('creado_por', 'Sistema') # O del token de usuario
 
                     cursor.execute(query_archivo, incidente_id, filename, filepath, archivo.mimetype, tamano_kb, descripcion_archivo, version_archivo, subido_por)
+                    manifiesto_archivos.registrar_si_disponible(
+                        cursor, incidente_id, filepath, descripcion=descripcion_archivo,
+                        subido_por=subido_por, nombre=filename
+                    )
                     conn.commit()
                 else:
                     print(f"Archivo no permitido o vacío: {archivo.filename}")
@@ -167,7 +173,7 @@ def get_incidente(incidente_id):
         cursor = conn.cursor()
 
         # Obtener detalles del incidente con TODOS los campos
-        query_incidente = """
+        query_incidente = f"""
             SELECT 
                 IncidenteID, Titulo, DescripcionInicial, Criticidad, EstadoActual, FechaCreacion, FechaActualizacion,
                 EmpresaID, CreadoPor, FechaDeteccion, FechaOcurrencia, TipoFlujo, OrigenIncidente,
@@ -176,7 +182,7 @@ def get_incidente(incidente_id):
                 AlcanceGeografico, ServiciosInterrumpidos, AnciImpactoPreliminar, AnciTipoAmenaza,
                 CausaRaiz, LeccionesAprendidas, PlanMejora
             FROM Incidentes
-            WHERE IncidenteID = ?
+            WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
         """
         cursor.execute(query_incidente, incidente_id)
         incidente = cursor.fetchone()
@@ -325,14 +331,14 @@ def update_incidente(incidente_id):
         cursor = conn.cursor()
 
         # Obtener el incidente actual para registrar el historial de cambios
-        query_get_old_incidente = """
+        query_get_old_incidente = f"""
             SELECT 
                 Titulo, DescripcionInicial, Criticidad, EstadoActual, FechaDeteccion, FechaOcurrencia, TipoFlujo, 
                 OrigenIncidente, SistemasAfectados, AccionesInmediatas, ResponsableCliente,
                 FechaCierre, AlcanceGeografico, ServiciosInterrumpidos, AnciImpactoPreliminar, AnciTipoAmenaza,
                 CausaRaiz, LeccionesAprendidas, PlanMejora
             FROM Incidentes
-            WHERE IncidenteID = ?
+            WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
         """
         cursor.execute(query_get_old_incidente, incidente_id)
         old_incidente = cursor.fetchone()
@@ -438,6 +444,10 @@ def update_incidente(incidente_id):
                     subido_por = data.get('modificado_por', 'Sistema') # O del token de usuario
 
                     cursor.execute(query_archivo, incidente_id, filename, filepath, archivo.mimetype, tamano_kb, descripcion_archivo, version_archivo, subido_por)
+                    manifiesto_archivos.registrar_si_disponible(
+                        cursor, incidente_id, filepath, descripcion=descripcion_archivo,
+                        subido_por=subido_por, nombre=filename
+                    )
                     conn.commit()
                 else:
                     print(f"Archivo no permitido o vacío: {archivo.filename}")
@@ -514,7 +524,7 @@ def get_all_incidentes():
 
     try:
         cursor = conn.cursor()
-        query = """
+        query = f"""
             SELECT 
                 IncidenteID, Titulo, DescripcionInicial, Criticidad, EstadoActual, FechaCreacion, FechaActualizacion,
                 EmpresaID, CreadoPor, FechaDeteccion, FechaOcurrencia, TipoFlujo, OrigenIncidente,
@@ -523,6 +533,7 @@ def get_all_incidentes():
                 AlcanceGeografico, ServiciosInterrumpidos, AnciImpactoPreliminar, AnciTipoAmenaza,
                 CausaRaiz, LeccionesAprendidas, PlanMejora
             FROM Incidentes
+            WHERE {filtro_no_eliminados(cursor)}
             ORDER BY FechaCreacion DESC
         """
         cursor.execute(query)
@@ -763,6 +774,13 @@ def gestionar_archivos_semilla(incidente_id):
             result = cursor.fetchone()
             archivo_id = result.ArchivoID if result else None
             
+            # Después de @@IDENTITY: el INSERT del manifiesto lo cambiaría
+            if manifiesto_archivos.registrar_si_disponible(
+                cursor, incidente_id, filepath, seccion=str(seccion_id), descripcion=descripcion,
+                subido_por=subido_por, nombre=filename
+            ):
+                conn.commit()
+            
             conn.close()
             
             response = jsonify({
@@ -909,11 +927,11 @@ def obtener_plantillas_anci(incidente_id):
         conn = get_db_connection()
         if conn:
             cursor = conn.cursor()
-            query = """
+            query = f"""
                 SELECT e.TipoEmpresa
                 FROM Incidentes i
                 INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
-                WHERE i.IncidenteID = ?
+                WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
             """
             cursor.execute(query, incidente_id)
             result = cursor.fetchone()
@@ -4,6 +4,7 @@ from datetime import datetime
 import io
 import json
 from app.database import get_db_connection
+from app.modules.admin.eliminacion_incidentes import filtro_no_eliminados
 
 incidente_simple_bp = Blueprint('incidente_simple', __name__, url_prefix='/api/incidente-simple')
 
@@ -33,7 +34,7 @@ def generar_documento_anci_simple(incidente_id):
         cursor = conn.cursor()
         
         # Consulta simple del incidente
-        query = """
+        query = f"""
             SELECT 
                 i.IncidenteID,
                 i.Titulo,
@@ -46,7 +47,7 @@ def generar_documento_anci_simple(incidente_id):
                 e.TipoEmpresa
             FROM Incidentes i
             LEFT JOIN Empresa e ON i.EmpresaID = e.EmpresaID
-            WHERE i.IncidenteID = ?
+            WHERE i.IncidenteID = ? AND {filtro_no_eliminados(cursor, 'i')}
         """
         
         cursor.execute(query, incidente_id)
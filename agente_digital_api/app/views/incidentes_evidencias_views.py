@@ -8,6 +8,7 @@ import pyodbc
 from datetime import datetime
 import uuid
 from ..modules.core.database import get_db_connection
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 from ..modules.core.errors import robust_endpoint
 
 incidentes_evidencias_bp = Blueprint('incidentes_evidencias', __name__, url_prefix='/api/admin')
@@ -107,7 +108,10 @@ def upload_evidencia_incidente(incidente_id):
     
     try:
         # Verificar que el incidente existe
-        cursor.execute("SELECT EmpresaID FROM dbo.Incidentes WHERE IncidenteID = ?", (incidente_id,))
+        cursor.execute(
+            f"SELECT EmpresaID FROM dbo.Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}",
+            (incidente_id,)
+        )
         result = cursor.fetchone()
         if not result:
             return jsonify({'error': 'Incidente no encontrado'}), 404
@@ -5,6 +5,8 @@ from flask import Blueprint, jsonify, request
 from ..db_validator import db_validator
 from ..error_handlers import robust_endpoint, ErrorResponse
 from ..database import get_db_connection
+from ..json_rapido import filas_a_dicts
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 
 incidentes_bp = Blueprint('incidentes_api', __name__, url_prefix='/api/admin/empresas')
 
@@ -38,12 +40,11 @@ def get_incidentes_empresa(empresa_id):
             query, columns = db_validator.build_safe_select_query(
                 cursor, 'Incidentes', 
                 desired_columns=['IncidenteID', 'Titulo', 'EstadoActual', 'Criticidad', 'FechaCreacion'],
-                where_clause=f"EmpresaID = {empresa_id}"
+                where_clause=f"EmpresaID = {empresa_id} AND {filtro_no_eliminados(cursor)}"
             )
             
             cursor.execute(query)
-            rows = cursor.fetchall()
-            incidentes = [dict(zip(columns, row)) for row in rows]
+            incidentes = filas_a_dicts(cursor)
             
             return jsonify(incidentes)
             
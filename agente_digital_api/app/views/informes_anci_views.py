@@ -6,6 +6,7 @@ Endpoints para generación de informes ANCI
 from flask import Blueprint, jsonify, send_file, request
 from flask_login import login_required, current_user
 from ..modules.incidentes.generador_informes_anci import GeneradorInformesANCI
+from ..modules.admin.eliminacion_incidentes import filtro_no_eliminados
 import os
 
 informes_anci_bp = Blueprint('informes_anci', __name__, url_prefix='/api/informes-anci')
@@ -73,8 +74,8 @@ def descargar_informe_anci(incidente_id, nombre_archivo):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT EmpresaID, IDVisible FROM Incidentes WHERE IncidenteID = ?
+        cursor.execute(f"""
+            SELECT EmpresaID, IDVisible FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
         """, (incidente_id,))
         
         result = cursor.fetchone()
@@ -149,8 +150,8 @@ def historial_informes(incidente_id):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT EmpresaID, IDVisible FROM Incidentes WHERE IncidenteID = ?
+        cursor.execute(f"""
+            SELECT EmpresaID, IDVisible FROM Incidentes WHERE IncidenteID = ? AND {filtro_no_eliminados(cursor)}
         """, (incidente_id,))
         
         result = cursor.fetchone()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque de la API
+
+Mide, en un proceso limpio por corrida:
+  - desglose de `python -X importtime` de `from app import create_app; create_app()`
+  - tiempo hasta la primera respuesta (import + create_app + GET /)
+
+Uso:
+    python dev_tools/benchmark_arranque.py
+    python dev_tools/benchmark_arranque.py --corridas 5 --top 25
+    python dev_tools/benchmark_arranque.py --max-ms 1500   # exit 1 si se supera
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO_IMPORT = "from app import create_app; create_app()"
+
+CODIGO_PRIMERA_PETICION = """
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+respuesta = app.test_client().get('/')
+t3 = time.perf_counter()
+print('@@' + json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'primera_peticion_ms': (t3 - t2) * 1000,
+    'total_ms': (t3 - t0) * 1000,
+    'status': respuesta.status_code,
+}))
+"""
+
+
+def _ejecutar(argumentos):
+    return subprocess.run(
+        [sys.executable] + argumentos,
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'),
+    )
+
+
+def desglose_importtime(top):
+    """Retorna (total_us, raiz, propios) con tuplas (modulo, propio_us, acumulado_us).
+
+    ``raiz`` son los imports de primer nivel más costosos y ``propios`` los
+    módulos de app/ y security/ a cualquier profundidad.
+    """
+    resultado = _ejecutar(['-X', 'importtime', '-c', CODIGO_IMPORT])
+    modulos = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        cabecera, acumulado, nombre = linea.split('|', 2)
+        # El nombre conserva la indentación que marca la profundidad del import
+        modulos.append((nombre[1:], int(cabecera.split(':')[1]), int(acumulado)))
+
+    # Solo paquetes de primer nivel (sin indentación en la salida de importtime)
+    raiz = [(n, p, a) for n, p, a in modulos if not n.startswith(' ')]
+    propios = sorted(((n.strip(), p, a) for n, p, a in modulos
+                      if n.strip().split('.')[0] in ('app', 'security')),
+                     key=lambda m: m[2], reverse=True)
+    total = sum(a for _, _, a in raiz)
+    return total, sorted(raiz, key=lambda m: m[2], reverse=True)[:top], propios[:top]
+
+
+def tiempo_primera_peticion(corridas):
+    """Corre ``corridas`` procesos nuevos y retorna las mediciones de cada uno."""
+    mediciones = []
+    for _ in range(corridas):
+        resultado = _ejecutar(['-c', CODIGO_PRIMERA_PETICION])
+        linea = next((l for l in resultado.stdout.splitlines() if l.startswith('@@')), None)
+        if linea is None:
+            raise RuntimeError(f"La corrida no reportó tiempos:\n{resultado.stderr[-2000:]}")
+        mediciones.append(json.loads(linea[2:]))
+    return mediciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corridas', type=int, default=3)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Presupuesto para la mediana de total_ms; exit 1 si se supera')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    total_us, raiz, propios = desglose_importtime(args.top)
+    mediciones = tiempo_primera_peticion(args.corridas)
+    resumen = {
+        clave: statistics.median(m[clave] for m in mediciones)
+        for clave in ('import_ms', 'create_app_ms', 'primera_peticion_ms', 'total_ms')
+    }
+
+    if args.json:
+        print(json.dumps({
+            'importtime_total_ms': total_us / 1000,
+            'importtime_top': [{'modulo': n, 'propio_ms': p / 1000, 'acumulado_ms': a / 1000} for n, p, a in raiz],
+            'importtime_app': [{'modulo': n, 'propio_ms': p / 1000, 'acumulado_ms': a / 1000} for n, p, a in propios],
+            'mediana': resumen,
+            'corridas': mediciones,
+        }, indent=2))
+    else:
+        print(f"📦 importtime total (módulos raíz): {total_us / 1000:.1f} ms")
+        print(f"\n{'acumulado ms':>13} {'propio ms':>10}  módulo raíz")
+        for nombre, propio, acumulado in raiz:
+            print(f"{acumulado / 1000:13.1f} {propio / 1000:10.1f}  {nombre}")
+        print(f"\n{'acumulado ms':>13} {'propio ms':>10}  módulo de la aplicación")
+        for nombre, propio, acumulado in propios:
+            print(f"{acumulado / 1000:13.1f} {propio / 1000:10.1f}  {nombre}")
+        print(f"\n⏱️ Primera petición (mediana de {args.corridas} procesos):")
+        for clave, valor in resumen.items():
+            print(f"   {clave:22} {valor:9.1f}")
+
+    if args.max_ms is not None and resumen['total_ms'] > args.max_ms:
+        print(f"❌ total_ms {resumen['total_ms']:.1f} supera el presupuesto de {args.max_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de la API sin SQL Server
+
+Levanta create_app() con la conexión de BD apuntando a una base emulada en
+SQLite (dev_tools/sql_emulado.py: interfaz pyodbc y traducción de TOP,
+GETDATE(), SCOPE_IDENTITY(), OUTPUT INSERTED, IF EXISTS, catálogo, etc.),
+carga un conjunto sintético multi-inquilino del tamaño pedido y ejerce los
+endpoints más usados desde varios hilos:
+
+  - listado y detalle de incidentes de una empresa
+  - taxonomías y evidencias de un incidente, catálogo de taxonomías
+  - carga de archivos a un incidente
+  - historial y validación de informes ANCI
+
+Por endpoint reporta p50/p95/p99, peticiones por segundo, consultas SQL
+por petición y sentencias que la emulación no pudo ejecutar. Los tiempos
+sirven como línea base para comparar cambios de la aplicación (mismo
+equipo, mismos parámetros), no como estimación de SQL Server en producción.
+
+Sale con código 1 si algún endpoint responde con error o con datos vacíos.
+Los archivos subidos y la base quedan en un directorio temporal que se
+elimina al terminar.
+
+Uso:
+    python dev_tools/benchmark_carga.py
+    python dev_tools/benchmark_carga.py --inquilinos 10 --empresas 20 --incidentes 100 --hilos 16
+    python dev_tools/benchmark_carga.py --solo detalle_incidente --peticiones 2000 --json base.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, NamedTuple
+
+TEMPORAL = tempfile.mkdtemp(prefix='benchmark_carga_')
+os.environ['TAREAS_MANTENIMIENTO'] = 'false'
+os.environ['TAREAS_DIR'] = os.path.join(TEMPORAL, 'tareas')
+os.environ['REVOCACION_BACKEND'] = 'sqlite'
+os.environ['REVOCACION_DB'] = os.path.join(TEMPORAL, 'revocaciones.sqlite3')
+os.environ['PAQUETES_EVIDENCIAS_DIR'] = os.path.join(TEMPORAL, 'paquetes')
+os.environ.setdefault('JWT_SECRET_KEY', 'clave-jwt-benchmark-carga-no-usar-en-produccion')
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jwt  # noqa: E402
+
+from sql_emulado import BaseEmulada, modulo_pyodbc  # noqa: E402
+
+ESQUEMA = [
+    """CREATE TABLE Inquilinos (
+        InquilinoID INT IDENTITY(1,1) PRIMARY KEY,
+        RazonSocial NVARCHAR(200) NOT NULL,
+        RUT NVARCHAR(20),
+        Activo BIT DEFAULT 1,
+        FechaCreacion DATETIME DEFAULT GETDATE())""",
+    """CREATE TABLE Empresas (
+        EmpresaID INT IDENTITY(1,1) PRIMARY KEY,
+        InquilinoID INT NOT NULL,
+        RazonSocial NVARCHAR(200) NOT NULL,
+        RUT NVARCHAR(20),
+        TipoEmpresa NVARCHAR(10),
+        Activo BIT DEFAULT 1,
+        FechaCreacion DATETIME DEFAULT GETDATE())""",
+    "CREATE INDEX IX_Empresas_Inquilino ON Empresas (InquilinoID)",
+    """CREATE TABLE Incidentes (
+        IncidenteID INT IDENTITY(1,1) PRIMARY KEY,
+        EmpresaID INT NOT NULL,
+        IDVisible NVARCHAR(50),
+        Titulo NVARCHAR(255) NOT NULL,
+        EstadoActual NVARCHAR(50),
+        Criticidad NVARCHAR(20),
+        OrigenIncidente NVARCHAR(100),
+        TipoRegistro NVARCHAR(50),
+        DescripcionInicial NVARCHAR(MAX),
+        AnciImpactoPreliminar NVARCHAR(MAX),
+        AccionesInmediatas NVARCHAR(MAX),
+        SolicitarCSIRT BIT DEFAULT 0,
+        TieneReporteANCI BIT DEFAULT 0,
+        FechaDeteccion DATETIME,
+        FechaOcurrencia DATETIME,
+        FechaCreacion DATETIME DEFAULT GETDATE(),
+        FechaActualizacion DATETIME,
+        CreadoPor NVARCHAR(100),
+        ModificadoPor NVARCHAR(100))""",
+    "CREATE INDEX IX_Incidentes_Empresa ON Incidentes (EmpresaID)",
+    """CREATE TABLE Taxonomia_incidentes (
+        Id_Incidente NVARCHAR(50) PRIMARY KEY,
+        Area NVARCHAR(200),
+        Efecto NVARCHAR(200),
+        Categoria_del_Incidente NVARCHAR(200),
+        Subcategoria_del_Incidente NVARCHAR(200),
+        Descripcion NVARCHAR(MAX),
+        AplicaTipoEmpresa NVARCHAR(10))""",
+    """CREATE TABLE INCIDENTE_TAXONOMIA (
+        ID INT IDENTITY(1,1) PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        Id_Taxonomia NVARCHAR(50) NOT NULL,
+        Comentarios NVARCHAR(MAX),
+        FechaAsignacion DATETIME DEFAULT GETDATE(),
+        CreadoPor NVARCHAR(100))""",
+    "CREATE INDEX IX_IncidenteTaxonomia_Incidente ON INCIDENTE_TAXONOMIA (IncidenteID)",
+    """CREATE TABLE EVIDENCIAS_TAXONOMIA (
+        EvidenciaID INT IDENTITY(1,1) PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        TaxonomiaID NVARCHAR(50) NOT NULL,
+        NombreArchivo NVARCHAR(255),
+        NombreArchivoOriginal NVARCHAR(255),
+        RutaArchivo NVARCHAR(500),
+        TamanoArchivo INT,
+        FechaSubida DATETIME DEFAULT GETDATE(),
+        SubidoPor NVARCHAR(100))""",
+    "CREATE INDEX IX_EvidenciasTaxonomia_Incidente ON EVIDENCIAS_TAXONOMIA (IncidenteID)",
+    """CREATE TABLE EvidenciasIncidentes (
+        EvidenciaIncidenteID INT IDENTITY(1,1) PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        NombreArchivoOriginal NVARCHAR(255),
+        NombreArchivoAlmacenado NVARCHAR(255),
+        RutaArchivo NVARCHAR(500),
+        TamanoArchivoKB DECIMAL(10,2),
+        TipoArchivo NVARCHAR(100),
+        Descripcion NVARCHAR(500),
+        Version INT DEFAULT 1,
+        FechaSubida DATETIME DEFAULT GETDATE(),
+        SubidoPor NVARCHAR(100),
+        UsuarioQueSubio NVARCHAR(100),
+        FechaVigencia DATETIME,
+        EsUltimaVersion BIT DEFAULT 1,
+        HashArchivo NVARCHAR(64),
+        InquilinoID INT,
+        EmpresaID INT)""",
+    "CREATE INDEX IX_EvidenciasIncidentes_Incidente ON EvidenciasIncidentes (IncidenteID)",
+    """CREATE TABLE INCIDENTES_ARCHIVOS (
+        ArchivoID INT IDENTITY(1,1) PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        NombreArchivo NVARCHAR(255),
+        TipoArchivo NVARCHAR(100),
+        TamanoKB DECIMAL(10,2),
+        RutaArchivo NVARCHAR(500),
+        SeccionID INT,
+        FechaCarga DATETIME DEFAULT GETDATE(),
+        SubidoPor NVARCHAR(100),
+        Activo BIT DEFAULT 1)""",
+    "CREATE INDEX IX_IncidentesArchivos_Incidente ON INCIDENTES_ARCHIVOS (IncidenteID)",
+    """CREATE TABLE INFORMES_ANCI (
+        InformeID INT IDENTITY(1,1) PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        TipoInforme VARCHAR(50) NOT NULL,
+        EstadoInforme VARCHAR(50) DEFAULT 'generado',
+        FechaGeneracion DATETIME DEFAULT GETDATE(),
+        RutaArchivo NVARCHAR(500),
+        TamanoKB DECIMAL(10,2),
+        GeneradoPor NVARCHAR(100),
+        Version INT DEFAULT 1,
+        Activo BIT DEFAULT 1,
+        FechaCreacion DATETIME DEFAULT GETDATE(),
+        FechaModificacion DATETIME DEFAULT GETDATE())""",
+    "CREATE INDEX IX_INFORMES_ANCI_IncidenteID ON INFORMES_ANCI (IncidenteID)",
+]
+
+ESTADOS = ('Abierto', 'En Investigación', 'Contenido', 'Cerrado')
+CRITICIDADES = ('Baja', 'Media', 'Alta', 'Crítica')
+ORIGENES = ('Monitoreo interno', 'Reporte de usuario', 'Proveedor', 'CSIRT')
+AREAS = ('Disponibilidad', 'Confidencialidad', 'Integridad', 'Uso indebido')
+TIPOS_EMPRESA = ('OIV', 'PSE', 'AMBAS')
+TIPOS_INFORME = ('preliminar', 'completo', 'final')
+PALABRAS = ('acceso', 'servidor', 'credenciales', 'correo', 'malware', 'red', 'respaldo', 'firewall',
+            'usuario', 'denegación', 'servicio', 'filtración', 'phishing', 'ransomware', 'base de datos')
+
+
+class Dataset(NamedTuple):
+    empresas: list          # (EmpresaID, TipoEmpresa)
+    incidentes: list        # IncidenteID
+
+
+def _texto(rnd, palabras):
+    return ' '.join(rnd.choice(PALABRAS) for _ in range(palabras)).capitalize()
+
+
+def cargar_datos(base, inquilinos, empresas_por_inquilino, incidentes_por_empresa, rnd):
+    """Carga el conjunto sintético; cada incidente tiene al menos una taxonomía,
+    una evidencia de cada tipo y un informe ANCI"""
+    for sentencia in ESQUEMA:
+        base.ejecutar_script(sentencia)
+
+    ahora = datetime.datetime.now().replace(microsecond=0)
+    taxonomias = [(f"INC_{area[:4].upper()}_{i:03d}", area, f"Efecto {i % 5}", f"Categoría {i % 9}",
+                   f"Subcategoría {i}", _texto(rnd, 12), TIPOS_EMPRESA[i % 3])
+                  for i, area in enumerate(AREAS * 15)]
+    base.cargar('Taxonomia_incidentes', ['Id_Incidente', 'Area', 'Efecto', 'Categoria_del_Incidente',
+                                         'Subcategoria_del_Incidente', 'Descripcion', 'AplicaTipoEmpresa'],
+                taxonomias)
+
+    base.cargar('Inquilinos', ['RazonSocial', 'RUT'],
+                [(f"Inquilino {i}", f"76.{i:03d}.000-{i % 10}") for i in range(1, inquilinos + 1)])
+    empresas = [(i, f"Empresa {i}-{j}", f"77.{i:03d}.{j:03d}-{j % 10}", rnd.choice(TIPOS_EMPRESA))
+                for i in range(1, inquilinos + 1) for j in range(1, empresas_por_inquilino + 1)]
+    base.cargar('Empresas', ['InquilinoID', 'RazonSocial', 'RUT', 'TipoEmpresa'], empresas)
+    tipos = [e[3] for e in empresas]
+
+    filas = []
+    for empresa_id in range(1, len(empresas) + 1):
+        for _ in range(incidentes_por_empresa):
+            deteccion = ahora - datetime.timedelta(hours=rnd.randint(1, 24 * 365))
+            filas.append((empresa_id, f"INC-{len(filas) + 1:06d}", _texto(rnd, 5), rnd.choice(ESTADOS),
+                          rnd.choice(CRITICIDADES), rnd.choice(ORIGENES), 'Integral', _texto(rnd, 40),
+                          _texto(rnd, 20), _texto(rnd, 20), rnd.random() < 0.2,
+                          deteccion, deteccion - datetime.timedelta(hours=rnd.randint(0, 48)), deteccion,
+                          'benchmark'))
+    base.cargar('Incidentes', ['EmpresaID', 'IDVisible', 'Titulo', 'EstadoActual', 'Criticidad', 'OrigenIncidente',
+                               'TipoRegistro', 'DescripcionInicial', 'AnciImpactoPreliminar', 'AccionesInmediatas',
+                               'SolicitarCSIRT', 'FechaDeteccion', 'FechaOcurrencia', 'FechaCreacion', 'CreadoPor'],
+                filas)
+
+    asignadas, evidencias_taxonomia, evidencias, informes = [], [], [], []
+    for incidente_id, fila in enumerate(filas, start=1):
+        empresa_id = fila[0]
+        for taxonomia in rnd.sample(taxonomias, rnd.randint(1, 3)):
+            asignadas.append((incidente_id, taxonomia[0],
+                              f"Justificación: {_texto(rnd, 8)}\nDescripción del problema: {_texto(rnd, 15)}",
+                              fila[11], 'benchmark'))
+            for k in range(rnd.randint(1, 2)):
+                nombre = f"tax_{incidente_id}_{k}.pdf"
+                evidencias_taxonomia.append((incidente_id, taxonomia[0], nombre, nombre,
+                                             f"uploads/incidentes/{incidente_id}/{nombre}",
+                                             rnd.randint(10_000, 2_000_000), fila[11], 'benchmark'))
+        for version in range(1, rnd.randint(2, 4)):
+            nombre = f"evidencia_{incidente_id}_v{version}.png"
+            evidencias.append((incidente_id, 'evidencia.png', nombre, f"uploads/incidentes/{incidente_id}/{nombre}",
+                               round(rnd.uniform(20, 4000), 2), 'image/png', _texto(rnd, 6), version, fila[11],
+                               'benchmark', 'benchmark', version == 1, f"{rnd.getrandbits(256):064x}",
+                               (empresa_id - 1) // empresas_por_inquilino + 1, empresa_id))
+        for version, tipo in enumerate(TIPOS_INFORME[:rnd.randint(1, 3)], start=1):
+            informes.append((incidente_id, tipo, os.path.join(TEMPORAL, 'informes', f"{incidente_id}_{tipo}.pdf"),
+                             round(rnd.uniform(50, 900), 2), 'benchmark', version,
+                             fila[11] + datetime.timedelta(hours=version)))
+
+    base.cargar('INCIDENTE_TAXONOMIA', ['IncidenteID', 'Id_Taxonomia', 'Comentarios', 'FechaAsignacion', 'CreadoPor'],
+                asignadas)
+    base.cargar('EVIDENCIAS_TAXONOMIA', ['IncidenteID', 'TaxonomiaID', 'NombreArchivo', 'NombreArchivoOriginal',
+                                         'RutaArchivo', 'TamanoArchivo', 'FechaSubida', 'SubidoPor'],
+                evidencias_taxonomia)
+    base.cargar('EvidenciasIncidentes', ['IncidenteID', 'NombreArchivoOriginal', 'NombreArchivoAlmacenado',
+                                         'RutaArchivo', 'TamanoArchivoKB', 'TipoArchivo', 'Descripcion', 'Version',
+                                         'FechaSubida', 'SubidoPor', 'UsuarioQueSubio', 'EsUltimaVersion',
+                                         'HashArchivo', 'InquilinoID', 'EmpresaID'], evidencias)
+    base.cargar('INFORMES_ANCI', ['IncidenteID', 'TipoInforme', 'RutaArchivo', 'TamanoKB', 'GeneradoPor', 'Version',
+                                  'FechaGeneracion'], informes)
+
+    print(f"🗃️ {inquilinos} inquilinos, {len(empresas)} empresas, {len(filas)} incidentes, "
+          f"{len(asignadas)} taxonomías asignadas, {len(evidencias) + len(evidencias_taxonomia)} evidencias, "
+          f"{len(informes)} informes ANCI")
+    return Dataset(list(enumerate(tipos, start=1)), list(range(1, len(filas) + 1)))
+
+
+# ----------------------------------------------------------------------
+# Endpoints
+# ----------------------------------------------------------------------
+
+class Endpoint(NamedTuple):
+    nombre: str
+    metodo: str
+    ruta: Callable            # (rnd, dataset) -> url
+    verificar: Callable       # json -> bool (respuesta con datos)
+    autenticado: bool = False
+
+
+def _incidente(rnd, datos):
+    return rnd.choice(datos.incidentes)
+
+
+ENDPOINTS = [
+    Endpoint('listado_incidentes', 'GET',
+             lambda rnd, d: f"/api/admin/empresas/{rnd.choice(d.empresas)[0]}/incidentes",
+             lambda r: isinstance(r, list) and len(r) > 0 and 'Titulo' in r[0]),
+    Endpoint('detalle_incidente', 'GET',
+             lambda rnd, d: f"/api/admin/empresas/incidentes/{_incidente(rnd, d)}",
+             lambda r: bool(r.get('IncidenteID')) and bool(r.get('RazonSocial'))),
+    Endpoint('taxonomias_incidente', 'GET',
+             lambda rnd, d: f"/api/admin/incidentes/{_incidente(rnd, d)}/taxonomias",
+             lambda r: r.get('total', 0) > 0 and all(t['archivos'] for t in r['taxonomias'])),
+    Endpoint('catalogo_taxonomias', 'GET',
+             lambda rnd, d: f"/api/admin/taxonomias/flat?tipo_empresa={rnd.choice(d.empresas)[1]}",
+             lambda r: r.get('total', 0) > 0),
+    Endpoint('evidencias_incidente', 'GET',
+             lambda rnd, d: f"/api/admin/incidentes/{_incidente(rnd, d)}/evidencias",
+             lambda r: isinstance(r, list) and len(r) > 0 and r[0].get('FechaSubida')),
+    Endpoint('subir_archivo', 'POST',
+             lambda rnd, d: f"/api/incidentes/{_incidente(rnd, d)}/subir-archivo",
+             lambda r: r.get('success') is True and bool(r['archivo']['id']), autenticado=True),
+    Endpoint('historial_anci', 'GET',
+             lambda rnd, d: f"/api/informes-anci/historial/{_incidente(rnd, d)}",
+             lambda r: len(r.get('informes', [])) > 0),
+    Endpoint('validar_anci', 'GET',
+             lambda rnd, d: f"/api/informes-anci/validar/{_incidente(rnd, d)}",
+             lambda r: 'valido' in r and 'Incidente no encontrado' not in r.get('errores', [])),
+]
+
+
+def emitir_token():
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    return jwt.encode({'sub': '1', 'rol': 'admin', 'email': 'carga@benchmark.local', 'nombre': 'Benchmark',
+                       'iat': ahora, 'exp': ahora + datetime.timedelta(hours=2)},
+                      os.environ['JWT_SECRET_KEY'], algorithm='HS256')
+
+
+def _peticion(cliente, endpoint, url, token, rnd):
+    if endpoint.metodo == 'POST':
+        contenido = os.urandom(rnd.randint(4, 256) * 1024)
+        return cliente.post(url, headers={'Authorization': f"Bearer {token}"},
+                            data={'archivo': (io.BytesIO(contenido), 'evidencia.pdf'), 'seccion_id': '2'},
+                            content_type='multipart/form-data')
+    headers = {'Authorization': f"Bearer {token}"} if endpoint.autenticado else {}
+    return cliente.get(url, headers=headers)
+
+
+def medir_endpoint(app, endpoint, datos, token, hilos, peticiones, semilla):
+    """Ejecuta ``peticiones`` repartidas en ``hilos`` y retorna las métricas"""
+    tiempos, fallas, consultas = [], [], []
+    guardia = threading.Lock()
+    barrera = threading.Barrier(hilos + 1)
+
+    def hilo(indice, cantidad):
+        rnd = random.Random(semilla * 1000 + indice)
+        cliente = app.test_client()
+        locales, fallas_locales, consultas_locales = [], [], []
+        barrera.wait()
+        for _ in range(cantidad):
+            url = endpoint.ruta(rnd, datos)
+            inicio = time.perf_counter()
+            respuesta = _peticion(cliente, endpoint, url, token, rnd)
+            locales.append(time.perf_counter() - inicio)
+            cuerpo = respuesta.get_json(silent=True)
+            if respuesta.status_code >= 300 or cuerpo is None or not endpoint.verificar(cuerpo):
+                fallas_locales.append(f"{url} -> {respuesta.status_code} {respuesta.get_data(as_text=True)[:200].strip()}")
+            consultas_locales.append(int(respuesta.headers.get('X-DB-Queries', 0)))
+        with guardia:
+            tiempos.extend(locales)
+            fallas.extend(fallas_locales)
+            consultas.extend(consultas_locales)
+
+    reparto = [peticiones // hilos + (1 if i < peticiones % hilos else 0) for i in range(hilos)]
+    trabajadores = [threading.Thread(target=hilo, args=(i, n)) for i, n in enumerate(reparto)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.perf_counter() - inicio
+
+    tiempos.sort()
+    percentil = lambda p: tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))] * 1000  # noqa: E731
+    return {
+        'peticiones': len(tiempos),
+        'fallidas': len(fallas),
+        'p50_ms': round(percentil(0.50), 2),
+        'p95_ms': round(percentil(0.95), 2),
+        'p99_ms': round(percentil(0.99), 2),
+        'media_ms': round(statistics.mean(tiempos) * 1000, 2),
+        'req_s': round(len(tiempos) / duracion, 1),
+        'consultas_por_peticion': round(statistics.mean(consultas), 1) if consultas else 0,
+        'ejemplos_fallas': fallas[:3],
+    }
+
+
+def crear_app_emulada(base):
+    """create_app() con las conexiones físicas servidas por la base emulada"""
+    # Antes de importar la app: no se necesita pyodbc nativo ni libodbc
+    sys.modules['pyodbc'] = modulo_pyodbc(base)
+    from app import database
+    from app.modules.admin import incidentes_actualizar
+
+    # crear_conexion (y secuencia_incidentes, que la importa) envuelve lo que entregue _conectar
+    database._conectar = base.conectar
+    # Los archivos subidos van al directorio temporal, no a uploads/ del proyecto
+    incidentes_actualizar.UPLOAD_FOLDER = os.path.join(TEMPORAL, 'uploads')
+
+    from app import create_app
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    # Conexión compartida por request: mide el modo optimizado y expone X-DB-*
+    app.config['DB_CONEXION_POR_REQUEST'] = True
+    app.config['DB_METRICAS_HEADERS'] = True
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--inquilinos', type=int, default=5, help='Inquilinos (tenants)')
+    parser.add_argument('--empresas', type=int, default=10, help='Empresas por inquilino')
+    parser.add_argument('--incidentes', type=int, default=40, help='Incidentes por empresa')
+    parser.add_argument('--hilos', type=int, default=8, help='Clientes concurrentes')
+    parser.add_argument('--peticiones', type=int, default=400, help='Peticiones medidas por endpoint')
+    parser.add_argument('--calentamiento', type=int, default=20, help='Peticiones previas no medidas')
+    parser.add_argument('--solo', action='append', choices=[e.nombre for e in ENDPOINTS],
+                        help='Medir solo este endpoint (repetible)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--json', help='Guardar los resultados en este archivo')
+    args = parser.parse_args()
+    ok = True
+
+    try:
+        base = BaseEmulada(os.path.join(TEMPORAL, 'carga.sqlite3'))
+        inicio = time.perf_counter()
+        datos = cargar_datos(base, args.inquilinos, args.empresas, args.incidentes, random.Random(args.semilla))
+        print(f"   datos cargados en {time.perf_counter() - inicio:.1f} s")
+
+        app = crear_app_emulada(base)
+        token = emitir_token()
+        print(f"🚀 create_app() con {len(list(app.url_map.iter_rules()))} rutas; "
+              f"{args.hilos} hilos, {args.peticiones} peticiones por endpoint\n")
+
+        resultados = {}
+        print(f"{'endpoint':22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'SQL/pet':>8} {'err SQL':>8}")
+        # Los endpoints imprimen trazas de depuración: se descartan durante la medición
+        nivel_log = logging.root.manager.disable
+        logging.disable(logging.WARNING)
+        for endpoint in ENDPOINTS:
+            if args.solo and endpoint.nombre not in args.solo:
+                continue
+            errores_antes = sum(base.errores.values())
+            with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+                if args.calentamiento:
+                    medir_endpoint(app, endpoint, datos, token, 1, args.calentamiento, args.semilla + 1)
+                resultado = medir_endpoint(app, endpoint, datos, token, args.hilos, args.peticiones, args.semilla)
+            resultado['errores_sql'] = sum(base.errores.values()) - errores_antes
+            resultados[endpoint.nombre] = resultado
+            correcto = resultado['fallidas'] == 0
+            ok &= correcto
+            print(f"{endpoint.nombre:22} {resultado['p50_ms']:8.2f} {resultado['p95_ms']:8.2f} "
+                  f"{resultado['p99_ms']:8.2f} {resultado['req_s']:8.1f} {resultado['consultas_por_peticion']:8.1f} "
+                  f"{resultado['errores_sql']:8d} {'✅' if correcto else '❌'}")
+            for ejemplo in resultado['ejemplos_fallas']:
+                print(f"      {ejemplo}")
+        logging.disable(nivel_log)
+
+        if base.errores:
+            print(f"\n⚠️ Sentencias que la base emulada no pudo ejecutar ({sum(base.errores.values())}):")
+            for sentencia, veces in base.errores.most_common(10):
+                print(f"   {veces:5d} x {sentencia[:110]}")
+                print(f"           {base.mensajes_error[sentencia][:110]}")
+
+        print(f"\n   {base.sentencias} sentencias SQL, {base.conexiones_creadas} conexiones SQLite")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'parametros': {k: v for k, v in vars(args).items() if k != 'json'},
+                    'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'endpoints': resultados,
+                }, f, ensure_ascii=False, indent=2)
+            print(f"💾 Resultados en {args.json}")
+        base.cerrar()
+    finally:
+        shutil.rmtree(TEMPORAL, ignore_errors=True)
+
+    if not ok:
+        print("❌ Hay verificaciones fallidas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark del índice offline de contraseñas comprometidas
+
+Genera una lista sintética de --entradas contraseñas (por defecto 5 millones),
+construye el índice y mide:
+  - construcción: segundos, tamaño del archivo y bytes por entrada
+  - consultas de contraseñas presentes y ausentes (µs por consulta, p99)
+  - tasa de falsos positivos observada vs la configurada (--fp, o --ancho
+    para forzar un prefijo corto y poder observarla)
+  - referencia: memoria y tiempo de carga de la misma lista en un set de
+    Python, como hacía _load_common_passwords por cada validador
+
+Sale con código 1 si alguna contraseña de la lista no se encuentra.
+No requiere base de datos ni red.
+
+Uso:
+    python dev_tools/benchmark_contrasenas_comprometidas.py
+    python dev_tools/benchmark_contrasenas_comprometidas.py --entradas 20000000 --ancho 4
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.contrasenas_comprometidas import TASA_FP_DEFECTO, IndiceContrasenas, construir_indice  # noqa: E402
+
+
+def contrasena(i):
+    # Deterministas y distintas entre sí; las consultas ausentes usan otro prefijo
+    return f"clave{i * 2654435761 % 4294967296:x}!{i % 97}"
+
+
+def medir_consultas(indice, contrasenas):
+    tiempos = []
+    encontradas = 0
+    for password in contrasenas:
+        inicio = time.perf_counter()
+        encontradas += indice.contiene(password)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return encontradas, statistics.mean(tiempos) * 1e6, tiempos[int(len(tiempos) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entradas', type=int, default=5000000, help='Contraseñas en la lista')
+    parser.add_argument('--consultas', type=int, default=200000, help='Consultas presentes y ausentes')
+    parser.add_argument('--fp', type=float, default=TASA_FP_DEFECTO, help='Tasa de falsos positivos')
+    parser.add_argument('--ancho', type=int, help='Bytes de prefijo (ignora --fp)')
+    parser.add_argument('--sin-set', action='store_true', help='Omitir la referencia con set de Python')
+    args = parser.parse_args()
+
+    azar = random.Random(1)
+    with tempfile.TemporaryDirectory(prefix='bench_contrasenas_') as temporal:
+        lista = os.path.join(temporal, 'lista.txt')
+        ruta_indice = os.path.join(temporal, 'indice.idx')
+
+        print(f"📝 Generando {args.entradas} contraseñas...")
+        with open(lista, 'w', encoding='utf-8') as archivo:
+            for inicio in range(0, args.entradas, 100000):
+                archivo.write(''.join(f"{contrasena(i)}\n" for i in range(inicio, min(inicio + 100000, args.entradas))))
+        tamano_lista = os.path.getsize(lista)
+
+        print("🔨 Construyendo índice...")
+        r = construir_indice(lista, ruta_indice, tasa_fp=args.fp, ancho=args.ancho)
+        print(f"   {r['total']} entradas, prefijo {r['ancho']} bytes, "
+              f"{r['bytes'] / 1048576:.1f} MB ({r['bytes'] / r['total']:.1f} B/entrada; lista "
+              f"{tamano_lista / 1048576:.1f} MB) en {r['segundos']}s")
+
+        indice = IndiceContrasenas(ruta_indice)
+        presentes = [contrasena(azar.randrange(args.entradas)) for _ in range(args.consultas)]
+        ausentes = [f"otra{azar.getrandbits(64):x}#" for _ in range(args.consultas)]
+
+        encontradas, media_p, p99_p = medir_consultas(indice, presentes)
+        falsos, media_a, p99_a = medir_consultas(indice, ausentes)
+        # contiene() prueba también la versión en minúsculas si es distinta
+        print(f"\n🔍 {args.consultas} consultas de cada tipo")
+        print(f"   presentes: {media_p:6.2f} µs (p99 {p99_p:.2f})  encontradas {encontradas}/{len(presentes)}")
+        print(f"   ausentes:  {media_a:6.2f} µs (p99 {p99_a:.2f})  falsos positivos {falsos} "
+              f"({falsos / len(ausentes):.2e}; esperada ~{indice.tasa_falsos_positivos:.2e})")
+        print(f"   {1e6 / ((media_p + media_a) / 2):,.0f} consultas/s por proceso")
+        indice.cerrar()
+
+        if not args.sin_set:
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            with open(lista, encoding='utf-8') as archivo:
+                conjunto = {linea.strip().lower() for linea in archivo}
+            segundos = time.perf_counter() - inicio
+            memoria = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"\n📦 Referencia set de Python: {memoria / 1048576:.0f} MB por proceso, "
+                  f"carga {segundos:.1f}s ({len(conjunto)} entradas)")
+            print("   El índice se comparte entre workers vía mmap (páginas del cache del SO)")
+
+    if encontradas != len(presentes):
+        print("❌ Hay contraseñas de la lista que no se encontraron")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
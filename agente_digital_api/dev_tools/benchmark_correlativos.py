@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark de asignación de correlativos de IDVisible con creadores concurrentes
+
+Compara contra la BD configurada (.env):
+  - anterior: MAX(CAST(LEFT(IDVisible, ...))) + INSERT por creación, sobre una
+    tabla temporal global poblada con --filas incidentes de una empresa
+  - secuencia: AsignadorCorrelativos sobre EmpresaSecuenciaIncidentes, con
+    bloque 1 y con --bloque, repartido entre --workers instancias (simulan
+    procesos de gunicorn)
+
+No toca Incidentes: la secuencia usa un EmpresaID negativo que se elimina al
+terminar. Requiere haber ejecutado sql/secuencia_incidentes.sql.
+
+Uso:
+    python dev_tools/benchmark_correlativos.py
+    python dev_tools/benchmark_correlativos.py --hilos 32 --creaciones 50 --bloque 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import cargar_entorno, crear_conexion  # noqa: E402
+from app.modules.admin.secuencia_incidentes import AsignadorCorrelativos, TABLA_SECUENCIA  # noqa: E402
+
+EMPRESA_BENCH = -(os.getpid() % 1000000) - 1
+TABLA_ANTERIOR = f"##BenchIncidentes_{os.getpid()}"
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def ejecutar_concurrente(hilos, creaciones, operacion):
+    """Ejecuta ``operacion(hilo)`` creaciones veces por hilo. Retorna (resultados, latencias, segundos, errores)."""
+    resultados, latencias, errores = [], [], []
+    guard = threading.Lock()
+    barrera = threading.Barrier(hilos)
+
+    def trabajador(numero):
+        propios, tiempos = [], []
+        barrera.wait()
+        for _ in range(creaciones):
+            inicio = time.perf_counter()
+            try:
+                propios.append(operacion(numero))
+            except Exception as e:
+                with guard:
+                    errores.append(str(e))
+                continue
+            tiempos.append(time.perf_counter() - inicio)
+        with guard:
+            resultados.extend(propios)
+            latencias.extend(tiempos)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultados, latencias, time.perf_counter() - inicio, errores
+
+
+def resumen(nombre, resultados, latencias, segundos, errores):
+    duplicados = sum(n - 1 for n in Counter(resultados).values() if n > 1)
+    return {
+        'modo': nombre,
+        'creaciones': len(resultados),
+        'por_segundo': len(resultados) / segundos if segundos else 0,
+        'mediana_ms': statistics.median(latencias) * 1000 if latencias else 0,
+        'p95_ms': percentil(latencias, 0.95) * 1000 if latencias else 0,
+        'duplicados': duplicados,
+        'errores': len(errores),
+    }
+
+
+def medir_anterior(args):
+    # La tabla temporal global vive mientras esta conexión siga abierta
+    propietaria = crear_conexion()
+    cursor = propietaria.cursor()
+    cursor.execute(f"CREATE TABLE {TABLA_ANTERIOR} (Id INT IDENTITY PRIMARY KEY, EmpresaID INT, IDVisible NVARCHAR(100))")
+    cursor.execute(f"""
+        INSERT INTO {TABLA_ANTERIOR} (EmpresaID, IDVisible)
+        SELECT TOP (?) 1, CONCAT(ROW_NUMBER() OVER (ORDER BY (SELECT NULL)), '_76543210_1_1_INCIDENTE')
+        FROM sys.all_objects a CROSS JOIN sys.all_objects b
+    """, (args.filas,))
+    propietaria.commit()
+
+    def crear(_hilo):
+        conn = crear_conexion()
+        try:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT ISNULL(MAX(CAST(LEFT(IDVisible, CHARINDEX('_', IDVisible) - 1) AS INT)), 0) + 1
+                FROM {TABLA_ANTERIOR} WHERE EmpresaID = 1
+            """)
+            correlativo = c.fetchone()[0]
+            c.execute(f"INSERT INTO {TABLA_ANTERIOR} (EmpresaID, IDVisible) VALUES (1, ?)",
+                      (f"{correlativo}_76543210_1_1_INCIDENTE",))
+            conn.commit()
+            return correlativo
+        finally:
+            conn.close()
+
+    try:
+        return resumen('anterior (MAX + INSERT)', *ejecutar_concurrente(args.hilos, args.creaciones, crear))
+    finally:
+        cursor.execute(f"DROP TABLE {TABLA_ANTERIOR}")
+        propietaria.commit()
+        propietaria.close()
+
+
+def limpiar_secuencia():
+    conn = crear_conexion()
+    try:
+        conn.cursor().execute(f"DELETE FROM {TABLA_SECUENCIA} WHERE EmpresaID = ?", (EMPRESA_BENCH,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def medir_secuencia(args, bloque):
+    limpiar_secuencia()
+    asignadores = [AsignadorCorrelativos(bloque=bloque) for _ in range(args.workers)]
+    try:
+        r = resumen(f"secuencia (bloque {bloque}, {args.workers} workers)",
+                    *ejecutar_concurrente(args.hilos, args.creaciones,
+                                          lambda hilo: asignadores[hilo % args.workers].siguiente(EMPRESA_BENCH)))
+        r['reservas_bd'] = sum(a.stats['reservas_bd'] for a in asignadores)
+        return r
+    finally:
+        limpiar_secuencia()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hilos', type=int, default=16, help='Creadores concurrentes')
+    parser.add_argument('--creaciones', type=int, default=25, help='Creaciones por hilo')
+    parser.add_argument('--filas', type=int, default=20000, help='Incidentes previos de la empresa (modo anterior)')
+    parser.add_argument('--workers', type=int, default=4, help='Instancias del asignador')
+    parser.add_argument('--bloque', type=int, default=20, help='Tamaño de bloque a comparar con 1')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    cargar_entorno()
+    resultados = [medir_anterior(args), medir_secuencia(args, 1)]
+    if args.bloque > 1:
+        resultados.append(medir_secuencia(args, args.bloque))
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        print(f"🔢 {args.hilos} hilos x {args.creaciones} creaciones ({args.filas} incidentes previos)\n")
+        print(f"{'':40}{'op/s':>10}{'mediana ms':>12}{'p95 ms':>10}{'duplicados':>12}{'errores':>9}")
+        for r in resultados:
+            print(f"{r['modo']:40}{r['por_segundo']:10.0f}{r['mediana_ms']:12.2f}{r['p95_ms']:10.2f}"
+                  f"{r['duplicados']:12}{r['errores']:9}")
+
+    if any(r['duplicados'] for r in resultados[1:]):
+        print("❌ La secuencia asignó correlativos duplicados")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Prueba multi-worker y benchmark de los tokens CSRF firmados (security/csrf_protection.py)
+
+  1. Varios workers (procesos, cada uno con su app Flask y su instancia de
+     CSRFProtection, como gunicorn tras el fork) emiten un token cada uno;
+     después todos validan, desde varios hilos a la vez, los tokens de todos:
+     deben pasar con la sesión que los emitió y fallar con otra sesión, con
+     la firma alterada o expirados.
+  2. Rotación de claves: con "2:nueva,1:anterior" los tokens de la versión 1
+     siguen valiendo y los nuevos salen con la versión 2; al retirar la
+     versión 1 sus tokens se rechazan.
+  3. Microbenchmark de emisión y validación con --vigentes tokens emitidos
+     y vigentes: caché por proceso con limpieza completa en cada emisión
+     (anterior) vs firma HMAC sin estado.
+
+Sale con código 1 si alguna verificación falla. No requiere Redis ni BD.
+
+Uso:
+    python dev_tools/benchmark_csrf.py
+    python dev_tools/benchmark_csrf.py --workers 8 --vigentes 50000
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import secrets
+import statistics
+import sys
+import threading
+import time
+
+from flask import Flask, session
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = 'clave-de-prueba-benchmark-csrf'
+CLAVE_ANTERIOR = b'clave-csrf-version-1'
+CLAVE_NUEVA = b'clave-csrf-version-2'
+HILOS = 4
+
+# Solo el módulo CSRF: el paquete security importa todos sus componentes (redis, etc.)
+_spec = importlib.util.spec_from_file_location('csrf_protection', os.path.join(RAIZ, 'security', 'csrf_protection.py'))
+modulo = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(modulo)
+
+
+def crear_app():
+    app = Flask('benchmark_csrf')
+    app.secret_key = SECRET_KEY
+    app.logger.setLevel('ERROR')  # los rechazos esperados registran CSRF_FAILURE
+    csrf = modulo.CSRFProtection()
+    csrf.configurar_claves({1: CLAVE_ANTERIOR})
+    csrf.init_app(app)
+
+    @app.route('/formulario')
+    def formulario():
+        return csrf.generate_csrf_token()
+
+    @app.route('/accion', methods=['POST'])
+    def accion():
+        return 'ok'
+
+    return app, csrf
+
+
+def emitir(cliente):
+    """(cookie de sesión, token) de un GET al formulario con una sesión nueva"""
+    respuesta = cliente.get('/formulario')
+    cookie = respuesta.headers['Set-Cookie'].split(';', 1)[0]
+    return cookie, respuesta.get_data(as_text=True)
+
+
+def aceptado(cliente, cookie, token):
+    respuesta = cliente.post('/accion', headers={
+        'Cookie': cookie, 'X-CSRF-Token': token, 'Origin': 'http://localhost'})
+    return respuesta.status_code == 200
+
+
+def alterar(token):
+    version, expira, firma = token.split('.')
+    return f"{version}.{expira}.{firma[:-1]}{'A' if firma[-1] != 'A' else 'B'}"
+
+
+def validar_todos(app, emitidos):
+    """Valida los tokens de todos los workers desde HILOS hilos a la vez"""
+    conteo = {'propios': 0, 'cruzados': 0, 'alterados': 0}
+    guardia = threading.Lock()
+
+    def hilo(indices):
+        cliente = app.test_client(use_cookies=False)
+        propios = cruzados = alterados = 0
+        for i in indices:
+            cookie, token = emitidos[i]
+            otra_cookie = emitidos[(i + 1) % len(emitidos)][0]
+            propios += aceptado(cliente, cookie, token)
+            cruzados += aceptado(cliente, otra_cookie, token)
+            alterados += aceptado(cliente, cookie, alterar(token))
+        with guardia:
+            conteo['propios'] += propios
+            conteo['cruzados'] += cruzados
+            conteo['alterados'] += alterados
+
+    hilos = [threading.Thread(target=hilo, args=(range(h, len(emitidos), HILOS),)) for h in range(HILOS)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return conteo
+
+
+def worker(indice, compartidos, barrera, resultados):
+    app, csrf = crear_app()
+    cliente = app.test_client(use_cookies=False)
+    resultado = {}
+
+    compartidos[indice] = emitir(cliente)
+    barrera.wait()
+    resultado['fase1'] = validar_todos(app, [compartidos[i] for i in range(len(compartidos))])
+
+    # Despliegue con la clave nueva: firma la 2, la 1 se sigue aceptando
+    barrera.wait()
+    csrf.configurar_claves({2: CLAVE_NUEVA, 1: CLAVE_ANTERIOR})
+    anteriores = [compartidos[i] for i in range(len(compartidos))]
+    barrera.wait()
+    compartidos[indice] = emitir(cliente)
+    barrera.wait()
+    nuevos = [compartidos[i] for i in range(len(compartidos))]
+    resultado['rotacion_anteriores'] = validar_todos(app, anteriores)['propios']
+    resultado['rotacion_nuevos'] = validar_todos(app, nuevos)['propios']
+    resultado['version_nueva'] = all(token.startswith('2.') for _, token in nuevos)
+
+    # Retiro de la versión 1
+    csrf.configurar_claves({2: CLAVE_NUEVA})
+    resultado['retiro_anteriores'] = validar_todos(app, anteriores)['propios']
+    resultado['retiro_nuevos'] = validar_todos(app, nuevos)['propios']
+
+    with app.test_request_context('/'):
+        session['csrf_sid'] = 'sesion-expirada'
+        resultado['expirado'] = csrf.validate_token(csrf.firmar_token('sesion-expirada', int(time.time()) - 1))
+    resultado['stats'] = dict(csrf.stats)
+    resultados[indice] = resultado
+
+
+class CSRFAnterior:
+    """Emisión y validación de la versión anterior: caché por proceso + sesión"""
+
+    def __init__(self, vida=3600):
+        self.vida = vida
+        self.token_cache = {}
+
+    def generate_csrf_token(self):
+        token = secrets.token_urlsafe(32)
+        session['csrf_token'] = token
+        session['csrf_token_data'] = {'created': time.time(), 'expires': time.time() + self.vida}
+        self.token_cache[token] = {'expires': time.time() + self.vida, 'session_id': 'unknown'}
+        ahora = time.time()
+        for expirado in [t for t, d in self.token_cache.items() if d['expires'] < ahora]:
+            del self.token_cache[expirado]
+        return token
+
+    def validate_token(self, token):
+        datos = self.token_cache.get(token)
+        if datos and datos['expires'] > time.time():
+            return True
+        return session.get('csrf_token') == token and session.get('csrf_token_data', {}).get('expires', 0) > time.time()
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return statistics.mean(tiempos) * 1e6, tiempos[int(len(tiempos) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Workers (procesos) simulados')
+    parser.add_argument('--vigentes', type=int, default=20000, help='Tokens vigentes en la caché anterior')
+    parser.add_argument('--repeticiones', type=int, default=2000, help='Mediciones por operación')
+    args = parser.parse_args()
+    ok = True
+
+    print(f"👥 {args.workers} workers x {HILOS} hilos")
+    contexto = multiprocessing.get_context('fork')
+    barrera = contexto.Barrier(args.workers)
+    with contexto.Manager() as manager:
+        compartidos, resultados = manager.dict(), manager.dict()
+        procesos = [contexto.Process(target=worker, args=(i, compartidos, barrera, resultados))
+                    for i in range(args.workers)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        resultados = dict(resultados)
+
+    n = args.workers
+    for indice in range(n):
+        r = resultados.get(indice)
+        if r is None:
+            ok = False
+            print(f"   worker {indice}: sin resultado ❌")
+            continue
+        fase1 = r['fase1']
+        correcto = (fase1 == {'propios': n, 'cruzados': 0, 'alterados': 0}
+                    and r['rotacion_anteriores'] == n and r['rotacion_nuevos'] == n and r['version_nueva']
+                    and r['retiro_anteriores'] == 0 and r['retiro_nuevos'] == n and not r['expirado'])
+        ok &= correcto
+        print(f"   worker {indice}: propios {fase1['propios']}/{n}, otra sesión {fase1['cruzados']}, "
+              f"alterados {fase1['alterados']}; rotación v1 {r['rotacion_anteriores']}/{n} v2 {r['rotacion_nuevos']}/{n}; "
+              f"retirada v1 {r['retiro_anteriores']}/{n}; expirado {r['expirado']} {'✅' if correcto else '❌'}")
+
+    print(f"\n⚡ Emisión y validación con {args.vigentes} tokens vigentes")
+    app, csrf = crear_app()
+    anterior = CSRFAnterior()
+    with app.test_request_context('/'):
+        for _ in range(args.vigentes):
+            anterior.generate_csrf_token()
+        emision_anterior = medir(anterior.generate_csrf_token, args.repeticiones)
+        token = anterior.generate_csrf_token()
+        validacion_anterior = medir(lambda: anterior.validate_token(token), args.repeticiones)
+        # Otro worker: el token no está en su caché y se compara con la sesión
+        otro_worker = CSRFAnterior()
+        validacion_otro_worker = medir(lambda: otro_worker.validate_token(token), args.repeticiones)
+        valido_otro_worker = otro_worker.validate_token(token)
+        session.clear()
+
+        emision_firmada = medir(lambda: csrf.generate_csrf_token(force_new=True), args.repeticiones)
+        firmado = csrf.generate_csrf_token(force_new=True)
+        csrf.config['CHECK_REFERER'] = False
+        validacion_firmada = medir(lambda: csrf.validate_token(firmado), args.repeticiones)
+        ok &= csrf.validate_token(firmado) and not csrf.validate_token(alterar(firmado))
+
+    print(f"   anterior, emisión:            {emision_anterior[0]:9.2f} µs (p99 {emision_anterior[1]:.2f}), "
+          f"{len(anterior.token_cache)} tokens en la caché del proceso")
+    print(f"   anterior, validación:         {validacion_anterior[0]:9.2f} µs (p99 {validacion_anterior[1]:.2f})")
+    print(f"   anterior, en otro worker:     {validacion_otro_worker[0]:9.2f} µs, "
+          f"{'válido' if valido_otro_worker else 'rechazado'} solo si la sesión trae el último token emitido")
+    print(f"   firmado, emisión:             {emision_firmada[0]:9.2f} µs (p99 {emision_firmada[1]:.2f})")
+    print(f"   firmado, validación:          {validacion_firmada[0]:9.2f} µs (p99 {validacion_firmada[1]:.2f}), "
+          f"igual en cualquier worker")
+
+    if not ok:
+        print("❌ Hay verificaciones fallidas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark del almacén de fotografías de incidentes
+
+Compara, sobre una secuencia sintética de ediciones de un incidente:
+  - formato anterior: JSON indentado por versión + copia completa como _ultima
+  - almacén versionado: base comprimida + deltas JSON-patch + dedupe por hash
+
+Reporta bytes en disco, latencia de guardado (mediana/p95), lectura de la
+última versión y reconstrucción de versiones arbitrarias.
+
+Uso:
+    python dev_tools/benchmark_fotografias.py
+    python dev_tools/benchmark_fotografias.py --versiones 200 --evidencias 400
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.incidentes.almacen_fotografias import AlmacenFotografias  # noqa: E402
+
+INCIDENTE_ID = 1
+
+
+def fotografia_sintetica(evidencias, taxonomias, comentarios, rnd):
+    """Fotografía con la forma de crear_fotografia_completa."""
+    def texto(n):
+        return ' '.join(rnd.choice(['incidente', 'sistema', 'acceso', 'configuración', 'red',
+                                    'servidor', 'evidencia', 'análisis', 'mitigación'])
+                        for _ in range(n))
+
+    return {
+        "metadata": {"version": "2.0", "incidente_id": INCIDENTE_ID,
+                     "fecha_fotografia": datetime.now().isoformat(),
+                     "encoding": "UTF-8", "correccion_aplicada": True},
+        "datos_principales": {
+            "IncidenteID": INCIDENTE_ID, "Titulo": texto(8), "DescripcionInicial": texto(200),
+            "AnalisisCausaRaiz": texto(150), "EstadoActual": "Abierto", "Criticidad": "Alta",
+            "FechaCreacion": "2025-01-01 10:00:00",
+        },
+        "evidencias_generales": [
+            {"EvidenciaID": i, "IncidenteID": INCIDENTE_ID, "NombreArchivo": f"evidencia_{i}.pdf",
+             "RutaArchivo": f"/uploads/{INCIDENTE_ID}/evidencia_{i}.pdf", "Descripcion": texto(30),
+             "SeccionFormulario": i % 6, "FechaSubida": f"2025-01-{1 + i % 28:02d} 12:00:00",
+             "TamanoKB": rnd.randint(10, 5000), "Version": 1}
+            for i in range(evidencias)
+        ],
+        "taxonomias": [
+            {"Id_Taxonomia": f"TAX_{i}", "Justificacion": texto(40), "DescripcionProblema": texto(40),
+             "Area": texto(3), "Efecto": texto(3), "Categoria_del_Incidente": texto(4)}
+            for i in range(taxonomias)
+        ],
+        "evidencias_taxonomias": [
+            {"Id_Taxonomia": f"TAX_{i % max(taxonomias, 1)}", "NumeroEvidencia": i,
+             "NombreArchivo": f"tax_{i}.png", "Descripcion": texto(20)}
+            for i in range(evidencias // 4)
+        ],
+        "comentarios_taxonomias": [
+            {"ComentarioID": i, "Comentario": texto(25)} for i in range(comentarios)
+        ],
+        "resumen": {},
+    }
+
+
+def editar(fotografia, rnd, paso):
+    """Una edición típica: cambiar campos, agregar o quitar una evidencia, o nada."""
+    nueva = copy.deepcopy(fotografia)
+    nueva["metadata"]["fecha_fotografia"] = datetime.now().isoformat()
+    accion = rnd.random()
+    if accion < 0.15:
+        pass  # Guardar sin cambios
+    elif accion < 0.55:
+        nueva["datos_principales"]["DescripcionInicial"] += f" Actualización {paso}."
+        nueva["datos_principales"]["EstadoActual"] = rnd.choice(["Abierto", "En Proceso", "Cerrado"])
+    elif accion < 0.8:
+        evidencias = nueva["evidencias_generales"]
+        posicion = rnd.randint(0, len(evidencias))
+        evidencias.insert(posicion, {"EvidenciaID": 10000 + paso, "IncidenteID": INCIDENTE_ID,
+                                     "NombreArchivo": f"nueva_{paso}.pdf", "Descripcion": f"Evidencia {paso}",
+                                     "SeccionFormulario": posicion % 6, "FechaSubida": "2025-02-01 12:00:00",
+                                     "TamanoKB": 100, "Version": 1})
+    elif accion < 0.9 and nueva["evidencias_generales"]:
+        nueva["evidencias_generales"].pop(rnd.randrange(len(nueva["evidencias_generales"])))
+    else:
+        comentario = rnd.choice(nueva["comentarios_taxonomias"])
+        comentario["Comentario"] += f" (editado {paso})"
+    return nueva
+
+
+def tamano_directorio(ruta):
+    return sum(os.path.getsize(os.path.join(raiz, nombre))
+               for raiz, _, archivos in os.walk(ruta) for nombre in archivos)
+
+
+def guardar_formato_anterior(carpeta, fotografia, paso):
+    """Réplica del guardar_fotografia original."""
+    ruta = os.path.join(carpeta, f"fotografia_actual_{paso:06d}.json")
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(fotografia, f, ensure_ascii=False, indent=2, default=str)
+    shutil.copy2(ruta, os.path.join(carpeta, "fotografia_actual_ultima.json"))
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def medir(args):
+    rnd = random.Random(args.semilla)
+    base = fotografia_sintetica(args.evidencias, args.taxonomias, args.comentarios, rnd)
+    secuencia = [base]
+    for paso in range(1, args.versiones):
+        secuencia.append(editar(secuencia[-1], rnd, paso))
+
+    raiz = tempfile.mkdtemp(prefix='bench_fotografias_')
+    try:
+        # Formato anterior
+        carpeta_anterior = os.path.join(raiz, 'anterior')
+        os.makedirs(carpeta_anterior)
+        tiempos_anterior = []
+        for paso, fotografia in enumerate(secuencia):
+            inicio = time.perf_counter()
+            guardar_formato_anterior(carpeta_anterior, fotografia, paso)
+            tiempos_anterior.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        with open(os.path.join(carpeta_anterior, "fotografia_actual_ultima.json"), encoding='utf-8') as f:
+            json.load(f)
+        lectura_anterior = time.perf_counter() - inicio
+
+        # Almacén versionado
+        almacen = AlmacenFotografias(os.path.join(raiz, 'almacen'))
+        tiempos_almacen = []
+        versiones_nuevas = 0
+        for fotografia in secuencia:
+            inicio = time.perf_counter()
+            resultado = almacen.guardar(INCIDENTE_ID, 'actual', fotografia)
+            tiempos_almacen.append(time.perf_counter() - inicio)
+            versiones_nuevas += resultado['nueva']
+
+        inicio = time.perf_counter()
+        ultima = almacen.cargar_ultima(INCIDENTE_ID, 'actual')
+        lectura_almacen = time.perf_counter() - inicio
+
+        historial = almacen.historial(INCIDENTE_ID, 'actual')
+        tiempos_reconstruccion = []
+        for entrada in rnd.sample(historial, min(len(historial), 30)):
+            inicio = time.perf_counter()
+            almacen.cargar_version(INCIDENTE_ID, 'actual', entrada['version'])
+            tiempos_reconstruccion.append(time.perf_counter() - inicio)
+
+        # Verificación: la última y una versión intermedia reconstruyen exacto
+        esperado = json.loads(json.dumps(secuencia[-1], ensure_ascii=False, default=str))
+        ok_ultima = {k: v for k, v in ultima.items() if k != 'metadata'} == \
+                    {k: v for k, v in esperado.items() if k != 'metadata'}
+        reconstruida = almacen.cargar_version(INCIDENTE_ID, 'actual', historial[0]['version'])
+        ok_reconstruccion = {k: v for k, v in reconstruida.items() if k != 'metadata'} == \
+                            {k: v for k, v in esperado.items() if k != 'metadata'}
+
+        return {
+            'versiones_guardadas': len(secuencia),
+            'versiones_nuevas': versiones_nuevas,
+            'tamano_fotografia_kb': len(json.dumps(base, ensure_ascii=False, indent=2)) / 1024,
+            'anterior': {
+                'bytes': tamano_directorio(carpeta_anterior),
+                'guardar_mediana_ms': statistics.median(tiempos_anterior) * 1000,
+                'guardar_p95_ms': percentil(tiempos_anterior, 0.95) * 1000,
+                'leer_ultima_ms': lectura_anterior * 1000,
+            },
+            'almacen': {
+                'bytes': tamano_directorio(os.path.join(raiz, 'almacen')),
+                'guardar_mediana_ms': statistics.median(tiempos_almacen) * 1000,
+                'guardar_p95_ms': percentil(tiempos_almacen, 0.95) * 1000,
+                'leer_ultima_ms': lectura_almacen * 1000,
+                'reconstruir_mediana_ms': statistics.median(tiempos_reconstruccion) * 1000,
+                'reconstruir_max_ms': max(tiempos_reconstruccion) * 1000,
+                'bases': sum(1 for v in historial if v['tipo'] == 'base'),
+                'deltas': sum(1 for v in historial if v['tipo'] == 'delta'),
+                'referencias': sum(1 for v in historial if v['tipo'] == 'ref'),
+            },
+            'verificacion': {'ultima': ok_ultima, 'reconstruccion': ok_reconstruccion},
+        }
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--versiones', type=int, default=100)
+    parser.add_argument('--evidencias', type=int, default=300)
+    parser.add_argument('--taxonomias', type=int, default=35)
+    parser.add_argument('--comentarios', type=int, default=60)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    r = medir(args)
+    if args.json:
+        print(json.dumps(r, indent=2))
+        return
+
+    a, n = r['anterior'], r['almacen']
+    print(f"📸 {r['versiones_guardadas']} guardados ({r['versiones_nuevas']} versiones con cambios), "
+          f"fotografía de {r['tamano_fotografia_kb']:.0f} KB")
+    print(f"\n{'':28}{'anterior':>12}{'almacén':>12}")
+    print(f"{'bytes en disco':28}{a['bytes'] / 1024:11.0f}K{n['bytes'] / 1024:11.0f}K"
+          f"   ({a['bytes'] / max(n['bytes'], 1):.1f}x menos)")
+    print(f"{'guardar mediana (ms)':28}{a['guardar_mediana_ms']:12.2f}{n['guardar_mediana_ms']:12.2f}")
+    print(f"{'guardar p95 (ms)':28}{a['guardar_p95_ms']:12.2f}{n['guardar_p95_ms']:12.2f}")
+    print(f"{'leer última (ms)':28}{a['leer_ultima_ms']:12.2f}{n['leer_ultima_ms']:12.2f}")
+    print(f"{'reconstruir versión (ms)':28}{'-':>12}{n['reconstruir_mediana_ms']:12.2f}"
+          f"   (máx {n['reconstruir_max_ms']:.2f})")
+    print(f"\n🧱 bases={n['bases']} deltas={n['deltas']} referencias={n['referencias']}")
+    verificacion = r['verificacion']
+    estado = '✅' if all(verificacion.values()) else '❌'
+    print(f"{estado} verificación: última={verificacion['ultima']} reconstrucción={verificacion['reconstruccion']}")
+    if not all(verificacion.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
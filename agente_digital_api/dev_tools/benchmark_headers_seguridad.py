@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Prueba y benchmark de los headers de seguridad (security/headers_security.py)
+
+  1. Estabilidad: aplica los headers a --respuestas respuestas repartidas entre
+     las clases de ruta (api, admin, static, general), con y sin nonce, y
+     verifica que el tamaño de los headers de cada clase no cambie y que
+     default_csp quede intacto. Antes, cada respuesta de /admin/ agregaba
+     fuentes a las listas compartidas de default_csp.
+  2. Microbenchmark por respuesta:
+     - por respuesta: CSP, HSTS y Permissions-Policy construidos en cada
+       respuesta (como antes de compilar)
+     - compilado: SecurityHeaders._apply_security_headers con los paquetes
+
+Sale con código 1 si la verificación falla. No requiere base de datos.
+
+Uso:
+    python dev_tools/benchmark_headers_seguridad.py
+    python dev_tools/benchmark_headers_seguridad.py --respuestas 200000 --repeticiones 50000
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+from flask import Flask, Response, g
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Solo el módulo de headers: el paquete security importa todos sus componentes (redis, etc.)
+_spec = importlib.util.spec_from_file_location(
+    'headers_security', os.path.join(RAIZ, 'security', 'headers_security.py'))
+headers_security = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(headers_security)
+
+RUTAS = {'api': '/api/incidentes', 'admin': '/admin/panel', 'static': '/static/app.js', 'general': '/'}
+
+
+def tamano_headers(response):
+    return sum(len(nombre) + len(valor) for nombre, valor in response.headers.items())
+
+
+def verificar_estabilidad(app, headers, respuestas):
+    """Tamaño de headers constante por clase de ruta después de ``respuestas`` respuestas"""
+    csp_original = json.dumps(headers.default_csp)
+    por_clase = respuestas // len(RUTAS)
+    errores = []
+
+    for clase, ruta in RUTAS.items():
+        for con_nonce in (False, True):
+            with app.test_request_context(ruta, headers={'Origin': 'https://cliente.example.cl'}):
+                if con_nonce:
+                    headers.generate_nonce()
+                tamanos = set()
+                for _ in range(por_clase // 2):
+                    tamanos.add(tamano_headers(headers._apply_security_headers(Response())))
+                if len(tamanos) != 1:
+                    errores.append(f"{clase} (nonce={con_nonce}): tamaños {sorted(tamanos)[:3]}...")
+
+                ultima = headers._apply_security_headers(Response())
+                csp = ultima.headers.get('Content-Security-Policy', '')
+                if con_nonce and clase in ('admin', 'general') and f"'nonce-{g.csp_nonce}'" not in csp:
+                    errores.append(f"{clase}: nonce ausente en la CSP")
+                if headers_security.MARCA_NONCE in csp:
+                    errores.append(f"{clase}: marca de nonce sin reemplazar")
+
+    if json.dumps(headers.default_csp) != csp_original:
+        errores.append("default_csp fue modificado")
+    return errores
+
+
+def aplicar_por_respuesta(headers, path, response):
+    """Referencia: construye los valores en cada respuesta, como antes de compilar"""
+    csp, plantilla = headers._build_csp(headers._get_csp_for_route(path))
+    nonce = g.get('csp_nonce')
+    if nonce is not None and plantilla is not None:
+        csp = f"{plantilla[0]}{nonce}{plantilla[1]}"
+    response.headers['Content-Security-Policy'] = csp
+    response.headers['Strict-Transport-Security'] = headers._build_hsts()
+    response.headers['X-Frame-Options'] = headers.config['FRAME_OPTIONS']
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['X-XSS-Protection'] = headers.config['XSS_PROTECTION']
+    response.headers['Referrer-Policy'] = headers.config['REFERRER_POLICY']
+    response.headers['Permissions-Policy'] = headers._build_permissions_policy()
+    headers._apply_cors_headers(response)
+    response.headers['X-Permitted-Cross-Domain-Policies'] = 'none'
+    response.headers['X-Download-Options'] = 'noopen'
+    response.headers['X-DNS-Prefetch-Control'] = 'off'
+    response.headers.pop('Server', None)
+    response.headers.pop('X-Powered-By', None)
+    return response
+
+
+def medir(app, funcion, repeticiones):
+    """Microsegundos por respuesta, promedio sobre las clases de ruta"""
+    total = 0.0
+    for ruta in RUTAS.values():
+        with app.test_request_context(ruta, headers={'Origin': 'https://cliente.example.cl'}):
+            respuestas = [Response() for _ in range(repeticiones)]
+            inicio = time.perf_counter()
+            for response in respuestas:
+                funcion(ruta, response)
+            total += time.perf_counter() - inicio
+    return total / (repeticiones * len(RUTAS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--respuestas', type=int, default=100000, help='Respuestas de la verificación')
+    parser.add_argument('--repeticiones', type=int, default=20000, help='Respuestas por ruta en el benchmark')
+    args = parser.parse_args()
+
+    app = Flask('benchmark_headers')
+    headers = headers_security.SecurityHeaders()
+    headers.init_app(app)
+
+    print(f"🔒 Verificando {args.respuestas} respuestas en {len(RUTAS)} clases de ruta...")
+    inicio = time.perf_counter()
+    errores = verificar_estabilidad(app, headers, args.respuestas)
+    print(f"   {time.perf_counter() - inicio:.1f}s")
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Tamaño de headers constante y default_csp intacto")
+    for clase, paquete in headers._paquetes.items():
+        print(f"   {clase:8} {paquete.tamano():5} bytes")
+
+    por_respuesta = medir(app, lambda ruta, r: aplicar_por_respuesta(headers, ruta, r), args.repeticiones)
+    compilado = medir(app, lambda ruta, r: headers._apply_security_headers(r), args.repeticiones)
+    print(f"\n⚡ {args.repeticiones} respuestas por ruta")
+    print(f"   por respuesta: {por_respuesta:7.2f} µs")
+    print(f"   compilado:     {compilado:7.2f} µs")
+    print(f"🚀 Aceleración: x{por_respuesta / compilado:.1f}")
+
+
+if __name__ == "__main__":
+    main()
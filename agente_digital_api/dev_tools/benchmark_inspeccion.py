@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Prueba y benchmark del motor de inspección de requests (security/inspection_engine.py)
+
+  1. Equivalencia: para SUSPICIOUS_PATTERNS (SecurityMiddleware), los
+     patrones peligrosos de InputValidator y los de XSSProtection (si bleach
+     está instalado), compara el veredicto de la regex compilada con el
+     recorrido anterior (re.search patrón por patrón) sobre un corpus de
+     textos normales, ataques conocidos y --fuzz textos aleatorios.
+  2. Equivalencia del cuerpo JSON: _validate_json_data contra el recorrido
+     recursivo anterior (mismos rechazos, incluido el límite de profundidad).
+  3. Microbenchmark de la inspección de una request (URL, --headers headers
+     y un cuerpo JSON con --campos campos): recorrido anterior vs motor.
+
+Sale con código 1 si alguna verificación falla. No requiere base de datos.
+
+Uso:
+    python dev_tools/benchmark_inspeccion.py
+    python dev_tools/benchmark_inspeccion.py --campos 500 --repeticiones 2000
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import types
+
+from flask import Flask
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Solo los módulos necesarios: el __init__ del paquete security importa todos
+# sus componentes (redis, etc.)
+_paquete = types.ModuleType('security')
+_paquete.__path__ = [os.path.join(RAIZ, 'security')]
+sys.modules.setdefault('security', _paquete)
+
+security_middleware = importlib.import_module('security.security_middleware')
+input_validator = importlib.import_module('security.input_validator')
+monitoring = importlib.import_module('security.monitoring')
+try:
+    xss_protection = importlib.import_module('security.xss_protection')
+except ImportError:  # bleach no instalado
+    xss_protection = None
+
+ATAQUES = [
+    "<script>alert(1)</script>", "<SCRIPT SRC=//x.cl/a.js>", "javascript:alert(1)", "<img src=x onerror=alert(1)>",
+    "../../etc/passwd", "..\\..\\windows\\win.ini", "%2e%2e%2f", "%252e%252e", "1 UNION   SELECT password FROM u",
+    "'; DROP TABLE Incidentes;--", "INSERT INTO x VALUES(1)", "exec (xp_cmdshell)", "eval(atob('x'))",
+    "system ('ls')", "cmd.exe /c dir", "a\x00b", "fin\x1a", "del\x7f", "<iframe src=x>", "{{7*7}}", "${jndi:ldap}",
+    "<svg onload=alert(1)>", "data:text/html;base64,PHNjcmlwdD4=", "style=\"x:expression(alert(1))\"", "@import url(x)",
+    "&#x3c;script&#x3e;", "<!DOCTYPE x [<!ENTITY e SYSTEM 'file:///'>]>", "{\"$ne\": 1}", "1 or 1=1", "a AND 2 = 2",
+]
+NORMALES = [
+    "Incidente de seguridad en servidor de correo", "Acceso no autorizado detectado el 2025-01-01",
+    "Compañía Ñandú SpA", "José Pérez", "Se reinició el servicio y se revisaron los registros",
+    "phishing dirigido a finanzas", "Informe Temprano", "usuario@empresa.cl", "https://empresa.cl/portal",
+    "Estado: Abierto", "Criticidad Alta", "12345", "Selección de controles", "Unión de sucursales",
+]
+
+
+def patrones_anteriores(patrones, flags):
+    """Veredicto del recorrido anterior: re.search por cada patrón"""
+    def coincide(texto):
+        return any(re.search(patron, texto, flags) for patron in patrones)
+    return coincide
+
+
+def corpus(cantidad, semilla=42):
+    azar = random.Random(semilla)
+    alfabeto = "abcdefghijklmnopqrstuvwxyz ABCXYZıſKİ<>/\\.;:=()'\"{}$%&#@*|`-_\x00\x1a\x7fñé0123456789\n\t"
+    fragmentos = ATAQUES + NORMALES + ["union", "select", "script", "on", "click", "exec", "..", "drop", "table"]
+    textos = list(ATAQUES) + list(NORMALES)
+    for _ in range(cantidad):
+        partes = [azar.choice(fragmentos) if azar.random() < 0.4
+                  else ''.join(azar.choice(alfabeto) for _ in range(azar.randint(1, 12)))
+                  for _ in range(azar.randint(1, 5))]
+        textos.append(azar.choice(['', ' ', '  ']).join(partes))
+    return textos
+
+
+def verificar_patrones(nombre, patrones, flags, textos, preparar=lambda t: t):
+    anterior = patrones_anteriores(patrones, flags)
+    conjunto = security_middleware.compile_patterns(patrones, flags)
+    diferencias = [t for t in textos if anterior(preparar(t)) != conjunto.matches(preparar(t))]
+    detectados = sum(1 for t in textos if conjunto.matches(preparar(t)))
+    print(f"   {nombre:28} {len(patrones):3} patrones  {detectados:6}/{len(textos)} detectados"
+          f"  {'✅' if not diferencias else '❌ ' + repr(diferencias[:3])}")
+    return not diferencias
+
+
+def validar_json_anterior(data, patrones, depth=0):
+    """Recorrido recursivo anterior de SecurityMiddleware._validate_json_data"""
+    if depth > 10:
+        raise ValueError("JSON too deeply nested")
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(key, str):
+                for pattern in patrones:
+                    if re.search(pattern, key, re.IGNORECASE):
+                        raise ValueError(f"Suspicious pattern in key: {key}")
+            validar_json_anterior(value, patrones, depth + 1)
+    elif isinstance(data, list):
+        for item in data:
+            validar_json_anterior(item, patrones, depth + 1)
+    elif isinstance(data, str):
+        for pattern in patrones:
+            if re.search(pattern, data, re.IGNORECASE):
+                raise ValueError("Suspicious pattern in value")
+
+
+def rechaza(funcion, data):
+    try:
+        funcion(data)
+        return False
+    except ValueError:
+        return True
+
+
+def anidado(profundidad, hoja):
+    data = hoja
+    for i in range(profundidad):
+        data = {'n': data} if i % 2 else [data]
+    return data
+
+
+def cuerpo(campos, azar):
+    return {
+        'incidente': {f"campo_{i}": azar.choice(NORMALES) for i in range(campos)},
+        'taxonomias': [{'id': i, 'justificacion': azar.choice(NORMALES), 'activo': True} for i in range(campos // 10)],
+        'total': campos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fuzz', type=int, default=20000, help='Textos aleatorios del corpus')
+    parser.add_argument('--campos', type=int, default=200, help='Campos del cuerpo JSON')
+    parser.add_argument('--headers', type=int, default=15, help='Headers de la request')
+    parser.add_argument('--repeticiones', type=int, default=1000, help='Requests por modo')
+    args = parser.parse_args()
+
+    middleware = security_middleware.SecurityMiddleware()
+    patrones = middleware.config['SUSPICIOUS_PATTERNS']
+    textos = corpus(args.fuzz)
+    ok = True
+
+    print("🔍 Equivalencia de patrones")
+    ok &= verificar_patrones('SecurityMiddleware', patrones, re.IGNORECASE, textos)
+    ok &= verificar_patrones('InputValidator', input_validator.InputValidator().dangerous_patterns,
+                             re.IGNORECASE, textos)
+    if xss_protection is not None:
+        ok &= verificar_patrones('XSSProtection', xss_protection.XSSProtection().xss_patterns,
+                                 re.IGNORECASE | re.DOTALL, textos, str.lower)
+    else:
+        print("   XSSProtection                omitido (bleach no instalado)")
+
+    print("🔍 Equivalencia del cuerpo JSON")
+    azar = random.Random(7)
+    cuerpos = [cuerpo(20, azar) for _ in range(50)]
+    cuerpos += [{'a': [1, {'b': t}]} for t in ATAQUES + NORMALES] + [{t: 1} for t in ATAQUES + NORMALES]
+    cuerpos += [anidado(p, h) for p in range(8, 14) for h in ('ok', "<script>", [], {})]
+    diferencias = [c for c in cuerpos
+                   if rechaza(lambda d: validar_json_anterior(d, patrones), c) != rechaza(middleware._validate_json_data, c)]
+    print(f"   {len(cuerpos)} cuerpos {'✅' if not diferencias else '❌ ' + json.dumps(diferencias[:2])[:200]}")
+    ok &= not diferencias
+    if not ok:
+        sys.exit(1)
+
+    # Request de ejemplo
+    app = Flask('benchmark_inspeccion')
+    headers = {'Authorization': 'Bearer ' + 'x' * 200, 'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64)',
+               'Accept-Language': 'es-CL,es;q=0.9'}
+    headers.update({f"X-Extra-{i}": f"valor {i}" for i in range(max(0, args.headers - len(headers)))})
+    body = cuerpo(args.campos, random.Random(1))
+
+    def anterior():
+        from flask import request
+        full_path = request.full_path
+        for pattern in patrones:
+            if re.search(pattern, full_path, re.IGNORECASE):
+                raise ValueError(pattern)
+        for header_name, header_value in request.headers:
+            header_str = f"{header_name}: {header_value}"
+            for pattern in patrones:
+                if re.search(pattern, header_str, re.IGNORECASE):
+                    raise ValueError(pattern)
+        validar_json_anterior(request.get_json(), patrones)
+
+    resultados = {}
+    with app.test_request_context('/api/admin/incidentes/1?empresa_id=3&detalle=true', method='POST',
+                                  json=body, headers=headers):
+        for nombre, funcion in (('anterior', anterior), ('motor', middleware._inspect_request)):
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                funcion()
+                tiempos.append(time.perf_counter() - inicio)
+            resultados[nombre] = statistics.median(tiempos) * 1e6
+
+    print(f"\n⚡ Inspección de una request: {args.headers} headers, cuerpo de {len(json.dumps(body))} bytes")
+    for nombre, us in resultados.items():
+        print(f"   {nombre:9} {us:9.1f} µs")
+    print(f"🚀 Aceleración: x{resultados['anterior'] / resultados['motor']:.1f}")
+    print(f"📊 Monitor: {monitoring.security_monitor._get_inspection_metrics()}")
+    print(f"📊 Motor:   {security_middleware.inspection_engine.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
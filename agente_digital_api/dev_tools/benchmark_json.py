@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de listas grandes (filas de pyodbc -> respuesta JSON)
+
+Compara, sobre --filas filas sintéticas con la forma de la lista de
+incidentes (enteros, textos con acentos, datetime, Decimal, NULL):
+  - anterior: [dict(zip(columns, row))] + jsonify con DefaultJSONProvider
+  - rapido:   filas_a_dicts (mapeador compilado) + ProveedorJSONRapido
+              (orjson si está instalado, si no json de la stdlib)
+  - rapido ISO: igual, con JSON_FECHAS_ISO (orjson serializa las fechas
+              sin pasar por Python)
+
+Verifica además que anterior y rapido produzcan el mismo JSON (mismas claves y valores).
+No requiere base de datos.
+
+Uso:
+    python dev_tools/benchmark_json.py
+    python dev_tools/benchmark_json.py --filas 50000 --repeticiones 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.json_rapido import ProveedorJSONRapido, filas_a_dicts, orjson  # noqa: E402
+
+COLUMNAS = ('IncidenteID', 'IDVisible', 'Titulo', 'EstadoActual', 'Criticidad', 'FechaCreacion',
+            'FechaDeteccion', 'EmpresaID', 'RazonSocial', 'PorcentajeAvance', 'Responsable', 'TipoFlujo')
+
+
+class CursorSintetico:
+    """Lo mínimo de un cursor pyodbc: description y fetchall"""
+
+    def __init__(self, filas):
+        self.description = [(c, None, None, None, None, None, True) for c in COLUMNAS]
+        self._filas = filas
+
+    def fetchall(self):
+        return self._filas
+
+
+def generar_filas(cantidad):
+    base = datetime(2025, 1, 1, 8, 30)
+    estados = ('Abierto', 'Cerrado', 'Pendiente')
+    criticidades = ('Alta', 'Media', 'Baja')
+    return [
+        (i, f"{i}_76543210_1_1_INCIDENTE", f"Incidente de seguridad número {i} — acceso no autorizado",
+         estados[i % 3], criticidades[i % 3], base + timedelta(minutes=i), base + timedelta(minutes=i, seconds=30),
+         i % 40, f"Compañía Ñandú {i % 40} SpA", Decimal(f"{i % 100}.50"),
+         None if i % 4 else f"José Pérez {i}", 'Informe Temprano')
+        for i in range(cantidad)
+    ]
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, min(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=10000, help='Filas de la lista')
+    parser.add_argument('--repeticiones', type=int, default=15, help='Repeticiones por modo')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    filas = generar_filas(args.filas)
+    cursor = CursorSintetico(filas)
+
+    app_anterior = Flask('anterior')
+    app_anterior.json = DefaultJSONProvider(app_anterior)
+    app_rapida = Flask('rapida')
+    app_rapida.config.update({'JSON_SORT_KEYS': False, 'JSON_AS_ASCII': False})
+    app_rapida.json = ProveedorJSONRapido(app_rapida)
+    app_iso = Flask('iso')
+    app_iso.config.update({'JSON_SORT_KEYS': False, 'JSON_AS_ASCII': False, 'JSON_FECHAS_ISO': True})
+    app_iso.json = ProveedorJSONRapido(app_iso)
+
+    def anterior_filas():
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def anterior():
+        with app_anterior.app_context():
+            return app_anterior.json.response(anterior_filas()).get_data()
+
+    def rapido():
+        with app_rapida.app_context():
+            return app_rapida.json.response(filas_a_dicts(cursor)).get_data()
+
+    def rapido_iso():
+        with app_iso.app_context():
+            return app_iso.json.response(filas_a_dicts(cursor)).get_data()
+
+    # Misma salida (el anterior ordena claves y escapa a ASCII; se compara ya parseado)
+    if json.loads(anterior()) != json.loads(rapido()):
+        print("❌ Las salidas no coinciden")
+        sys.exit(1)
+
+    resultados = []
+    for nombre, fila_fn, respuesta_fn in (
+        ('anterior (dict(zip) + jsonify stdlib)', anterior_filas, anterior),
+        (f"rapido (mapeador + {app_rapida.json.motor})", lambda: filas_a_dicts(cursor), rapido),
+        (f"rapido ISO (mapeador + {app_iso.json.motor})", lambda: filas_a_dicts(cursor), rapido_iso),
+    ):
+        mediana_filas, _ = medir(fila_fn, args.repeticiones)
+        mediana, minimo = medir(respuesta_fn, args.repeticiones)
+        resultados.append({
+            'modo': nombre,
+            'filas_a_dict_ms': round(mediana_filas, 2),
+            'respuesta_ms': round(mediana, 2),
+            'respuesta_min_ms': round(minimo, 2),
+            'bytes': len(respuesta_fn()),
+        })
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        return
+
+    print(f"⚡ {args.filas} filas x {len(COLUMNAS)} columnas, {args.repeticiones} repeticiones"
+          f" (orjson {'instalado' if orjson else 'no instalado'})\n")
+    print(f"{'':44}{'filas ms':>10}{'total ms':>10}{'min ms':>9}{'bytes':>10}")
+    for r in resultados:
+        print(f"{r['modo']:44}{r['filas_a_dict_ms']:10.2f}{r['respuesta_ms']:10.2f}"
+              f"{r['respuesta_min_ms']:9.2f}{r['bytes']:10}")
+    print()
+    for r in resultados[1:]:
+        print(f"🚀 {r['modo']}: x{resultados[0]['respuesta_ms'] / r['respuesta_ms']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
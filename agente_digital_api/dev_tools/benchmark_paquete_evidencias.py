@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark y verificación del paquete ZIP de evidencias
+
+Sobre archivos sintéticos (imágenes/PDF incompresibles y texto), sin BD:
+  - memoria máxima (tracemalloc) al generar paquetes de distinto tamaño:
+    debe ser la misma, no proporcional al paquete
+  - rendimiento en MB/s de generación
+  - ZIP válido (testzip), ZIP_STORED para formatos comprimidos, deflate
+    para el resto, y manifest.csv con el SHA-256 de cada archivo
+  - salida determinista y reanudación: un parcial truncado y con la cola
+    corrupta se completa con los mismos bytes que la generación completa
+  - con --zip64, un archivo disperso de más de 4 GiB fuerza ZIP64
+
+Uso:
+    python dev_tools/benchmark_paquete_evidencias.py
+    python dev_tools/benchmark_paquete_evidencias.py --mb 500 --zip64
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+TEMPORAL = tempfile.mkdtemp(prefix='benchmark_paquete_')
+os.environ['PAQUETES_EVIDENCIAS_DIR'] = os.path.join(TEMPORAL, 'paquetes')
+os.environ['TAREAS_DIR'] = os.path.join(TEMPORAL, 'tareas')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.admin import paquete_evidencias as modulo  # noqa: E402
+
+TEXTO = ("incidente acceso servidor evidencia análisis mitigación red configuración "
+         "registro alerta sistema usuario ").encode('utf-8')
+
+
+def crear_archivos(carpeta, megas, rnd):
+    """Filas (carpeta, ruta, origen, referencia, nombre) con ~megas MB de archivos"""
+    os.makedirs(carpeta, exist_ok=True)
+    filas, total, i = [], 0, 0
+    while total < megas * 1024 * 1024:
+        extension = ('jpg', 'pdf', 'txt', 'log', 'png')[i % 5]
+        tamano = rnd.randint(64 * 1024, 4 * 1024 * 1024)
+        ruta = os.path.join(carpeta, f"evidencia_{i}.{extension}")
+        with open(ruta, 'wb') as f:
+            if extension in modulo.EXTENSIONES_COMPRIMIDAS:
+                f.write(os.urandom(tamano))
+            else:
+                f.write((TEXTO * (tamano // len(TEXTO) + 1))[:tamano])
+        filas.append((f"incidentes/INC-{i % 7}/evidencias/", ruta, 'EvidenciasIncidentes', str(i % 7),
+                      f"evidencia_{i}.{extension}"))
+        total += tamano
+        i += 1
+    # Fila con el mismo nombre y una que ya no está en disco
+    filas.append((filas[0][0], filas[1][1] + '.copia', 'EVIDENCIAS_TAXONOMIA', '0', filas[0][4]))
+    shutil.copy(filas[1][1], filas[-1][1])
+    filas.append(('cumplimiento/1/', os.path.join(carpeta, 'borrado.pdf'), 'EvidenciasCumplimiento', '1', 'borrado.pdf'))
+    return filas, total
+
+
+def generar(paquete, destino=None):
+    """(bytes, sha256, segundos, pico de memoria) de una generación completa"""
+    sha256, tamano = hashlib.sha256(), 0
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for bloque in modulo.generar_zip(paquete):
+        sha256.update(bloque)
+        tamano += len(bloque)
+        if destino:
+            destino.write(bloque)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tamano, sha256.hexdigest(), segundos, pico
+
+
+def verificar_zip(ruta, paquete):
+    with zipfile.ZipFile(ruta) as zf:
+        ok = zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+        manifiesto = list(csv.DictReader(io.StringIO(zf.read(modulo.NOMBRE_MANIFIESTO).decode('utf-8'))))
+        for fila in manifiesto:
+            entrada = next(e for e in paquete.entradas if e.nombre_zip == fila['archivo'])
+            if fila['estado'] != 'incluido':
+                ok &= fila['archivo'] not in infos and not entrada.estado.existe
+                continue
+            info = infos[fila['archivo']]
+            extension = os.path.splitext(entrada.ruta)[1].lstrip('.')
+            esperado = zipfile.ZIP_STORED if extension in modulo.EXTENSIONES_COMPRIMIDAS else zipfile.ZIP_DEFLATED
+            ok &= info.compress_type == esperado
+            ok &= hashlib.sha256(zf.read(info)).hexdigest() == fila['sha256']
+            with open(entrada.ruta, 'rb') as f:
+                ok &= hashlib.sha256(f.read()).hexdigest() == fila['sha256']
+        ok &= len(manifiesto) == len(paquete.entradas)
+    return ok, manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mb', type=int, default=120, help='Tamaño del paquete grande en MB')
+    parser.add_argument('--zip64', action='store_true', help='Incluir un archivo disperso de 4.1 GiB')
+    args = parser.parse_args()
+    rnd = random.Random(42)
+    ok = True
+
+    try:
+        print("🧠 Memoria máxima según el tamaño del paquete")
+        picos = []
+        for megas in (max(args.mb // 8, 4), args.mb):
+            filas, total = crear_archivos(os.path.join(TEMPORAL, f"archivos_{megas}"), megas, rnd)
+            paquete = modulo._armar('evidencias.zip', filas)
+            tamano, _, segundos, pico = generar(paquete)
+            picos.append(pico)
+            print(f"   {len(paquete.entradas):4d} archivos, {total / 2**20:7.1f} MB -> ZIP {tamano / 2**20:7.1f} MB "
+                  f"en {segundos:5.2f} s ({total / 2**20 / segundos:6.1f} MB/s), pico {pico / 1024:6.0f} KB")
+        correcto = picos[1] < picos[0] * 1.5 + 256 * 1024
+        ok &= correcto
+        print(f"   memoria independiente del tamaño {'✅' if correcto else '❌'}")
+
+        print("🔎 ZIP, modos de compresión y manifest.csv")
+        ruta_zip = os.path.join(TEMPORAL, 'completo.zip')
+        with open(ruta_zip, 'wb') as f:
+            tamano, huella_bytes, _, _ = generar(paquete, f)
+        correcto, manifiesto = verificar_zip(ruta_zip, paquete)
+        faltantes = sum(1 for fila in manifiesto if fila['estado'] == 'no_encontrado')
+        ok &= correcto and faltantes == 1
+        print(f"   {len(manifiesto)} filas en manifest.csv, {faltantes} no encontrada {'✅' if correcto else '❌'}")
+
+        print("🔁 Determinismo y reanudación")
+        _, repetida, _, _ = generar(paquete)
+        correcto = repetida == huella_bytes and modulo._armar('evidencias.zip', filas).huella == paquete.huella
+        ok &= correcto
+        print(f"   misma huella y mismos bytes en otra generación {'✅' if correcto else '❌'}")
+
+        os.makedirs(modulo.DIRECTORIO_PAQUETES, exist_ok=True)
+        for corte, cola in ((0, b''), (tamano * 2 // 5, b''), (tamano // 2, b'basura' * 1000), (tamano, b'sobra')):
+            if os.path.exists(modulo.ruta_paquete(paquete.huella)):
+                os.remove(modulo.ruta_paquete(paquete.huella))
+            with open(ruta_zip, 'rb') as completo, open(modulo.ruta_paquete(paquete.huella, parcial=True), 'wb') as p:
+                p.write(completo.read(corte) + cola)
+            inicio = time.perf_counter()
+            final = modulo.completar_paquete(paquete)
+            segundos = time.perf_counter() - inicio
+            with open(final, 'rb') as f:
+                correcto = hashlib.sha256(f.read()).hexdigest() == huella_bytes
+            ok &= correcto
+            print(f"   parcial de {corte / 2**20:6.1f} MB{' + cola corrupta' if cola else ''}: "
+                  f"completado en {segundos:5.2f} s {'✅' if correcto else '❌'}")
+
+        resumen = modulo.limpiar_paquetes(horas=0)
+        correcto = resumen['eliminados'] == 1 and not os.listdir(modulo.DIRECTORIO_PAQUETES)
+        ok &= correcto
+        print(f"   limpieza de la caché: {resumen} {'✅' if correcto else '❌'}")
+
+        if args.zip64:
+            print("📦 ZIP64")
+            ruta_grande = os.path.join(TEMPORAL, 'disperso.zip')
+            with open(ruta_grande, 'wb') as f:
+                f.truncate(4 * 2**30 + 100 * 2**20)
+            paquete = modulo._armar('evidencias.zip', [('evidencias/', ruta_grande, 'EvidenciasIncidentes', '1',
+                                                        'disperso.zip')])
+            tamano, cola, inicio = 0, b'', time.perf_counter()
+            tracemalloc.start()
+            for bloque in modulo.generar_zip(paquete):
+                tamano += len(bloque)
+                cola = (cola + bloque)[-4096:]
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            correcto = tamano > 2**32 and b'PK\x06\x06' in cola and b'PK\x06\x07' in cola
+            ok &= correcto
+            print(f"   {tamano / 2**30:.2f} GiB en {time.perf_counter() - inicio:.1f} s, pico {pico / 1024:.0f} KB, "
+                  f"registros ZIP64 al final {'✅' if correcto else '❌'}")
+    finally:
+        shutil.rmtree(TEMPORAL, ignore_errors=True)
+
+    if not ok:
+        print("❌ Hay verificaciones fallidas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Prueba y benchmark de la revocación de tokens JWT (app/revocacion_tokens.py)
+
+  1. Varios workers (procesos) sobre el mismo almacén SQLite: cada uno hace
+     logout de un token (POST /api/auth/logout) y luego todos verifican con
+     auth_utils.token_required que los tokens revocados por los demás se
+     rechazan (401) y que los no revocados siguen pasando.
+  2. Expiración: un token revocado deja de ocupar el almacén cuando expira.
+  3. Microbenchmark de la consulta de un token no revocado con --revocados
+     revocaciones vigentes: set del proceso (anterior) vs filtro de Bloom, y
+     falsos positivos observados del filtro (se confirman en el almacén).
+
+Sale con código 1 si alguna verificación falla. No requiere SQL Server ni Redis.
+
+Uso:
+    python dev_tools/benchmark_revocacion_tokens.py
+    python dev_tools/benchmark_revocacion_tokens.py --workers 8 --revocados 200000
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TEMPORAL = tempfile.mkdtemp(prefix='bench_revocacion_')
+os.environ['REVOCACION_DB'] = os.path.join(TEMPORAL, 'revocaciones.sqlite3')
+os.environ['REVOCACION_BACKEND'] = 'sqlite'
+os.environ.setdefault('JWT_SECRET_KEY', 'clave-de-prueba-benchmark-revocacion')
+
+import jwt  # noqa: E402
+from flask import Flask, jsonify  # noqa: E402
+
+from app import auth_utils, revocacion_tokens as modulo  # noqa: E402
+from app.routes import auth_bp, SECRET_KEY  # noqa: E402
+
+
+def emitir_token(sujeto, segundos=3600):
+    ahora = datetime.datetime.utcnow()
+    return jwt.encode({'sub': sujeto, 'rol': 'Usuario', 'exp': ahora + datetime.timedelta(seconds=segundos),
+                       'iat': ahora, 'jti': os.urandom(16).hex()}, SECRET_KEY, algorithm='HS256')
+
+
+def crear_app():
+    app = Flask('benchmark_revocacion')
+    app.register_blueprint(auth_bp)
+
+    @app.route('/api/protegido')
+    @auth_utils.token_required
+    def protegido(user_id, rol, email, nombre):
+        return jsonify({'user_id': user_id})
+
+    return app
+
+
+def worker(indice, tokens, barrera, resultados):
+    # Como un worker de gunicorn tras el fork: la instancia global aún no abrió
+    # el almacén ni cargó el filtro, cada proceso lo hace al primer uso
+    cliente = crear_app().test_client()
+
+    def estado(token):
+        return cliente.get('/api/protegido', headers={'Authorization': f"Bearer {token}"}).status_code
+
+    antes = estado(tokens[indice]['revocar'])
+    cliente.post('/api/auth/logout', headers={'Authorization': f"Bearer {tokens[indice]['revocar']}"})
+    propio = estado(tokens[indice]['revocar'])
+    barrera.wait()
+    time.sleep(modulo.AlmacenRevocacionSQLite.intervalo_sincronizacion + 0.05)
+
+    revocados = [estado(t['revocar']) for t in tokens]
+    vigentes = [estado(t['mantener']) for t in tokens]
+    resultados[indice] = {
+        'antes': antes, 'propio': propio,
+        'revocados_401': sum(1 for s in revocados if s == 401),
+        'vigentes_200': sum(1 for s in vigentes if s == 200),
+        'stats': modulo.revocacion_tokens.get_stats(),
+    }
+
+
+def medir(funcion, claves):
+    tiempos = []
+    for clave in claves:
+        inicio = time.perf_counter()
+        funcion(clave)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return statistics.mean(tiempos) * 1e6, tiempos[int(len(tiempos) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Procesos que comparten el almacén')
+    parser.add_argument('--revocados', type=int, default=100000, help='Revocaciones vigentes en el benchmark')
+    parser.add_argument('--consultas', type=int, default=200000, help='Consultas de tokens no revocados')
+    args = parser.parse_args()
+    ok = True
+
+    print(f"👥 {args.workers} workers sobre {os.environ['REVOCACION_DB']}")
+    tokens = [{'revocar': emitir_token(f"r{i}"), 'mantener': emitir_token(f"m{i}")} for i in range(args.workers)]
+    contexto = multiprocessing.get_context('fork')
+    barrera = contexto.Barrier(args.workers)
+    with contexto.Manager() as manager:
+        resultados = manager.dict()
+        procesos = [contexto.Process(target=worker, args=(i, tokens, barrera, resultados))
+                    for i in range(args.workers)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        resultados = dict(resultados)
+
+    for indice in range(args.workers):
+        r = resultados.get(indice)
+        correcto = (r is not None and r['antes'] == 200 and r['propio'] == 401
+                    and r['revocados_401'] == args.workers and r['vigentes_200'] == args.workers)
+        ok &= correcto
+        detalle = (f"antes {r['antes']}, tras su logout {r['propio']}, revocados rechazados "
+                   f"{r['revocados_401']}/{args.workers}, vigentes aceptados {r['vigentes_200']}/{args.workers}"
+                   if r else 'sin resultado')
+        print(f"   worker {indice}: {detalle} {'✅' if correcto else '❌'}")
+
+    print("⏳ Expiración")
+    revocacion = modulo.RevocacionTokens()
+    revocacion.revocar('expira-pronto', time.time() + 1)
+    antes = revocacion.almacen.esta_revocado('expira-pronto')
+    time.sleep(1.1)
+    despues = revocacion.almacen.esta_revocado('expira-pronto')
+    revocacion._sincronizar(forzar_reconstruccion=True)
+    quedan = revocacion.almacen._conexion().execute(
+        "SELECT COUNT(*) FROM tokens_revocados WHERE jti = 'expira-pronto'").fetchone()[0]
+    correcto = antes and not despues and quedan == 0 and not revocacion.revocar('ya-expirado', time.time() - 1)
+    ok &= correcto
+    print(f"   revocado {antes} -> tras expirar {despues}, filas tras purga {quedan} {'✅' if correcto else '❌'}")
+
+    print(f"\n⚡ Consulta de tokens no revocados con {args.revocados} revocaciones vigentes")
+    almacen = modulo.AlmacenRevocacionSQLite(os.path.join(TEMPORAL, 'benchmark.sqlite3'))
+    expira = time.time() + 3600
+    conexion = almacen._conexion()
+    with conexion:
+        conexion.execute("BEGIN")
+        conexion.executemany("INSERT INTO tokens_revocados (jti, expira) VALUES (?, ?)",
+                             ((f"revocado-{i}", expira) for i in range(args.revocados)))
+    revocacion = modulo.RevocacionTokens(almacen)
+    revocacion.config['CAPACIDAD'] = args.revocados
+    inicio = time.perf_counter()
+    revocacion.esta_revocado('calentar')
+    carga = time.perf_counter() - inicio
+
+    conjunto = {f"revocado-{i}" for i in range(args.revocados)}
+    ausentes = [os.urandom(16).hex() for _ in range(args.consultas)]
+    media_set, p99_set = medir(conjunto.__contains__, ausentes)
+    media_filtro, p99_filtro = medir(revocacion.esta_revocado, ausentes)
+    media_sqlite, p99_sqlite = medir(almacen.esta_revocado, ausentes[:20000])
+    token = emitir_token('bench')
+    media_jwt, _ = medir(lambda t: jwt.decode(t, SECRET_KEY, algorithms=['HS256']), [token] * 20000)
+
+    stats = revocacion.get_stats()
+    print(f"   set del proceso (anterior): {media_set:6.2f} µs (p99 {p99_set:.2f}), no compartido")
+    print(f"   filtro de Bloom:            {media_filtro:6.2f} µs (p99 {p99_filtro:.2f}) "
+          f"{stats['filtro_bytes'] / 1024:.0f} KB, carga {carga * 1000:.0f} ms")
+    print(f"   SQLite sin filtro:          {media_sqlite:6.2f} µs (p99 {p99_sqlite:.2f})")
+    print(f"   referencia jwt.decode:      {media_jwt:6.2f} µs")
+    print(f"   falsos positivos: {stats['falsos_positivos']}/{args.consultas} "
+          f"({stats['falsos_positivos'] / args.consultas:.1e}; configurada {revocacion.config['TASA_FP']:.0e}), "
+          f"sincronizaciones {stats['sincronizaciones']}")
+    ok &= stats['confirmados'] == 0 and stats['falsos_positivos'] / args.consultas < revocacion.config['TASA_FP'] * 3
+
+    if not ok:
+        print("❌ Hay verificaciones fallidas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
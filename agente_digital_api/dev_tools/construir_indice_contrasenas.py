@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Construye el índice offline de contraseñas comprometidas (app/contrasenas_comprometidas.py)
+
+Acepta uno o más archivos con una contraseña por línea, o archivos de hashes
+SHA-1 de HaveIBeenPwned ("HASH:conteo", se detecta por línea). El ancho del
+prefijo se elige según --fp (tasa de falsos positivos) o se fija con --ancho.
+
+El índice se reemplaza de forma atómica; los workers lo recargan en menos de
+un minuto (INTERVALO_REVISION) sin reiniciar.
+
+Uso:
+    python dev_tools/construir_indice_contrasenas.py rockyou.txt
+    python dev_tools/construir_indice_contrasenas.py pwned-passwords-sha1.txt --fp 1e-7 \\
+        --salida /srv/agente/contrasenas_comprometidas.idx
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.contrasenas_comprometidas import (  # noqa: E402
+    RUTA_INDICE, TASA_FP_DEFECTO, IndiceContrasenas, construir_indice
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('listas', nargs='+', help='Archivos de contraseñas o hashes SHA-1')
+    parser.add_argument('--salida', default=RUTA_INDICE, help=f"Índice a generar (por defecto {RUTA_INDICE})")
+    parser.add_argument('--fp', type=float, default=TASA_FP_DEFECTO, help='Tasa de falsos positivos máxima')
+    parser.add_argument('--ancho', type=int, help='Bytes de prefijo SHA-1 (ignora --fp)')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    for lista in args.listas:
+        if not os.path.isfile(lista):
+            print(f"❌ No existe: {lista}")
+            sys.exit(1)
+
+    resultado = construir_indice(args.listas, args.salida, tasa_fp=args.fp, ancho=args.ancho,
+                                 progreso=None if args.json else lambda m: print(f"   {m}"))
+    indice = IndiceContrasenas(args.salida)
+    resultado['verificado'] = indice.total == resultado['total']
+    indice.cerrar()
+
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+
+    print(f"✅ Índice generado: {args.salida}")
+    print(f"   Entradas únicas: {resultado['total']} (de {resultado['leidas']} líneas)")
+    print(f"   Prefijo: {resultado['ancho']} bytes, falsos positivos ~{resultado['tasa_fp']:.2e}")
+    print(f"   Tamaño: {resultado['bytes'] / 1048576:.1f} MB en {resultado['segundos']}s")
+
+
+if __name__ == "__main__":
+    main()
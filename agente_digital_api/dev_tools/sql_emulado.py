@@ -0,0 +1,672 @@
+"""
+Base de datos emulada para pruebas de carga sin SQL Server
+
+Conexiones con la interfaz de pyodbc que usa la API (cursor, execute con
+parámetros ``?``, filas con acceso por atributo, description, rowcount,
+nextset, commit/rollback, setdecoding) sobre un archivo SQLite, traduciendo
+las construcciones de T-SQL que aparecen en las consultas:
+
+  - ``TOP (n)`` / ``TOP n`` y ``OFFSET ... FETCH NEXT ...`` -> ``LIMIT``
+  - ``GETDATE()``, ``GETUTCDATE()``, ``DATEDIFF``, ``DATEADD`` (funciones)
+  - ``SCOPE_IDENTITY()`` y ``@@IDENTITY`` -> ``last_insert_rowid()``
+  - ``OUTPUT INSERTED.x`` -> ``RETURNING x``
+  - ``IF [NOT] EXISTS (...) ... ELSE ...``, lotes con ``;``, ``SET NOCOUNT``
+  - ``dbo.``, ``N'...'``, ``WITH (NOLOCK)``, ``ISNULL``, ``LEN``, ``NEWID()``
+  - ``OBJECT_ID``, ``INFORMATION_SCHEMA.TABLES/COLUMNS`` y ``sys.objects``,
+    ``sys.tables``, ``sys.columns``, ``sys.indexes``, ``sys.triggers``
+  - ``CREATE TABLE`` con ``IDENTITY``, ``NVARCHAR`` (sin distinguir
+    mayúsculas, como la collation de SQL Server) y ``DEFAULT GETDATE()``
+
+No es un motor T-SQL: lo que no se traduce falla como en un driver real y
+queda contado en ``BaseEmulada.errores`` con la sentencia original, para
+que la prueba de carga reporte qué consultas no se pudieron medir.
+
+Uso:
+    base = BaseEmulada('/tmp/carga.sqlite3')
+    conn = base.conectar()      # misma interfaz que pyodbc.connect(...)
+    sys.modules['pyodbc'] = modulo_pyodbc(base)   # sin pyodbc ni libodbc
+"""
+
+import calendar
+import re
+import sqlite3
+import threading
+import types
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+# pyodbc sin libodbc instalado también falla al importar (ImportError u OSError)
+try:
+    import pyodbc as _pyodbc
+except Exception:
+    _pyodbc = sqlite3
+_ErrorBase, _ErrorProgramacion, _ErrorIntegridad = _pyodbc.Error, _pyodbc.ProgrammingError, _pyodbc.IntegrityError
+
+
+class ErrorSQL(_ErrorBase):
+    """Error de una sentencia en la base emulada (subclase de pyodbc.Error si está instalado)"""
+
+
+class ErrorProgramacionSQL(ErrorSQL, _ErrorProgramacion):
+    pass
+
+
+class ErrorIntegridadSQL(ErrorSQL, _ErrorIntegridad):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Traducción T-SQL -> SQLite
+# ----------------------------------------------------------------------
+
+class Paso(NamedTuple):
+    """Sentencia del lote: 'sql' (texto), 'si' (condición EXISTS con ramas) o 'omitir'"""
+    tipo: str
+    sql: str = ''
+    negado: bool = False
+    rama_si: Tuple['Paso', ...] = ()
+    rama_no: Tuple['Paso', ...] = ()
+
+
+_SUSTITUCIONES = [(re.compile(patron, re.IGNORECASE), reemplazo) for patron, reemplazo in (
+    (r'\[?\bdbo\]?\.', ''),
+    (r'\bWITH\s*\(\s*(?:NOLOCK|READPAST|UPDLOCK|ROWLOCK|HOLDLOCK)(?:\s*,\s*\w+)*\s*\)', ''),
+    (r'\bSCOPE_IDENTITY\s*\(\s*\)|@@IDENTITY\b', 'last_insert_rowid()'),
+    (r'\bISNULL\s*\(', 'IFNULL('),
+    (r'\bLEN\s*\(', 'LENGTH('),
+    (r'\bNEWID\s*\(\s*\)', 'lower(hex(randomblob(16)))'),
+    (r'\bSTRING_AGG\s*\(', 'group_concat('),
+    (r'\b(DATEDIFF|DATEADD)\s*\(\s*(\w+)\s*,', r"\1('\2',"),
+    (r'\bOBJECT_ID\s*\(\s*(\'[^\']*\')\s*,\s*(\'[^\']*\')\s*\)',
+     r'(SELECT object_id FROM _sys_objects WHERE name = \1 AND type = \2)'),
+    (r'\bOBJECT_ID\s*\(\s*(\'[^\']*\')\s*\)', r'(SELECT object_id FROM _sys_objects WHERE name = \1)'),
+    (r'\bINFORMATION_SCHEMA\.(\w+)', lambda m: '_is_' + m.group(1).upper()),
+    (r'\bsys\.(\w+)', lambda m: '_sys_' + m.group(1).lower()),
+)]
+
+_DDL = [(re.compile(patron, re.IGNORECASE), reemplazo) for patron, reemplazo in (
+    (r'\b(?:BIG|SMALL)?INT\s+IDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)\s+(?:NOT\s+NULL\s+)?PRIMARY\s+KEY',
+     'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (r'\b(N?VARCHAR|N?CHAR|N?TEXT)(?:\s*\(\s*MAX\s*\)|(\s*\(\s*\d+\s*\)))?', r'\1\2 COLLATE NOCASE'),
+    (r'\bDEFAULT\s+(?:\(\s*(?:GETDATE|SYSDATETIME)\s*\(\s*\)\s*\)|(?:GETDATE|SYSDATETIME)\s*\(\s*\))',
+     'DEFAULT CURRENT_TIMESTAMP'),
+)]
+
+_OMITIR = re.compile(r'^(SET\s+(NOCOUNT|XACT_ABORT|ANSI_\w+|LOCK_TIMEOUT|DATEFORMAT)\b'
+                     r'|EXEC(UTE)?\s+sp_set_session_context\b|PRINT\b|BEGIN\s+TRAN|GO$)', re.IGNORECASE)
+_SI_EXISTE = re.compile(r'^IF\s+(NOT\s+)?EXISTS\s*\(', re.IGNORECASE)
+_TOP = re.compile(r'(\bSELECT\s+(?:DISTINCT\s+)?)TOP\s*(?:\(\s*([^()]+?)\s*\)|(\d+|:p\d+))\s*', re.IGNORECASE)
+_OFFSET = re.compile(r'\bOFFSET\s+\(?\s*(\d+|:p\d+)\s*\)?\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+'
+                     r'\(?\s*(\d+|:p\d+)\s*\)?\s+ROWS?\s+ONLY', re.IGNORECASE)
+_OUTPUT = re.compile(r'\s+OUTPUT\s+((?:INSERTED|DELETED)\.\w+(?:\s+AS\s+\w+)?'
+                     r'(?:\s*,\s*(?:INSERTED|DELETED)\.\w+(?:\s+AS\s+\w+)?)*)', re.IGNORECASE)
+_PALABRA = re.compile(r'[A-Za-z_]\w*')
+_BEGIN_TRAN = re.compile(r'BEGIN\s+TRAN', re.IGNORECASE)
+
+
+def _escanear(sql):
+    """Sentencias del lote: parámetros ``?`` numerados como ``:pN``, sin
+    comentarios ni prefijo N de los literales, divididas en ``;`` de nivel 0
+    (fuera de paréntesis y de bloques BEGIN/CASE ... END)"""
+    sentencias, actual = [], []
+    profundidad, parametros = 0, 0
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if c == "'":
+            fin = i + 1
+            while fin < n:
+                if sql[fin] == "'":
+                    if fin + 1 < n and sql[fin + 1] == "'":
+                        fin += 2
+                        continue
+                    break
+                fin += 1
+            actual.append(sql[i:fin + 1])
+            i = fin + 1
+        elif c == '-' and sql.startswith('--', i):
+            fin = sql.find('\n', i)
+            i = n if fin < 0 else fin
+        elif c == '/' and sql.startswith('/*', i):
+            fin = sql.find('*/', i + 2)
+            i = n if fin < 0 else fin + 2
+        elif c == '?':
+            actual.append(f':p{parametros}')
+            parametros += 1
+            i += 1
+        elif c in 'Nn' and sql.startswith("'", i + 1) and (i == 0 or not (sql[i - 1].isalnum() or sql[i - 1] == '_')):
+            i += 1
+        elif c.isalpha() or c == '_':
+            palabra = _PALABRA.match(sql, i).group(0)
+            clave = palabra.upper()
+            if clave == 'CASE' or (clave == 'BEGIN' and not _BEGIN_TRAN.match(sql, i)):
+                profundidad += 1
+            elif clave == 'END':
+                profundidad -= 1
+            actual.append(palabra)
+            i += len(palabra)
+        else:
+            if c == '(':
+                profundidad += 1
+            elif c == ')':
+                profundidad -= 1
+            elif c == ';' and profundidad == 0:
+                sentencias.append(''.join(actual))
+                actual = []
+                i += 1
+                continue
+            actual.append(c)
+            i += 1
+    sentencias.append(''.join(actual))
+    return [s.strip() for s in sentencias if s.strip()]
+
+
+def _cierre(texto, apertura):
+    """Índice del paréntesis que cierra el abierto en ``apertura``"""
+    profundidad = 0
+    for i in range(apertura, len(texto)):
+        if texto[i] == '(':
+            profundidad += 1
+        elif texto[i] == ')':
+            profundidad -= 1
+            if profundidad == 0:
+                return i
+    raise ErrorProgramacionSQL(f"Paréntesis sin cerrar: {texto[apertura:apertura + 60]}")
+
+
+def _fin_de_select(texto, desde):
+    """Posición donde termina el SELECT que contiene ``desde`` (paréntesis que lo cierra o fin)"""
+    profundidad = 0
+    for i in range(desde, len(texto)):
+        if texto[i] == '(':
+            profundidad += 1
+        elif texto[i] == ')':
+            if profundidad == 0:
+                return i
+            profundidad -= 1
+    return len(texto.rstrip().rstrip(';'))
+
+
+def _traducir_sentencia(sql):
+    if re.match(r'CREATE\s+TABLE\b', sql, re.IGNORECASE):
+        for patron, reemplazo in _DDL:
+            sql = patron.sub(reemplazo, sql)
+    for patron, reemplazo in _SUSTITUCIONES:
+        sql = patron.sub(reemplazo, sql)
+
+    salida = _OUTPUT.search(sql)
+    if salida:
+        columnas = re.sub(r'\b(?:INSERTED|DELETED)\.', '', salida.group(1), flags=re.IGNORECASE)
+        sql = f"{sql[:salida.start()]}{sql[salida.end():].rstrip().rstrip(';')} RETURNING {columnas}"
+
+    sql = _OFFSET.sub(r'LIMIT \2 OFFSET \1', sql)
+
+    while True:
+        top = _TOP.search(sql)
+        if not top:
+            break
+        limite = top.group(2) or top.group(3)
+        sql = sql[:top.start()] + top.group(1) + sql[top.end():]
+        fin = _fin_de_select(sql, top.start() + len(top.group(1)))
+        sql = f"{sql[:fin].rstrip()} LIMIT {limite}{' ' if fin < len(sql) else ''}{sql[fin:]}"
+    return sql
+
+
+def _pasos(sentencias):
+    pasos = []
+    for sentencia in sentencias:
+        if _OMITIR.match(sentencia):
+            pasos.append(Paso('omitir'))
+            continue
+        condicion = _SI_EXISTE.match(sentencia)
+        if condicion:
+            cierre = _cierre(sentencia, condicion.end() - 1)
+            ramas = re.split(r'\bELSE\b', sentencia[cierre + 1:], maxsplit=1, flags=re.IGNORECASE)
+            pasos.append(Paso(
+                'si', _traducir_sentencia(sentencia[condicion.end():cierre]), bool(condicion.group(1)),
+                tuple(_pasos(_bloque(ramas[0]))), tuple(_pasos(_bloque(ramas[1]))) if len(ramas) > 1 else (),
+            ))
+            continue
+        pasos.append(Paso('sql', _traducir_sentencia(sentencia)))
+    return pasos
+
+
+def _bloque(rama):
+    """Sentencias de una rama de IF, con o sin BEGIN ... END"""
+    rama = rama.strip()
+    bloque = re.fullmatch(r'BEGIN\b(.*)\bEND;?', rama, re.IGNORECASE | re.DOTALL)
+    return _escanear(bloque.group(1) if bloque else rama)
+
+
+@lru_cache(maxsize=2048)
+def traducir(sql: str) -> Tuple[Paso, ...]:
+    """Pasos SQLite de un lote T-SQL (cacheado por texto, como el plan en SQL Server)"""
+    return tuple(_pasos(_escanear(sql)))
+
+
+# ----------------------------------------------------------------------
+# Funciones y catálogo
+# ----------------------------------------------------------------------
+
+_PARTES = {
+    'year': 'year', 'yy': 'year', 'yyyy': 'year', 'month': 'month', 'mm': 'month', 'm': 'month',
+    'week': 'week', 'wk': 'week', 'ww': 'week', 'day': 'day', 'dd': 'day', 'd': 'day',
+    'hour': 'hour', 'hh': 'hour', 'minute': 'minute', 'mi': 'minute', 'n': 'minute',
+    'second': 'second', 'ss': 'second', 's': 'second',
+}
+
+
+def _fecha(valor):
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, date):
+        return datetime(valor.year, valor.month, valor.day)
+    return datetime.fromisoformat(str(valor))
+
+
+def _texto_fecha(valor):
+    return valor.isoformat(' ', timespec='milliseconds')
+
+
+def _datediff(parte, desde, hasta):
+    desde, hasta = _fecha(desde), _fecha(hasta)
+    if desde is None or hasta is None:
+        return None
+    parte = _PARTES[parte.lower()]
+    if parte == 'year':
+        return hasta.year - desde.year
+    if parte == 'month':
+        return (hasta.year - desde.year) * 12 + hasta.month - desde.month
+    if parte == 'week':
+        return ((hasta.date() - timedelta(days=(hasta.weekday() + 1) % 7))
+                - (desde.date() - timedelta(days=(desde.weekday() + 1) % 7))).days // 7
+    if parte == 'day':
+        return (hasta.date() - desde.date()).days
+    # Límites cruzados, como SQL Server: se trunca a la unidad antes de restar
+    segundos = {'hour': 3600, 'minute': 60, 'second': 1}[parte]
+    return int(hasta.timestamp() // segundos - desde.timestamp() // segundos)
+
+
+def _dateadd(parte, cantidad, valor):
+    valor = _fecha(valor)
+    if valor is None or cantidad is None:
+        return None
+    parte, cantidad = _PARTES[parte.lower()], int(cantidad)
+    if parte in ('year', 'month'):
+        meses = valor.month - 1 + cantidad * (12 if parte == 'year' else 1)
+        anio, mes = valor.year + meses // 12, meses % 12 + 1
+        valor = valor.replace(year=anio, month=mes, day=min(valor.day, calendar.monthrange(anio, mes)[1]))
+    else:
+        valor = valor + timedelta(**{parte + 's': cantidad})
+    return _texto_fecha(valor)
+
+
+def _convertir_fecha(valor):
+    try:
+        return datetime.fromisoformat(valor.decode())
+    except ValueError:
+        return valor.decode()
+
+
+sqlite3.register_converter('DATETIME', _convertir_fecha)
+sqlite3.register_converter('DATETIME2', _convertir_fecha)
+sqlite3.register_converter('SMALLDATETIME', _convertir_fecha)
+sqlite3.register_converter('BIT', lambda valor: valor not in (b'0', b''))
+sqlite3.register_adapter(datetime, _texto_fecha)
+sqlite3.register_adapter(uuid.UUID, str)
+
+# Vistas del catálogo de SQL Server sobre sqlite_master (los objetos que
+# empiezan con "_" son de la emulación y no se listan)
+CATALOGO = """
+CREATE VIEW IF NOT EXISTS _sys_objects AS
+    SELECT rowid AS object_id, name COLLATE NOCASE AS name,
+           CASE type WHEN 'table' THEN 'U' WHEN 'view' THEN 'V' WHEN 'trigger' THEN 'TR' ELSE 'IX' END AS type,
+           (SELECT o.rowid FROM sqlite_master o WHERE o.name = m.tbl_name AND m.type IN ('trigger', 'index'))
+               AS parent_object_id,
+           (SELECT schema_version FROM pragma_schema_version) AS modify_date,
+           (SELECT schema_version FROM pragma_schema_version) AS create_date
+    FROM sqlite_master m
+    WHERE substr(name, 1, 1) <> '_' AND name NOT LIKE 'sqlite%';
+CREATE VIEW IF NOT EXISTS _sys_tables AS SELECT * FROM _sys_objects WHERE type = 'U';
+CREATE VIEW IF NOT EXISTS _sys_views AS SELECT * FROM _sys_objects WHERE type = 'V';
+CREATE VIEW IF NOT EXISTS _sys_triggers AS SELECT * FROM _sys_objects WHERE type = 'TR';
+CREATE VIEW IF NOT EXISTS _sys_indexes AS
+    SELECT o.object_id AS index_object_id, o.name, o.parent_object_id AS object_id
+    FROM _sys_objects o WHERE o.type = 'IX';
+CREATE VIEW IF NOT EXISTS _sys_columns AS
+    SELECT o.object_id, c.name COLLATE NOCASE AS name, c.cid + 1 AS column_id, c."notnull" = 0 AS is_nullable
+    FROM _sys_objects o JOIN pragma_table_info(o.name) c
+    WHERE o.type IN ('U', 'V');
+CREATE VIEW IF NOT EXISTS _is_TABLES AS
+    SELECT 'emulada' AS TABLE_CATALOG, 'dbo' AS TABLE_SCHEMA, name AS TABLE_NAME,
+           CASE type WHEN 'U' THEN 'BASE TABLE' ELSE 'VIEW' END AS TABLE_TYPE
+    FROM _sys_objects WHERE type IN ('U', 'V');
+CREATE VIEW IF NOT EXISTS _is_COLUMNS AS
+    SELECT 'emulada' AS TABLE_CATALOG, 'dbo' AS TABLE_SCHEMA, o.name AS TABLE_NAME, c.name COLLATE NOCASE AS COLUMN_NAME,
+           c.cid + 1 AS ORDINAL_POSITION, c.dflt_value AS COLUMN_DEFAULT,
+           CASE WHEN c."notnull" THEN 'NO' ELSE 'YES' END AS IS_NULLABLE,
+           lower(CASE WHEN instr(c.type, '(') THEN substr(c.type, 1, instr(c.type, '(') - 1) ELSE c.type END)
+               AS DATA_TYPE
+    FROM _sys_objects o JOIN pragma_table_info(o.name) c
+    WHERE o.type IN ('U', 'V');
+"""
+
+
+# ----------------------------------------------------------------------
+# Conexión y cursor con la interfaz de pyodbc
+# ----------------------------------------------------------------------
+
+class Fila(tuple):
+    """Fila con acceso por índice y por nombre de columna, como pyodbc.Row"""
+    __slots__ = ()
+    _indices = {}
+    cursor_description = ()
+
+    def __getattr__(self, nombre):
+        try:
+            return self[self._indices[nombre]]
+        except KeyError:
+            raise AttributeError(nombre) from None
+
+
+@lru_cache(maxsize=1024)
+def _clase_fila(descripcion):
+    indices = {}
+    for i, columna in enumerate(descripcion):
+        indices.setdefault(columna[0], i)
+    return type('Fila', (Fila,), {'__slots__': (), '_indices': indices, 'cursor_description': descripcion})
+
+
+class Cursor:
+    """Cursor pyodbc sobre sqlite3: execute retorna el cursor, filas con atributos"""
+
+    def __init__(self, conexion):
+        self.connection = conexion
+        self._base = conexion._base
+        self._sqlite = conexion._sqlite
+        self._actual = None
+        self._pendientes = []
+        self._clase = Fila
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+        self.arraysize = 1
+
+    # -- ejecución
+
+    def execute(self, sql, *parametros):
+        if len(parametros) == 1 and isinstance(parametros[0], (list, tuple)):
+            parametros = parametros[0]
+        valores = {f'p{i}': valor for i, valor in enumerate(parametros)}
+        self._actual, self._pendientes = None, []
+        self.description, self.rowcount = None, -1
+        try:
+            self._ejecutar_pasos(traducir(sql), valores)
+        except ErrorSQL as e:
+            self._base._registrar_error(sql, e)
+            raise
+        except sqlite3.Error as e:
+            self._base._registrar_error(sql, e)
+            clase = ErrorIntegridadSQL if isinstance(e, sqlite3.IntegrityError) else ErrorProgramacionSQL
+            raise clase('HY000', f"[SQLite emulado] {e}") from e
+        finally:
+            self._base._contar_sentencia()
+        if self._actual is None and self._pendientes:
+            self._siguiente_resultado()
+        return self
+
+    def _ejecutar_pasos(self, pasos, valores):
+        for paso in pasos:
+            if paso.tipo == 'omitir':
+                continue
+            if paso.tipo == 'si':
+                existe = self._sqlite.execute(f"SELECT EXISTS ({paso.sql})", valores).fetchone()[0]
+                self._ejecutar_pasos(paso.rama_si if bool(existe) != paso.negado else paso.rama_no, valores)
+                continue
+            cursor = self._sqlite.execute(paso.sql, valores)
+            if cursor.description is None:
+                self.rowcount = cursor.rowcount
+            elif self._actual is None and not self._pendientes:
+                self._actual = cursor
+                self._clase = _clase_fila(tuple(cursor.description))
+                self.description = cursor.description
+            else:
+                self._pendientes.append((cursor.description, cursor.fetchall()))
+
+    def executemany(self, sql, secuencia):
+        for parametros in secuencia:
+            self.execute(sql, parametros)
+
+    # -- lectura
+
+    def fetchone(self):
+        if self._actual is None:
+            return None
+        fila = self._actual.fetchone()
+        return None if fila is None else self._clase(fila)
+
+    def fetchall(self):
+        if self._actual is None:
+            return []
+        clase = self._clase
+        return [clase(fila) for fila in self._actual.fetchall()]
+
+    def fetchmany(self, cantidad=None):
+        if self._actual is None:
+            return []
+        clase = self._clase
+        return [clase(fila) for fila in self._actual.fetchmany(cantidad or self.arraysize)]
+
+    def fetchval(self):
+        fila = self.fetchone()
+        return None if fila is None else fila[0]
+
+    def nextset(self):
+        if not self._pendientes:
+            self._actual, self.description = None, None
+            return False
+        self._siguiente_resultado()
+        return True
+
+    def _siguiente_resultado(self):
+        descripcion, filas = self._pendientes.pop(0)
+        self._actual = _ResultadoLeido(filas)
+        self._clase = _clase_fila(tuple(descripcion))
+        self.description = descripcion
+
+    def __iter__(self):
+        while True:
+            fila = self.fetchone()
+            if fila is None:
+                return
+            yield fila
+
+    def close(self):
+        self._actual, self._pendientes = None, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _ResultadoLeido:
+    """Conjunto de resultados adicional de un lote, ya leído"""
+
+    def __init__(self, filas):
+        self._filas = filas
+        self._posicion = 0
+
+    def fetchone(self):
+        if self._posicion >= len(self._filas):
+            return None
+        self._posicion += 1
+        return self._filas[self._posicion - 1]
+
+    def fetchall(self):
+        filas, self._posicion = self._filas[self._posicion:], len(self._filas)
+        return filas
+
+    def fetchmany(self, cantidad):
+        filas = self._filas[self._posicion:self._posicion + cantidad]
+        self._posicion += len(filas)
+        return filas
+
+
+class Conexion:
+    """Conexión pyodbc emulada; close() devuelve la conexión SQLite al pool de la base"""
+
+    def __init__(self, base, conexion_sqlite):
+        self._base = base
+        self._sqlite = conexion_sqlite
+        self.autocommit = False
+        self.timeout = 0
+
+    def cursor(self):
+        if self._sqlite is None:
+            raise ErrorProgramacionSQL('08003', 'Conexión cerrada')
+        return Cursor(self)
+
+    def execute(self, sql, *parametros):
+        return self.cursor().execute(sql, *parametros)
+
+    def commit(self):
+        self._sqlite.commit()
+
+    def rollback(self):
+        if self._sqlite is not None:
+            self._sqlite.rollback()
+
+    def close(self):
+        if self._sqlite is not None:
+            self._sqlite.rollback()
+            self._base._devolver(self._sqlite)
+            self._sqlite = None
+
+    def setdecoding(self, *args, **kwargs):
+        pass
+
+    def setencoding(self, *args, **kwargs):
+        pass
+
+    def add_output_converter(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+class BaseEmulada:
+    """Archivo SQLite compartido por todas las conexiones, con pool y contadores"""
+
+    def __init__(self, ruta: str, max_errores_distintos: int = 200):
+        self.ruta = ruta
+        self._pool: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.sentencias = 0
+        self.conexiones_creadas = 0
+        self.errores = Counter()
+        self.mensajes_error = {}
+        self.max_errores_distintos = max_errores_distintos
+
+        conexion = self._crear()
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.executescript(CATALOGO)
+        conexion.commit()
+        self._devolver(conexion)
+
+    def _crear(self):
+        conexion = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute("PRAGMA foreign_keys=OFF")
+        conexion.create_function('GETDATE', 0, lambda: _texto_fecha(datetime.now()))
+        conexion.create_function('SYSDATETIME', 0, lambda: _texto_fecha(datetime.now()))
+        conexion.create_function('GETUTCDATE', 0, lambda: _texto_fecha(datetime.utcnow()))
+        conexion.create_function('SYSUTCDATETIME', 0, lambda: _texto_fecha(datetime.utcnow()))
+        conexion.create_function('DATEDIFF', 3, _datediff)
+        conexion.create_function('DATEADD', 3, _dateadd)
+        with self._lock:
+            self.conexiones_creadas += 1
+        return conexion
+
+    def conectar(self, *args, **kwargs) -> Conexion:
+        """Equivalente a pyodbc.connect(): los argumentos se ignoran"""
+        with self._lock:
+            conexion = self._pool.pop() if self._pool else None
+        return Conexion(self, conexion or self._crear())
+
+    def _devolver(self, conexion):
+        with self._lock:
+            self._pool.append(conexion)
+
+    def _contar_sentencia(self):
+        with self._lock:
+            self.sentencias += 1
+
+    def _registrar_error(self, sql, error):
+        clave = ' '.join(sql.split())[:160]
+        with self._lock:
+            if clave in self.errores or len(self.errores) < self.max_errores_distintos:
+                self.errores[clave] += 1
+                self.mensajes_error.setdefault(clave, str(error))
+
+    def ejecutar_script(self, sql: str):
+        """Ejecuta un lote T-SQL (p.ej. CREATE TABLE) y confirma"""
+        conexion = self.conectar()
+        try:
+            conexion.cursor().execute(sql)
+            conexion.commit()
+        finally:
+            conexion.close()
+
+    def cargar(self, tabla: str, columnas: List[str], filas) -> int:
+        """Inserción masiva directa en SQLite (datos de prueba); retorna el último id"""
+        conexion = self.conectar()
+        try:
+            marcadores = ', '.join('?' for _ in columnas)
+            conexion._sqlite.executemany(
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})", filas)
+            conexion.commit()
+            return conexion._sqlite.execute("SELECT last_insert_rowid()").fetchone()[0]
+        finally:
+            conexion.close()
+
+    def cerrar(self):
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for conexion in pool:
+            conexion.close()
+
+
+def modulo_pyodbc(base: BaseEmulada) -> types.ModuleType:
+    """
+    Módulo ``pyodbc`` sustituto para ``sys.modules``: connect() entrega
+    conexiones de ``base`` y las excepciones son las que lanza la base
+    emulada (las del pyodbc real si está instalado), así que la API importa
+    y atrapa errores sin el driver nativo.
+    """
+    modulo = types.ModuleType('pyodbc', 'pyodbc emulado sobre SQLite (dev_tools/sql_emulado.py)')
+    modulo.Error = _ErrorBase
+    modulo.ProgrammingError = _ErrorProgramacion
+    modulo.IntegrityError = _ErrorIntegridad
+    modulo.DatabaseError = _pyodbc.DatabaseError
+    modulo.OperationalError = _pyodbc.OperationalError
+    modulo.InterfaceError = _pyodbc.InterfaceError
+    modulo.SQL_CHAR, modulo.SQL_WCHAR = 1, -8
+    modulo.Connection, modulo.Cursor, modulo.Row = Conexion, Cursor, Fila
+    modulo.drivers = lambda: ['ODBC Driver 17 for SQL Server']
+    modulo.connect = base.conectar
+    return modulo
@@ -2,21 +2,59 @@
 """
 Script de migración al sistema dinámico de incidentes
 Migra los datos existentes al nuevo esquema con acordeones variables
+
+Uso:
+    python migrations/migrar_a_sistema_dinamico.py
+    python migrations/migrar_a_sistema_dinamico.py --masivo --lote 1000 --checkpoint migracion.json
 """
 
 import sys
 import os
 import json
+import time
+import argparse
 from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import get_db_connection
 
+# Columnas del incidente usadas para poblar las secciones fijas (el orden importa)
+COLUMNAS_INCIDENTE = """Titulo, DescripcionInicial, AccionesInmediatas,
+                   AnciImpactoPreliminar, CausaRaiz, LeccionesAprendidas,
+                   PlanMejora, ReporteAnciID, FechaDeclaracionANCI,
+                   AnciTipoAmenaza, SistemasAfectados, ServiciosInterrumpidos,
+                   AlcanceGeografico, ResponsableCliente"""
+
+# Secciones aplicables según tipo de empresa
+QUERY_SECCIONES_APLICABLES = """
+    SELECT SeccionID, CodigoSeccion, TipoSeccion
+    FROM ANCI_SECCIONES_CONFIG
+    WHERE Activo = 1
+    AND (
+        TipoSeccion = 'FIJA'
+        OR (
+            TipoSeccion = 'TAXONOMIA' 
+            AND (
+                (? = 'OIV' AND AplicaOIV = 1)
+                OR (? = 'PSE' AND AplicaPSE = 1)
+                OR (? = 'AMBAS')
+            )
+        )
+    )
+"""
+
+# Tamaño de lote por defecto para el modo masivo
+TAMANO_LOTE_DEFECTO = 500
+
 class MigradorSistemaDinamico:
-    def __init__(self):
+    def __init__(self, modo_masivo=False, tamano_lote=TAMANO_LOTE_DEFECTO, archivo_checkpoint=None):
         self.conn = None
         self.cursor = None
+        self.modo_masivo = modo_masivo
+        self.tamano_lote = tamano_lote
+        self.archivo_checkpoint = archivo_checkpoint
+        self._cache_secciones = {}
         self.estadisticas = {
             'incidentes_migrados': 0,
             'secciones_creadas': 0,
@@ -57,17 +95,33 @@ class MigradorSistemaDinamico:
             print("\n3️⃣ Cargando taxonomías como secciones...")
             self.cargar_taxonomias_como_secciones()
             
-            # 4. Migrar incidentes existentes
-            print("\n4️⃣ Migrando incidentes existentes...")
-            self.migrar_incidentes()
-            
-            # 5. Migrar evidencias
-            print("\n5️⃣ Migrando evidencias...")
-            self.migrar_evidencias()
-            
-            # 6. Migrar comentarios de taxonomías
-            print("\n6️⃣ Migrando comentarios de taxonomías...")
-            self.migrar_comentarios_taxonomias()
+            if self.modo_masivo:
+                # Las secciones deben quedar confirmadas antes de los lotes
+                self.conn.commit()
+                
+                # 4. Migrar incidentes existentes por lotes
+                print("\n4️⃣ Migrando incidentes existentes (modo masivo)...")
+                self.migrar_incidentes_masivo()
+                
+                # 5. Migrar evidencias
+                print("\n5️⃣ Migrando evidencias (modo masivo)...")
+                self.migrar_evidencias_masivo()
+                
+                # 6. Migrar comentarios de taxonomías
+                print("\n6️⃣ Migrando comentarios de taxonomías (modo masivo)...")
+                self.migrar_comentarios_taxonomias_masivo()
+            else:
+                # 4. Migrar incidentes existentes
+                print("\n4️⃣ Migrando incidentes existentes...")
+                self.migrar_incidentes()
+                
+                # 5. Migrar evidencias
+                print("\n5️⃣ Migrando evidencias...")
+                self.migrar_evidencias()
+                
+                # 6. Migrar comentarios de taxonomías
+                print("\n6️⃣ Migrando comentarios de taxonomías...")
+                self.migrar_comentarios_taxonomias()
             
             # Confirmar cambios
             self.conn.commit()
@@ -217,12 +271,8 @@ class MigradorSistemaDinamico:
     def migrar_incidente_individual(self, incidente_id, empresa_id, tipo_empresa):
         """Migra un incidente individual"""
         # Obtener datos actuales del incidente
-        self.cursor.execute("""
-            SELECT Titulo, DescripcionInicial, AccionesInmediatas,
-                   AnciImpactoPreliminar, CausaRaiz, LeccionesAprendidas,
-                   PlanMejora, ReporteAnciID, FechaDeclaracionANCI,
-                   AnciTipoAmenaza, SistemasAfectados, ServiciosInterrumpidos,
-                   AlcanceGeografico, ResponsableCliente
+        self.cursor.execute(f"""
+            SELECT {COLUMNAS_INCIDENTE}
             FROM Incidentes
             WHERE IncidenteID = ?
         """, (incidente_id,))
@@ -230,75 +280,14 @@ class MigradorSistemaDinamico:
         datos_incidente = self.cursor.fetchone()
         
         # Obtener secciones aplicables según tipo de empresa
-        query_secciones = """
-            SELECT SeccionID, CodigoSeccion, TipoSeccion
-            FROM ANCI_SECCIONES_CONFIG
-            WHERE Activo = 1
-            AND (
-                TipoSeccion = 'FIJA'
-                OR (
-                    TipoSeccion = 'TAXONOMIA' 
-                    AND (
-                        (? = 'OIV' AND AplicaOIV = 1)
-                        OR (? = 'PSE' AND AplicaPSE = 1)
-                        OR (? = 'AMBAS')
-                    )
-                )
-            )
-        """
-        
-        self.cursor.execute(query_secciones, (tipo_empresa, tipo_empresa, tipo_empresa))
+        self.cursor.execute(QUERY_SECCIONES_APLICABLES, (tipo_empresa, tipo_empresa, tipo_empresa))
         secciones = self.cursor.fetchall()
         
         # Mapear datos existentes a secciones
         for seccion_id, codigo_seccion, tipo_seccion in secciones:
-            datos_seccion = {}
-            estado = 'VACIO'
-            porcentaje = 0
-            
-            if tipo_seccion == 'FIJA':
-                # Mapear datos según la sección
-                if codigo_seccion == 'SEC_1':  # Información General
-                    datos_seccion = {
-                        'titulo': datos_incidente[0] or '',
-                        'criticidad': 'Media'  # Default
-                    }
-                elif codigo_seccion == 'SEC_2':  # Descripción
-                    datos_seccion = {
-                        'descripcion_detallada': datos_incidente[1] or '',
-                        'sistemas_afectados': datos_incidente[10] or '',
-                        'servicios_interrumpidos': datos_incidente[11] or ''
-                    }
-                elif codigo_seccion == 'SEC_3':  # Análisis
-                    datos_seccion = {
-                        'analisis_tecnico': '',
-                        'impacto_preliminar': datos_incidente[3] or '',
-                        'alcance_geografico': datos_incidente[12] or ''
-                    }
-                elif codigo_seccion == 'SEC_4':  # Acciones
-                    datos_seccion = {
-                        'acciones_inmediatas': datos_incidente[2] or '',
-                        'responsable_cliente': datos_incidente[13] or ''
-                    }
-                elif codigo_seccion == 'SEC_5':  # Análisis Final
-                    datos_seccion = {
-                        'causa_raiz': datos_incidente[4] or '',
-                        'lecciones_aprendidas': datos_incidente[5] or '',
-                        'plan_mejora': datos_incidente[6] or ''
-                    }
-                elif codigo_seccion == 'SEC_6':  # Info ANCI
-                    datos_seccion = {
-                        'reporte_anci_id': datos_incidente[7] or '',
-                        'fecha_declaracion_anci': str(datos_incidente[8]) if datos_incidente[8] else '',
-                        'tipo_amenaza': datos_incidente[9] or ''
-                    }
-                
-                # Calcular estado
-                if any(datos_seccion.values()):
-                    campos_llenos = sum(1 for v in datos_seccion.values() if v)
-                    total_campos = len(datos_seccion)
-                    porcentaje = int((campos_llenos / total_campos) * 100)
-                    estado = 'COMPLETO' if porcentaje == 100 else 'PARCIAL'
+            datos_seccion, estado, porcentaje = self._mapear_datos_seccion(
+                codigo_seccion, tipo_seccion, datos_incidente
+            )
             
             # Insertar datos de sección
             self.cursor.execute("""
@@ -316,6 +305,62 @@ class MigradorSistemaDinamico:
             
             self.estadisticas['secciones_creadas'] += 1
     
+    def _mapear_datos_seccion(self, codigo_seccion, tipo_seccion, datos_incidente):
+        """Mapea las columnas del incidente a los datos de una sección.
+        
+        Retorna (datos_seccion, estado, porcentaje). ``datos_incidente`` sigue el
+        orden de columnas de ``COLUMNAS_INCIDENTE``.
+        """
+        datos_seccion = {}
+        estado = 'VACIO'
+        porcentaje = 0
+        
+        if tipo_seccion == 'FIJA':
+            # Mapear datos según la sección
+            if codigo_seccion == 'SEC_1':  # Información General
+                datos_seccion = {
+                    'titulo': datos_incidente[0] or '',
+                    'criticidad': 'Media'  # Default
+                }
+            elif codigo_seccion == 'SEC_2':  # Descripción
+                datos_seccion = {
+                    'descripcion_detallada': datos_incidente[1] or '',
+                    'sistemas_afectados': datos_incidente[10] or '',
+                    'servicios_interrumpidos': datos_incidente[11] or ''
+                }
+            elif codigo_seccion == 'SEC_3':  # Análisis
+                datos_seccion = {
+                    'analisis_tecnico': '',
+                    'impacto_preliminar': datos_incidente[3] or '',
+                    'alcance_geografico': datos_incidente[12] or ''
+                }
+            elif codigo_seccion == 'SEC_4':  # Acciones
+                datos_seccion = {
+                    'acciones_inmediatas': datos_incidente[2] or '',
+                    'responsable_cliente': datos_incidente[13] or ''
+                }
+            elif codigo_seccion == 'SEC_5':  # Análisis Final
+                datos_seccion = {
+                    'causa_raiz': datos_incidente[4] or '',
+                    'lecciones_aprendidas': datos_incidente[5] or '',
+                    'plan_mejora': datos_incidente[6] or ''
+                }
+            elif codigo_seccion == 'SEC_6':  # Info ANCI
+                datos_seccion = {
+                    'reporte_anci_id': datos_incidente[7] or '',
+                    'fecha_declaracion_anci': str(datos_incidente[8]) if datos_incidente[8] else '',
+                    'tipo_amenaza': datos_incidente[9] or ''
+                }
+            
+            # Calcular estado
+            if any(datos_seccion.values()):
+                campos_llenos = sum(1 for v in datos_seccion.values() if v)
+                total_campos = len(datos_seccion)
+                porcentaje = int((campos_llenos / total_campos) * 100)
+                estado = 'COMPLETO' if porcentaje == 100 else 'PARCIAL'
+        
+        return datos_seccion, estado, porcentaje
+    
     def migrar_evidencias(self):
         """Migra las evidencias existentes al nuevo esquema"""
         print("   📎 Migrando evidencias...")
@@ -471,6 +516,355 @@ class MigradorSistemaDinamico:
                 except Exception as e:
                     print(f"      ⚠️ Error migrando comentario: {e}")
     
+    # ------------------------------------------------------------------
+    # Modo masivo: configuración precargada, lotes con executemany,
+    # commit por lote y reanudación desde checkpoint
+    # ------------------------------------------------------------------
+    
+    def _cursor_escritura(self):
+        """Cursor para inserciones masivas (fast_executemany cuando el driver lo soporta)"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.fast_executemany = True
+        except AttributeError:
+            pass
+        return cursor
+    
+    def _obtener_secciones_por_tipo(self, tipo_empresa):
+        """Secciones aplicables a un tipo de empresa, consultadas una sola vez por tipo"""
+        if tipo_empresa not in self._cache_secciones:
+            self.cursor.execute(QUERY_SECCIONES_APLICABLES, (tipo_empresa, tipo_empresa, tipo_empresa))
+            self._cache_secciones[tipo_empresa] = [tuple(fila) for fila in self.cursor.fetchall()]
+        return self._cache_secciones[tipo_empresa]
+    
+    def _obtener_mapa_secciones(self, tipo_seccion=None):
+        """Mapa CodigoSeccion -> SeccionID de las secciones configuradas (opcionalmente de un solo tipo)"""
+        if tipo_seccion:
+            self.cursor.execute("""
+                SELECT CodigoSeccion, SeccionID FROM ANCI_SECCIONES_CONFIG
+                WHERE TipoSeccion = ?
+            """, (tipo_seccion,))
+        else:
+            self.cursor.execute("SELECT CodigoSeccion, SeccionID FROM ANCI_SECCIONES_CONFIG")
+        return {codigo: seccion_id for codigo, seccion_id in self.cursor.fetchall()}
+    
+    def _reintentar_por_incidente(self, escritura, sentencia, filas, etapa):
+        """Reinserta un lote fallido incidente por incidente; devuelve las filas confirmadas.
+        
+        Las filas de un incidente que vuelve a fallar quedan registradas en errores y
+        ese incidente se omite, igual que en ``migrar_incidentes_masivo``.
+        """
+        filas_por_incidente = {}
+        for fila in filas:
+            filas_por_incidente.setdefault(fila[0], []).append(fila)
+        
+        confirmadas = 0
+        for incidente_id, filas_incidente in filas_por_incidente.items():
+            try:
+                escritura.executemany(sentencia, filas_incidente)
+                self.conn.commit()
+                confirmadas += len(filas_incidente)
+            except Exception as e_individual:
+                self.conn.rollback()
+                error_msg = f"Error migrando {etapa} del incidente {incidente_id}: {e_individual}"
+                print(f"   ❌ {error_msg}")
+                self.estadisticas['errores'].append(error_msg)
+        return confirmadas
+    
+    def _cargar_checkpoint(self):
+        """Lee el checkpoint de la migración (último IncidenteID confirmado por etapa)"""
+        if not self.archivo_checkpoint or not os.path.exists(self.archivo_checkpoint):
+            return {}
+        try:
+            with open(self.archivo_checkpoint, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ Checkpoint ilegible, se inicia desde cero: {e}")
+            return {}
+    
+    def _guardar_checkpoint(self, etapa, ultimo_id):
+        """Persiste el avance de una etapa de forma atómica"""
+        if not self.archivo_checkpoint:
+            return
+        checkpoint = self._cargar_checkpoint()
+        checkpoint[etapa] = ultimo_id
+        checkpoint['actualizado'] = datetime.now().isoformat()
+        temporal = f"{self.archivo_checkpoint}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temporal, self.archivo_checkpoint)
+    
+    def _reportar_throughput(self, etapa, numero_lote, procesados, inicio):
+        """Imprime el avance acumulado en incidentes por segundo"""
+        transcurrido = max(time.time() - inicio, 1e-6)
+        print(f"   ⏱️ {etapa} lote {numero_lote}: {procesados} incidentes "
+              f"({procesados / transcurrido:.1f} incidentes/s)")
+    
+    def migrar_incidentes_masivo(self):
+        """Migra los incidentes por lotes de ``tamano_lote`` con una inserción por lote"""
+        ultimo_id = self._cargar_checkpoint().get('incidentes', 0)
+        if ultimo_id:
+            print(f"   ↩️ Reanudando desde IncidenteID > {ultimo_id}")
+        
+        columnas = ', '.join(f"i.{columna.strip()}" for columna in COLUMNAS_INCIDENTE.split(','))
+        escritura = self._cursor_escritura()
+        inicio = time.time()
+        procesados = 0
+        numero_lote = 0
+        
+        while True:
+            # Paginación por clave: no deja un result set abierto mientras se inserta
+            self.cursor.execute(f"""
+                SELECT TOP (?) i.IncidenteID, e.Tipo_Empresa, {columnas}
+                FROM Incidentes i
+                INNER JOIN Empresas e ON i.EmpresaID = e.EmpresaID
+                WHERE i.IncidenteID > ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM INCIDENTES_SECCIONES_DATOS 
+                    WHERE IncidenteID = i.IncidenteID
+                )
+                ORDER BY i.IncidenteID
+            """, (self.tamano_lote, ultimo_id))
+            lote = self.cursor.fetchmany(self.tamano_lote)
+            if not lote:
+                break
+            
+            filas = []
+            for fila in lote:
+                incidente_id, tipo_empresa, datos_incidente = fila[0], fila[1], fila[2:]
+                for seccion_id, codigo_seccion, tipo_seccion in self._obtener_secciones_por_tipo(tipo_empresa):
+                    datos_seccion, estado, porcentaje = self._mapear_datos_seccion(
+                        codigo_seccion, tipo_seccion, datos_incidente
+                    )
+                    filas.append((
+                        incidente_id,
+                        seccion_id,
+                        json.dumps(datos_seccion),
+                        estado,
+                        porcentaje,
+                        'Migración'
+                    ))
+            
+            try:
+                if filas:
+                    escritura.executemany("""
+                        INSERT INTO INCIDENTES_SECCIONES_DATOS 
+                        (IncidenteID, SeccionID, DatosJSON, EstadoSeccion, PorcentajeCompletado, ActualizadoPor)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, filas)
+                self.conn.commit()
+                self.estadisticas['incidentes_migrados'] += len(lote)
+                self.estadisticas['secciones_creadas'] += len(filas)
+            except Exception as e:
+                # Reintentar el lote incidente por incidente para aislar los que fallan
+                self.conn.rollback()
+                print(f"   ⚠️ Lote {numero_lote + 1} falló ({e}), reintentando por incidente...")
+                for fila in lote:
+                    try:
+                        self.migrar_incidente_individual(fila[0], None, fila[1])
+                        self.conn.commit()
+                        self.estadisticas['incidentes_migrados'] += 1
+                    except Exception as e_individual:
+                        self.conn.rollback()
+                        error_msg = f"Error migrando incidente {fila[0]}: {e_individual}"
+                        print(f"   ❌ {error_msg}")
+                        self.estadisticas['errores'].append(error_msg)
+            
+            ultimo_id = lote[-1][0]
+            self._guardar_checkpoint('incidentes', ultimo_id)
+            procesados += len(lote)
+            numero_lote += 1
+            self._reportar_throughput('Incidentes', numero_lote, procesados, inicio)
+        
+        print(f"   📊 Incidentes procesados: {procesados}")
+    
+    def migrar_evidencias_masivo(self):
+        """Migra las evidencias agrupadas por lotes de incidentes completos"""
+        mapa_secciones = self._obtener_mapa_secciones()
+        mapeo_secciones = {
+            '2': 'SEC_2',  # Descripción
+            '3': 'SEC_3',  # Análisis
+            '4': 'SEC_4',  # Acciones
+            '5': 'SEC_5',  # Análisis Final
+        }
+        
+        sentencia = """
+            INSERT INTO INCIDENTES_ARCHIVOS 
+            (IncidenteID, SeccionID, NumeroArchivo, NombreOriginal, 
+             NombreServidor, RutaArchivo, TipoArchivo, TamanoKB, 
+             Descripcion, FechaSubida, SubidoPor)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        ultimo_id = self._cargar_checkpoint().get('evidencias', 0)
+        escritura = self._cursor_escritura()
+        inicio = time.time()
+        procesados = 0
+        numero_lote = 0
+        
+        while True:
+            # Rango de los próximos incidentes completos (aunque ya estén migrados)
+            self.cursor.execute("""
+                SELECT MAX(IncidenteID) FROM (
+                    SELECT DISTINCT TOP (?) IncidenteID FROM EvidenciasIncidentes
+                    WHERE IncidenteID > ?
+                    ORDER BY IncidenteID
+                ) rango
+            """, (self.tamano_lote, ultimo_id))
+            fin_rango = self.cursor.fetchone()[0]
+            if fin_rango is None:
+                break
+            
+            self.cursor.execute("""
+                SELECT ei.IncidenteID, ei.EvidenciaID, ei.NombreArchivo, 
+                       ei.RutaArchivo, ei.TipoArchivo, ei.TamanoKB,
+                       ei.Descripcion, ei.FechaSubida, ei.SubidoPor,
+                       ei.Seccion, ei.Version
+                FROM EvidenciasIncidentes ei
+                WHERE ei.IncidenteID > ? AND ei.IncidenteID <= ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM INCIDENTES_ARCHIVOS 
+                    WHERE IncidenteID = ei.IncidenteID 
+                    AND NombreOriginal = ei.NombreArchivo
+                )
+                ORDER BY ei.IncidenteID, ei.Seccion, ei.EvidenciaID
+            """, (ultimo_id, fin_rango))
+            evidencias = self.cursor.fetchall()
+            
+            filas = []
+            evidencias_por_seccion = {}
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            for evidencia in evidencias:
+                incidente_id = evidencia[0]
+                seccion_antigua = str(evidencia[9] or '2')  # Default a sección 2
+                seccion_id = mapa_secciones.get(mapeo_secciones.get(seccion_antigua, 'SEC_2'))
+                if seccion_id is None:
+                    continue
+                
+                key = (incidente_id, seccion_id)
+                evidencias_por_seccion[key] = evidencias_por_seccion.get(key, 0) + 1
+                numero_archivo = evidencias_por_seccion[key]
+                
+                # Solo migrar si no excede el límite (10 archivos por sección)
+                if numero_archivo <= 10:
+                    filas.append((
+                        incidente_id,
+                        seccion_id,
+                        numero_archivo,
+                        evidencia[2],  # NombreArchivo
+                        f"MIG_{timestamp}_{evidencia[1]}_{evidencia[2]}",
+                        evidencia[3],  # RutaArchivo
+                        evidencia[4] or 'application/octet-stream',
+                        evidencia[5] or 0,
+                        evidencia[6] or '',
+                        evidencia[7],
+                        evidencia[8] or 'Migración'
+                    ))
+            
+            try:
+                if filas:
+                    escritura.executemany(sentencia, filas)
+                self.conn.commit()
+                self.estadisticas['archivos_migrados'] += len(filas)
+            except Exception as e:
+                # Reintentar incidente por incidente antes de avanzar el checkpoint
+                self.conn.rollback()
+                print(f"   ⚠️ Lote de evidencias {ultimo_id + 1}-{fin_rango} falló ({e}), reintentando por incidente...")
+                self.estadisticas['archivos_migrados'] += self._reintentar_por_incidente(
+                    escritura, sentencia, filas, 'evidencias'
+                )
+            
+            procesados += len({evidencia[0] for evidencia in evidencias})
+            ultimo_id = fin_rango
+            self._guardar_checkpoint('evidencias', ultimo_id)
+            numero_lote += 1
+            self._reportar_throughput('Evidencias', numero_lote, procesados, inicio)
+    
+    def migrar_comentarios_taxonomias_masivo(self):
+        """Migra los comentarios de taxonomías agrupados por lotes de incidentes completos"""
+        mapa_secciones = self._obtener_mapa_secciones('TAXONOMIA')
+        sentencia = """
+            INSERT INTO INCIDENTES_COMENTARIOS 
+            (IncidenteID, SeccionID, NumeroComentario, Comentario, 
+             TipoComentario, FechaCreacion, CreadoPor)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        ultimo_id = self._cargar_checkpoint().get('comentarios', 0)
+        escritura = self._cursor_escritura()
+        inicio = time.time()
+        procesados = 0
+        numero_lote = 0
+        
+        while True:
+            # Rango de los próximos incidentes completos (aunque ya estén migrados)
+            self.cursor.execute("""
+                SELECT MAX(IncidenteID) FROM (
+                    SELECT DISTINCT TOP (?) IncidenteID FROM COMENTARIOS_TAXONOMIA
+                    WHERE IncidenteID > ?
+                    ORDER BY IncidenteID
+                ) rango
+            """, (self.tamano_lote, ultimo_id))
+            fin_rango = self.cursor.fetchone()[0]
+            if fin_rango is None:
+                break
+            
+            self.cursor.execute("""
+                SELECT ct.IncidenteID, ct.Id_Taxonomia, ct.NumeroEvidencia,
+                       ct.Comentario, ct.FechaCreacion, ct.CreadoPor
+                FROM COMENTARIOS_TAXONOMIA ct
+                WHERE ct.IncidenteID > ? AND ct.IncidenteID <= ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM INCIDENTES_COMENTARIOS ic
+                    WHERE ic.IncidenteID = ct.IncidenteID
+                    AND ic.Comentario = ct.Comentario
+                )
+                ORDER BY ct.IncidenteID, ct.Id_Taxonomia
+            """, (ultimo_id, fin_rango))
+            comentarios = self.cursor.fetchall()
+            
+            filas = []
+            comentarios_por_seccion = {}
+            for incidente_id, id_taxonomia, numero_evidencia, texto, fecha, usuario in comentarios:
+                seccion_id = mapa_secciones.get(f'TAX_{id_taxonomia}')
+                if seccion_id is None:
+                    continue
+                
+                key = (incidente_id, seccion_id)
+                comentarios_por_seccion[key] = comentarios_por_seccion.get(key, 0) + 1
+                numero_comentario = comentarios_por_seccion[key]
+                
+                # Solo migrar si no excede el límite (6 comentarios por sección)
+                if numero_comentario <= 6:
+                    filas.append((
+                        incidente_id,
+                        seccion_id,
+                        numero_comentario,
+                        texto,
+                        'TAXONOMIA',
+                        fecha,
+                        usuario or 'Migración'
+                    ))
+            
+            try:
+                if filas:
+                    escritura.executemany(sentencia, filas)
+                self.conn.commit()
+                self.estadisticas['comentarios_migrados'] += len(filas)
+            except Exception as e:
+                # Reintentar incidente por incidente antes de avanzar el checkpoint
+                self.conn.rollback()
+                print(f"   ⚠️ Lote de comentarios {ultimo_id + 1}-{fin_rango} falló ({e}), reintentando por incidente...")
+                self.estadisticas['comentarios_migrados'] += self._reintentar_por_incidente(
+                    escritura, sentencia, filas, 'comentarios'
+                )
+            
+            procesados += len({comentario[0] for comentario in comentarios})
+            ultimo_id = fin_rango
+            self._guardar_checkpoint('comentarios', ultimo_id)
+            numero_lote += 1
+            self._reportar_throughput('Comentarios', numero_lote, procesados, inicio)
+    
     def mostrar_resumen(self):
         """Muestra el resumen de la migración"""
         print("\n" + "=" * 60)
@@ -493,15 +887,31 @@ class MigradorSistemaDinamico:
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Migrador al sistema dinámico de incidentes")
+    parser.add_argument('--masivo', action='store_true',
+                        help='Migrar por lotes con executemany y commit por lote')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFECTO,
+                        help=f'Incidentes por lote en modo masivo (defecto {TAMANO_LOTE_DEFECTO})')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Archivo JSON para reanudar el modo masivo')
+    args = parser.parse_args()
+    
     print("\n🚀 MIGRADOR AL SISTEMA DINÁMICO DE INCIDENTES")
     print("=" * 60)
+    if args.masivo:
+        print(f"Modo masivo: lotes de {args.lote} incidentes"
+              + (f", checkpoint en {args.checkpoint}" if args.checkpoint else ""))
     
     respuesta = input("\n¿Desea continuar con la migración? (s/n): ")
     if respuesta.lower() != 's':
         print("Migración cancelada")
         return
     
-    migrador = MigradorSistemaDinamico()
+    migrador = MigradorSistemaDinamico(
+        modo_masivo=args.masivo,
+        tamano_lote=args.lote,
+        archivo_checkpoint=args.checkpoint
+    )
     try:
         migrador.ejecutar_migracion()
     except Exception as e:
@@ -52,6 +52,7 @@ from .headers_security import security_headers, SecurityHeaders
 from .file_upload_security import file_upload_security, FileUploadSecurity, secure_file_required
 from .api_security import api_security, APISecurityManager, require_auth
 from .monitoring import security_monitor, SecurityMonitor, monitor_endpoint
+from .inspection_engine import inspection_engine, InspectionEngine, compile_patterns
 
 # Funciones de conveniencia
 from .encryption_utils import (
@@ -176,6 +177,7 @@ __all__ = [
     'FileUploadSecurity',
     'APISecurityManager',
     'SecurityMonitor',
+    'InspectionEngine',
     
     # Instancias globales
     'rate_limiter',
@@ -192,10 +194,12 @@ __all__ = [
     'file_upload_security',
     'api_security',
     'security_monitor',
+    'inspection_engine',
     
     # Funciones de conveniencia
     'integrate_security',
     'get_db_connection',
+    'compile_patterns',
     'encrypt_sensitive_data',
     'decrypt_sensitive_data',
     'hash_user_password',
@@ -25,6 +25,7 @@ from typing import Dict, Any, Optional, List, Callable
 from functools import wraps
 from flask import request, jsonify, g, current_app
 import jsonschema
+from app.revocacion_tokens import revocacion_tokens
 
 class APISecurityManager:
     """
@@ -64,8 +65,8 @@ class APISecurityManager:
             'VALIDATE_RESPONSE_SCHEMA': os.getenv('VALIDATE_RESPONSE_SCHEMA', 'false').lower() == 'true'
         }
         
-        # Blacklist de tokens JWT
-        self.token_blacklist = set()
+        # Tokens JWT revocados, compartidos entre workers (app/revocacion_tokens.py)
+        self.token_revocation = revocacion_tokens
         
         # Registry de API keys
         self.api_keys = {}
@@ -184,7 +185,7 @@ class APISecurityManager:
             
             # Verificar blacklist
             if self.config['JWT_BLACKLIST_ENABLED']:
-                if payload.get('jti') in self.token_blacklist:
+                if self.token_revocation.esta_revocado(payload.get('jti')):
                     return None
             
             return payload
@@ -195,7 +196,7 @@ class APISecurityManager:
             return None
     
     def revoke_token(self, token: str):
-        """Revoca un token agregándolo a la blacklist"""
+        """Revoca un token hasta su expiración en el almacén compartido"""
         if not self.config['JWT_BLACKLIST_ENABLED']:
             return
         
@@ -208,11 +209,7 @@ class APISecurityManager:
                 options={"verify_exp": False}  # Permitir tokens expirados
             )
             
-            jti = payload.get('jti')
-            if jti:
-                self.token_blacklist.add(jti)
-                
-                # TODO: En producción, almacenar en Redis/DB con TTL
+            self.token_revocation.revocar(payload.get('jti'), payload.get('exp'))
                 
         except:
             pass
@@ -6,24 +6,54 @@ Este módulo implementa protección completa contra ataques CSRF mediante
 tokens únicos, validación de origen y políticas de seguridad.
 
 Características:
-- Generación de tokens CSRF únicos
+- Tokens CSRF firmados (HMAC-SHA256) sin estado en el servidor
+- Rotación de claves por versión
 - Validación de tokens en requests
 - Verificación de headers Referer/Origin
 - Double Submit Cookie pattern
 - Integración con sesiones
 - Exclusión de endpoints específicos
+
+Formato del token: ``<versión>.<expira>.<firma>``, con la firma HMAC-SHA256
+de la clave de esa versión sobre versión, expiración (epoch en segundos) y
+el identificador CSRF de la sesión (``csrf_sid``, aleatorio, guardado en la
+sesión al emitir el primer token). Cualquier worker con las mismas claves
+valida el token sin consultar caché ni sesión de servidor, y el costo de
+validar no depende de cuántos tokens se hayan emitido.
+
+Claves: CSRF_SECRET_KEYS="3:clave-nueva,2:clave-anterior"; la primera firma
+los tokens nuevos y las demás solo se aceptan al validar, hasta que sus
+tokens expiren. Sin la variable se deriva la versión 1 de app.secret_key.
 """
 
 import os
 import hmac
 import hashlib
+import base64
+import logging
 import secrets
 import time
 from functools import wraps
 from datetime import datetime, timedelta
-from typing import Optional, List, Callable
+from typing import Optional, List, Callable, Dict
 from flask import request, session, g, abort, current_app
 
+logger = logging.getLogger(__name__)
+
+
+def _parsear_claves(valor: str) -> Dict[int, bytes]:
+    """'3:clave,2:otra' -> {3: b'clave', 2: b'otra'} conservando el orden"""
+    claves = {}
+    for parte in (valor or '').split(','):
+        version, separador, clave = parte.strip().partition(':')
+        if not separador or not version.isdigit() or not clave:
+            if parte.strip():
+                logger.warning("CSRF_SECRET_KEYS: entrada ignorada (formato versión:clave)")
+            continue
+        claves[int(version)] = clave.encode('utf-8')
+    return claves
+
+
 class CSRFProtection:
     """
     Sistema de protección contra CSRF
@@ -33,7 +63,7 @@ class CSRFProtection:
         self.app = app
         self.config = {
             'ENABLE_CSRF': os.getenv('ENABLE_CSRF_PROTECTION', 'true').lower() == 'true',
-            'TOKEN_LENGTH': int(os.getenv('CSRF_TOKEN_LENGTH', 32)),
+            'SECRET_KEYS': os.getenv('CSRF_SECRET_KEYS', ''),
             'TOKEN_LIFETIME': int(os.getenv('CSRF_TOKEN_LIFETIME', 3600)),  # 1 hora
             'HEADER_NAME': os.getenv('CSRF_HEADER_NAME', 'X-CSRF-Token'),
             'FORM_FIELD': os.getenv('CSRF_FORM_FIELD', 'csrf_token'),
@@ -45,8 +75,16 @@ class CSRFProtection:
             'EXCLUDE_PATHS': []
         }
         
-        # Cache de tokens para validación rápida
-        self.token_cache = {}
+        # Claves de firma por versión; la activa firma los tokens nuevos
+        self.claves = {}
+        self.version_activa = None
+        self.stats = {
+            'tokens_generados': 0,
+            'tokens_validos': 0,
+            'tokens_rechazados': 0,
+            'version_desconocida': 0,
+        }
+        self.configurar_claves(_parsear_claves(self.config['SECRET_KEYS']))
         
         if app:
             self.init_app(app)
@@ -56,9 +94,17 @@ class CSRFProtection:
         self.app = app
         
         # Configurar secret key si no existe
-        if not app.secret_key:
+        secret_key_generada = not app.secret_key
+        if secret_key_generada:
             app.secret_key = os.urandom(32)
         
+        # Sin CSRF_SECRET_KEYS: versión 1 derivada de la secret key de la app
+        if not self.claves:
+            if secret_key_generada:
+                logger.warning("CSRF sin CSRF_SECRET_KEYS ni secret key: los tokens solo valen en este worker")
+            secreto = app.secret_key if isinstance(app.secret_key, bytes) else str(app.secret_key).encode('utf-8')
+            self.configurar_claves({1: hmac.new(secreto, b'csrf-token-v1', hashlib.sha256).digest()})
+        
         # Registrar before_request handler
         app.before_request(self._before_request)
         
@@ -91,44 +137,91 @@ class CSRFProtection:
             self._log_csrf_failure()
             abort(403, 'CSRF validation failed')
     
+    def configurar_claves(self, claves: Dict[int, bytes], version_activa: int = None):
+        """
+        Define las claves de firma por versión
+        
+        Args:
+            claves: {versión: clave}; sin version_activa, firma la primera
+            version_activa: Versión con la que se firman los tokens nuevos
+        """
+        self.claves = dict(claves)
+        if version_activa is None and self.claves:
+            version_activa = next(iter(self.claves))
+        if version_activa is not None and version_activa not in self.claves:
+            raise ValueError(f"Versión de clave CSRF {version_activa} sin clave")
+        self.version_activa = version_activa
+    
+    @staticmethod
+    def _firma(clave: bytes, version: int, expira: int, sid: str) -> str:
+        mensaje = f"{version}.{expira}.{sid}".encode('utf-8')
+        digest = hmac.new(clave, mensaje, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+    
+    def firmar_token(self, sid: str, expira: int = None) -> str:
+        """Token firmado con la clave activa para el identificador CSRF ``sid``"""
+        if expira is None:
+            expira = int(time.time()) + self.config['TOKEN_LIFETIME']
+        version = self.version_activa
+        self.stats['tokens_generados'] += 1
+        return f"{version}.{expira}.{self._firma(self.claves[version], version, expira, sid)}"
+    
+    def verificar_firma(self, token: str, sid: str) -> bool:
+        """
+        Verifica versión, expiración y firma de un token para ``sid``
+        
+        Sin estado: no consulta caché ni sesión más allá de ``sid``, y la
+        firma se compara en tiempo constante.
+        """
+        try:
+            version, expira, firma = token.split('.')
+            version, expira = int(version), int(expira)
+        except (AttributeError, ValueError):
+            self.stats['tokens_rechazados'] += 1
+            return False
+        
+        clave = self.claves.get(version)
+        if clave is None:
+            self.stats['version_desconocida'] += 1
+            self.stats['tokens_rechazados'] += 1
+            return False
+        
+        esperada = self._firma(clave, version, expira, sid or '')
+        valido = hmac.compare_digest(firma.encode('ascii', 'replace'), esperada.encode('ascii')) \
+            and expira > time.time()
+        self.stats['tokens_validos' if valido else 'tokens_rechazados'] += 1
+        return valido
+    
+    def _sid(self, crear: bool = False) -> Optional[str]:
+        """Identificador CSRF de la sesión; se crea al emitir el primer token"""
+        sid = session.get('csrf_sid')
+        if not sid and crear:
+            sid = secrets.token_urlsafe(16)
+            session['csrf_sid'] = sid
+        return sid
+    
     def generate_csrf_token(self, force_new: bool = False) -> str:
         """
-        Genera un nuevo token CSRF
+        Genera un token CSRF firmado para la sesión actual
         
         Args:
-            force_new: Forzar generación de nuevo token
+            force_new: Nuevo identificador CSRF de sesión, lo que invalida
+                los tokens emitidos antes (por ejemplo, tras el login)
             
         Returns:
             str: Token CSRF
         """
-        # Verificar si ya existe un token válido en la sesión
-        if not force_new and 'csrf_token' in session:
-            token_data = session.get('csrf_token_data', {})
-            if token_data.get('expires', 0) > time.time():
-                return session['csrf_token']
-        
-        # Generar nuevo token
-        token = secrets.token_urlsafe(self.config['TOKEN_LENGTH'])
-        
-        # Almacenar en sesión con timestamp
-        session['csrf_token'] = token
-        session['csrf_token_data'] = {
-            'created': time.time(),
-            'expires': time.time() + self.config['TOKEN_LIFETIME'],
-            'ip': request.remote_addr
-        }
+        # Un token por request: las plantillas lo piden varias veces
+        if not force_new and getattr(g, 'csrf_token', None):
+            return g.csrf_token
         
-        # Almacenar en g para acceso en la request actual
-        g.csrf_token = token
+        if force_new:
+            session.pop('csrf_sid', None)
         
-        # Cache local para validación rápida
-        self.token_cache[token] = {
-            'expires': time.time() + self.config['TOKEN_LIFETIME'],
-            'session_id': session.get('_id', 'unknown')
-        }
+        token = self.firmar_token(self._sid(crear=True))
         
-        # Limpiar tokens expirados del cache
-        self._cleanup_token_cache()
+        # Almacenar en g para acceso en la request actual
+        g.csrf_token = token
         
         return token
     
@@ -171,29 +264,11 @@ class CSRFProtection:
         Returns:
             bool: True si es válido
         """
-        # Verificar en cache primero
-        if token in self.token_cache:
-            cache_data = self.token_cache[token]
-            if cache_data['expires'] > time.time():
-                return True
-            else:
-                # Token expirado, eliminar del cache
-                del self.token_cache[token]
-        
-        # Verificar en sesión
-        session_token = session.get('csrf_token')
-        if not session_token or session_token != token:
+        # Firma, versión de clave y expiración, ligadas a la sesión actual
+        sid = self._sid()
+        if not sid or not self.verificar_firma(token, sid):
             return False
         
-        # Verificar expiración
-        token_data = session.get('csrf_token_data', {})
-        if token_data.get('expires', 0) < time.time():
-            return False
-        
-        # Verificar IP (opcional, puede causar problemas con proxies)
-        # if token_data.get('ip') != request.remote_addr:
-        #     return False
-        
         # Validar referer/origin si está configurado
         if self.config['CHECK_REFERER']:
             if not self._validate_referer():
@@ -298,17 +373,6 @@ class CSRFProtection:
         
         return False
     
-    def _cleanup_token_cache(self):
-        """Limpia tokens expirados del cache"""
-        current_time = time.time()
-        expired_tokens = [
-            token for token, data in self.token_cache.items()
-            if data['expires'] < current_time
-        ]
-        
-        for token in expired_tokens:
-            del self.token_cache[token]
-    
     def regenerate_token(self):
         """Regenera el token CSRF (útil después de login)"""
         return self.generate_csrf_token(force_new=True)
@@ -317,7 +381,9 @@ class CSRFProtection:
         """Obtiene el token CSRF actual"""
         if hasattr(g, 'csrf_token'):
             return g.csrf_token
-        return session.get('csrf_token')
+        if self._sid():
+            return self.generate_csrf_token()
+        return None
     
     def validate_token(self, token: str) -> bool:
         """
@@ -20,13 +20,24 @@ import secrets
 import hashlib
 import hmac
 from datetime import datetime, timedelta
-from typing import Union, Optional, Tuple
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from typing import Any, Union, Optional, Tuple, TYPE_CHECKING
 import bcrypt
 
+# cryptography se importa al primer cifrado, no al importar el módulo
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+
+
+def _generate_fernet_key() -> bytes:
+    """Clave Fernet nueva (equivalente a Fernet.generate_key sin importar cryptography)"""
+    return base64.urlsafe_b64encode(os.urandom(32))
+
+
+def _new_fernet(key: bytes) -> 'Fernet':
+    """Crea una instancia Fernet importando cryptography bajo demanda"""
+    from cryptography.fernet import Fernet
+    return Fernet(key)
+
 class EncryptionManager:
     """
     Gestor central de encriptación y seguridad criptográfica
@@ -56,13 +67,24 @@ class EncryptionManager:
         """Inicializa o genera la clave de encriptación principal"""
         if not self.config['ENCRYPTION_KEY']:
             # Generar nueva clave si no existe
-            self.config['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+            self.config['ENCRYPTION_KEY'] = _generate_fernet_key().decode()
             # En producción, esta clave debe almacenarse de forma segura
             print(f"⚠️  ADVERTENCIA: Nueva clave de encriptación generada.")
             print(f"   Guarde esta clave de forma segura: {self.config['ENCRYPTION_KEY']}")
         
-        # Crear instancia Fernet principal
-        self.fernet = Fernet(self.config['ENCRYPTION_KEY'].encode())
+        # La instancia Fernet principal se crea en el primer uso (ver ``fernet``)
+        self._fernet = None
+    
+    @property
+    def fernet(self) -> 'Fernet':
+        """Instancia Fernet de la clave principal, creada bajo demanda"""
+        if self._fernet is None:
+            self._fernet = _new_fernet(self.config['ENCRYPTION_KEY'].encode())
+        return self._fernet
+    
+    @fernet.setter
+    def fernet(self, value: 'Fernet'):
+        self._fernet = value
     
     def encrypt(self, data: Union[str, bytes], context: str = 'default') -> str:
         """
@@ -120,7 +142,7 @@ class EncryptionManager:
             # Si falla la desencriptación, puede ser datos no encriptados
             return encrypted_data
     
-    def _get_fernet_for_context(self, context: str) -> Fernet:
+    def _get_fernet_for_context(self, context: str) -> 'Fernet':
         """Obtiene instancia Fernet para un contexto específico"""
         if context not in self.fernet_cache:
             # Derivar clave específica del contexto
@@ -128,12 +150,16 @@ class EncryptionManager:
                 self.config['ENCRYPTION_KEY'].encode(),
                 context.encode()
             )
-            self.fernet_cache[context] = Fernet(context_key)
+            self.fernet_cache[context] = _new_fernet(context_key)
         
         return self.fernet_cache[context]
     
     def _derive_key(self, master_key: bytes, salt: bytes) -> bytes:
         """Deriva una clave usando PBKDF2"""
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        from cryptography.hazmat.backends import default_backend
+        
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
@@ -351,10 +377,10 @@ class EncryptionManager:
         
         # Establecer nueva clave
         if not new_key:
-            new_key = Fernet.generate_key().decode()
+            new_key = _generate_fernet_key().decode()
         
         self.config['ENCRYPTION_KEY'] = new_key
-        self.fernet = Fernet(new_key.encode())
+        self.fernet = _new_fernet(new_key.encode())
         
         # Limpiar cache
         self.fernet_cache.clear()
@@ -12,11 +12,80 @@ Características:
 - X-Content-Type-Options
 - Permissions Policy
 - Referrer Policy
+
+Los headers se compilan una vez por clase de ruta (api, admin, static,
+resto) en paquetes inmutables ya serializados; por respuesta solo se
+copian, se inserta el nonce CSP en una plantilla y se decide el origen CORS.
 """
 
 import os
-from typing import Dict, Optional, List
-from flask import Response, request, current_app
+from typing import Any, Dict, Optional, List, Tuple
+from flask import Response, request, current_app, g, make_response
+from werkzeug.datastructures import Headers
+
+# Clases de ruta con CSP propia: (clase, prefijo). El orden importa.
+CLASES_RUTA = (
+    ('api', '/api/'),
+    ('admin', '/admin/'),
+    ('static', '/static/'),
+    ('general', '/'),
+)
+
+MARCA_NONCE = '\x00nonce\x00'
+
+HEADERS_CORS = (
+    'Access-Control-Allow-Origin',
+    'Access-Control-Allow-Methods',
+    'Access-Control-Allow-Headers',
+    'Access-Control-Max-Age',
+    'Access-Control-Allow-Credentials',
+    'Access-Control-Expose-Headers',
+)
+
+
+def clase_ruta(path: str) -> str:
+    """Clase de ruta de un path (misma prioridad que _get_csp_for_route)"""
+    for clase, prefijo in CLASES_RUTA[:-1]:
+        if path.startswith(prefijo):
+            return clase
+    return 'general'
+
+
+def _agregar_fuente(csp: Dict[str, List[str]], directive: str, source: str):
+    if directive in csp and source not in csp[directive]:
+        csp[directive].append(source)
+
+
+class PaqueteHeaders:
+    """
+    Headers ya serializados de una clase de ruta. No se modifica después
+    de compilar: cambiar la configuración genera paquetes nuevos.
+    """
+
+    __slots__ = ('clase', 'headers', 'csp_nombre', 'csp', '_plantilla')
+
+    def __init__(self, clase: str, headers: Tuple[Tuple[str, str], ...], csp_nombre: str,
+                 csp: Optional[str], plantilla: Optional[Tuple[str, str]]):
+        self.clase = clase
+        self.headers = headers
+        self.csp_nombre = csp_nombre
+        self.csp = csp
+        self._plantilla = plantilla
+
+    def csp_con_nonce(self, nonce: Optional[str]) -> Optional[str]:
+        """CSP con el nonce en script-src (o la CSP fija si no hay nonce o plantilla)"""
+        if nonce is None or self._plantilla is None:
+            return self.csp
+        antes, despues = self._plantilla
+        return f"{antes}{nonce}{despues}"
+
+    def tamano(self) -> int:
+        """Bytes de headers del paquete sin nonce (para reportes y pruebas)"""
+        total = sum(len(nombre) + len(valor) for nombre, valor in self.headers)
+        if self.csp is not None:
+            total += len(self.csp_nombre) + len(self.csp)
+        return total
+
 
 class SecurityHeaders:
     """
@@ -101,112 +170,161 @@ class SecurityHeaders:
             'document-domain': '()'
         }
         
+        # Paquetes de headers compilados (ver compilar())
+        self._paquetes: Dict[str, PaqueteHeaders] = {}
+        self.compilar()
+        
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         """Inicializa headers de seguridad con la aplicación"""
         self.app = app
-        
+    
         if not self.config['ENABLE_SECURITY_HEADERS']:
             return
-        
+    
+        # Headers pre-serializados por clase de ruta
+        self.compilar()
+    
         # Registrar after_request handler
         app.after_request(self._apply_security_headers)
-        
+    
         # Registrar endpoint para reportes CSP si está habilitado
         if self.config['CSP_ENABLED'] and self.config['CSP_REPORT_URI']:
             self._register_csp_report_endpoint(app)
     
-    def _apply_security_headers(self, response: Response) -> Response:
-        """Aplica todos los headers de seguridad a la respuesta"""
-        if not self.config['ENABLE_SECURITY_HEADERS']:
-            return response
-        
-        # Content Security Policy
-        if self.config['CSP_ENABLED']:
-            self._apply_csp(response)
-        
-        # HTTP Strict Transport Security
+    def compilar(self):
+        """
+        Construye los paquetes de headers de cada clase de ruta y las
+        variantes CORS a partir de la configuración actual.
+    
+        Se llama en init_app, add_csp_source y set_custom_header; si se
+        modifica self.config directamente hay que volver a llamarlo.
+        """
+        comunes = []
+    
         if self.config['HSTS_ENABLED']:
-            self._apply_hsts(response)
-        
-        # X-Frame-Options
+            comunes.append(('Strict-Transport-Security', self._build_hsts()))
         if self.config['FRAME_OPTIONS']:
-            response.headers['X-Frame-Options'] = self.config['FRAME_OPTIONS']
-        
-        # X-Content-Type-Options
+            comunes.append(('X-Frame-Options', self.config['FRAME_OPTIONS']))
         if self.config['CONTENT_TYPE_NOSNIFF']:
-            response.headers['X-Content-Type-Options'] = 'nosniff'
-        
-        # X-XSS-Protection
+            comunes.append(('X-Content-Type-Options', 'nosniff'))
         if self.config['XSS_PROTECTION']:
-            response.headers['X-XSS-Protection'] = self.config['XSS_PROTECTION']
-        
-        # Referrer Policy
+            comunes.append(('X-XSS-Protection', self.config['XSS_PROTECTION']))
         if self.config['REFERRER_POLICY']:
-            response.headers['Referrer-Policy'] = self.config['REFERRER_POLICY']
-        
-        # Permissions Policy
+            comunes.append(('Referrer-Policy', self.config['REFERRER_POLICY']))
         if self.config['PERMISSIONS_POLICY_ENABLED']:
-            self._apply_permissions_policy(response)
-        
+            comunes.append(('Permissions-Policy', self._build_permissions_policy()))
+    
+        # Headers adicionales de seguridad
+        comunes.append(('X-Permitted-Cross-Domain-Policies', 'none'))
+        comunes.append(('X-Download-Options', 'noopen'))
+        comunes.append(('X-DNS-Prefetch-Control', 'off'))
+    
+        csp_nombre = ('Content-Security-Policy-Report-Only' if self.config['CSP_REPORT_ONLY']
+                      else 'Content-Security-Policy')
+        dinamicos = {csp_nombre.lower(), *(nombre.lower() for nombre in HEADERS_CORS)}
+    
+        # Los headers personalizados reemplazan a los fijos del mismo nombre
+        custom = list(self.config['CUSTOM_HEADERS'].items())
+        reemplazados = {nombre.lower() for nombre, _ in custom}
+        comunes = [(n, v) for n, v in comunes if n.lower() not in reemplazados] + custom
+        Headers(comunes)  # valida los valores (sin saltos de línea) una sola vez
+    
+        paquetes = {}
+        for clase, prefijo_ruta in CLASES_RUTA:
+            csp = plantilla = None
+            if self.config['CSP_ENABLED']:
+                csp, plantilla = self._build_csp(self._get_csp_for_route(prefijo_ruta))
+            paquetes[clase] = PaqueteHeaders(clase, tuple(comunes), csp_nombre, csp, plantilla)
+    
+        # CORS: valores fijos; por respuesta solo se decide el origen
+        origenes = [o.strip() for o in self.config['CORS_ORIGINS'] if o.strip()]
+        self._cors_comodin = '*' in origenes
+        self._cors_exactos = frozenset(o for o in origenes if not o.startswith('*.'))
+        self._cors_subdominios = tuple(o[2:] for o in origenes if o.startswith('*.'))
+        self._cors_preflight = (
+            ('Access-Control-Allow-Methods', ', '.join(self.config['CORS_METHODS'])),
+            ('Access-Control-Allow-Headers', ', '.join(self.config['CORS_HEADERS'])),
+            ('Access-Control-Max-Age', '86400'),  # 24 horas
+        )
+    
+        # Nombres que puede escribir _apply_security_headers. Si la respuesta
+        # no trae ninguno (lo normal) se agregan sin buscar duplicados; un
+        # header personalizado sobre CSP/CORS obliga a reemplazar uno a uno.
+        self._nombres = frozenset({n.lower() for n, _ in comunes} | dinamicos)
+        self._agregar_directo = reemplazados.isdisjoint(dinamicos)
+        self._custom_dinamicos = tuple((n, v) for n, v in custom if n.lower() in dinamicos)
+        self._paquetes = paquetes
+        return paquetes
+    
+    def _apply_security_headers(self, response: Response) -> Response:
+        """Aplica el paquete de headers de la clase de ruta a la respuesta"""
+        if not self.config['ENABLE_SECURITY_HEADERS']:
+            return response
+    
+        paquete = self._paquetes[clase_ruta(request.path)]
+        headers = response.headers
+    
+        # Content Security Policy (con nonce si la vista lo generó)
+        nuevos = []
+        if paquete.csp is not None:
+            nuevos.append((paquete.csp_nombre, paquete.csp_con_nonce(g.get('csp_nonce'))))
+        nuevos += paquete.headers
+    
         # CORS Headers
         if self.config['CORS_ENABLED']:
-            self._apply_cors_headers(response)
-        
-        # Headers adicionales de seguridad
-        response.headers['X-Permitted-Cross-Domain-Policies'] = 'none'
-        response.headers['X-Download-Options'] = 'noopen'
-        response.headers['X-DNS-Prefetch-Control'] = 'off'
-        
+            nuevos += self._cors_headers(request.headers.get('Origin'), request.method)
+    
         # Remover headers que exponen información
-        response.headers.pop('Server', None)
-        response.headers.pop('X-Powered-By', None)
-        
-        # Headers personalizados
-        for header, value in self.config['CUSTOM_HEADERS'].items():
-            response.headers[header] = value
-        
+        headers.pop('Server', None)
+        headers.pop('X-Powered-By', None)
+    
+        # Valores validados al compilar: si ninguno existe en la respuesta se
+        # agregan en bloque (Headers.__setitem__ valida y recorre la lista por header)
+        lista = getattr(headers, '_list', None)
+        if (self._agregar_directo and lista is not None
+                and self._nombres.isdisjoint([nombre.lower() for nombre, _ in lista])):
+            lista.extend(nuevos)
+        else:
+            for nombre, valor in nuevos + list(self._custom_dinamicos):
+                headers[nombre] = valor
+    
         return response
     
-    def _apply_csp(self, response: Response):
-        """Aplica Content Security Policy"""
-        # Obtener directivas CSP para esta ruta
-        csp_directives = self._get_csp_for_route(request.path)
-        
-        # Construir header CSP
+    def _build_csp(self, csp_directives: Dict[str, List[str]]) -> Tuple[str, Optional[Tuple[str, str]]]:
+        """
+        Serializa las directivas CSP.
+    
+        Returns:
+            (header sin nonce, plantilla) donde plantilla es (antes, después)
+            del nonce que reemplaza a 'unsafe-inline' en script-src, o None
+            si la política no tiene dónde ponerlo.
+        """
         csp_parts = []
+        con_marca = []
         for directive, sources in csp_directives.items():
-            if sources:
-                csp_parts.append(f"{directive} {' '.join(sources)}")
-            else:
-                csp_parts.append(directive)
-        
-        # Agregar nonce si es necesario
-        if hasattr(g, 'csp_nonce'):
-            # Actualizar script-src con nonce
-            for i, part in enumerate(csp_parts):
-                if part.startswith('script-src'):
-                    csp_parts[i] = part.replace("'unsafe-inline'", f"'nonce-{g.csp_nonce}'")
-        
+            part = f"{directive} {' '.join(sources)}" if sources else directive
+            csp_parts.append(part)
+            if directive == 'script-src' and "'unsafe-inline'" in sources:
+                part = part.replace("'unsafe-inline'", f"'nonce-{MARCA_NONCE}'", 1)
+            con_marca.append(part)
+    
         # Agregar report-uri si está configurado
         if self.config['CSP_REPORT_URI']:
             csp_parts.append(f"report-uri {self.config['CSP_REPORT_URI']}")
-        
+            con_marca.append(csp_parts[-1])
+    
         csp_header = '; '.join(csp_parts)
-        
-        # Aplicar header
-        if self.config['CSP_REPORT_ONLY']:
-            response.headers['Content-Security-Policy-Report-Only'] = csp_header
-        else:
-            response.headers['Content-Security-Policy'] = csp_header
+        antes, marca, despues = '; '.join(con_marca).partition(MARCA_NONCE)
+        return csp_header, ((antes, despues) if marca else None)
     
     def _get_csp_for_route(self, path: str) -> Dict[str, List[str]]:
-        """Obtiene directivas CSP específicas para una ruta"""
-        # Copiar directivas por defecto
-        csp = self.default_csp.copy()
-        
+        """Obtiene directivas CSP específicas para una ruta (copia, no modifica default_csp)"""
+        # Copiar directivas por defecto (también las listas)
+        csp = {directive: list(sources) for directive, sources in self.default_csp.items()}
+    
         # Ajustes específicos por ruta
         if path.startswith('/api/'):
             # APIs no necesitan muchas directivas
@@ -215,80 +333,70 @@ class SecurityHeaders:
             csp.pop('script-src', None)
             csp.pop('style-src', None)
             csp.pop('img-src', None)
-        
+    
         elif path.startswith('/admin/'):
             # Admin puede necesitar más permisos
-            csp['script-src'].extend(["'unsafe-eval'"])  # Para algunas librerías admin
-            csp['style-src'].extend(["https://fonts.googleapis.com"])
-            csp['font-src'].extend(["https://fonts.gstatic.com"])
-        
+            _agregar_fuente(csp, 'script-src', "'unsafe-eval'")  # Para algunas librerías admin
+            _agregar_fuente(csp, 'style-src', "https://fonts.googleapis.com")
+            _agregar_fuente(csp, 'font-src', "https://fonts.gstatic.com")
+    
         elif path.startswith('/static/'):
             # Archivos estáticos
             csp = {'default-src': ["'none'"]}
-        
+    
         return csp
     
-    def _apply_hsts(self, response: Response):
-        """Aplica HTTP Strict Transport Security"""
+    def _build_hsts(self) -> str:
+        """Valor de HTTP Strict Transport Security"""
         hsts_value = f"max-age={self.config['HSTS_MAX_AGE']}"
-        
+    
         if self.config['HSTS_INCLUDE_SUBDOMAINS']:
             hsts_value += "; includeSubDomains"
-        
+    
         if self.config['HSTS_PRELOAD']:
             hsts_value += "; preload"
-        
-        response.headers['Strict-Transport-Security'] = hsts_value
     
-    def _apply_permissions_policy(self, response: Response):
-        """Aplica Permissions Policy (antes Feature Policy)"""
-        permissions = []
-        
-        for feature, allowlist in self.default_permissions.items():
-            permissions.append(f"{feature}={allowlist}")
-        
-        response.headers['Permissions-Policy'] = ', '.join(permissions)
+        return hsts_value
+    
+    def _build_permissions_policy(self) -> str:
+        """Valor de Permissions Policy (antes Feature Policy)"""
+        return ', '.join(f"{feature}={allowlist}" for feature, allowlist in self.default_permissions.items())
+    
+    def _cors_headers(self, origin: Optional[str], method: str) -> List[Tuple[str, str]]:
+        """Headers CORS para el origen y método de la petición"""
+        cors = []
     
-    def _apply_cors_headers(self, response: Response):
-        """Aplica headers CORS de forma segura"""
-        origin = request.headers.get('Origin')
-        
         # Verificar si el origen está permitido
         if origin and self._is_allowed_origin(origin):
-            response.headers['Access-Control-Allow-Origin'] = origin
-        elif '*' in self.config['CORS_ORIGINS']:
-            response.headers['Access-Control-Allow-Origin'] = '*'
-        
+            cors.append(('Access-Control-Allow-Origin', origin))
+        elif self._cors_comodin:
+            cors.append(('Access-Control-Allow-Origin', '*'))
+    
         # Otros headers CORS
-        if request.method == 'OPTIONS':
-            response.headers['Access-Control-Allow-Methods'] = ', '.join(self.config['CORS_METHODS'])
-            response.headers['Access-Control-Allow-Headers'] = ', '.join(self.config['CORS_HEADERS'])
-            response.headers['Access-Control-Max-Age'] = '86400'  # 24 horas
-        
+        if method == 'OPTIONS':
+            cors += self._cors_preflight
+    
         if self.config['CORS_CREDENTIALS'] and origin != '*':
-            response.headers['Access-Control-Allow-Credentials'] = 'true'
-        
+            cors.append(('Access-Control-Allow-Credentials', 'true'))
+    
         # Headers expuestos
-        response.headers['Access-Control-Expose-Headers'] = 'Content-Length, X-Request-Id'
+        cors.append(('Access-Control-Expose-Headers', 'Content-Length, X-Request-Id'))
+        return cors
+    
+    def _apply_cors_headers(self, response: Response):
+        """Aplica headers CORS de forma segura"""
+        for nombre, valor in self._cors_headers(request.headers.get('Origin'), request.method):
+            response.headers[nombre] = valor
     
     def _is_allowed_origin(self, origin: str) -> bool:
         """Verifica si un origen está permitido"""
-        # Si se permite cualquier origen
-        if '*' in self.config['CORS_ORIGINS']:
+        # Si se permite cualquier origen o está en la lista
+        if self._cors_comodin or origin in self._cors_exactos:
             return True
-        
-        # Verificar lista de orígenes permitidos
-        for allowed in self.config['CORS_ORIGINS']:
-            if allowed == origin:
-                return True
-            
-            # Soporte para wildcards en subdominios
-            if allowed.startswith('*.'):
-                domain = allowed[2:]
-                if origin.endswith(domain):
-                    return True
-        
-        return False
+    
+        # Soporte para wildcards en subdominios
+        return bool(self._cors_subdominios) and origin.endswith(self._cors_subdominios)
+    
     
     def _register_csp_report_endpoint(self, app):
         """Registra endpoint para recibir reportes CSP"""
@@ -355,6 +463,7 @@ class SecurityHeaders:
         if directive in self.default_csp:
             if source not in self.default_csp[directive]:
                 self.default_csp[directive].append(source)
+                self.compilar()
     
     def set_custom_header(self, name: str, value: str):
         """
@@ -365,6 +474,7 @@ class SecurityHeaders:
             value: Valor del header
         """
         self.config['CUSTOM_HEADERS'][name] = value
+        self.compilar()
     
     def get_security_headers_report(self) -> Dict[str, Any]:
         """
@@ -379,7 +489,8 @@ class SecurityHeaders:
                 'CSP': {
                     'enabled': self.config['CSP_ENABLED'],
                     'report_only': self.config['CSP_REPORT_ONLY'],
-                    'directives': len(self.default_csp)
+                    'directives': len(self.default_csp),
+                    'bytes_por_ruta': {clase: len(p.csp or '') for clase, p in self._paquetes.items()}
                 },
                 'HSTS': {
                     'enabled': self.config['HSTS_ENABLED'],
@@ -24,6 +24,8 @@ from decimal import Decimal
 from typing import Any, Dict, List, Optional, Union, Tuple
 from flask import request, abort
 
+from .inspection_engine import compile_patterns
+
 class InputValidator:
     """
     Sistema completo de validación y sanitización de inputs
@@ -204,9 +206,8 @@ class InputValidator:
         
         # Validar contra patrones peligrosos
         if self.config['STRICT_MODE']:
-            for pattern in self.dangerous_patterns:
-                if re.search(pattern, value, re.IGNORECASE):
-                    raise ValueError("String contains dangerous pattern")
+            if compile_patterns(self.dangerous_patterns).matches(value):
+                raise ValueError("String contains dangerous pattern")
         
         # Sanitizar
         sanitized = self._sanitize_string(value, rules)
@@ -0,0 +1,223 @@
+"""
+inspection_engine.py - Motor de inspección de requests
+======================================================
+
+Compila cada lista de patrones sospechosos una sola vez: un prefiltro de
+literales obligatorios (búsqueda de subcadenas) más una regex con todas las
+alternativas que confirma. El cuerpo JSON se recorre una vez, de forma
+iterativa y con límites de profundidad y de nodos.
+
+Lo usan SecurityMiddleware (URL, headers y cuerpo), XSSProtection
+(detección de payloads XSS) e InputValidator (patrones peligrosos en
+strings). Las listas compiladas se comparten: la misma lista de patrones con
+los mismos flags se compila una sola vez por proceso.
+
+Uso:
+    from .inspection_engine import compile_patterns, inspection_engine
+
+    conjunto = compile_patterns([r'<script', r'union\\s+select'])
+    conjunto.search('... UNION SELECT ...')   # -> 'union\\s+select'
+    inspection_engine.inspect_json(data, conjunto)
+"""
+
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+
+class InspectionBudgetExceeded(ValueError):
+    """El cuerpo supera los límites de profundidad o de nodos"""
+
+
+# Caracteres no ASCII que re.IGNORECASE empareja con letras ASCII y que
+# str.lower() no convierte a esa letra ('K' de Kelvin sí: lower() da 'k')
+_PLIEGUE_IGNORECASE = {0x131: 'i', 0x17f: 's'}
+
+
+def _literal_requerido(patron: str, flags: int) -> Optional[str]:
+    """
+    Tramo literal más largo que toda coincidencia de ``patron`` contiene
+    (secuencia de LITERAL en el nivel superior), o None si no lo hay.
+    """
+    mejor, actual = '', []
+    for op, av in sre_parse.parse(patron, flags):
+        if op is sre_parse.LITERAL:
+            actual.append(chr(av))
+            continue
+        if len(actual) > len(mejor):
+            mejor = ''.join(actual)
+        actual = []
+    if len(actual) > len(mejor):
+        mejor = ''.join(actual)
+    return mejor or None
+
+
+class PatternSet:
+    """
+    Lista de patrones compilada para inspección en una pasada:
+
+    - prefiltro: si todos los patrones tienen un literal obligatorio, un
+      texto que no contiene ninguno se descarta con búsquedas de subcadena
+    - una regex con todas las alternativas (sin grupos de captura, que la
+      hacen varias veces más lenta) confirma si hay coincidencia
+    - solo entonces se busca qué patrón fue, en el orden de la lista
+
+    ``search`` retorna el patrón original que coincidió (o None), igual que
+    el primer ``re.search`` exitoso del recorrido patrón por patrón.
+    """
+
+    __slots__ = ('patterns', 'flags', 'regex', '_individuales', '_literales', '_ignorecase')
+
+    def __init__(self, patterns: Tuple[str, ...], flags: int):
+        self.patterns = patterns
+        self.flags = flags
+        self.regex = re.compile('|'.join(f"(?:{patron})" for patron in patterns) or r'(?!)', flags)
+        self._individuales = tuple(re.compile(patron, flags) for patron in patterns)
+        self._ignorecase = bool(flags & re.IGNORECASE)
+
+        literales = [_literal_requerido(patron, flags) for patron in patterns]
+        if patterns and all(literal and literal.isascii() for literal in literales):
+            self._literales = tuple(sorted({literal.lower() if self._ignorecase else literal
+                                            for literal in literales}, key=len))
+        else:
+            self._literales = None
+
+    def matches(self, text: str) -> bool:
+        """True si algún patrón coincide en ``text``"""
+        if self._literales is not None:
+            if self._ignorecase:
+                bajo = text.lower()
+                if not bajo.isascii():
+                    bajo = bajo.translate(_PLIEGUE_IGNORECASE)
+            else:
+                bajo = text
+            for literal in self._literales:
+                if literal in bajo:
+                    break
+            else:
+                return False
+        return self.regex.search(text) is not None
+
+    def search(self, text: str) -> Optional[str]:
+        """Patrón que coincide en ``text`` o None"""
+        if not self.matches(text):
+            return None
+        for patron, regex in zip(self.patterns, self._individuales):
+            if regex.search(text):
+                return patron
+        return None
+
+    @property
+    def prefiltered(self) -> bool:
+        return self._literales is not None
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+@lru_cache(maxsize=64)
+def _compilar(patterns: Tuple[str, ...], flags: int) -> PatternSet:
+    return PatternSet(patterns, flags)
+
+
+def compile_patterns(patterns: Iterable[str], flags: int = re.IGNORECASE) -> PatternSet:
+    """
+    PatternSet compartido para esta lista de patrones y flags.
+
+    Recibe la lista de configuración tal cual: si se modifica en caliente,
+    la siguiente llamada compila la lista nueva.
+    """
+    return _compilar(tuple(patterns), flags)
+
+
+class InspectionEngine:
+    """
+    Recorrido de cuerpos JSON con presupuesto y estadísticas de costo
+    """
+
+    def __init__(self):
+        self.config = {
+            'MAX_DEPTH': int(os.getenv('INSPECTION_MAX_DEPTH', 10)),
+            'MAX_NODES': int(os.getenv('INSPECTION_MAX_NODES', 50000)),
+        }
+        self.stats = {
+            'json_inspeccionados': 0,
+            'nodos': 0,
+            'coincidencias': 0,
+            'presupuesto_excedido': 0,
+        }
+        self._lock = threading.Lock()
+
+    def inspect_json(self, data: Any, pattern_set: PatternSet,
+                     max_depth: Optional[int] = None,
+                     max_nodes: Optional[int] = None) -> Optional[Tuple[str, str]]:
+        """
+        Recorre ``data`` una sola vez (sin recursión) buscando patrones en las
+        claves y en los strings.
+
+        Returns:
+            ('key' | 'value', patrón) de la primera coincidencia, o None
+
+        Raises:
+            InspectionBudgetExceeded: más de ``max_depth`` niveles o más de
+            ``max_nodes`` nodos
+        """
+        max_depth = self.config['MAX_DEPTH'] if max_depth is None else max_depth
+        max_nodes = self.config['MAX_NODES'] if max_nodes is None else max_nodes
+        search = pattern_set.search
+
+        pendientes = [(data, 0)]
+        nodos = 0
+        resultado = None
+        try:
+            while pendientes:
+                valor, profundidad = pendientes.pop()
+                nodos += 1
+                if nodos > max_nodes:
+                    raise InspectionBudgetExceeded(f"JSON with more than {max_nodes} nodes")
+
+                if isinstance(valor, str):
+                    patron = search(valor)
+                    if patron:
+                        resultado = ('value', patron)
+                        return resultado
+                elif isinstance(valor, dict):
+                    if valor and profundidad >= max_depth:
+                        raise InspectionBudgetExceeded("JSON too deeply nested")
+                    for clave, hijo in valor.items():
+                        if isinstance(clave, str):
+                            patron = search(clave)
+                            if patron:
+                                resultado = ('key', patron)
+                                return resultado
+                        pendientes.append((hijo, profundidad + 1))
+                elif isinstance(valor, list):
+                    if valor and profundidad >= max_depth:
+                        raise InspectionBudgetExceeded("JSON too deeply nested")
+                    pendientes.extend((hijo, profundidad + 1) for hijo in valor)
+            return None
+        except InspectionBudgetExceeded:
+            with self._lock:
+                self.stats['presupuesto_excedido'] += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats['json_inspeccionados'] += 1
+                self.stats['nodos'] += nodos
+                if resultado:
+                    self.stats['coincidencias'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, 'patrones_compilados': _compilar.cache_info().currsize}
+
+
+# Instancia global
+inspection_engine = InspectionEngine()
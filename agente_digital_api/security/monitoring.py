@@ -56,6 +56,10 @@ class SecurityMonitor:
             'suspicious_activities': defaultdict(int)
         }
         
+        # Costo de inspección por request (SecurityMiddleware), en segundos
+        self.inspection_times = deque(maxlen=1000)
+        self.inspection_counts = {'requests': 0, 'blocked': 0}
+        
         # Eventos recientes (cola circular)
         self.recent_events = deque(maxlen=self.config['MAX_EVENTS_BUFFER'])
         
@@ -181,6 +185,17 @@ class SecurityMonitor:
                 endpoint=endpoint
             ).observe(response_time)
     
+    def record_inspection(self, seconds: float, blocked: bool = False):
+        """Registra el costo de inspeccionar una request (URL, headers y cuerpo)"""
+        with self.lock:
+            self.inspection_times.append(seconds)
+            self.inspection_counts['requests'] += 1
+            if blocked:
+                self.inspection_counts['blocked'] += 1
+        
+        if self.statsd_client:
+            self.statsd_client.timing('security.inspection', seconds * 1000)
+    
     def record_security_event(self, event_type: str, severity: str = 'info',
                             details: Dict[str, Any] = None):
         """Registra un evento de seguridad"""
@@ -410,6 +425,7 @@ class SecurityMonitor:
                     'avg_response_time': self._calculate_avg_response_time(),
                     'endpoints': self._get_endpoint_metrics()
                 },
+                'inspection': self._get_inspection_metrics(),
                 'alerts': {
                     'active': len([a for a in self.active_alerts.values() if a['status'] == 'active']),
                     'total': len(self.active_alerts)
@@ -424,6 +440,19 @@ class SecurityMonitor:
         
         return statistics.mean(all_times) if all_times else 0
     
+    def _get_inspection_metrics(self) -> Dict[str, Any]:
+        """Costo de inspección por request (últimas 1000)"""
+        times = sorted(self.inspection_times)
+        if not times:
+            return {**self.inspection_counts, 'avg_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+        
+        return {
+            **self.inspection_counts,
+            'avg_ms': round(statistics.mean(times) * 1000, 3),
+            'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 3),
+            'max_ms': round(times[-1] * 1000, 3)
+        }
+    
     def _get_endpoint_metrics(self) -> List[Dict[str, Any]]:
         """Obtiene métricas por endpoint"""
         endpoint_data = []
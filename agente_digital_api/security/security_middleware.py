@@ -22,9 +22,11 @@ from functools import wraps
 from datetime import datetime, timedelta
 from flask import request, g, abort, jsonify, current_app
 from werkzeug.exceptions import BadRequest
-import re
 import ipaddress
 
+from .inspection_engine import compile_patterns, inspection_engine
+from .monitoring import security_monitor
+
 class SecurityMiddleware:
     """
     Middleware principal que coordina todas las medidas de seguridad
@@ -111,40 +113,9 @@ class SecurityMiddleware:
                 })
                 abort(403, 'Forbidden')
         
-        # Detectar patrones sospechosos en la URL
-        full_path = request.full_path
-        for pattern in self.config['SUSPICIOUS_PATTERNS']:
-            if re.search(pattern, full_path, re.IGNORECASE):
-                self._log_security_event('suspicious_pattern_url', {
-                    'pattern': pattern,
-                    'url': full_path,
-                    'ip': self._get_client_ip()
-                })
-                abort(400, 'Bad request')
-        
-        # Detectar patrones sospechosos en headers
-        for header_name, header_value in request.headers:
-            header_str = f"{header_name}: {header_value}"
-            for pattern in self.config['SUSPICIOUS_PATTERNS']:
-                if re.search(pattern, header_str, re.IGNORECASE):
-                    self._log_security_event('suspicious_pattern_header', {
-                        'pattern': pattern,
-                        'header': header_name,
-                        'ip': self._get_client_ip()
-                    })
-                    abort(400, 'Bad request')
-        
-        # Validar request body si existe
-        if request.is_json:
-            try:
-                data = request.get_json()
-                self._validate_json_data(data)
-            except Exception as e:
-                self._log_security_event('invalid_json', {
-                    'error': str(e),
-                    'ip': self._get_client_ip()
-                })
-                abort(400, 'Invalid JSON')
+        # Inspección de URL, headers y cuerpo con los patrones compilados
+        # en una sola regex (ver inspection_engine.py)
+        self._inspect_request()
         
         # Establecer información de seguridad en g
         g.client_ip = self._get_client_ip()
@@ -169,39 +140,75 @@ class SecurityMiddleware:
         
         return response
     
+    def _inspect_request(self):
+        """
+        Busca SUSPICIOUS_PATTERNS en la URL, los headers y el cuerpo JSON.
+        Aborta con 400 en la primera coincidencia y registra el costo de la
+        inspección en el monitor de seguridad.
+        """
+        patrones = compile_patterns(self.config['SUSPICIOUS_PATTERNS'])
+        inicio = time.perf_counter()
+        bloqueado = False
+        try:
+            # Detectar patrones sospechosos en la URL
+            full_path = request.full_path
+            pattern = patrones.search(full_path)
+            if pattern:
+                bloqueado = True
+                self._log_security_event('suspicious_pattern_url', {
+                    'pattern': pattern,
+                    'url': full_path,
+                    'ip': self._get_client_ip()
+                })
+                abort(400, 'Bad request')
+            
+            # Detectar patrones sospechosos en headers
+            for header_name, header_value in request.headers:
+                pattern = patrones.search(f"{header_name}: {header_value}")
+                if pattern:
+                    bloqueado = True
+                    self._log_security_event('suspicious_pattern_header', {
+                        'pattern': pattern,
+                        'header': header_name,
+                        'ip': self._get_client_ip()
+                    })
+                    abort(400, 'Bad request')
+            
+            # Validar request body si existe
+            if request.is_json:
+                try:
+                    data = request.get_json()
+                    self._validate_json_data(data)
+                except Exception as e:
+                    bloqueado = True
+                    self._log_security_event('invalid_json', {
+                        'error': str(e),
+                        'ip': self._get_client_ip()
+                    })
+                    abort(400, 'Invalid JSON')
+        finally:
+            segundos = time.perf_counter() - inicio
+            g.inspection_ms = segundos * 1000
+            security_monitor.record_inspection(segundos, bloqueado)
+    
     def _validate_json_data(self, data, depth=0):
         """
-        Valida recursivamente datos JSON contra patrones maliciosos
+        Valida datos JSON contra patrones maliciosos en un solo recorrido
         
         Args:
             data: Datos a validar
-            depth: Profundidad actual de recursión
+            depth: Profundidad de ``data`` dentro del cuerpo
+            
+        Raises:
+            ValueError: patrón sospechoso, anidamiento excesivo o demasiados nodos
         """
-        MAX_DEPTH = 10
-        
-        if depth > MAX_DEPTH:
-            raise ValueError("JSON too deeply nested")
-        
-        if isinstance(data, dict):
-            for key, value in data.items():
-                # Validar key
-                if isinstance(key, str):
-                    for pattern in self.config['SUSPICIOUS_PATTERNS']:
-                        if re.search(pattern, key, re.IGNORECASE):
-                            raise ValueError(f"Suspicious pattern in key: {key}")
-                
-                # Validar value recursivamente
-                self._validate_json_data(value, depth + 1)
-                
-        elif isinstance(data, list):
-            for item in data:
-                self._validate_json_data(item, depth + 1)
-                
-        elif isinstance(data, str):
-            # Validar strings contra patrones maliciosos
-            for pattern in self.config['SUSPICIOUS_PATTERNS']:
-                if re.search(pattern, data, re.IGNORECASE):
-                    raise ValueError(f"Suspicious pattern in value")
+        encontrado = inspection_engine.inspect_json(
+            data, compile_patterns(self.config['SUSPICIOUS_PATTERNS']),
+            max_depth=inspection_engine.config['MAX_DEPTH'] - depth
+        )
+        if encontrado:
+            lugar, _ = encontrado
+            raise ValueError("Suspicious pattern in key" if lugar == 'key' else "Suspicious pattern in value")
     
     def _get_client_ip(self):
         """
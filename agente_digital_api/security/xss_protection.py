@@ -19,10 +19,16 @@ import re
 import html
 import json
 import bleach
+from datetime import datetime
 from urllib.parse import urlparse, quote
 from typing import Any, Dict, List, Optional, Union
 from flask import Response, make_response
 
+from .inspection_engine import compile_patterns
+
+# Atributos con valores sospechosamente largos
+ATTR_LARGO = re.compile(r'(\w+)\s*=\s*["\']([^"\']{100,})["\']')
+
 class XSSProtection:
     """
     Sistema completo de protección contra XSS
@@ -148,14 +154,12 @@ class XSSProtection:
         """Detecta posibles intentos de XSS"""
         content_lower = content.lower()
         
-        # Verificar patrones conocidos
-        for pattern in self.xss_patterns:
-            if re.search(pattern, content_lower, re.IGNORECASE | re.DOTALL):
-                return True
+        # Verificar patrones conocidos (una sola regex, compartida)
+        if compile_patterns(self.xss_patterns, re.IGNORECASE | re.DOTALL).matches(content_lower):
+            return True
         
         # Verificar longitud sospechosa de atributos
-        attr_pattern = r'(\w+)\s*=\s*["\']([^"\']{100,})["\']'
-        if re.search(attr_pattern, content):
+        if ATTR_LARGO.search(content):
             return True
         
         # Verificar múltiples codificaciones
@@ -0,0 +1,215 @@
+-- ========================================
+-- CONTADORES DEL DASHBOARD POR EMPRESA
+-- ========================================
+-- Una fila por empresa con los totales que muestra el dashboard
+-- (incidentes por estado/criticidad, obligaciones por estado, evidencias).
+-- Los triggers aplican deltas en la misma transacción que el INSERT/UPDATE/
+-- DELETE que los origina, sin importar qué módulo escribe. El job
+-- app/modules/admin/contadores_dashboard.py (reconciliar_contadores)
+-- recalcula desde las tablas base y corrige cualquier desvío.
+--
+-- Después de ejecutar este script, inicializar con:
+--     python -m app.modules.admin.contadores_dashboard
+-- ========================================
+
+IF OBJECT_ID('EmpresaContadoresDashboard', 'U') IS NULL
+BEGIN
+    CREATE TABLE EmpresaContadoresDashboard (
+        EmpresaID INT NOT NULL PRIMARY KEY,
+        -- Incidentes
+        IncidentesTotal INT NOT NULL DEFAULT 0,
+        IncidentesAbiertos INT NOT NULL DEFAULT 0,
+        IncidentesCerrados INT NOT NULL DEFAULT 0,
+        IncidentesPendientes INT NOT NULL DEFAULT 0,
+        IncidentesCritAlta INT NOT NULL DEFAULT 0,
+        IncidentesCritMedia INT NOT NULL DEFAULT 0,
+        IncidentesCritBaja INT NOT NULL DEFAULT 0,
+        IncidentesCriticosAbiertos INT NOT NULL DEFAULT 0,   -- Alta y Abierto
+        -- Obligaciones (registros de CumplimientoEmpresa)
+        ObligacionesTotal INT NOT NULL DEFAULT 0,
+        ObligacionesImplementadas INT NOT NULL DEFAULT 0,
+        ObligacionesEnProceso INT NOT NULL DEFAULT 0,
+        ObligacionesPendientes INT NOT NULL DEFAULT 0,
+        ObligacionesVencidas INT NOT NULL DEFAULT 0,
+        ObligacionesNoAplica INT NOT NULL DEFAULT 0,
+        AvanceSuma BIGINT NOT NULL DEFAULT 0,                -- SUM(PorcentajeAvance) no nulos
+        AvanceCantidad INT NOT NULL DEFAULT 0,               -- COUNT(PorcentajeAvance)
+        -- Evidencias
+        EvidenciasCumplimiento INT NOT NULL DEFAULT 0,
+        EvidenciasIncidentes INT NOT NULL DEFAULT 0,
+        FechaActualizacion DATETIME NOT NULL DEFAULT GETDATE(),
+        FechaReconciliacion DATETIME NULL                    -- NULL: aún no inicializada
+    );
+END
+GO
+
+-- ----------------------------------------
+-- Incidentes
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_Incidentes_ContadoresDashboard
+ON Incidentes
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- Updates que no tocan columnas contadas no generan delta
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(EmpresaID) OR UPDATE(EstadoActual) OR UPDATE(Criticidad))
+        RETURN;
+
+    ;WITH cambios AS (
+        SELECT EmpresaID, EstadoActual, Criticidad, 1 AS Signo FROM inserted
+        UNION ALL
+        SELECT EmpresaID, EstadoActual, Criticidad, -1 FROM deleted
+    ), delta AS (
+        SELECT
+            EmpresaID,
+            SUM(Signo) AS Total,
+            SUM(CASE WHEN EstadoActual = 'Abierto' THEN Signo ELSE 0 END) AS Abiertos,
+            SUM(CASE WHEN EstadoActual = 'Cerrado' THEN Signo ELSE 0 END) AS Cerrados,
+            SUM(CASE WHEN EstadoActual = 'Pendiente' THEN Signo ELSE 0 END) AS Pendientes,
+            SUM(CASE WHEN Criticidad = 'Alta' THEN Signo ELSE 0 END) AS CritAlta,
+            SUM(CASE WHEN Criticidad = 'Media' THEN Signo ELSE 0 END) AS CritMedia,
+            SUM(CASE WHEN Criticidad = 'Baja' THEN Signo ELSE 0 END) AS CritBaja,
+            SUM(CASE WHEN Criticidad = 'Alta' AND EstadoActual = 'Abierto' THEN Signo ELSE 0 END) AS CriticosAbiertos
+        FROM cambios
+        WHERE EmpresaID IS NOT NULL
+        GROUP BY EmpresaID
+    )
+    MERGE EmpresaContadoresDashboard WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED THEN UPDATE SET
+        IncidentesTotal = c.IncidentesTotal + d.Total,
+        IncidentesAbiertos = c.IncidentesAbiertos + d.Abiertos,
+        IncidentesCerrados = c.IncidentesCerrados + d.Cerrados,
+        IncidentesPendientes = c.IncidentesPendientes + d.Pendientes,
+        IncidentesCritAlta = c.IncidentesCritAlta + d.CritAlta,
+        IncidentesCritMedia = c.IncidentesCritMedia + d.CritMedia,
+        IncidentesCritBaja = c.IncidentesCritBaja + d.CritBaja,
+        IncidentesCriticosAbiertos = c.IncidentesCriticosAbiertos + d.CriticosAbiertos,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (
+        EmpresaID, IncidentesTotal, IncidentesAbiertos, IncidentesCerrados, IncidentesPendientes,
+        IncidentesCritAlta, IncidentesCritMedia, IncidentesCritBaja, IncidentesCriticosAbiertos
+    ) VALUES (
+        d.EmpresaID, d.Total, d.Abiertos, d.Cerrados, d.Pendientes,
+        d.CritAlta, d.CritMedia, d.CritBaja, d.CriticosAbiertos
+    );
+END
+GO
+
+-- ----------------------------------------
+-- CumplimientoEmpresa
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_CumplimientoEmpresa_ContadoresDashboard
+ON CumplimientoEmpresa
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(EmpresaID) OR UPDATE(Estado) OR UPDATE(PorcentajeAvance))
+        RETURN;
+
+    ;WITH cambios AS (
+        SELECT EmpresaID, Estado, PorcentajeAvance, 1 AS Signo FROM inserted
+        UNION ALL
+        SELECT EmpresaID, Estado, PorcentajeAvance, -1 FROM deleted
+    ), delta AS (
+        SELECT
+            EmpresaID,
+            SUM(Signo) AS Total,
+            SUM(CASE WHEN Estado = 'Implementado' THEN Signo ELSE 0 END) AS Implementadas,
+            SUM(CASE WHEN Estado = 'En Proceso' THEN Signo ELSE 0 END) AS EnProceso,
+            SUM(CASE WHEN Estado = 'Pendiente' THEN Signo ELSE 0 END) AS Pendientes,
+            SUM(CASE WHEN Estado = 'Vencido' THEN Signo ELSE 0 END) AS Vencidas,
+            SUM(CASE WHEN Estado = 'No Aplica' THEN Signo ELSE 0 END) AS NoAplica,
+            SUM(CAST(ISNULL(PorcentajeAvance, 0) AS BIGINT) * Signo) AS AvanceSuma,
+            SUM(CASE WHEN PorcentajeAvance IS NOT NULL THEN Signo ELSE 0 END) AS AvanceCantidad
+        FROM cambios
+        WHERE EmpresaID IS NOT NULL
+        GROUP BY EmpresaID
+    )
+    MERGE EmpresaContadoresDashboard WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED THEN UPDATE SET
+        ObligacionesTotal = c.ObligacionesTotal + d.Total,
+        ObligacionesImplementadas = c.ObligacionesImplementadas + d.Implementadas,
+        ObligacionesEnProceso = c.ObligacionesEnProceso + d.EnProceso,
+        ObligacionesPendientes = c.ObligacionesPendientes + d.Pendientes,
+        ObligacionesVencidas = c.ObligacionesVencidas + d.Vencidas,
+        ObligacionesNoAplica = c.ObligacionesNoAplica + d.NoAplica,
+        AvanceSuma = c.AvanceSuma + d.AvanceSuma,
+        AvanceCantidad = c.AvanceCantidad + d.AvanceCantidad,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (
+        EmpresaID, ObligacionesTotal, ObligacionesImplementadas, ObligacionesEnProceso,
+        ObligacionesPendientes, ObligacionesVencidas, ObligacionesNoAplica, AvanceSuma, AvanceCantidad
+    ) VALUES (
+        d.EmpresaID, d.Total, d.Implementadas, d.EnProceso,
+        d.Pendientes, d.Vencidas, d.NoAplica, d.AvanceSuma, d.AvanceCantidad
+    );
+END
+GO
+
+-- ----------------------------------------
+-- EvidenciasCumplimiento (empresa vía CumplimientoEmpresa)
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_EvidenciasCumplimiento_ContadoresDashboard
+ON EvidenciasCumplimiento
+AFTER INSERT, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    ;WITH delta AS (
+        SELECT ce.EmpresaID, SUM(x.Signo) AS Total
+        FROM (
+            SELECT CumplimientoID, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT CumplimientoID, -1 FROM deleted
+        ) x
+        JOIN CumplimientoEmpresa ce ON ce.CumplimientoID = x.CumplimientoID
+        GROUP BY ce.EmpresaID
+    )
+    MERGE EmpresaContadoresDashboard WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED THEN UPDATE SET
+        EvidenciasCumplimiento = c.EvidenciasCumplimiento + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (EmpresaID, EvidenciasCumplimiento)
+        VALUES (d.EmpresaID, d.Total);
+END
+GO
+
+-- ----------------------------------------
+-- EvidenciasIncidentes (empresa vía Incidentes)
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_EvidenciasIncidentes_ContadoresDashboard
+ON EvidenciasIncidentes
+AFTER INSERT, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    ;WITH delta AS (
+        SELECT i.EmpresaID, SUM(x.Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted
+        ) x
+        JOIN Incidentes i ON i.IncidenteID = x.IncidenteID
+        GROUP BY i.EmpresaID
+    )
+    MERGE EmpresaContadoresDashboard WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED THEN UPDATE SET
+        EvidenciasIncidentes = c.EvidenciasIncidentes + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (EmpresaID, EvidenciasIncidentes)
+        VALUES (d.EmpresaID, d.Total);
+END
+GO
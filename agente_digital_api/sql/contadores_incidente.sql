@@ -0,0 +1,295 @@
+-- ========================================
+-- CONTADORES POR INCIDENTE (ESTADÍSTICAS Y COMPLETITUD)
+-- ========================================
+-- Una fila por incidente con lo que muestran las estadísticas del
+-- incidente y los listados: evidencias, comentarios, taxonomías, secciones
+-- del formulario ANCI y campos principales completos. Los triggers aplican
+-- deltas en la misma transacción que guarda la evidencia, el comentario,
+-- la taxonomía, la sección o los campos del incidente, sin importar qué
+-- módulo escribe. El job app/modules/admin/contadores_incidente.py
+-- (reconciliar_contadores_incidente) recalcula desde las tablas base,
+-- corrige y reporta los desvíos.
+--
+-- Una fila sin FechaReconciliacion (creada por un trigger para un incidente
+-- anterior a este script) se reconcilia al leerla por primera vez.
+--
+-- Requiere SQL Server 2016 o superior y las tablas del formulario dinámico
+-- (crear_sistema_dinamico.sql). Después de ejecutarlo, inicializar con:
+--     python -m app.modules.admin.contadores_incidente
+-- ========================================
+
+IF OBJECT_ID('IncidenteContadores', 'U') IS NULL
+BEGIN
+    CREATE TABLE IncidenteContadores (
+        IncidenteID INT NOT NULL PRIMARY KEY,
+        Evidencias INT NOT NULL DEFAULT 0,             -- INCIDENTES_ARCHIVOS activos
+        EvidenciasTaxonomia INT NOT NULL DEFAULT 0,    -- EVIDENCIAS_TAXONOMIA
+        Comentarios INT NOT NULL DEFAULT 0,            -- INCIDENTES_COMENTARIOS activos
+        ComentariosTaxonomia INT NOT NULL DEFAULT 0,   -- COMENTARIOS_TAXONOMIA
+        Taxonomias INT NOT NULL DEFAULT 0,             -- INCIDENTE_TAXONOMIA
+        SeccionesConDatos INT NOT NULL DEFAULT 0,      -- INCIDENTES_SECCIONES_DATOS no vacías
+        SeccionesCompletas INT NOT NULL DEFAULT 0,     -- INCIDENTES_SECCIONES_DATOS completas
+        CamposCompletos INT NOT NULL DEFAULT 0,        -- campos principales de Incidentes con valor
+        FechaActualizacion DATETIME NOT NULL DEFAULT GETDATE(),
+        FechaReconciliacion DATETIME NULL              -- NULL: aún no inicializada
+    );
+END
+GO
+
+-- ----------------------------------------
+-- Incidentes: campos principales completos (mismos 17 campos que
+-- CAMPOS_COMPLETITUD en contadores_incidente.py)
+-- ----------------------------------------
+CREATE OR ALTER FUNCTION dbo.fn_CamposCompletosIncidente (
+    @Titulo NVARCHAR(MAX), @TipoRegistro NVARCHAR(MAX), @FechaDeteccion NVARCHAR(MAX),
+    @FechaOcurrencia NVARCHAR(MAX), @Criticidad NVARCHAR(MAX), @AlcanceGeografico NVARCHAR(MAX),
+    @DescripcionInicial NVARCHAR(MAX), @AnciImpactoPreliminar NVARCHAR(MAX), @SistemasAfectados NVARCHAR(MAX),
+    @ServiciosInterrumpidos NVARCHAR(MAX), @OrigenIncidente NVARCHAR(MAX), @AnciTipoAmenaza NVARCHAR(MAX),
+    @ResponsableCliente NVARCHAR(MAX), @AccionesInmediatas NVARCHAR(MAX), @CausaRaiz NVARCHAR(MAX),
+    @LeccionesAprendidas NVARCHAR(MAX), @PlanMejora NVARCHAR(MAX)
+)
+RETURNS TABLE
+AS
+RETURN
+    SELECT SUM(CASE WHEN LTRIM(RTRIM(v.Valor)) <> '' THEN 1 ELSE 0 END) AS Total
+    FROM (VALUES
+        (@Titulo), (@TipoRegistro), (@FechaDeteccion), (@FechaOcurrencia), (@Criticidad),
+        (@AlcanceGeografico), (@DescripcionInicial), (@AnciImpactoPreliminar), (@SistemasAfectados),
+        (@ServiciosInterrumpidos), (@OrigenIncidente), (@AnciTipoAmenaza), (@ResponsableCliente),
+        (@AccionesInmediatas), (@CausaRaiz), (@LeccionesAprendidas), (@PlanMejora)
+    ) v (Valor);
+GO
+
+CREATE OR ALTER TRIGGER TR_Incidentes_ContadoresIncidente
+ON Incidentes
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF NOT EXISTS (SELECT 1 FROM inserted)
+    BEGIN
+        DELETE c FROM IncidenteContadores c JOIN deleted d ON d.IncidenteID = c.IncidenteID;
+        RETURN;
+    END
+
+    IF EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(Titulo) OR UPDATE(TipoRegistro) OR UPDATE(FechaDeteccion) OR UPDATE(FechaOcurrencia)
+             OR UPDATE(Criticidad) OR UPDATE(AlcanceGeografico) OR UPDATE(DescripcionInicial)
+             OR UPDATE(AnciImpactoPreliminar) OR UPDATE(SistemasAfectados) OR UPDATE(ServiciosInterrumpidos)
+             OR UPDATE(OrigenIncidente) OR UPDATE(AnciTipoAmenaza) OR UPDATE(ResponsableCliente)
+             OR UPDATE(AccionesInmediatas) OR UPDATE(CausaRaiz) OR UPDATE(LeccionesAprendidas)
+             OR UPDATE(PlanMejora))
+        RETURN;
+
+    -- Un incidente nuevo aún no tiene filas hijas: su fila nace reconciliada
+    ;WITH campos AS (
+        SELECT i.IncidenteID, f.Total AS CamposCompletos,
+            CASE WHEN d.IncidenteID IS NULL THEN 1 ELSE 0 END AS Nuevo
+        FROM inserted i
+        LEFT JOIN deleted d ON d.IncidenteID = i.IncidenteID
+        CROSS APPLY dbo.fn_CamposCompletosIncidente(
+            i.Titulo, i.TipoRegistro, CONVERT(NVARCHAR(30), i.FechaDeteccion, 126),
+            CONVERT(NVARCHAR(30), i.FechaOcurrencia, 126), i.Criticidad, i.AlcanceGeografico,
+            i.DescripcionInicial, i.AnciImpactoPreliminar, i.SistemasAfectados, i.ServiciosInterrumpidos,
+            i.OrigenIncidente, i.AnciTipoAmenaza, i.ResponsableCliente, i.AccionesInmediatas,
+            i.CausaRaiz, i.LeccionesAprendidas, i.PlanMejora
+        ) f
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING campos AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED AND c.CamposCompletos <> d.CamposCompletos THEN UPDATE SET
+        CamposCompletos = d.CamposCompletos,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, CamposCompletos, FechaReconciliacion)
+        VALUES (d.IncidenteID, d.CamposCompletos, CASE WHEN d.Nuevo = 1 THEN GETDATE() END);
+END
+GO
+
+-- ----------------------------------------
+-- INCIDENTES_ARCHIVOS (solo activos)
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_IncidentesArchivos_ContadoresIncidente
+ON INCIDENTES_ARCHIVOS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(IncidenteID) OR UPDATE(Activo))
+        RETURN;
+
+    ;WITH delta AS (
+        SELECT IncidenteID, SUM(Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted WHERE Activo = 1
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted WHERE Activo = 1
+        ) x
+        GROUP BY IncidenteID
+        HAVING SUM(Signo) <> 0
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED THEN UPDATE SET
+        Evidencias = c.Evidencias + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, Evidencias)
+        VALUES (d.IncidenteID, d.Total);
+END
+GO
+
+-- ----------------------------------------
+-- INCIDENTES_COMENTARIOS (solo activos)
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_IncidentesComentarios_ContadoresIncidente
+ON INCIDENTES_COMENTARIOS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(IncidenteID) OR UPDATE(Activo))
+        RETURN;
+
+    ;WITH delta AS (
+        SELECT IncidenteID, SUM(Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted WHERE Activo = 1
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted WHERE Activo = 1
+        ) x
+        GROUP BY IncidenteID
+        HAVING SUM(Signo) <> 0
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED THEN UPDATE SET
+        Comentarios = c.Comentarios + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, Comentarios)
+        VALUES (d.IncidenteID, d.Total);
+END
+GO
+
+-- ----------------------------------------
+-- Taxonomías del incidente, sus evidencias y sus comentarios
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_IncidenteTaxonomia_ContadoresIncidente
+ON INCIDENTE_TAXONOMIA
+AFTER INSERT, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    ;WITH delta AS (
+        SELECT IncidenteID, SUM(Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted
+        ) x
+        GROUP BY IncidenteID
+        HAVING SUM(Signo) <> 0
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED THEN UPDATE SET
+        Taxonomias = c.Taxonomias + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, Taxonomias)
+        VALUES (d.IncidenteID, d.Total);
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_EvidenciasTaxonomia_ContadoresIncidente
+ON EVIDENCIAS_TAXONOMIA
+AFTER INSERT, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    ;WITH delta AS (
+        SELECT IncidenteID, SUM(Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted
+        ) x
+        GROUP BY IncidenteID
+        HAVING SUM(Signo) <> 0
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED THEN UPDATE SET
+        EvidenciasTaxonomia = c.EvidenciasTaxonomia + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, EvidenciasTaxonomia)
+        VALUES (d.IncidenteID, d.Total);
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_ComentariosTaxonomia_ContadoresIncidente
+ON COMENTARIOS_TAXONOMIA
+AFTER INSERT, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    ;WITH delta AS (
+        SELECT IncidenteID, SUM(Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted
+        ) x
+        GROUP BY IncidenteID
+        HAVING SUM(Signo) <> 0
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED THEN UPDATE SET
+        ComentariosTaxonomia = c.ComentariosTaxonomia + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, ComentariosTaxonomia)
+        VALUES (d.IncidenteID, d.Total);
+END
+GO
+
+-- ----------------------------------------
+-- INCIDENTES_SECCIONES_DATOS (estado de cada sección del formulario)
+-- ----------------------------------------
+CREATE OR ALTER TRIGGER TR_IncidentesSeccionesDatos_ContadoresIncidente
+ON INCIDENTES_SECCIONES_DATOS
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(IncidenteID) OR UPDATE(EstadoSeccion))
+        RETURN;
+
+    ;WITH delta AS (
+        SELECT IncidenteID,
+            SUM(CASE WHEN EstadoSeccion <> 'VACIO' THEN Signo ELSE 0 END) AS ConDatos,
+            SUM(CASE WHEN EstadoSeccion = 'COMPLETO' THEN Signo ELSE 0 END) AS Completas
+        FROM (
+            SELECT IncidenteID, EstadoSeccion, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT IncidenteID, EstadoSeccion, -1 FROM deleted
+        ) x
+        GROUP BY IncidenteID
+    )
+    MERGE IncidenteContadores WITH (HOLDLOCK) AS c
+    USING (SELECT * FROM delta WHERE ConDatos <> 0 OR Completas <> 0) AS d ON c.IncidenteID = d.IncidenteID
+    WHEN MATCHED THEN UPDATE SET
+        SeccionesConDatos = c.SeccionesConDatos + d.ConDatos,
+        SeccionesCompletas = c.SeccionesCompletas + d.Completas,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (IncidenteID, SeccionesConDatos, SeccionesCompletas)
+        VALUES (d.IncidenteID, d.ConDatos, d.Completas);
+END
+GO
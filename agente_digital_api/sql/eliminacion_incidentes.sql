@@ -0,0 +1,174 @@
+-- ========================================
+-- ELIMINACIÓN DIFERIDA DE INCIDENTES
+-- ========================================
+-- Eliminar un incidente es un UPDATE de Incidentes.EliminadoEn (con OUTPUT
+-- hacia la cola IncidentesPurga) y la respuesta es inmediata. La tarea
+-- 'purga_incidentes' del planificador (app/modules/admin/eliminacion_incidentes.py)
+-- borra después, por lotes de incidentes y en orden de dependencias, todas
+-- las filas relacionadas, y encola los archivos físicos en ArchivosPurga.
+--
+-- Mientras no se purga (ventana de restauración, por defecto 72 horas) el
+-- incidente se puede restaurar. Las consultas que listan o muestran
+-- incidentes los excluyen con un predicado explícito EliminadoEn IS NULL
+-- (filtro_no_eliminados en app/modules/admin/eliminacion_incidentes.py).
+--
+-- Si se usan los contadores del dashboard, ejecutar después de
+-- contadores_dashboard_empresa.sql (y volver a ejecutar este script si
+-- aquél se reinstala): redefine sus triggers de Incidentes y
+-- EvidenciasIncidentes para no contar los incidentes eliminados.
+-- ========================================
+
+IF COL_LENGTH('Incidentes', 'EliminadoEn') IS NULL
+    ALTER TABLE Incidentes ADD EliminadoEn DATETIME NULL, EliminadoPor NVARCHAR(100) NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Incidentes_EliminadoEn')
+    CREATE INDEX IX_Incidentes_EliminadoEn ON Incidentes (EliminadoEn) WHERE EliminadoEn IS NOT NULL;
+GO
+
+-- Cola de purga: una fila por incidente eliminado (se llena con OUTPUT INTO
+-- desde el UPDATE de la eliminación, por eso no tiene FK ni triggers)
+IF OBJECT_ID('IncidentesPurga', 'U') IS NULL
+BEGIN
+    CREATE TABLE IncidentesPurga (
+        IncidenteID INT NOT NULL PRIMARY KEY,
+        EmpresaID INT NULL,
+        IDVisible NVARCHAR(200) NULL,
+        EliminadoEn DATETIME NOT NULL,
+        EliminadoPor NVARCHAR(100) NULL,
+        PurgarDesde DATETIME NOT NULL,
+        Estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',    -- pendiente | purgado
+        FechaPurga DATETIME NULL
+    );
+    CREATE INDEX IX_IncidentesPurga_Pendientes ON IncidentesPurga (PurgarDesde) WHERE Estado = 'pendiente';
+END
+GO
+
+-- Cola de archivos físicos por eliminar (se llena en la misma transacción
+-- que borra las filas; un archivo sale de la cola cuando ya no existe)
+IF OBJECT_ID('ArchivosPurga', 'U') IS NULL
+BEGIN
+    CREATE TABLE ArchivosPurga (
+        ArchivoPurgaID BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        RutaArchivo NVARCHAR(1000) NOT NULL,
+        Intentos INT NOT NULL DEFAULT 0,
+        UltimoError NVARCHAR(500) NULL,
+        FechaCreacion DATETIME NOT NULL DEFAULT GETDATE()
+    );
+END
+GO
+
+-- ----------------------------------------
+-- Contadores del dashboard (sql/contadores_dashboard_empresa.sql)
+-- ----------------------------------------
+-- Los eliminados dejan de contar al marcarse, vuelven a contar al
+-- restaurarse y no se restan de nuevo al purgarse. Sin la tabla de
+-- contadores instalada, los triggers se compilan pero no se crean.
+IF OBJECT_ID('EmpresaContadoresDashboard', 'U') IS NULL
+    SET NOEXEC ON;
+GO
+
+CREATE OR ALTER TRIGGER TR_Incidentes_ContadoresDashboard
+ON Incidentes
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- Updates que no tocan columnas contadas no generan delta
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(EmpresaID) OR UPDATE(EstadoActual) OR UPDATE(Criticidad) OR UPDATE(EliminadoEn))
+        RETURN;
+
+    ;WITH cambios AS (
+        SELECT EmpresaID, EstadoActual, Criticidad, 1 AS Signo FROM inserted WHERE EliminadoEn IS NULL
+        UNION ALL
+        SELECT EmpresaID, EstadoActual, Criticidad, -1 FROM deleted WHERE EliminadoEn IS NULL
+    ), delta AS (
+        SELECT
+            EmpresaID,
+            SUM(Signo) AS Total,
+            SUM(CASE WHEN EstadoActual = 'Abierto' THEN Signo ELSE 0 END) AS Abiertos,
+            SUM(CASE WHEN EstadoActual = 'Cerrado' THEN Signo ELSE 0 END) AS Cerrados,
+            SUM(CASE WHEN EstadoActual = 'Pendiente' THEN Signo ELSE 0 END) AS Pendientes,
+            SUM(CASE WHEN Criticidad = 'Alta' THEN Signo ELSE 0 END) AS CritAlta,
+            SUM(CASE WHEN Criticidad = 'Media' THEN Signo ELSE 0 END) AS CritMedia,
+            SUM(CASE WHEN Criticidad = 'Baja' THEN Signo ELSE 0 END) AS CritBaja,
+            SUM(CASE WHEN Criticidad = 'Alta' AND EstadoActual = 'Abierto' THEN Signo ELSE 0 END) AS CriticosAbiertos
+        FROM cambios
+        WHERE EmpresaID IS NOT NULL
+        GROUP BY EmpresaID
+    )
+    MERGE EmpresaContadoresDashboard WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED THEN UPDATE SET
+        IncidentesTotal = c.IncidentesTotal + d.Total,
+        IncidentesAbiertos = c.IncidentesAbiertos + d.Abiertos,
+        IncidentesCerrados = c.IncidentesCerrados + d.Cerrados,
+        IncidentesPendientes = c.IncidentesPendientes + d.Pendientes,
+        IncidentesCritAlta = c.IncidentesCritAlta + d.CritAlta,
+        IncidentesCritMedia = c.IncidentesCritMedia + d.CritMedia,
+        IncidentesCritBaja = c.IncidentesCritBaja + d.CritBaja,
+        IncidentesCriticosAbiertos = c.IncidentesCriticosAbiertos + d.CriticosAbiertos,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (
+        EmpresaID, IncidentesTotal, IncidentesAbiertos, IncidentesCerrados, IncidentesPendientes,
+        IncidentesCritAlta, IncidentesCritMedia, IncidentesCritBaja, IncidentesCriticosAbiertos
+    ) VALUES (
+        d.EmpresaID, d.Total, d.Abiertos, d.Cerrados, d.Pendientes,
+        d.CritAlta, d.CritMedia, d.CritBaja, d.CriticosAbiertos
+    );
+
+    -- Eliminar o restaurar un incidente también saca o repone sus evidencias
+    IF UPDATE(EliminadoEn)
+    BEGIN
+        ;WITH delta AS (
+            SELECT i.EmpresaID, SUM(CASE WHEN i.EliminadoEn IS NULL THEN 1 ELSE -1 END) AS Total
+            FROM inserted i
+            JOIN deleted d ON d.IncidenteID = i.IncidenteID
+            JOIN EvidenciasIncidentes e ON e.IncidenteID = i.IncidenteID
+            WHERE i.EmpresaID IS NOT NULL
+              AND ((i.EliminadoEn IS NULL AND d.EliminadoEn IS NOT NULL)
+                OR (i.EliminadoEn IS NOT NULL AND d.EliminadoEn IS NULL))
+            GROUP BY i.EmpresaID
+        )
+        UPDATE c SET
+            EvidenciasIncidentes = c.EvidenciasIncidentes + d.Total,
+            FechaActualizacion = GETDATE()
+        FROM EmpresaContadoresDashboard c
+        JOIN delta d ON d.EmpresaID = c.EmpresaID;
+    END
+END
+GO
+
+CREATE OR ALTER TRIGGER TR_EvidenciasIncidentes_ContadoresDashboard
+ON EvidenciasIncidentes
+AFTER INSERT, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    ;WITH delta AS (
+        SELECT i.EmpresaID, SUM(x.Signo) AS Total
+        FROM (
+            SELECT IncidenteID, 1 AS Signo FROM inserted
+            UNION ALL
+            SELECT IncidenteID, -1 FROM deleted
+        ) x
+        JOIN Incidentes i ON i.IncidenteID = x.IncidenteID
+        WHERE i.EliminadoEn IS NULL    -- ya descontadas al eliminar el incidente
+        GROUP BY i.EmpresaID
+    )
+    MERGE EmpresaContadoresDashboard WITH (HOLDLOCK) AS c
+    USING delta AS d ON c.EmpresaID = d.EmpresaID
+    WHEN MATCHED THEN UPDATE SET
+        EvidenciasIncidentes = c.EvidenciasIncidentes + d.Total,
+        FechaActualizacion = GETDATE()
+    WHEN NOT MATCHED THEN INSERT (EmpresaID, EvidenciasIncidentes)
+        VALUES (d.EmpresaID, d.Total);
+END
+GO
+
+SET NOEXEC OFF;
+GO
@@ -0,0 +1,44 @@
+-- ========================================
+-- MANIFIESTO DE ARCHIVOS POR INCIDENTE
+-- ========================================
+-- Una fila por archivo de incidente (sección o taxonomía, tamaño, hash,
+-- estado), registrada al subir el archivo o al guardar el formulario. El
+-- listado de archivos de un incidente es una consulta por índice, en vez de
+-- listar la carpeta de evidencias y leer temp_incidentes/<IDVisible>.json,
+-- y guardar el formulario ya no reescribe ese JSON completo.
+--
+-- Después de ejecutar este script, importar una sola vez lo existente en
+-- las carpetas de evidencias y los JSON temporales:
+--     python -m app.modules.admin.manifiesto_archivos --importar
+-- ========================================
+
+IF OBJECT_ID('ManifiestoArchivosIncidente', 'U') IS NULL
+BEGIN
+    CREATE TABLE ManifiestoArchivosIncidente (
+        ArchivoManifiestoID BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        IncidenteID INT NOT NULL,
+        Seccion NVARCHAR(20) NULL,                  -- sección del formulario ('2', '3'...)
+        TaxonomiaID NVARCHAR(50) NULL,              -- o taxonomía a la que pertenece
+        ClaveCliente NVARCHAR(100) NULL,            -- id que usa el formulario para el archivo
+        NombreArchivo NVARCHAR(255) NOT NULL,
+        RutaArchivo NVARCHAR(1000) NULL,
+        TamanoBytes BIGINT NULL,
+        TipoArchivo NVARCHAR(100) NULL,
+        HashSHA256 CHAR(64) NULL,
+        Descripcion NVARCHAR(1000) NULL,
+        Comentario NVARCHAR(MAX) NULL,
+        Estado VARCHAR(20) NOT NULL DEFAULT 'activo',    -- activo | eliminado
+        Origen VARCHAR(20) NOT NULL DEFAULT 'carga',     -- carga | formulario | importado_carpeta | importado_json
+        FechaCarga DATETIME NOT NULL DEFAULT GETDATE(),
+        FechaActualizacion DATETIME NOT NULL DEFAULT GETDATE(),
+        SubidoPor NVARCHAR(100) NULL
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ManifiestoArchivos_Incidente')
+    CREATE INDEX IX_ManifiestoArchivos_Incidente
+        ON ManifiestoArchivosIncidente (IncidenteID, Estado)
+        INCLUDE (Seccion, TaxonomiaID, ClaveCliente, NombreArchivo, RutaArchivo, TamanoBytes,
+                 TipoArchivo, HashSHA256, FechaCarga, Origen);
+GO
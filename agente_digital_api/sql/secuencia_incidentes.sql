@@ -0,0 +1,35 @@
+-- ========================================
+-- CORRELATIVOS DE IDVisible POR EMPRESA
+-- ========================================
+-- Una fila por empresa con el último correlativo asignado (primer segmento
+-- de IDVisible: CORRELATIVO_RUT_MODULO_SUBMODULO_DESCRIPCION).
+-- app/modules/admin/secuencia_incidentes.py lo incrementa con un
+-- UPDATE ... OUTPUT atómico, en vez de calcular MAX(IDVisible) sobre todos
+-- los incidentes de la empresa en cada creación.
+--
+-- Los correlativos nunca se reutilizan: eliminar un incidente no los
+-- devuelve, y un bloque reservado por un proceso que termina deja huecos.
+-- ========================================
+
+IF OBJECT_ID('EmpresaSecuenciaIncidentes', 'U') IS NULL
+BEGIN
+    CREATE TABLE EmpresaSecuenciaIncidentes (
+        EmpresaID INT NOT NULL PRIMARY KEY,
+        UltimoCorrelativo INT NOT NULL DEFAULT 0,
+        FechaActualizacion DATETIME NOT NULL DEFAULT GETDATE()
+    );
+END
+GO
+
+-- Inicializar con el mayor correlativo existente de cada empresa. Las
+-- empresas que no queden aquí se inicializan solas en su primera creación.
+INSERT INTO EmpresaSecuenciaIncidentes (EmpresaID, UltimoCorrelativo)
+SELECT e.EmpresaID,
+       ISNULL(MAX(TRY_CAST(LEFT(i.IDVisible, CHARINDEX('_', i.IDVisible + '_') - 1) AS INT)), 0)
+FROM Empresas e
+LEFT JOIN Incidentes i ON i.EmpresaID = e.EmpresaID
+WHERE NOT EXISTS (
+    SELECT 1 FROM EmpresaSecuenciaIncidentes s WHERE s.EmpresaID = e.EmpresaID
+)
+GROUP BY e.EmpresaID;
+GO
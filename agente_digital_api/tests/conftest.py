@@ -11,8 +11,21 @@ from unittest.mock import Mock, patch
 # Agregar el directorio raíz al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Sin el driver ODBC nativo (libodbc) pyodbc no importa: los módulos que lo
+# importan de paso usan el sustituto de dev_tools/sql_emulado.py
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    from dev_tools.sql_emulado import BaseEmulada, modulo_pyodbc
+    sys.modules['pyodbc'] = modulo_pyodbc(BaseEmulada(':memory:'))
+
 from app import create_app
-from config_testing import TestingConfig
+
+# config_testing es opcional: sin él la app usa la configuración por defecto
+try:
+    from config_testing import TestingConfig
+except ImportError:
+    TestingConfig = None
 
 @pytest.fixture(scope="session")
 def app():
@@ -67,6 +80,14 @@ def mock_db():
             'get_connection': mock_conn
         }
 
+@pytest.fixture(scope="function")
+def base_emulada(tmp_path):
+    """Base SQLite con la interfaz de pyodbc y las traducciones de T-SQL de dev_tools/sql_emulado.py"""
+    from dev_tools.sql_emulado import BaseEmulada
+    base = BaseEmulada(str(tmp_path / 'base.sqlite3'))
+    yield base
+    base.cerrar()
+
 @pytest.fixture(scope="function")
 def mock_redis():
     """Fixture de Redis mock"""
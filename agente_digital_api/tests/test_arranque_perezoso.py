@@ -0,0 +1,59 @@
+# tests/test_arranque_perezoso.py
+# Verifica que create_app() no importa dependencias pesadas que solo usan algunos endpoints
+
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que deben importarse en el primer uso y no al arrancar
+MODULOS_DIFERIDOS = [
+    'docx',                                   # informes ANCI completos
+    'app.modules.informes_anci_completo',
+    'requests',                               # consulta HIBP de contraseñas
+    'qrcode',                                 # código QR de MFA
+    'security.encryption_utils',              # Fernet (cryptography)
+]
+
+# Blueprints que importan pyodbc: si faltan, create_app() se saltó esos módulos
+# y la prueba no diría nada sobre ellos
+BLUEPRINTS_ESPERADOS = [
+    'admin_empresas', 'admin_incidentes', 'admin_tareas', 'auth',
+    'incidente_completo', 'informes_anci', 'informes_anci_completo', 'paquete_evidencias',
+]
+
+# Sin el driver ODBC nativo (libodbc) pyodbc no importa y create_app() omite
+# los blueprints que lo usan: se instala el sustituto de dev_tools/sql_emulado.py
+SCRIPT = """
+import contextlib, io, json, sys
+try:
+    import pyodbc
+except ImportError:
+    from dev_tools.sql_emulado import BaseEmulada, modulo_pyodbc
+    sys.modules['pyodbc'] = modulo_pyodbc(BaseEmulada(':memory:'))
+with contextlib.redirect_stdout(io.StringIO()):
+    from app import create_app
+    app = create_app()
+print(json.dumps({
+    'modulos': {m: m in sys.modules for m in %r},
+    'blueprints': sorted(app.blueprints),
+}))
+"""
+
+
+def test_create_app_no_importa_dependencias_pesadas():
+    """create_app() en un proceso limpio deja fuera de sys.modules los imports diferidos"""
+    resultado = subprocess.run(
+        [sys.executable, '-c', SCRIPT % MODULOS_DIFERIDOS],
+        cwd=RAIZ, capture_output=True, text=True, timeout=120
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    
+    salida = json.loads(resultado.stdout.strip().splitlines()[-1])
+    faltantes = [bp for bp in BLUEPRINTS_ESPERADOS if bp not in salida['blueprints']]
+    assert faltantes == [], f"Blueprints no registrados: {faltantes}"
+
+    importados = [modulo for modulo, presente in salida['modulos'].items() if presente]
+    assert importados == [], f"Importados al arrancar: {importados}"
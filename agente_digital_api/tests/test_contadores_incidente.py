@@ -0,0 +1,150 @@
+# tests/test_contadores_incidente.py
+# Contadores mantenidos por incidente (app/modules/admin/contadores_incidente.py)
+
+from datetime import datetime
+
+import pytest
+
+from app.modules.admin import contadores_incidente as contadores
+from app.modules.admin.contadores_incidente import COLUMNAS_CONTADORES
+
+CEROS = dict.fromkeys(COLUMNAS_CONTADORES, 0)
+
+
+class BaseContadores:
+    """IncidenteContadores y los valores que calcularía la reconciliación desde las tablas base"""
+
+    def __init__(self, instalada=True, triggers=len(contadores.TRIGGERS_CONTADORES)):
+        self.instalada = instalada
+        self.triggers = triggers
+        self.filas = {}       # {IncidenteID: {columna: valor, 'FechaReconciliacion': ...}}
+        self.esperados = {}   # {IncidenteID: {columna: valor}} (incidentes existentes)
+        self.reconciliaciones = []
+        self.commits = 0
+
+    def cursor(self):
+        return CursorContadores(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def reconciliar(self, ids):
+        """Filas de OUTPUT del MERGE: $action, IncidenteID, sin_inicializar, deleted.*, inserted.*"""
+        self.reconciliaciones.append(ids)
+        salida = []
+        for incidente_id in (ids if ids is not None else sorted(self.esperados)):
+            esperado = self.esperados.get(incidente_id)
+            if esperado is None:
+                continue
+            actual = self.filas.get(incidente_id)
+            valores = [esperado[c] for c in COLUMNAS_CONTADORES]
+            if actual is None:
+                salida.append(('INSERT', incidente_id, 1, *[None] * len(valores), *valores))
+            elif actual['FechaReconciliacion'] is None or any(actual[c] != esperado[c] for c in COLUMNAS_CONTADORES):
+                salida.append(('UPDATE', incidente_id, int(actual['FechaReconciliacion'] is None),
+                               *[actual[c] for c in COLUMNAS_CONTADORES], *valores))
+            else:
+                continue
+            self.filas[incidente_id] = {**esperado, 'FechaReconciliacion': datetime(2026, 3, 2)}
+        if ids is None:
+            for incidente_id in sorted(set(self.filas) - set(self.esperados)):
+                fila = self.filas.pop(incidente_id)
+                salida.append(('DELETE', incidente_id, 0, *[fila[c] for c in COLUMNAS_CONTADORES],
+                               *[None] * len(COLUMNAS_CONTADORES)))
+        return salida
+
+
+class CursorContadores:
+    def __init__(self, base):
+        self.base = base
+        self.description = None
+        self._filas = []
+
+    def execute(self, sql, parametros=()):
+        base = self.base
+        if sql == contadores.QUERY_DISPONIBILIDAD:
+            self._filas = [(int(base.instalada), base.triggers)]
+        elif sql == contadores.QUERY_RECONCILIAR:
+            ids = parametros[0]
+            self._filas = base.reconciliar(None if ids is None else [int(i) for i in ids.strip('[]').split(',')])
+        elif f"FROM {contadores.TABLA_CONTADORES}" in sql:
+            columnas = ['IncidenteID', *COLUMNAS_CONTADORES, 'FechaActualizacion', 'FechaReconciliacion']
+            self.description = [(c,) for c in columnas]
+            self._filas = [
+                (i, *[base.filas[i][c] for c in COLUMNAS_CONTADORES], None, base.filas[i]['FechaReconciliacion'])
+                for i in parametros if i in base.filas
+            ]
+        else:
+            raise AssertionError(f"Consulta inesperada: {sql}")
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return list(self._filas)
+
+
+@pytest.fixture(autouse=True)
+def sin_cache_disponibilidad(monkeypatch):
+    monkeypatch.setitem(contadores._disponibilidad, 'valor', None)
+
+
+def test_calcular_completitud():
+    total = len(contadores.CAMPOS_COMPLETITUD) + contadores.PUNTOS_EXTRA
+    assert contadores.calcular_completitud(0, 0, 0, 0) == 0
+    assert contadores.calcular_completitud(len(contadores.CAMPOS_COMPLETITUD), 1, 3, 2) == 100
+    assert contadores.calcular_completitud(10, 5, 0, 1) == int(13 / total * 100)
+    assert contadores.calcular_completitud(50, 1, 1, 1) == 100  # nunca sobre 100
+
+
+def test_estadisticas_suman_incidente_y_taxonomias():
+    fila = {**CEROS, 'Evidencias': 2, 'EvidenciasTaxonomia': 3, 'ComentariosTaxonomia': 1,
+            'Taxonomias': 2, 'SeccionesConDatos': 4, 'SeccionesCompletas': 1, 'CamposCompletos': 17}
+    assert contadores.estadisticas_desde_contadores(fila) == {
+        'TotalEvidencias': 5, 'TotalComentarios': 1, 'TaxonomiasSeleccionadas': 2,
+        'SeccionesConDatos': 4, 'SeccionesCompletas': 1, 'Completitud': 100,
+    }
+
+
+@pytest.mark.parametrize('opciones', [{'instalada': False}, {'triggers': 3}])
+def test_sin_tabla_o_triggers_usa_consultas_agregadas(opciones):
+    base = BaseContadores(**opciones)
+    assert contadores.obtener_contadores_incidentes(base, [1]) is None
+    assert contadores.obtener_estadisticas_incidentes(base, [1]) is None
+
+
+def test_incidentes_sin_inicializar_se_reconcilian_una_vez():
+    base = BaseContadores()
+    base.esperados = {1: {**CEROS, 'Evidencias': 2}, 2: {**CEROS, 'Taxonomias': 1}, 3: dict(CEROS)}
+    base.filas[3] = {**CEROS, 'FechaReconciliacion': datetime(2026, 3, 1)}
+
+    filas = contadores.obtener_contadores_incidentes(base, [1, '2', 3, 1, 99])
+    assert sorted(filas) == [1, 2, 3]  # 99 no existe
+    assert filas[1]['Evidencias'] == 2 and filas[2]['Taxonomias'] == 1
+    assert base.reconciliaciones == [[1, 2, 99]] and base.commits == 1
+
+    # Ya inicializados: solo la lectura por clave
+    contadores.obtener_contadores_incidentes(base, [1, 2, 3])
+    assert len(base.reconciliaciones) == 1 and base.commits == 1
+
+
+def test_reconciliar_reporta_desvios_por_columna():
+    base = BaseContadores()
+    base.esperados = {1: {**CEROS, 'Evidencias': 3, 'Comentarios': 1}, 2: dict(CEROS),
+                      3: dict(CEROS), 4: {**CEROS, 'Evidencias': 1}}
+    base.filas = {
+        1: {**CEROS, 'Evidencias': 5, 'FechaReconciliacion': datetime(2026, 3, 1)},   # desvío
+        2: {**CEROS, 'FechaReconciliacion': None},                                     # creada por trigger
+        3: {**CEROS, 'FechaReconciliacion': datetime(2026, 3, 1)},                     # correcta
+        8: {**CEROS, 'FechaReconciliacion': datetime(2026, 3, 1)},                     # incidente borrado
+    }
+
+    resumen = contadores.reconciliar_contadores_incidente(base.cursor())
+    assert resumen['inicializados'] == 2  # 4 (INSERT) y 2 (UPDATE sin inicializar)
+    assert resumen['corregidos'] == [1]
+    assert resumen['desvios'] == {
+        'Evidencias': {'incidentes': 1, 'diferencia_total': 2},
+        'Comentarios': {'incidentes': 1, 'diferencia_total': 1},
+    }
+    assert resumen['eliminados'] == 1
+    assert sorted(base.filas) == [1, 2, 3, 4]
@@ -0,0 +1,115 @@
+# tests/test_csrf_firmado.py
+# Tokens CSRF firmados sin estado entre workers (security/csrf_protection.py)
+
+import importlib.util
+import os
+import time
+
+import pytest
+from flask import Flask, session
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = 'clave-de-prueba-csrf'
+CLAVE_ANTERIOR = b'clave-csrf-version-1'
+CLAVE_NUEVA = b'clave-csrf-version-2'
+
+# Solo el módulo CSRF: el paquete security importa todos sus componentes (redis, etc.)
+_spec = importlib.util.spec_from_file_location('csrf_protection', os.path.join(RAIZ, 'security', 'csrf_protection.py'))
+csrf_protection = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(csrf_protection)
+
+
+def crear_worker(claves):
+    """App Flask con su propia instancia de CSRFProtection, como cada worker tras el fork"""
+    app = Flask('test_csrf')
+    app.secret_key = SECRET_KEY
+    app.logger.setLevel('ERROR')  # los rechazos esperados registran CSRF_FAILURE
+    csrf = csrf_protection.CSRFProtection()
+    csrf.configurar_claves(claves)
+    csrf.init_app(app)
+
+    @app.route('/formulario')
+    def formulario():
+        return csrf.generate_csrf_token()
+
+    @app.route('/accion', methods=['POST'])
+    def accion():
+        return 'ok'
+
+    return app, csrf
+
+
+def emitir(app):
+    """(cookie de sesión, token) de un GET al formulario con una sesión nueva"""
+    respuesta = app.test_client(use_cookies=False).get('/formulario')
+    cookie = respuesta.headers['Set-Cookie'].split(';', 1)[0]
+    return cookie, respuesta.get_data(as_text=True)
+
+
+def aceptado(app, cookie, token):
+    respuesta = app.test_client(use_cookies=False).post('/accion', headers={
+        'Cookie': cookie, 'X-CSRF-Token': token, 'Origin': 'http://localhost'})
+    return respuesta.status_code == 200
+
+
+def alterar(token):
+    version, expira, firma = token.split('.')
+    return f"{version}.{expira}.{firma[:-1]}{'A' if firma[-1] != 'A' else 'B'}"
+
+
+@pytest.fixture
+def workers():
+    return [crear_worker({1: CLAVE_ANTERIOR}) for _ in range(3)]
+
+
+def test_token_de_un_worker_valida_en_otro(workers):
+    """Sin caché por proceso: cualquier worker con las mismas claves valida el token"""
+    for emisor, _ in workers:
+        cookie, token = emitir(emisor)
+        for validador, _ in workers:
+            assert aceptado(validador, cookie, token)
+
+
+def test_token_de_otra_sesion_rechazado(workers):
+    (app_a, _), (app_b, _) = workers[:2]
+    cookie_a, token_a = emitir(app_a)
+    cookie_b, _ = emitir(app_b)
+    assert not aceptado(app_b, cookie_b, token_a)
+    assert aceptado(app_b, cookie_a, token_a)
+
+
+def test_token_alterado_rechazado(workers):
+    (app_a, _), (app_b, _) = workers[:2]
+    cookie, token = emitir(app_a)
+    assert not aceptado(app_b, cookie, alterar(token))
+    # Cambiar la expiración también invalida la firma
+    version, expira, firma = token.split('.')
+    assert not aceptado(app_b, cookie, f"{version}.{int(expira) + 3600}.{firma}")
+    assert not aceptado(app_b, cookie, 'token-sin-formato')
+
+
+def test_token_expirado_rechazado(workers):
+    app, csrf = workers[0]
+    with app.test_request_context('/', headers={'Origin': 'http://localhost'}):
+        session['csrf_sid'] = 'sesion-expirada'
+        assert not csrf.validate_token(csrf.firmar_token('sesion-expirada', int(time.time()) - 1))
+        assert csrf.validate_token(csrf.firmar_token('sesion-expirada'))
+
+
+def test_rotacion_acepta_clave_anterior(workers):
+    """Con "2:nueva,1:anterior" los tokens de la versión 1 siguen valiendo hasta retirarla"""
+    app_viejo, _ = workers[0]
+    cookie_anterior, token_anterior = emitir(app_viejo)
+    assert token_anterior.startswith('1.')
+
+    app_nuevo, csrf_nuevo = crear_worker({2: CLAVE_NUEVA, 1: CLAVE_ANTERIOR})
+    cookie_nuevo, token_nuevo = emitir(app_nuevo)
+    assert token_nuevo.startswith('2.')
+    assert aceptado(app_nuevo, cookie_anterior, token_anterior)
+    assert aceptado(app_nuevo, cookie_nuevo, token_nuevo)
+
+    # Retiro de la versión 1
+    csrf_nuevo.configurar_claves({2: CLAVE_NUEVA})
+    assert not aceptado(app_nuevo, cookie_anterior, token_anterior)
+    assert aceptado(app_nuevo, cookie_nuevo, token_nuevo)
+    assert csrf_nuevo.stats['version_desconocida'] == 1
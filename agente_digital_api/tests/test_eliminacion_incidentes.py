@@ -0,0 +1,159 @@
+# tests/test_eliminacion_incidentes.py
+# Soft-delete de incidentes: filtro en las lecturas, alcance y restauración
+# (app/modules/admin/eliminacion_incidentes.py)
+
+import pytest
+
+from app.modules.admin import eliminacion_incidentes as eliminacion
+from app.modules.admin import paquete_evidencias
+
+TABLAS = (
+    """CREATE TABLE Incidentes (
+        IncidenteID INT IDENTITY(1,1) PRIMARY KEY, EmpresaID INT, IDVisible NVARCHAR(100),
+        EliminadoEn DATETIME NULL, EliminadoPor NVARCHAR(100) NULL)""",
+    "CREATE TABLE Empresas (EmpresaID INT PRIMARY KEY, InquilinoID INT)",
+    "CREATE TABLE Usuarios (UsuarioID INT PRIMARY KEY, InquilinoID INT NULL)",
+    """CREATE TABLE IncidentesPurga (
+        IncidenteID INT PRIMARY KEY, EmpresaID INT, IDVisible NVARCHAR(100), EliminadoEn DATETIME,
+        EliminadoPor NVARCHAR(100), PurgarDesde DATETIME, Estado VARCHAR(20), FechaPurga DATETIME NULL)""",
+    """CREATE TABLE EvidenciasIncidentes (
+        EvidenciaID INT IDENTITY(1,1) PRIMARY KEY, IncidenteID INT, NombreArchivo NVARCHAR(255),
+        RutaArchivo NVARCHAR(1000), FechaSubida DATETIME DEFAULT GETDATE())""",
+)
+
+
+@pytest.fixture(autouse=True)
+def sin_cache_columna(monkeypatch):
+    """Cada prueba vuelve a verificar si existe Incidentes.EliminadoEn"""
+    monkeypatch.setitem(eliminacion._columna_eliminado, 'valor', None)
+
+
+@pytest.fixture
+def cursor(base_emulada):
+    """Dos inquilinos: empresas 1 y 2 del inquilino 10, empresa 3 del inquilino 20"""
+    for sentencia in TABLAS:
+        base_emulada.ejecutar_script(sentencia)
+    base_emulada.cargar('Empresas', ['EmpresaID', 'InquilinoID'], [(1, 10), (2, 10), (3, 20)])
+    base_emulada.cargar('Usuarios', ['UsuarioID', 'InquilinoID'], [(1, None), (2, 10)])
+    base_emulada.cargar('Incidentes', ['EmpresaID', 'IDVisible', 'EliminadoEn'], [
+        (1, '1_vigente', None),
+        (1, '2_eliminado', '2026-01-01 10:00:00'),
+        (3, '1_otro_inquilino', '2026-01-01 10:00:00'),
+    ])
+    base_emulada.cargar('IncidentesPurga', ['IncidenteID', 'EmpresaID', 'IDVisible', 'Estado'], [
+        (2, 1, '2_eliminado', 'pendiente'),
+        (3, 3, '1_otro_inquilino', 'pendiente'),
+        (9, 2, '9_purgado', 'purgado'),
+    ])
+    conexion = base_emulada.conectar()
+    yield conexion.cursor()
+    conexion.close()
+
+
+class CursorRegistro:
+    """Registra las sentencias y responde rowcount/fetchone fijos"""
+
+    def __init__(self, rowcount=1, fila=None):
+        self.sentencias = []
+        self.rowcount = rowcount
+        self.fila = fila
+
+    def execute(self, sql, parametros=()):
+        self.sentencias.append((sql, tuple(parametros)))
+
+    def fetchone(self):
+        return self.fila
+
+
+def test_filtro_excluye_incidentes_eliminados(cursor):
+    cursor.execute(
+        f"SELECT IDVisible FROM Incidentes i WHERE i.EmpresaID = ? AND {eliminacion.filtro_no_eliminados(cursor, 'i')}",
+        (1,)
+    )
+    assert [fila[0] for fila in cursor.fetchall()] == ['1_vigente']
+    assert eliminacion.filtro_no_eliminados(cursor) == "EliminadoEn IS NULL"
+
+
+def test_filtro_sin_columna_no_filtra(base_emulada):
+    base_emulada.ejecutar_script("CREATE TABLE Incidentes (IncidenteID INT PRIMARY KEY, EmpresaID INT)")
+    cursor = base_emulada.conectar().cursor()
+    assert eliminacion.filtro_no_eliminados(cursor, 'i') == '1 = 1'
+
+
+def test_filtro_verifica_la_columna_una_vez_por_ttl():
+    consultas = []
+
+    def contar():
+        consultas.append(1)
+        return 1
+
+    for _ in range(5):
+        assert eliminacion.filtro_no_eliminados_con(contar, 'x') == 'x.EliminadoEn IS NULL'
+    assert len(consultas) == 1
+
+
+def test_filtro_con_error_no_corta_la_consulta():
+    def contar():
+        raise RuntimeError('sin permisos sobre INFORMATION_SCHEMA')
+
+    assert eliminacion.filtro_no_eliminados_con(contar) == '1 = 1'
+
+
+def test_paquete_de_incidente_eliminado_no_existe(cursor):
+    assert paquete_evidencias.paquete_incidente(cursor, 2) is None
+    assert paquete_evidencias.paquete_incidente(cursor, 1) is not None
+
+
+def test_paquete_de_empresa_omite_evidencias_de_eliminados(cursor, tmp_path):
+    rutas = {}
+    for incidente_id in (1, 2):
+        ruta = tmp_path / f"evidencia_{incidente_id}.pdf"
+        ruta.write_bytes(b'%PDF')
+        rutas[incidente_id] = str(ruta)
+    cursor.executemany(
+        "INSERT INTO EvidenciasIncidentes (IncidenteID, NombreArchivo, RutaArchivo) VALUES (?, ?, ?)",
+        [(i, f"evidencia_{i}.pdf", ruta) for i, ruta in rutas.items()]
+    )
+    paquete = paquete_evidencias.paquete_empresa(cursor, 1)
+    assert [entrada.ruta for entrada in paquete.entradas] == [rutas[1]]
+
+
+@pytest.mark.parametrize('rol, usuario_id, esperado', [
+    ('Administrador', 1, (True, None)),   # usuario de plataforma: todos los inquilinos
+    ('Superusuario', 2, (True, 10)),      # limitado a su inquilino
+    ('Usuario', 1, (False, None)),        # rol sin permiso
+    ('admin', 99, (False, None)),         # usuario inexistente
+])
+def test_alcance_usuario(cursor, rol, usuario_id, esperado):
+    assert eliminacion.alcance_usuario(cursor, usuario_id, rol) == esperado
+
+
+def test_listar_eliminados_limitado_al_inquilino(cursor):
+    todos = eliminacion.listar_eliminados(cursor)
+    assert sorted(f['IncidenteID'] for f in todos) == [2, 3]
+
+    propios = eliminacion.listar_eliminados(cursor, inquilino_id=10)
+    assert [f['IncidenteID'] for f in propios] == [2]
+
+    con_purgados = eliminacion.listar_eliminados(cursor, incluir_purgados=True, inquilino_id=10)
+    assert sorted(f['IncidenteID'] for f in con_purgados) == [2, 9]
+
+
+def test_restaurar_con_inquilino_filtra_por_sus_empresas():
+    cursor = CursorRegistro(rowcount=1)
+    assert eliminacion.restaurar_incidente(cursor, 5, inquilino_id=10)
+
+    (update, parametros), (delete, _) = cursor.sentencias
+    assert 'InquilinoID = ?' in update and 'i.EmpresaID IN' in update
+    assert parametros == (5, 10)
+    assert delete.startswith(f"DELETE FROM {eliminacion.TABLA_COLA}")
+
+
+def test_restaurar_de_otro_inquilino_no_cambia_nada():
+    cursor = CursorRegistro(rowcount=0)
+    assert not eliminacion.restaurar_incidente(cursor, 5, inquilino_id=10)
+    assert len(cursor.sentencias) == 1  # sin DELETE de la cola
+
+    cursor = CursorRegistro(rowcount=1)
+    eliminacion.restaurar_incidente(cursor, 5)
+    assert cursor.sentencias[0][1] == (5,) and '1 = 1' in cursor.sentencias[0][0]
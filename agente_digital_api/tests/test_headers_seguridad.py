@@ -0,0 +1,72 @@
+# tests/test_headers_seguridad.py
+# Los headers de seguridad no deben crecer con las respuestas (security/headers_security.py)
+
+import importlib.util
+import json
+import os
+
+import pytest
+from flask import Flask
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Solo el módulo de headers: el paquete security importa todos sus componentes (redis, etc.)
+_spec = importlib.util.spec_from_file_location(
+    'headers_security', os.path.join(RAIZ, 'security', 'headers_security.py'))
+headers_security = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(headers_security)
+
+PETICIONES = 100000
+
+# Clase de ruta -> (ruta, genera nonce)
+RUTAS = {
+    'api': ('/api/incidentes', False),
+    'admin': ('/admin/panel', True),
+    'static': ('/static/app.js', False),
+    'general': ('/', True),
+}
+
+
+def tamano_headers(response):
+    return sum(len(nombre) + len(valor) for nombre, valor in response.headers.items())
+
+
+@pytest.fixture
+def app_headers():
+    app = Flask('test_headers', static_folder=None)
+    headers = headers_security.SecurityHeaders()
+    headers.init_app(app)
+
+    def crear_vista(con_nonce):
+        def vista():
+            if con_nonce:
+                headers.generate_nonce()
+            return 'ok'
+        return vista
+
+    for clase, (ruta, con_nonce) in RUTAS.items():
+        app.add_url_rule(ruta, clase, crear_vista(con_nonce))
+    return app, headers
+
+
+def test_tamano_headers_constante_despues_de_100k_peticiones(app_headers):
+    """Cada clase de ruta responde con headers del mismo tamaño y default_csp no cambia"""
+    app, headers = app_headers
+    csp_original = json.dumps(headers.default_csp)
+    client = app.test_client()
+    origen = {'Origin': 'https://cliente.example.cl'}
+
+    for clase, (ruta, con_nonce) in RUTAS.items():
+        primera = client.get(ruta, headers=origen)
+        assert primera.status_code == 200
+        csp = primera.headers.get('Content-Security-Policy', '')
+        assert headers_security.MARCA_NONCE not in csp
+        if con_nonce:
+            assert "'nonce-" in csp, f"{clase}: nonce ausente en la CSP"
+
+        tamano = tamano_headers(primera)
+        for _ in range(PETICIONES // len(RUTAS) - 1):
+            response = client.get(ruta, headers=origen)
+            assert tamano_headers(response) == tamano, f"{clase}: los headers cambiaron de tamaño"
+
+    assert json.dumps(headers.default_csp) == csp_original
@@ -0,0 +1,138 @@
+# tests/test_manifiesto_archivos.py
+# Manifiesto de archivos por incidente (app/modules/admin/manifiesto_archivos.py)
+
+import hashlib
+
+import pytest
+
+from app.modules.admin import manifiesto_archivos as manifiesto
+from app.modules.incidentes import gestor_evidencias
+
+# sql/manifiesto_archivos_incidente.sql sin el bloque IF ni el índice con INCLUDE
+TABLA_MANIFIESTO = """CREATE TABLE ManifiestoArchivosIncidente (
+    ArchivoManifiestoID BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY, IncidenteID INT NOT NULL,
+    Seccion NVARCHAR(20) NULL, TaxonomiaID NVARCHAR(50) NULL, ClaveCliente NVARCHAR(100) NULL,
+    NombreArchivo NVARCHAR(255) NOT NULL, RutaArchivo NVARCHAR(1000) NULL, TamanoBytes BIGINT NULL,
+    TipoArchivo NVARCHAR(100) NULL, HashSHA256 CHAR(64) NULL, Descripcion NVARCHAR(1000) NULL,
+    Comentario NVARCHAR(MAX) NULL, Estado VARCHAR(20) NOT NULL DEFAULT 'activo',
+    Origen VARCHAR(20) NOT NULL DEFAULT 'carga', FechaCarga DATETIME NOT NULL DEFAULT GETDATE(),
+    FechaActualizacion DATETIME NOT NULL DEFAULT GETDATE(), SubidoPor NVARCHAR(100) NULL)"""
+
+TABLA_EVIDENCIAS = """CREATE TABLE EvidenciasIncidentes (
+    EvidenciaID INT IDENTITY(1,1) PRIMARY KEY, IncidenteID INT, NombreArchivo NVARCHAR(255),
+    RutaArchivo NVARCHAR(1000), Descripcion NVARCHAR(1000), Seccion NVARCHAR(20), FechaSubida DATETIME,
+    SubidoPor NVARCHAR(100), Version INT, HashMD5 NVARCHAR(32), TamanoKB FLOAT, TipoArchivo NVARCHAR(100),
+    Estado VARCHAR(20))"""
+
+
+@pytest.fixture(autouse=True)
+def sin_cache_disponibilidad(monkeypatch):
+    """Cada prueba vuelve a verificar si la tabla del manifiesto existe"""
+    monkeypatch.setitem(manifiesto._disponibilidad, 'valor', None)
+
+
+@pytest.fixture
+def cursor(base_emulada):
+    base_emulada.ejecutar_script(TABLA_MANIFIESTO)
+    conexion = base_emulada.conectar()
+    yield conexion.cursor()
+    conexion.close()
+
+
+@pytest.fixture
+def evidencia(tmp_path):
+    ruta = tmp_path / '15_3_1_20260301.pdf'
+    ruta.write_bytes(b'%PDF-1.4 evidencia')
+    return ruta
+
+
+def activos(cursor, incidente_id):
+    return manifiesto._leer_activos(cursor, incidente_id)
+
+
+def test_sin_tabla_no_registra(base_emulada, evidencia):
+    cursor = base_emulada.conectar().cursor()
+    assert manifiesto.registrar_si_disponible(cursor, 15, str(evidencia), seccion='3') is None
+    # Sin incidente o sin ruta tampoco consulta la base
+    assert manifiesto.registrar_si_disponible(None, None, str(evidencia)) is None
+    assert manifiesto.registrar_si_disponible(None, 15, '') is None
+
+
+def test_registrar_con_tamano_hash_y_nombre_original(cursor, evidencia):
+    archivo_id = manifiesto.registrar_si_disponible(
+        cursor, 15, str(evidencia), seccion='3', nombre='informe.pdf', subido_por='7')
+    assert archivo_id
+
+    (fila,) = activos(cursor, 15)
+    assert fila['ArchivoManifiestoID'] == archivo_id
+    assert fila['NombreArchivo'] == 'informe.pdf'
+    assert fila['TamanoBytes'] == evidencia.stat().st_size
+    assert fila['HashSHA256'] == hashlib.sha256(evidencia.read_bytes()).hexdigest()
+    assert (fila['Seccion'], fila['TipoArchivo'], fila['Origen']) == ('3', 'pdf', 'carga')
+
+
+def test_error_al_registrar_no_corta_la_carga(cursor, evidencia, monkeypatch):
+    def fallar(*args, **kwargs):
+        raise RuntimeError('columna inexistente')
+
+    monkeypatch.setattr(manifiesto, 'registrar_archivo', fallar)
+    assert manifiesto.registrar_si_disponible(cursor, 15, str(evidencia)) is None
+
+
+def test_listar_agrupa_por_seccion_y_taxonomia(cursor, evidencia):
+    manifiesto.registrar_archivo(cursor, 15, str(evidencia), seccion='2')
+    manifiesto.registrar_archivo(cursor, 15, str(evidencia), seccion='3', descripcion='log')
+    manifiesto.registrar_archivo(cursor, 15, str(evidencia), taxonomia_id='TAX-1')
+    manifiesto.registrar_archivo(cursor, 16, str(evidencia), seccion='2')
+
+    por_seccion, por_taxonomia = manifiesto.listar_archivos(cursor, 15)
+    assert sorted(por_seccion) == ['2', '3'] and list(por_taxonomia) == ['TAX-1']
+    archivo = por_seccion['3'][0]
+    assert archivo['descripcion'] == 'log' and archivo['existente']
+    assert archivo['id'] == f"15_3_m{archivo['manifiesto_id']}"
+
+
+def test_sincronizar_formulario_aplica_solo_diferencias(cursor, evidencia):
+    subido = manifiesto.registrar_archivo(cursor, 15, str(evidencia), seccion='2')
+    archivos = manifiesto.archivos_del_formulario(
+        {'seccion_2': [{'id': 'a1', 'nombre': 'a.pdf', 'descripcion': 'uno'},
+                       {'id': 'a2', 'nombre': 'b.pdf'}]},
+        [{'id': 7, 'archivos': [{'id': 't1', 'nombre': 't.pdf'}]}],
+    )
+    assert manifiesto.sincronizar_formulario(cursor, 15, archivos) == {
+        'insertados': 3, 'actualizados': 0, 'eliminados': 0}
+
+    # Mismo guardado: nada que escribir
+    assert manifiesto.sincronizar_formulario(cursor, 15, archivos) == {
+        'insertados': 0, 'actualizados': 0, 'eliminados': 0}
+
+    # Cambia una descripción y se quita b.pdf del formulario
+    archivos[0]['descripcion'] = 'dos'
+    resumen = manifiesto.sincronizar_formulario(cursor, 15, [archivos[0], archivos[2]])
+    assert resumen == {'insertados': 0, 'actualizados': 1, 'eliminados': 1}
+
+    filas = {f['NombreArchivo']: f for f in activos(cursor, 15)}
+    assert sorted(filas) == ['15_3_1_20260301.pdf', 'a.pdf', 't.pdf']
+    assert filas['a.pdf']['Descripcion'] == 'dos'
+    assert filas['t.pdf']['TaxonomiaID'] == '7'
+    # Los archivos subidos solo salen con archivos_eliminados
+    assert filas['15_3_1_20260301.pdf']['ArchivoManifiestoID'] == subido
+
+
+def test_gestor_evidencias_registra_la_seccion_del_formulario(base_emulada, evidencia, tmp_path, monkeypatch):
+    base_emulada.ejecutar_script(TABLA_MANIFIESTO)
+    base_emulada.ejecutar_script(TABLA_EVIDENCIAS)
+    monkeypatch.setattr(gestor_evidencias, 'get_db_connection', base_emulada.conectar)
+    monkeypatch.setattr(gestor_evidencias.GestorEvidencias, 'RUTA_EVIDENCIAS', str(tmp_path / 'evidencias'))
+    monkeypatch.setattr(gestor_evidencias.GestorEvidencias, 'RUTA_TEMPORAL', str(tmp_path / 'temp'))
+
+    resultado = gestor_evidencias.GestorEvidencias().guardar_evidencia_bd(15, {
+        'nombre': evidencia.name, 'nombre_original': 'captura.pdf', 'ruta': str(evidencia),
+        'seccion': '3.4', 'hash_md5': '0' * 32, 'tamano_kb': 1, 'tipo_mime': 'application/pdf',
+        'extension': '.pdf', 'subido_por': '7',
+    })
+    assert resultado['exito'], resultado
+
+    cursor = base_emulada.conectar().cursor()
+    (fila,) = activos(cursor, 15)
+    assert (fila['Seccion'], fila['NombreArchivo'], fila['TipoArchivo']) == ('3', 'captura.pdf', 'pdf')
@@ -0,0 +1,142 @@
+# tests/test_planificador_tareas.py
+# Expresiones cron y elección de líder del planificador (app/planificador_tareas.py)
+
+import time
+from datetime import datetime
+
+import pytest
+
+from app import planificador_tareas as planificador
+from app.planificador_tareas import ExpresionCron, PlanificadorTareas
+
+requiere_flock = pytest.mark.skipif(planificador.fcntl is None, reason='sin flock (Windows)')
+
+
+@pytest.fixture(autouse=True)
+def directorio_tareas(tmp_path, monkeypatch):
+    """Estado y locks de las tareas en un directorio propio de cada prueba"""
+    monkeypatch.setattr(planificador, 'DIRECTORIO_TAREAS', str(tmp_path))
+    return tmp_path
+
+
+# ----------------------------------------------------------------------
+# Expresiones cron
+# ----------------------------------------------------------------------
+
+def test_cron_campos_con_pasos_rangos_y_listas():
+    cron = ExpresionCron('*/15 8-10,22 * * *')
+    assert cron.minutos == {0, 15, 30, 45}
+    assert cron.horas == {8, 9, 10, 22}
+    assert cron.coincide(datetime(2026, 3, 2, 9, 45))
+    assert not cron.coincide(datetime(2026, 3, 2, 9, 46))
+    assert not cron.coincide(datetime(2026, 3, 2, 11, 0))
+
+    # Valor con paso: desde el valor hasta el máximo del campo
+    assert ExpresionCron('5/20 * * * *').minutos == {5, 25, 45}
+
+
+def test_cron_domingo_como_0_y_7():
+    # 2026-03-01 es domingo
+    assert ExpresionCron('0 3 * * 0').coincide(datetime(2026, 3, 1, 3, 0))
+    assert ExpresionCron('0 3 * * 7').coincide(datetime(2026, 3, 1, 3, 0))
+    assert not ExpresionCron('0 3 * * 1-5').coincide(datetime(2026, 3, 1, 3, 0))
+
+
+def test_cron_dia_del_mes_o_de_la_semana():
+    """Como cron: con ambos campos restringidos basta que coincida uno"""
+    cron = ExpresionCron('0 0 1 * 1')
+    assert cron.coincide(datetime(2026, 4, 1, 0, 0))    # día 1, miércoles
+    assert cron.coincide(datetime(2026, 4, 6, 0, 0))    # lunes
+    assert not cron.coincide(datetime(2026, 4, 7, 0, 0))
+
+
+def test_cron_siguiente_ejecucion():
+    assert ExpresionCron('30 2 * * *').siguiente(datetime(2026, 3, 2, 2, 30, 10)) == datetime(2026, 3, 3, 2, 30)
+    assert ExpresionCron('0 0 29 2 *').siguiente(datetime(2026, 1, 1)) == datetime(2028, 2, 29, 0, 0)
+    assert ExpresionCron('*/5 * * * *').siguiente(datetime(2026, 12, 31, 23, 58)) == datetime(2027, 1, 1, 0, 0)
+
+
+@pytest.mark.parametrize('expresion', [
+    '* * * *',          # faltan campos
+    '60 * * * *',       # minuto fuera de rango
+    '* 5-2 * * *',      # rango invertido
+    '* * 0 * *',        # día 0
+    '*/0 * * * *',      # paso 0
+    'a * * * *',
+])
+def test_cron_invalida(expresion):
+    with pytest.raises(ValueError):
+        ExpresionCron(expresion)
+
+
+# ----------------------------------------------------------------------
+# Elección de líder
+# ----------------------------------------------------------------------
+
+def crear_planificador(ejecuciones, **opciones):
+    p = PlanificadorTareas()
+
+    def tarea(ctx):
+        ejecuciones.append(ctx.checkpoint)
+        return {'ok': True}
+
+    p.registrar('limpieza', tarea, '* * * * *', **opciones)
+    return p
+
+
+@requiere_flock
+def test_otro_worker_con_el_lock_omite_la_tarea(directorio_tareas):
+    fcntl = planificador.fcntl
+    ejecuciones = []
+    p = crear_planificador(ejecuciones)
+
+    # Otro proceso del nodo tiene el flock del archivo de la tarea
+    with open(directorio_tareas / 'limpieza.lock', 'a') as otro_worker:
+        fcntl.flock(otro_worker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        resultado = p.ejecutar('limpieza')
+        fcntl.flock(otro_worker, fcntl.LOCK_UN)
+
+    assert resultado['estado'] == 'omitida'
+    assert ejecuciones == [] and p.stats['omitidas_bloqueo'] == 1
+    assert p.ejecutar('limpieza')['estado'] == 'completada'
+    assert len(ejecuciones) == 1
+
+
+def test_slot_procesado_por_otro_worker_no_se_repite():
+    ejecuciones = []
+    slot = datetime(2026, 3, 2, 4, 0)
+    primero = crear_planificador(ejecuciones)
+    segundo = crear_planificador(ejecuciones)  # otro worker: comparte el estado en disco
+
+    assert primero.ejecutar('limpieza', slot=slot)['estado'] == 'completada'
+    resultado = segundo.ejecutar('limpieza', slot=slot)
+    assert resultado == {'nombre': 'limpieza', 'estado': 'omitida', 'motivo': 'slot ya procesado'}
+    assert len(ejecuciones) == 1
+
+
+def test_tarea_parcial_se_reanuda_desde_el_checkpoint():
+    avance = []
+    p = PlanificadorTareas()
+
+    def por_lotes(ctx):
+        desde = ctx.checkpoint.get('ultimo', 0)
+        avance.append(desde)
+        ctx.guardar_checkpoint({'ultimo': desde + 10})
+        if desde == 0:
+            time.sleep(0.05)  # el primer lote agota el presupuesto
+            ctx.debe_detenerse()
+        return {'desde': desde}
+
+    p.registrar('purga', por_lotes, '0 3 * * *', bloqueo=None, max_segundos=0.01)
+    assert p.ejecutar('purga')['estado'] == 'parcial'
+
+    # Fuera del horario del cron, el tick reanuda la tarea parcial
+    p._tick(datetime(2026, 3, 2, 12, 0))
+    estado = planificador._leer_estado(p.tareas['purga'].ruta_estado)
+    assert avance == [0, 10]
+    assert estado['estado'] == 'completada' and estado['checkpoint'] == {}
+
+
+def test_bloqueo_desconocido():
+    with pytest.raises(ValueError):
+        PlanificadorTareas().registrar('x', lambda ctx: None, '* * * * *', bloqueo='redis')
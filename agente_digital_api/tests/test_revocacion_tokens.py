@@ -0,0 +1,72 @@
+# tests/test_revocacion_tokens.py
+# Revocación de tokens compartida entre workers (app/revocacion_tokens.py)
+
+import time
+
+import pytest
+
+from app.revocacion_tokens import AlmacenRevocacionSQLite, FiltroBloom, RevocacionTokens
+
+
+def crear_worker(ruta):
+    """Un worker de gunicorn: su propio filtro, el mismo archivo SQLite"""
+    worker = RevocacionTokens(AlmacenRevocacionSQLite(ruta))
+    worker.config['SINCRONIZACION'] = '0'  # sincroniza en cada consulta
+    return worker
+
+
+@pytest.fixture
+def workers(tmp_path):
+    ruta = str(tmp_path / 'revocaciones.sqlite3')
+    return crear_worker(ruta), crear_worker(ruta)
+
+
+def test_logout_en_un_worker_se_aplica_en_el_otro(workers):
+    uno, otro = workers
+    assert not otro.esta_revocado('jti-1')  # el filtro de 'otro' ya está construido
+
+    assert uno.revocar('jti-1', time.time() + 3600)
+    assert uno.esta_revocado('jti-1')
+    assert otro.esta_revocado('jti-1')  # sincronización incremental, sin reconstruir
+    assert otro.stats['reconstrucciones'] == 1
+    assert not otro.esta_revocado('jti-2')
+
+
+def test_token_expirado_o_sin_jti_no_se_guarda(workers):
+    uno, otro = workers
+    assert not uno.revocar('jti-viejo', time.time() - 1)
+    assert not uno.revocar(None, time.time() + 60)
+    assert not uno.revocar('jti-sin-exp', None)
+    assert not otro.esta_revocado('jti-viejo')
+    assert not otro.esta_revocado(None)
+
+
+def test_revocacion_expira_con_el_token(tmp_path):
+    almacen = AlmacenRevocacionSQLite(str(tmp_path / 'revocaciones.sqlite3'))
+    almacen.revocar('vigente', time.time() + 60)
+    almacen.revocar('expirado', time.time() - 1)  # expiró después de revocarse
+
+    assert almacen.esta_revocado('vigente')
+    assert not almacen.esta_revocado('expirado')
+    assert almacen.purgar_expirados() == 1
+    jtis, _, completo = almacen.cambios_desde(None)
+    assert jtis == ['vigente'] and completo
+
+
+def test_positivo_del_filtro_se_confirma_en_el_almacen(workers):
+    uno, _ = workers
+    uno.esta_revocado('x')
+    uno._filtro.agregar('no-revocado')  # simula un falso positivo del filtro
+    assert not uno.esta_revocado('no-revocado')
+    assert uno.stats['falsos_positivos'] == 1
+
+
+def test_filtro_bloom_sin_falsos_negativos():
+    filtro = FiltroBloom(1000, 0.01)
+    revocados = [f"jti-{i}" for i in range(1000)]
+    for jti in revocados:
+        filtro.agregar(jti)
+
+    assert all(jti in filtro for jti in revocados)
+    falsos = sum(f"otro-{i}" in filtro for i in range(10000))
+    assert falsos < 300  # ~1 % esperado
@@ -0,0 +1,154 @@
+# tests/test_secuencia_incidentes.py
+# Correlativos de IDVisible por empresa (app/modules/admin/secuencia_incidentes.py)
+
+import threading
+
+import pytest
+
+from app.modules.admin import secuencia_incidentes as secuencia
+
+
+class BaseSecuencia:
+    """Estado que comparten las conexiones simuladas: la tabla de secuencia y el MAX de Incidentes"""
+
+    def __init__(self, tabla_instalada=True, maximos=None):
+        self.tabla_instalada = tabla_instalada
+        self.ultimos = {}                   # EmpresaSecuenciaIncidentes: {EmpresaID: UltimoCorrelativo}
+        self.maximos = dict(maximos or {})  # mayor correlativo ya usado en Incidentes por empresa
+        self.lock = threading.Lock()
+        self.conexiones = 0
+        self.commits = 0
+
+    def conectar(self):
+        with self.lock:
+            self.conexiones += 1
+        return ConexionSecuencia(self)
+
+
+class ConexionSecuencia:
+    def __init__(self, base):
+        self.base = base
+
+    def cursor(self):
+        return CursorSecuencia(self.base)
+
+    def commit(self):
+        with self.base.lock:
+            self.base.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CursorSecuencia:
+    """Responde las cuatro consultas del módulo como lo haría SQL Server"""
+
+    def __init__(self, base):
+        self.base = base
+        self._fila = None
+
+    def execute(self, sql, parametros=()):
+        base = self.base
+        if sql == secuencia.QUERY_DISPONIBLE:
+            self._fila = (1 if base.tabla_instalada else 0,)
+        elif sql == secuencia.QUERY_MAX_CORRELATIVO:
+            self._fila = (base.maximos.get(parametros[0], 0) + 1,)
+        elif not base.tabla_instalada:
+            raise RuntimeError(f"Invalid object name '{secuencia.TABLA_SECUENCIA}'")
+        elif sql == secuencia.QUERY_RESERVAR:
+            cantidad, empresa_id = parametros
+            with base.lock:
+                if empresa_id in base.ultimos:
+                    base.ultimos[empresa_id] += cantidad
+                    self._fila = (base.ultimos[empresa_id],)
+                else:
+                    self._fila = None
+        elif sql == secuencia.QUERY_INICIALIZAR:
+            with base.lock:
+                base.ultimos.setdefault(parametros[0], base.maximos.get(parametros[0], 0))
+        else:
+            raise AssertionError(f"Consulta inesperada: {sql}")
+
+    def fetchone(self):
+        return self._fila
+
+
+def test_primera_reserva_parte_del_mayor_correlativo_usado():
+    base = BaseSecuencia(maximos={7: 41})
+    asignador = secuencia.AsignadorCorrelativos(bloque=1, conectar=base.conectar)
+
+    assert [asignador.siguiente(7) for _ in range(3)] == [42, 43, 44]
+    assert base.ultimos[7] == 44
+    assert asignador.siguiente('8') == 1  # empresa sin incidentes; el ID puede venir como texto
+
+
+def test_bloque_reserva_una_vez_por_bloque():
+    base = BaseSecuencia()
+    asignador = secuencia.AsignadorCorrelativos(bloque=10, conectar=base.conectar)
+
+    assert [asignador.siguiente(1) for _ in range(10)] == list(range(1, 11))
+    assert base.conexiones == 1
+    assert asignador.siguiente(1) == 11
+    assert base.conexiones == 2
+    assert asignador.get_stats()['reservados_sin_usar'] == 9
+
+
+def test_workers_concurrentes_sin_duplicados():
+    """Dos procesos (asignadores) y varios hilos sobre la misma tabla: correlativos únicos"""
+    base = BaseSecuencia(maximos={3: 100})
+    workers = [secuencia.AsignadorCorrelativos(bloque=5, conectar=base.conectar) for _ in range(2)]
+    obtenidos, guard = [], threading.Lock()
+
+    def crear(asignador):
+        for _ in range(50):
+            correlativo = asignador.siguiente(3)
+            with guard:
+                obtenidos.append(correlativo)
+
+    hilos = [threading.Thread(target=crear, args=(workers[i % 2],)) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(obtenidos) == len(set(obtenidos)) == 200
+    assert min(obtenidos) == 101
+
+
+def test_sin_tabla_usa_maximo_mas_uno():
+    base = BaseSecuencia(tabla_instalada=False, maximos={3: 7})
+    asignador = secuencia.AsignadorCorrelativos(bloque=10, conectar=base.conectar)
+
+    assert asignador.siguiente(3) == 8
+    # Sin reserva, el siguiente se vuelve a leer del MAX (bloque de uno)
+    base.maximos[3] = 8
+    assert asignador.siguiente(3) == 9
+    stats = asignador.get_stats()
+    assert stats['respaldo_max'] == 2 and stats['errores'] == 0
+    assert base.commits == 2
+
+
+def test_tabla_instalada_despues_se_usa_sin_reiniciar(monkeypatch):
+    monkeypatch.setattr(secuencia, 'TTL_DISPONIBILIDAD', 0)
+    base = BaseSecuencia(tabla_instalada=False, maximos={3: 100})
+    asignador = secuencia.AsignadorCorrelativos(bloque=1, conectar=base.conectar)
+
+    assert asignador.siguiente(3) == 101
+    base.maximos[3] = 101
+    base.tabla_instalada = True
+    assert [asignador.siguiente(3), asignador.siguiente(3)] == [102, 103]
+    assert base.ultimos[3] == 103
+    assert asignador.get_stats()['respaldo_max'] == 1
+
+
+def test_sin_conexion_propaga_el_error():
+    asignador = secuencia.AsignadorCorrelativos(bloque=1, conectar=lambda: None)
+    with pytest.raises(RuntimeError):
+        asignador.siguiente(1)
+    assert asignador.get_stats()['errores'] == 1
+
+    with pytest.raises(ValueError):
+        asignador.siguiente(None)
@@ -0,0 +1,94 @@
+# tests/test_sincronizar_taxonomias.py
+# Sincronización por diferencias de INCIDENTE_TAXONOMIA (app/modules/incidentes/gestor_taxonomias.py)
+
+import pytest
+
+from app.modules.incidentes import gestor_taxonomias
+from app.modules.incidentes.gestor_taxonomias import sincronizar_taxonomias
+
+TABLA = """CREATE TABLE INCIDENTE_TAXONOMIA (
+    Id INT IDENTITY(1,1) PRIMARY KEY, IncidenteID INT, Id_Taxonomia NVARCHAR(50),
+    Comentarios NVARCHAR(MAX) NULL, FechaAsignacion DATETIME, AsignadoPor NVARCHAR(100) NULL,
+    CreadoPor NVARCHAR(100) NULL)"""
+
+
+class CursorContador:
+    """Envuelve un cursor y cuenta las sentencias por tipo"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.sentencias = {}
+
+    def _contar(self, sql):
+        tipo = sql.split()[0].upper()
+        self.sentencias[tipo] = self.sentencias.get(tipo, 0) + 1
+
+    def execute(self, sql, parametros=()):
+        self._contar(sql)
+        return self.cursor.execute(sql, parametros)
+
+    def executemany(self, sql, filas):
+        self._contar(sql)
+        return self.cursor.executemany(sql, filas)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+@pytest.fixture
+def cursor(base_emulada):
+    base_emulada.ejecutar_script(TABLA)
+    base_emulada.cargar('INCIDENTE_TAXONOMIA', ['IncidenteID', 'Id_Taxonomia', 'Comentarios'], [
+        (1, 'A', 'igual'), (1, 'B', 'antes'), (1, 'C', None), (1, '10', None), (2, 'A', 'otro incidente'),
+    ])
+    conexion = base_emulada.conectar()
+    yield conexion.cursor()
+    conexion.close()
+
+
+def asignadas(cursor, incidente_id):
+    cursor.execute(
+        "SELECT Id_Taxonomia, Comentarios, AsignadoPor, CreadoPor FROM INCIDENTE_TAXONOMIA WHERE IncidenteID = ?",
+        (incidente_id,)
+    )
+    return {fila[0]: tuple(fila[1:]) for fila in cursor.fetchall()}
+
+
+def test_aplica_solo_las_diferencias(cursor):
+    resultado = sincronizar_taxonomias(
+        cursor, 1, {'A': 'igual', 'B': 'después', 'D': 'nueva', 10: None}, usuario='7')
+
+    assert resultado == {'agregadas': 1, 'eliminadas': 1, 'actualizadas': 1, 'sin_cambios': 2}
+    assert asignadas(cursor, 1) == {
+        'A': ('igual', None, None), 'B': ('después', None, None),
+        'D': ('nueva', '7', None), '10': (None, None, None),
+    }
+    assert asignadas(cursor, 2) == {'A': ('otro incidente', None, None)}
+
+
+def test_sin_diferencias_no_escribe(cursor):
+    contador = CursorContador(cursor)
+    resultado = sincronizar_taxonomias(contador, 1, {'A': 'igual', 'B': 'antes', 'C': '', '10': None})
+    assert resultado == {'agregadas': 0, 'eliminadas': 0, 'actualizadas': 0, 'sin_cambios': 4}
+    assert contador.sentencias == {'SELECT': 1}
+
+
+def test_columna_de_usuario(cursor):
+    sincronizar_taxonomias(cursor, 3, {'X': None}, usuario='9', columna_usuario='CreadoPor')
+    assert asignadas(cursor, 3) == {'X': (None, None, '9')}
+
+    with pytest.raises(ValueError):
+        sincronizar_taxonomias(cursor, 3, {}, columna_usuario='Comentarios; DROP TABLE x')
+
+
+def test_lotes_respetan_el_limite_de_parametros(cursor, monkeypatch):
+    monkeypatch.setattr(gestor_taxonomias, 'FILAS_POR_INSERT', 3)
+    monkeypatch.setattr(gestor_taxonomias, 'IDS_POR_DELETE', 2)
+    contador = CursorContador(cursor)
+
+    deseadas = {f"T{i}": None for i in range(7)}
+    resultado = sincronizar_taxonomias(contador, 1, deseadas)
+
+    assert resultado['agregadas'] == 7 and resultado['eliminadas'] == 4
+    assert contador.sentencias == {'SELECT': 1, 'DELETE': 2, 'INSERT': 3}
+    assert set(asignadas(cursor, 1)) == set(deseadas)